@@ -7,11 +7,9 @@ from aqt import mw
 
 
 def start_addon() -> None:
-    from . import bulkconvert, events, menus
+    from . import startup
 
-    bulkconvert.init()
-    menus.init()
-    events.init()
+    startup.init()
 
 
 if mw and "pytest" not in sys.modules:
@@ -0,0 +1,245 @@
+# Copyright: Ajatt-Tools and contributors; https://github.com/Ajatt-Tools
+# License: GNU AGPL, version 3 or later; http://www.gnu.org/licenses/agpl.html
+import os.path
+import typing
+from collections.abc import Callable, Iterable, Sequence
+
+from anki.collection import Collection, OpChanges
+from anki.notes import Note, NoteId
+from anki.utils import join_fields
+from aqt import mw
+from aqt.browser import Browser
+from aqt.operations import CollectionOp
+from aqt.qt import *
+from aqt.utils import tooltip
+
+from .ajt_common.about_menu import tweak_window
+from .ajt_common.media import find_all_media
+from .ajt_common.monospace_line_edit import MonoSpaceLineEdit
+from .config import MediaConverterConfig, get_global_config
+from .consts import ADDON_FULL_NAME, WINDOW_MIN_WIDTH
+from .media_deduplication.deduplication import deduplicate_media_in_note
+from .media_deduplication.reference_index import get_reference_index
+from .media_rename import (
+    RenameTask,
+    duplicate_file_in_collection,
+    format_report_message,
+)
+from .utils.file_paths_factory import compatible_filename, note_sort_field_content
+from .widgets.lazy_table_model import LazyTableModel
+
+ACTION_NAME = f"{ADDON_FULL_NAME}: Batch-rename media"
+DEFAULT_PATTERN = "{sort_field}_{n}"
+PATTERN_HELP = (
+    "Placeholders: {name} (current name without extension), {sort_field}, {custom_field}, {note_id}, {n} (counter)."
+)
+
+
+class FileContext(typing.NamedTuple):
+    """A media file and the note it was found in first."""
+
+    filename: str
+    note_id: int
+    sort_field: str
+    custom_field: str
+
+
+class BatchRenameError(ValueError):
+    pass
+
+
+@compatible_filename
+def format_name(pattern: str, file: FileContext, counter: str) -> str:
+    try:
+        return pattern.format(
+            name=os.path.splitext(file.filename)[0],
+            sort_field=file.sort_field,
+            custom_field=file.custom_field,
+            note_id=file.note_id,
+            n=counter,
+        )
+    except (KeyError, IndexError, ValueError) as ex:
+        raise BatchRenameError(f"Invalid pattern: {ex}") from ex
+
+
+def plan_batch_rename(pattern: str, files: Sequence[FileContext], is_taken: Callable[[str], bool]) -> list[RenameTask]:
+    """
+    Make a new name for each file. Files keep their extensions.
+    Names that repeat or belong to existing files get a numeric suffix.
+    """
+    if not pattern.strip():
+        raise BatchRenameError("Pattern is empty.")
+    width = len(str(len(files)))
+    assigned: set[str] = set()
+    tasks: list[RenameTask] = []
+    for idx, file in enumerate(files, start=1):
+        ext = os.path.splitext(file.filename)[1]
+        stem = format_name(pattern, file, str(idx).zfill(width))
+        new_filename, suffix = f"{stem}{ext}", 1
+        while new_filename != file.filename and (new_filename in assigned or is_taken(new_filename)):
+            suffix += 1
+            new_filename = f"{stem}_{suffix}{ext}"
+        assigned.add(new_filename)
+        if new_filename != file.filename:
+            tasks.append(RenameTask(file.filename, new_filename))
+    return tasks
+
+
+def collect_file_contexts(notes: Iterable[Note], config: MediaConverterConfig) -> list[FileContext]:
+    """Find media files referenced by notes, in order of appearance."""
+    found: dict[str, FileContext] = {}
+    for note in notes:
+        for filename in find_all_media(join_fields(note.fields)):
+            if filename in found:
+                continue
+            try:
+                custom_field = note[config.custom_name_field]
+            except KeyError:
+                custom_field = ""
+            found[filename] = FileContext(filename, note.id, note_sort_field_content(note), custom_field)
+    return list(found.values())
+
+
+class BatchRenameResult(typing.NamedTuple):
+    renamed: list[RenameTask]
+    failed: list[str]
+
+
+def batch_rename_op(col: Collection, to_rename: Sequence[RenameTask], result: BatchRenameResult) -> OpChanges:
+    """
+    Copy files to their new names and rewrite every note that references them as one undoable operation.
+    The old files stay in the media folder until Check Media removes them.
+    """
+    pos = col.add_custom_undo_entry(f"Rename {len(to_rename)} media files")
+    for old_filename, new_filename in to_rename:
+        try:
+            new_filename = duplicate_file_in_collection(old_filename, new_filename, col)
+        except OSError as ex:
+            result.failed.append(f"{old_filename}: {ex}")
+            continue
+        result.renamed.append(RenameTask(old_filename, new_filename))
+
+    to_update: dict[NoteId, Note] = {}
+    references = get_reference_index().references(col, (task.old_filename for task in result.renamed))
+    for old_filename, new_filename in result.renamed:
+        for note_id in references[old_filename]:
+            note = to_update.setdefault(note_id, col.get_note(note_id))
+            deduplicate_media_in_note(note, old_filename, new_filename)
+    col.update_notes(list(to_update.values()))
+    return col.merge_undo_entries(pos)
+
+
+class BatchRenameDialog(QDialog):
+    """Asks for a naming pattern and shows a preview. Can be used without Anki running."""
+
+    _files: Sequence[FileContext]
+    _is_taken: Callable[[str], bool]
+    _to_rename: list[RenameTask]
+
+    def __init__(
+        self,
+        files: Sequence[FileContext],
+        is_taken: Callable[[str], bool],
+        pattern: str = DEFAULT_PATTERN,
+        parent: QWidget | None = None,
+    ) -> None:
+        super().__init__(parent=parent)
+        self._files = files
+        self._is_taken = is_taken
+        self._to_rename = []
+        self._pattern_edit = MonoSpaceLineEdit()
+        self._status_label = QLabel()
+        self._model = LazyTableModel(["Old name", "New name"], parent=self)
+        self._table = QTableView()
+        self._table.setModel(self._model)
+        self._table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        self._button_box = QDialogButtonBox(QDialogButtonBox.StandardButton.Ok | QDialogButtonBox.StandardButton.Cancel)
+        self.setWindowTitle(f"{ADDON_FULL_NAME}: batch-rename files")
+        self.setMinimumWidth(WINDOW_MIN_WIDTH)
+        self.setLayout(self._make_layout())
+        qconnect(self._pattern_edit.textChanged, self._update_preview)
+        qconnect(self._button_box.accepted, self.accept)
+        qconnect(self._button_box.rejected, self.reject)
+        self._pattern_edit.setText(pattern)
+        self._update_preview()
+        tweak_window(self)
+
+    def _make_layout(self) -> QLayout:
+        layout = QVBoxLayout()
+        layout.addWidget(self._pattern_edit)
+        help_label = QLabel(PATTERN_HELP)
+        help_label.setWordWrap(True)
+        layout.addWidget(help_label)
+        layout.addWidget(self._status_label)
+        layout.addWidget(self._table)
+        layout.addWidget(self._button_box)
+        return layout
+
+    def _update_preview(self) -> None:
+        try:
+            self._to_rename = plan_batch_rename(self._pattern_edit.text(), self._files, self._is_taken)
+        except BatchRenameError as ex:
+            self._to_rename = []
+            self._status_label.setText(str(ex))
+        else:
+            self._status_label.setText(f"{len(self._to_rename)} of {len(self._files)} files will be renamed.")
+        self._model.set_rows(self._to_rename)
+        self._button_box.button(QDialogButtonBox.StandardButton.Ok).setEnabled(bool(self._to_rename))
+
+    def pattern(self) -> str:
+        return self._pattern_edit.text()
+
+    def to_rename(self) -> list[RenameTask]:
+        return self._to_rename
+
+
+class BatchRenamer:
+    _config: MediaConverterConfig
+    _browser: Browser
+
+    def __init__(self, config: MediaConverterConfig, browser: Browser) -> None:
+        self._config = config
+        self._browser = browser
+
+    def tooltip(self, msg: str) -> None:
+        tooltip(msg, period=self._config.tooltip_duration_milliseconds, parent=self._browser)
+
+    def on_batch_rename(self) -> None:
+        assert mw and mw.col
+        if not (selected_nids := self._browser.selectedNotes()):
+            self.tooltip("No cards selected.")
+            return
+        if not (files := collect_file_contexts(map(mw.col.get_note, selected_nids), self._config)):
+            self.tooltip("No files found on selected cards.")
+            return
+        media_dir = mw.col.media.dir()
+        dialog = BatchRenameDialog(
+            files, is_taken=lambda filename: os.path.exists(os.path.join(media_dir, filename)), parent=self._browser
+        )
+        if dialog.exec() and (to_rename := dialog.to_rename()):
+            self._rename(to_rename)
+
+    def _rename(self, to_rename: list[RenameTask]) -> None:
+        result = BatchRenameResult(renamed=[], failed=[])
+
+        def on_success() -> None:
+            msg = format_report_message(result.renamed)
+            if result.failed:
+                msg += f"<p>Failed <code>{len(result.failed)}</code> files.</p>"
+            self.tooltip(msg)
+            if self._browser.editor:
+                self._browser.editor.loadNoteKeepingFocus()
+
+        CollectionOp(
+            parent=self._browser,
+            op=lambda col: batch_rename_op(col, to_rename, result),
+        ).success(lambda out: on_success()).run_in_background()
+
+
+def setup_menu(browser: Browser) -> None:
+    a = QAction(ACTION_NAME, browser)
+    renamer = BatchRenamer(config=get_global_config(), browser=browser)
+    qconnect(a.triggered, renamer.on_batch_rename)
+    browser.form.menuEdit.addAction(a)
+    # Keep a reference, otherwise the object is garbage-collected and the action does nothing.
+    browser._ajt__media_converter_batch_renamer = renamer
@@ -0,0 +1,222 @@
+# Copyright: Ajatt-Tools and contributors; https://github.com/Ajatt-Tools
+# License: GNU AGPL, version 3 or later; http://www.gnu.org/licenses/agpl.html
+
+import time
+from collections.abc import Callable
+
+from aqt import gui_hooks, mw
+from aqt.operations import CollectionOp
+from aqt.qt import *
+from aqt.utils import tooltip
+
+from ..config import MediaConverterConfig
+from ..dialogs.bulk_convert_result_dialog import BulkConvertResultDialog
+from ..utils.idle_gate import ActivityFilter, IdleGate
+from ..widgets.background_convert_status import BackgroundConvertStatus
+from .convert_result import ConvertProgress
+from .convert_task import ConvertTask
+from .runnable import ConvertRunnable, ConvertSignals
+
+TICK_MS = 1000
+# Notes are updated in batches while the files are converting, so that the work done so far isn't lost.
+NOTES_BATCH_SIZE = 200
+NOTES_BATCH_SECONDS = 30.0
+
+# Keeps the jobs alive until their worker threads have finished and the indicator is closed.
+_running: list["BackgroundConversion"] = []
+
+
+class BackgroundConversion(QObject):
+    """
+    Runs a bulk conversion without blocking Anki.
+    New files are started only while the user is idle, and the encoders run at the lowest OS priority.
+    The notes of converted files are updated in batches, also only while the user is idle.
+    Progress is shown in the status bar of the main window.
+    """
+
+    _task: ConvertTask
+    _gate: IdleGate
+    _config: MediaConverterConfig
+    _signals: ConvertSignals
+    _filter: ActivityFilter
+    _status: BackgroundConvertStatus | None
+    _dialog: BulkConvertResultDialog | None  # results opened while the task is running
+    _timer: QTimer
+    _progress: ConvertProgress | None
+    _task_done: bool
+    _closed: bool  # the profile was closed before the task finished
+    _updating: bool
+    _update_error: Exception | None
+    _last_update: float
+    _status_bar_was_hidden: bool
+    _on_done: Callable[[], None]
+
+    def __init__(
+        self,
+        task: ConvertTask,
+        gate: IdleGate,
+        config: MediaConverterConfig,
+        on_done: Callable[[], None] = lambda: None,
+    ) -> None:
+        super().__init__()
+        self._task = task
+        self._gate = gate
+        self._config = config
+        self._signals = ConvertSignals()
+        self._filter = ActivityFilter(gate, parent=self)
+        self._status = None
+        self._dialog = None
+        self._progress = None
+        self._task_done = False
+        self._closed = False
+        self._updating = False
+        self._update_error = None
+        self._last_update = time.monotonic()
+        self._status_bar_was_hidden = True
+        self._on_done = on_done
+        self._timer = QTimer(self)
+        self._timer.setInterval(TICK_MS)
+        qconnect(self._timer.timeout, self._tick)
+        qconnect(self._signals.update_progress, self._on_progress)
+        qconnect(self._signals.task_done, self._on_task_done)
+
+    def start(self) -> None:
+        assert mw
+        _running.append(self)
+        QApplication.instance().installEventFilter(self._filter)
+        self._show_status()
+        gui_hooks.profile_will_close.append(self._on_profile_will_close)
+        QThreadPool.globalInstance().start(ConvertRunnable(self._task, self._signals))
+        self._timer.start()
+
+    def _show_status(self) -> None:
+        self._status = BackgroundConvertStatus()
+        qconnect(self._status.cancel_button.clicked, lambda: self._signals.canceled.emit())
+        qconnect(self._status.results_button.clicked, self._show_results)
+        status_bar = mw.statusBar()
+        # Anki hides the status bar of the main window. It is shown while the indicator is there.
+        self._status_bar_was_hidden = status_bar.isHidden()
+        status_bar.addPermanentWidget(self._status)
+        status_bar.show()
+
+    def _hide_status(self) -> None:
+        if self._status is None:
+            return
+        status_bar = mw.statusBar()
+        status_bar.removeWidget(self._status)
+        self._status.deleteLater()
+        self._status = None
+        status_bar.setHidden(self._status_bar_was_hidden)
+
+    def _on_progress(self, progress: ConvertProgress) -> None:
+        self._progress = progress
+        self._update_status()
+
+    def _update_status(self) -> None:
+        if self._status and self._progress and not self._task_done:
+            self._status.set_progress(self._progress, paused=not self._gate.is_idle())
+
+    def _on_task_done(self) -> None:
+        self._task_done = True
+        if self._closed:
+            self._release()
+        else:
+            self._tick()
+
+    def _tick(self) -> None:
+        self._update_status()
+        if self._dialog:
+            self._dialog.update_result()
+        self._maybe_update_notes()
+        if self._task_done and not self._updating and (self._update_error or not self._task.unapplied()):
+            self._finish()
+
+    def _maybe_update_notes(self) -> None:
+        if self._updating or self._update_error or not self._gate.is_idle():
+            return
+        if not (pending := self._task.unapplied()):
+            return
+        batch_ready = len(pending) >= NOTES_BATCH_SIZE or time.monotonic() - self._last_update >= NOTES_BATCH_SECONDS
+        if not (batch_ready or self._task_done):
+            return
+        self._updating = True
+        CollectionOp(parent=mw, op=lambda col: self._task.update_notes_op(col, pending)).success(
+            lambda out: self._on_notes_updated()
+        ).failure(self._on_update_failed).run_in_background()
+
+    def _on_notes_updated(self) -> None:
+        self._updating = False
+        self._last_update = time.monotonic()
+
+    def _on_update_failed(self, ex: Exception) -> None:
+        self._updating = False
+        self._update_error = ex
+        self._task.set_canceled()
+        tooltip(f"Couldn't update notes of converted files: {ex}", parent=mw)
+
+    def _stop(self) -> None:
+        self._timer.stop()
+        QApplication.instance().removeEventFilter(self._filter)
+
+    def _release(self) -> None:
+        # The worker threads send signals until the task is done.
+        if self._task_done and self._status is None and self in _running:
+            gui_hooks.profile_will_close.remove(self._on_profile_will_close)
+            _running.remove(self)
+
+    def _finish(self) -> None:
+        self._stop()
+        result = self._task.result
+        message = f"Bulk-convert: {len(result.converted)} converted"
+        if result.failed:
+            message += f", {len(result.failed)} failed"
+        if self._status:
+            self._status.set_finished(message)
+        if self._dialog:
+            self._dialog.update_result()
+        tooltip(message, period=self._config.tooltip_duration_milliseconds, parent=mw)
+        self._on_done()
+
+    def _show_results(self) -> None:
+        if self._dialog:
+            self._dialog.activateWindow()
+            return
+        dialog = BulkConvertResultDialog(mw)
+        dialog.set_result(self._task.result)
+        if not self._task_done:
+            # The user keeps working while the dialog is open. Files that finish later are added every tick.
+            dialog.setWindowModality(Qt.WindowModality.NonModal)
+            dialog.setAttribute(Qt.WidgetAttribute.WA_DeleteOnClose)
+            qconnect(dialog.finished, self._on_dialog_closed)
+            self._dialog = dialog
+            dialog.show()
+            return
+        self._hide_status()
+        self._release()
+        dialog.exec()
+
+    def _on_dialog_closed(self, _result: int = 0) -> None:
+        self._dialog = None
+
+    def _on_profile_will_close(self) -> None:
+        """Stop converting, and point the notes to the files that are ready while the collection is still open."""
+        self._task.set_canceled()
+        self._stop()
+        if not self._updating and not self._update_error and (pending := self._task.unapplied()):
+            self._task.update_notes_op(mw.col, pending)
+        self._closed = True
+        if self._dialog:
+            self._dialog.close()
+        self._hide_status()
+        self._release()
+        self._on_done()
+
+
+def start_background_conversion(
+    task: ConvertTask,
+    gate: IdleGate,
+    config: MediaConverterConfig,
+    on_done: Callable[[], None] = lambda: None,
+) -> None:
+    """Start the conversion. on_done is called once the notes are updated or the profile is closed."""
+    BackgroundConversion(task, gate, config, on_done).start()
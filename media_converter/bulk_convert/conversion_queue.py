@@ -0,0 +1,72 @@
+# Copyright: Ajatt-Tools and contributors; https://github.com/Ajatt-Tools
+# License: GNU AGPL, version 3 or later; http://www.gnu.org/licenses/agpl.html
+
+import os
+import sqlite3
+import threading
+import time
+from collections.abc import Iterable
+
+from ..consts import USER_FILES_DIR
+
+QUEUE_FILENAME = "conversion_queue.sqlite3"
+# Files are queued as images unless told otherwise.
+DEFAULT_KIND = "image"
+
+
+class ConversionQueue:
+    """
+    Media files waiting to be converted, per media folder.
+    The queue is stored on disk, so queued files are converted after a restart if Anki closes first.
+    """
+
+    _db_path: str
+    _lock: threading.Lock
+
+    def __init__(self, db_path: str | None = None) -> None:
+        if db_path is None:
+            os.makedirs(USER_FILES_DIR, exist_ok=True)
+            db_path = os.path.join(USER_FILES_DIR, QUEUE_FILENAME)
+        self._db_path = db_path
+        self._lock = threading.Lock()
+        with self._connect() as con:
+            con.execute("""
+                CREATE TABLE IF NOT EXISTS queued (
+                    media_dir TEXT NOT NULL,
+                    filename TEXT NOT NULL,
+                    queued_at REAL NOT NULL,
+                    kind TEXT NOT NULL DEFAULT 'image',
+                    PRIMARY KEY (media_dir, filename)
+                )
+            """)
+            if "kind" not in {column for _, column, *_ in con.execute("PRAGMA table_info(queued)")}:
+                # Queues written by older versions only had images.
+                con.execute("ALTER TABLE queued ADD COLUMN kind TEXT NOT NULL DEFAULT 'image'")
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self._db_path, timeout=10)
+
+    def push(self, media_dir: str, filenames: Iterable[str], kind: str = DEFAULT_KIND) -> None:
+        """Add files to the queue. Files that are already queued keep their place."""
+        now = time.time()
+        with self._lock, self._connect() as con:
+            con.executemany(
+                "INSERT OR IGNORE INTO queued (media_dir, filename, queued_at, kind) VALUES (?, ?, ?, ?)",
+                ((media_dir, filename, now, kind) for filename in filenames),
+            )
+
+    def pending(self, media_dir: str) -> dict[str, str]:
+        """Return queued files and their kinds, e.g. image or audio, in the order they were added."""
+        with self._lock, self._connect() as con:
+            rows = con.execute(
+                "SELECT filename, kind FROM queued WHERE media_dir = ? ORDER BY queued_at, rowid",
+                (media_dir,),
+            )
+            return dict(rows)
+
+    def remove(self, media_dir: str, filenames: Iterable[str]) -> None:
+        with self._lock, self._connect() as con:
+            con.executemany(
+                "DELETE FROM queued WHERE media_dir = ? AND filename = ?",
+                ((media_dir, filename) for filename in filenames),
+            )
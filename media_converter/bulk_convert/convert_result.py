@@ -1,20 +1,91 @@
 # Copyright: Ajatt-Tools and contributors; https://github.com/Ajatt-Tools
 # License: GNU AGPL, version 3 or later; http://www.gnu.org/licenses/agpl.html
 
+import time
+import typing
+
 from ..file_converters.common import LocalFile
+from ..utils.conversion_records import ConversionRecord
+
+MIB = 1024 * 1024
+
+
+def format_mib(n_bytes: int) -> str:
+    return f"{n_bytes / MIB:.1f} MiB"
+
+
+def format_duration(seconds: float) -> str:
+    minutes, seconds = divmod(round(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}" if hours else f"{minutes}:{seconds:02d}"
+
+
+class ConvertProgress(typing.NamedTuple):
+    """A snapshot of a running bulk conversion, sent to the progress bar."""
+
+    done: int  # converted and failed
+    total: int
+    failed: int
+    bytes_in: int  # size of the original files that were converted
+    bytes_out: int  # size of the files they were converted to
+    elapsed: float  # seconds
+    active: tuple[str, ...]  # files that the workers are converting right now
+
+    @property
+    def files_per_second(self) -> float:
+        return self.done / self.elapsed if self.elapsed > 0 else 0.0
+
+    @property
+    def compression_ratio(self) -> float:
+        """Output size relative to input size. Lower is better."""
+        return self.bytes_out / self.bytes_in if self.bytes_in else 0.0
+
+    @property
+    def eta(self) -> float | None:
+        """Seconds left, or None until the speed is known."""
+        if not self.done or not self.files_per_second:
+            return None
+        return (self.total - self.done) / self.files_per_second
+
+    def summary(self) -> str:
+        parts = [f"{self.done}/{self.total} files", f"{self.files_per_second:.1f} files/s"]
+        if self.bytes_in:
+            parts.append(f"{format_mib(self.bytes_in)} → {format_mib(self.bytes_out)} ({self.compression_ratio:.0%})")
+        if self.failed:
+            parts.append(f"{self.failed} failed")
+        if (eta := self.eta) is not None:
+            parts.append(f"ETA {format_duration(eta)}")
+        return " · ".join(parts)
 
 
 class ConvertResult:
     def __init__(self) -> None:
         self._converted: dict[LocalFile, str] = {}
         self._failed: dict[LocalFile, Exception | None] = {}
+        self._records: list[ConversionRecord] = []
+        self._bytes_in = 0
+        self._bytes_out = 0
+        self._started_at: float | None = None
+        self._finished_at: float | None = None
+
+    def start(self) -> None:
+        self._started_at = time.monotonic()
+        self._finished_at = None
+
+    def finish(self) -> None:
+        self._finished_at = time.monotonic()
 
-    def add_converted(self, old_file: LocalFile, new_filename: str) -> None:
+    def add_converted(self, old_file: LocalFile, new_filename: str, bytes_in: int = 0, bytes_out: int = 0) -> None:
         self._converted[old_file] = new_filename
+        self._bytes_in += bytes_in
+        self._bytes_out += bytes_out
 
     def add_failed(self, file: LocalFile, exception: Exception | None = None) -> None:
         self._failed[file] = exception
 
+    def add_record(self, record: ConversionRecord) -> None:
+        self._records.append(record)
+
     @property
     def converted(self) -> dict[LocalFile, str]:
         return self._converted
@@ -23,5 +94,36 @@ class ConvertResult:
     def failed(self) -> dict[LocalFile, Exception | None]:
         return self._failed
 
+    @property
+    def records(self) -> list[ConversionRecord]:
+        """Details of every converted, skipped and failed file, for export."""
+        return self._records
+
+    @property
+    def bytes_in(self) -> int:
+        return self._bytes_in
+
+    @property
+    def bytes_out(self) -> int:
+        return self._bytes_out
+
+    @property
+    def elapsed(self) -> float:
+        """Seconds since the conversion started, or how long it took if it has finished."""
+        if self._started_at is None:
+            return 0.0
+        return (self._finished_at or time.monotonic()) - self._started_at
+
     def has_results(self) -> bool:
         return bool(self._converted or self._failed)
+
+    def progress(self, total: int, active: tuple[str, ...] = ()) -> ConvertProgress:
+        return ConvertProgress(
+            done=len(self._converted) + len(self._failed),
+            total=total,
+            failed=len(self._failed),
+            bytes_in=self._bytes_in,
+            bytes_out=self._bytes_out,
+            elapsed=self.elapsed,
+            active=active,
+        )
@@ -3,8 +3,10 @@
 import collections
 import concurrent.futures
 import multiprocessing
-from collections.abc import Iterable, Sequence
+import threading
+from collections.abc import Callable, Iterable, Sequence
 
+import anki.errors
 from anki.collection import Collection
 from anki.notes import Note, NoteId
 from anki.utils import join_fields
@@ -12,12 +14,23 @@ from aqt import mw
 from aqt.browser import Browser
 from aqt.operations import CollectionOp, ResultWithChanges
 
-from ..bulk_convert.convert_result import ConvertResult
+from ..bulk_convert.convert_result import ConvertProgress, ConvertResult
+from ..bulk_convert.reconvert_plan import ReconvertPlan, plan_reconvert
 from ..config import MediaConverterConfig
 from ..dialogs.bulk_convert_result_dialog import BulkConvertResultDialog
-from ..file_converters.common import LocalFile
+from ..file_converters.common import ConverterType, LocalFile
 from ..file_converters.find_media import FindMedia
 from ..file_converters.internal_file_converter import InternalFileConverter
+from ..file_converters.records import make_record
+from ..media_deduplication.conversion_index import get_conversion_index
+from ..media_deduplication.reference_index import trash_unreferenced
+from ..utils.conversion_records import (
+    ConversionOrigin,
+    ConversionRecord,
+    ConversionStatus,
+)
+from ..utils.idle_gate import IdleGate
+from ..utils.timings import RunProfiler, timed
 
 MAX_WORKERS = max(1, multiprocessing.cpu_count() - 1)
 
@@ -41,28 +54,79 @@ class ConvertTask:
     _canceled: bool
     _config: MediaConverterConfig
     _finder: FindMedia
+    _reconvert_plan: ReconvertPlan | None
+    _active: dict[int, str]  # worker thread id -> file it is converting
+    _active_lock: threading.Lock
+    _idle_gate: IdleGate | None
+    _applied: set[LocalFile]  # converted files whose notes have been updated
 
     def __init__(
-        self, browser: Browser, note_ids: Sequence[NoteId], selected_fields: list[str], config: MediaConverterConfig
+        self,
+        browser: Browser,
+        note_ids: Sequence[NoteId],
+        selected_fields: list[str],
+        config: MediaConverterConfig,
+        idle_gate: IdleGate | None = None,
     ) -> None:
+        """
+        With an idle gate, the task runs in the background:
+        encoders run at the lowest OS priority, and new files are started only while the user is idle.
+        """
         self._browser = browser
-        self._config = config
+        self._idle_gate = idle_gate
+        self._applied = set()
+        # Workers read the settings the job was started with, even if the config is saved meanwhile.
+        self._config = config.snapshot()
         self._selected_fields = selected_fields
         self._result = ConvertResult()
-        self._finder = FindMedia(config)
+        self._finder = FindMedia(self._config)
         self._canceled = False
+        self._active = {}
+        self._active_lock = threading.Lock()
         self._to_convert = self._find_files_to_convert_and_notes(note_ids)
+        self._reconvert_plan = None
 
     @property
     def size(self) -> int:
         return len(self._to_convert)
 
+    @property
+    def reconvert_plan(self) -> ReconvertPlan | None:
+        """Which images are reconverted and which are skipped, once plan_reconvert() has run."""
+        return self._reconvert_plan
+
+    def plan_reconvert(self) -> ReconvertPlan | None:
+        """
+        Leave out images that are already converted with the current settings, if reconversion is enabled.
+        Every image is looked up and the encoder is asked for its version, so run it in the background.
+        """
+        if self._config.bulk_reconvert and self._reconvert_plan is None:
+            self._reconvert_plan = self._plan_reconvert()
+        return self._reconvert_plan
+
+    @property
+    def result(self) -> ConvertResult:
+        return self._result
+
     def set_canceled(self) -> None:
         self._canceled = True
 
+    def unapplied(self) -> dict[LocalFile, str]:
+        """Converted files whose notes haven't been updated yet."""
+        # Copied at once, because the worker threads keep adding files.
+        converted = list(self._result.converted.items())
+        return {file: new_filename for file, new_filename in converted if file not in self._applied}
+
+    def progress(self) -> ConvertProgress:
+        """Counts, sizes and speed so far. Called from the thread that iterates over the task."""
+        with self._active_lock:
+            active = tuple(sorted(self._active.values()))
+        return self._result.progress(total=self.size, active=active)
+
     def __call__(self) -> Iterable[int]:
         """
-        Execute the conversion using ThreadPoolExecutor for parallelism while reporting progress.
+        Execute the conversion using ThreadPoolExecutor for parallelism.
+        Yields the number of finished files after each file. Use progress() for the details.
         The conversion is performed in parallel; the order of completion is not guaranteed.
         If the task is canceled, all pending jobs are cancelled and no further
         conversions are started.  Running conversions are allowed to finish but
@@ -71,24 +135,44 @@ class ConvertTask:
         if self._result.has_results():
             raise RuntimeError("Already converted.")
 
+        profiler = RunProfiler.from_env()
+        convert = profiler.wrap(self._convert_stored_file) if profiler else self._convert_stored_file
+        if self._reconvert_plan:
+            for filename, reason in self._reconvert_plan.to_skip().items():
+                self._result.add_record(
+                    self._unconverted_record(LocalFile.image(filename), ConversionStatus.skipped, reason.value)
+                )
+        self._result.start()
         with concurrent.futures.ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
-            future_to_file = {executor.submit(self._convert_stored_file, file): file for file in self._to_convert}
+            future_to_file = {executor.submit(convert, file): file for file in self._to_convert}
             for progress_idx, future in enumerate(concurrent.futures.as_completed(future_to_file), start=1):
                 if self._canceled:
                     cancel_all_remaining_futures(future_to_file)
                     break
                 original_filename = future_to_file[future]
                 try:
-                    converted_filename = future.result()
+                    record: ConversionRecord = future.result()
                 except TaskCanceledByUserException:
+                    self._result.add_record(
+                        self._unconverted_record(original_filename, ConversionStatus.skipped, "canceled by the user")
+                    )
                     continue
                 except Exception as ex:
                     self._result.add_failed(original_filename, exception=ex)
+                    self._result.add_record(
+                        self._unconverted_record(original_filename, ConversionStatus.failed, str(ex))
+                    )
                 else:
-                    self._result.add_converted(original_filename, converted_filename)
+                    self._result.add_converted(original_filename, record.output, record.bytes_in, record.bytes_out)
+                    self._result.add_record(record)
                 yield progress_idx
+        self._result.finish()
+        if profiler:
+            profiler.dump("bulk_convert")
+
+    def update_notes(self, on_done: Callable[[], None] = lambda: None) -> None:
+        """Point the notes to the converted files and show the report. on_done is called when the notes are updated."""
 
-    def update_notes(self) -> None:
         def show_report_message() -> int:
             dialog = BulkConvertResultDialog(self._browser)
             dialog.set_result(self._result)
@@ -96,18 +180,23 @@ class ConvertTask:
 
         def on_finish() -> None:
             assert self._browser.editor
+            on_done()
             show_report_message()
             self._browser.editor.loadNoteKeepingFocus()
 
-        if self._result.has_results():
-            # If there are converted or failed files.
-            if not self._result.converted:
+        def on_failure(ex: Exception) -> None:
+            on_done()
+            raise ex
+
+        if not self._result.converted:
+            on_done()
+            if self._result.has_results():
+                # If there are failed files.
                 show_report_message()
-                return
-            CollectionOp(parent=self._browser, op=lambda col: self._update_notes_op(col)).success(
-                lambda out: on_finish()
-            ).run_in_background()
-        return
+            return
+        CollectionOp(parent=self._browser, op=lambda col: self.update_notes_op(col)).success(
+            lambda out: on_finish()
+        ).failure(on_failure).run_in_background()
 
     def _first_referenced(self, file: LocalFile) -> Note:
         return next(note for note in self._to_convert[file].values())
@@ -141,26 +230,66 @@ class ConvertTask:
                     to_convert[LocalFile.audio(filename)][note.id] = note
         return to_convert
 
-    def _convert_stored_file(self, file: LocalFile) -> str:
+    def _plan_reconvert(self) -> ReconvertPlan:
+        assert mw
+        images = [file.file_name for file in self._to_convert if file.type == ConverterType.image]
+        plan = plan_reconvert(images, mw.col.media.dir(), self._config, get_conversion_index())
+        for filename in plan.to_skip():
+            del self._to_convert[LocalFile.image(filename)]
+        return plan
+
+    @staticmethod
+    def _unconverted_record(file: LocalFile, status: ConversionStatus, reason: str) -> ConversionRecord:
+        return make_record(ConversionOrigin.bulk, file.file_name, bytes_in=0, status=status, reason=reason)
+
+    def _convert_stored_file(self, file: LocalFile) -> ConversionRecord:
         """
         Convert a single file.
         If the task has been canceled, the conversion is skipped.
         """
+        if self._idle_gate:
+            self._idle_gate.wait(lambda: self._canceled)
         if self._canceled:
             raise TaskCanceledByUserException
-        conv = InternalFileConverter(self._browser.editor, file, self._first_referenced(file), config=self._config)
-        conv.convert_internal()
-        return conv.new_filename
+        with self._active_lock:
+            self._active[threading.get_ident()] = file.file_name
+        try:
+            # In the background, the editor's note can change at any time, so it isn't used to name files.
+            editor = None if self._idle_gate else self._browser.editor
+            conv = InternalFileConverter(
+                editor, file, self._first_referenced(file), config=self._config, low_priority=bool(self._idle_gate)
+            )
+            conv.convert_internal()
+            return conv.record(ConversionOrigin.bulk)
+        finally:
+            with self._active_lock:
+                del self._active[threading.get_ident()]
 
-    def _update_notes_op(self, col: Collection) -> ResultWithChanges:
-        pos = col.add_custom_undo_entry(f"Convert {len(self._result.converted)} images to WebP")
+    def update_notes_op(self, col: Collection, converted: dict[LocalFile, str] | None = None) -> ResultWithChanges:
+        """
+        Point the notes to the converted files. By default, all files that haven't been applied yet.
+        Notes are read again, so that edits made while the files were converting are kept.
+        """
+        if converted is None:
+            converted = self.unapplied()
+        pos = col.add_custom_undo_entry(f"Convert {len(converted)} images to WebP")
         to_update: dict[NoteId, Note] = {}
 
-        for old_file, converted_filename in self._result.converted.items():
-            for note in self._to_convert[old_file].values():
-                for field_name in self._keys_to_update(note):
-                    note[field_name] = note[field_name].replace(old_file.file_name, converted_filename)
-                to_update[note.id] = note
+        with timed("update_notes"):
+            for old_file, converted_filename in converted.items():
+                for note_id in self._to_convert[old_file]:
+                    if (note := to_update.get(note_id)) is None:
+                        try:
+                            note = to_update[note_id] = col.get_note(note_id)
+                        except anki.errors.NotFoundError:
+                            print(f"note id={note_id} not found")
+                            continue
+                    for field_name in self._keys_to_update(note):
+                        note[field_name] = note[field_name].replace(old_file.file_name, converted_filename)
 
-        col.update_notes(list(to_update.values()))
+            col.update_notes(list(to_update.values()))
+        self._applied.update(converted)
+        if self._config.delete_original_file_on_convert:
+            # Notes outside the selection may still use an original file. Those files are kept.
+            trash_unreferenced(col, (file.file_name for file in converted))
         return col.merge_undo_entries(pos)
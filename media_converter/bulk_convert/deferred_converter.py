@@ -0,0 +1,204 @@
+# Copyright: Ajatt-Tools and contributors; https://github.com/Ajatt-Tools
+# License: GNU AGPL, version 3 or later; http://www.gnu.org/licenses/agpl.html
+import concurrent.futures
+import typing
+from collections.abc import Iterable, Sequence
+
+from anki.collection import Collection, OpChanges
+from anki.notes import Note, NoteId
+from aqt import mw
+from aqt.operations import CollectionOp, QueryOp
+from aqt.qt import *
+from aqt.utils import tooltip
+
+from ..config import MediaConverterConfig
+from ..file_converters.common import ConverterType, LocalFile
+from ..file_converters.internal_file_converter import InternalFileConverter
+from ..media_deduplication.deduplication import deduplicate_media_in_note
+from ..media_deduplication.reference_index import (
+    get_reference_index,
+    trash_unreferenced,
+)
+from ..utils.conversion_records import ConversionOrigin, get_conversion_log
+from ..utils.timings import timed
+from .conversion_queue import ConversionQueue
+from .convert_task import MAX_WORKERS
+
+# Notes added within this window are converted together.
+DEBOUNCE_MS = 3000
+
+
+class QueuedFile(typing.NamedTuple):
+    file: LocalFile
+    note: Note  # the first note that references the file, used to name the converted file
+
+
+class DeferredResult(typing.NamedTuple):
+    converted: dict[str, str]  # old filename -> new filename
+    failed: dict[str, str]  # filename -> error
+
+
+def convert_queued_files(files: Sequence[QueuedFile], config: MediaConverterConfig) -> DeferredResult:
+    def convert(conv: InternalFileConverter) -> str:
+        try:
+            conv.convert_internal()
+        except Exception as ex:
+            get_conversion_log().record(conv.record(ConversionOrigin.add_note, error=ex))
+            raise
+        get_conversion_log().record(conv.record(ConversionOrigin.add_note))
+        return conv.new_filename
+
+    result = DeferredResult(converted={}, failed={})
+    future_to_file = {}
+    with concurrent.futures.ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        for queued in files:
+            try:
+                # The converter reserves its destination name, so files like a.png and a.jpg get different names.
+                conv = InternalFileConverter(editor=None, file=queued.file, note=queued.note, config=config)
+            except OSError as ex:
+                result.failed[queued.file.file_name] = str(ex)
+            else:
+                future_to_file[executor.submit(convert, conv)] = queued
+        for future in concurrent.futures.as_completed(future_to_file):
+            filename = future_to_file[future].file.file_name
+            try:
+                result.converted[filename] = future.result()
+            except Exception as ex:
+                result.failed[filename] = str(ex)
+    return result
+
+
+def find_queued_files(col: Collection, pending: dict[str, str]) -> tuple[list[QueuedFile], list[str]]:
+    """
+    Split queued files into those to convert and those to drop, because the file or its notes are gone.
+    Pending files map to their kinds, as returned by ConversionQueue.pending().
+    """
+    to_convert: list[QueuedFile] = []
+    to_drop: list[str] = []
+    for filename, note_ids in get_reference_index().references(col, pending).items():
+        if note_ids and col.media.have(filename):
+            file = LocalFile(filename, ConverterType(pending[filename]))
+            to_convert.append(QueuedFile(file, col.get_note(note_ids[0])))
+        else:
+            to_drop.append(filename)
+    return to_convert, to_drop
+
+
+def apply_conversions_op(col: Collection, converted: dict[str, str], delete_originals: bool = False) -> OpChanges:
+    """
+    Point every note that references a converted file to its new name, as one undoable operation.
+    Originals that no note references afterward are moved to the media trash if requested.
+    """
+    pos = col.add_custom_undo_entry(f"Convert {len(converted)} media files of added notes")
+    to_update: dict[NoteId, Note] = {}
+    with timed("update_notes"):
+        references = get_reference_index().references(col, converted)
+        for old_filename, new_filename in converted.items():
+            for note_id in references[old_filename]:
+                note = to_update.setdefault(note_id, col.get_note(note_id))
+                deduplicate_media_in_note(note, old_filename, new_filename)
+        col.update_notes(list(to_update.values()))
+    if delete_originals:
+        trash_unreferenced(col, converted)
+    return col.merge_undo_entries(pos)
+
+
+class DeferredConverter:
+    """
+    Converts media of notes added by AnkiConnect after the notes are added, so that adding isn't blocked.
+    Files are queued on disk. After a short pause in additions, the whole queue is converted in the background,
+    and the notes are updated in one batch.
+    """
+
+    _config: MediaConverterConfig
+    _queue: ConversionQueue
+    _timer: QTimer
+    _running: bool
+
+    def __init__(self, config: MediaConverterConfig, queue: ConversionQueue | None = None) -> None:
+        self._config = config
+        self._queue = queue or ConversionQueue()
+        self._running = False
+        self._timer = QTimer()
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(DEBOUNCE_MS)
+        qconnect(self._timer.timeout, self.flush)
+
+    def enqueue(self, filenames: Iterable[str], kind: ConverterType = ConverterType.image) -> None:
+        assert mw and mw.col
+        self._queue.push(mw.col.media.dir(), filenames, kind.value)
+        # Restart the countdown, so that a burst of additions is converted at once.
+        self.schedule()
+
+    def schedule(self) -> None:
+        self._timer.start()
+
+    def stop(self) -> None:
+        """Stop waiting. The queue is kept and converted the next time a profile is opened."""
+        self._timer.stop()
+
+    def flush(self) -> None:
+        if self._running:
+            # Try again after the current batch.
+            self.schedule()
+            return
+        if not (mw and mw.col):
+            return
+        media_dir = mw.col.media.dir()
+        pending = self._queue.pending(media_dir)
+        if not pending:
+            return
+        self._running = True
+        # Looking up references may refresh the index, which is slow on a large collection.
+        QueryOp(
+            parent=mw,
+            op=lambda col: find_queued_files(col, pending),
+            success=lambda found: self._convert(media_dir, *found),
+        ).failure(self._on_failure).run_in_background()
+
+    def _convert(self, media_dir: str, to_convert: list[QueuedFile], to_drop: list[str]) -> None:
+        self._queue.remove(media_dir, to_drop)
+        if not to_convert:
+            return self._finish()
+        config = self._config.snapshot()
+        QueryOp(
+            parent=mw,
+            op=lambda col: convert_queued_files(to_convert, config),
+            success=lambda result: self._apply(media_dir, to_convert, result),
+        ).failure(self._on_failure).without_collection().run_in_background()
+
+    def _apply(self, media_dir: str, queued: Sequence[QueuedFile], result: DeferredResult) -> None:
+        def on_done() -> None:
+            # Failed files are not retried. Otherwise, a broken file would be converted on every flush.
+            self._queue.remove(media_dir, (file.file.file_name for file in queued))
+            self._finish()
+            msg = f"Converted {len(result.converted)} files of added notes."
+            if result.failed:
+                msg += f"<br>Failed: {len(result.failed)}."
+            tooltip(msg, period=self._config.tooltip_duration_milliseconds, parent=mw)
+
+        def on_apply_failure(ex: Exception) -> None:
+            # The converted files already exist. Converting the originals again would only make more copies.
+            # Converted files that no note uses are listed by Tools → Check Media.
+            self._queue.remove(media_dir, (file.file.file_name for file in queued))
+            self._finish()
+            tooltip(f"Couldn't update notes with converted media: {ex}", parent=mw)
+
+        if not result.converted:
+            return on_done()
+        CollectionOp(
+            parent=mw,
+            op=lambda col: apply_conversions_op(
+                col, result.converted, delete_originals=self._config.delete_original_file_on_convert
+            ),
+        ).success(lambda out: on_done()).failure(on_apply_failure).run_in_background()
+
+    def _on_failure(self, ex: Exception) -> None:
+        # The files stay queued and are retried when more notes are added or the profile is opened again.
+        self._running = False
+        tooltip(f"Couldn't convert media of added notes: {ex}", parent=mw)
+
+    def _finish(self) -> None:
+        self._running = False
+        if mw and mw.col and self._queue.pending(mw.col.media.dir()):
+            self.schedule()
@@ -0,0 +1,97 @@
+# Copyright: Ajatt-Tools and contributors; https://github.com/Ajatt-Tools
+# License: GNU AGPL, version 3 or later; http://www.gnu.org/licenses/agpl.html
+import collections
+import enum
+import os
+import typing
+from collections.abc import Iterable
+
+from ..config import MediaConverterConfig
+from ..file_converters.common import get_file_extension
+from ..file_converters.image_converter import image_encoder_version
+from ..file_converters.records import file_size, read_dimensions
+from ..media_deduplication.conversion_index import ConversionIndex, image_settings_sha1
+from ..utils.show_options import ImageDimensions
+
+
+class ReconvertReason(enum.Enum):
+    not_converted = "not in the target format yet"
+    unknown_origin = "converted outside the add-on or before its settings were recorded"
+    different_settings = "converted with different settings"
+    different_encoder = "converted with a different encoder version"
+    up_to_date = "already converted with the current settings"
+    small_gain = "estimated size reduction is below the minimum"
+
+    @property
+    def will_convert(self) -> bool:
+        return self not in (ReconvertReason.up_to_date, ReconvertReason.small_gain)
+
+
+class ReconvertPlan(typing.NamedTuple):
+    reasons: dict[str, ReconvertReason]  # filename -> why it is converted or skipped
+
+    def to_skip(self) -> dict[str, ReconvertReason]:
+        return {filename: reason for filename, reason in self.reasons.items() if not reason.will_convert}
+
+    def summary(self) -> str:
+        """What would change, counted by reason."""
+        counts = collections.Counter(self.reasons.values())
+        n_convert = sum(count for reason, count in counts.items() if reason.will_convert)
+        lines = [f"{n_convert} of {len(self.reasons)} images will be converted."]
+        lines.extend(f"{counts[reason]} {reason.value}." for reason in ReconvertReason if counts[reason])
+        return "\n".join(lines)
+
+
+def expected_pixels(dims: ImageDimensions, config: MediaConverterConfig) -> int:
+    """How many pixels the image will have after it is resized with the current settings."""
+    width, height = config.image_width, config.image_height
+    smaller = 0 < dims.width < width or 0 < dims.height < height
+    if (width == 0 and height == 0) or (config.avoid_upscaling and smaller) or not (dims.width and dims.height):
+        return dims.width * dims.height
+    if width and height:
+        return width * height
+    if width:
+        return width * round(dims.height * width / dims.width)
+    return height * round(dims.width * height / dims.height)
+
+
+def estimated_gain(path: str, bytes_per_pixel: float, config: MediaConverterConfig) -> float | None:
+    """The share of the file size that reconverting would save, or None if it can't be estimated."""
+    if not (size := file_size(path)) or not (pixels := expected_pixels(read_dimensions(path), config)):
+        return None
+    return 1 - bytes_per_pixel * pixels / size
+
+
+def plan_reconvert(
+    filenames: Iterable[str], media_dir: str, config: MediaConverterConfig, index: ConversionIndex
+) -> ReconvertPlan:
+    """
+    Decide which images to convert when reconversion is enabled.
+    Images in the target format that were converted with the current settings and encoder are skipped.
+    With a minimum gain, so are images that are estimated to shrink by less.
+    """
+    filenames = list(filenames)
+    settings_hash = image_settings_sha1(config)
+    version = image_encoder_version(config)
+    converted = [name for name in filenames if get_file_extension(name) == config.image_extension]
+    provenance = index.provenance(media_dir, converted)
+    bytes_per_pixel = index.bytes_per_pixel(settings_hash, version) if config.bulk_reconvert_min_gain else None
+    reasons: dict[str, ReconvertReason] = {}
+    for filename in filenames:
+        if get_file_extension(filename) != config.image_extension:
+            reasons[filename] = ReconvertReason.not_converted
+            continue
+        if (made := provenance.get(filename)) is None:
+            reason = ReconvertReason.unknown_origin
+        elif made.settings_hash != settings_hash:
+            reason = ReconvertReason.different_settings
+        elif made.encoder_version != version:
+            reason = ReconvertReason.different_encoder
+        else:
+            reason = ReconvertReason.up_to_date
+        if reason.will_convert and bytes_per_pixel is not None:
+            gain = estimated_gain(os.path.join(media_dir, filename), bytes_per_pixel, config)
+            if gain is not None and gain * 100 < config.bulk_reconvert_min_gain:
+                reason = ReconvertReason.small_gain
+        reasons[filename] = reason
+    return ReconvertPlan(reasons)
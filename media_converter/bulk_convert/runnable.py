@@ -1,30 +1,62 @@
 # Copyright: Ajatt-Tools and contributors; https://github.com/Ajatt-Tools
 # License: GNU AGPL, version 3 or later; http://www.gnu.org/licenses/agpl.html
 
+import time
+from collections.abc import Callable
+
 from aqt import qconnect
 from aqt.qt import QObject, QRunnable, pyqtSignal
 
 from .convert_task import ConvertTask
 
+# Fast conversions finish hundreds of files per second. The progress bar doesn't need more updates than this.
+PROGRESS_INTERVAL_SECONDS = 0.1
+
+
+class ProgressThrottle:
+    """Lets an update through at most once per interval."""
+
+    _interval: float
+    _clock: Callable[[], float]
+    _last: float | None
+
+    def __init__(
+        self, interval: float = PROGRESS_INTERVAL_SECONDS, clock: Callable[[], float] = time.monotonic
+    ) -> None:
+        self._interval = interval
+        self._clock = clock
+        self._last = None
+
+    def ready(self) -> bool:
+        now = self._clock()
+        if self._last is not None and now - self._last < self._interval:
+            return False
+        self._last = now
+        return True
+
 
 class ConvertSignals(QObject):
     canceled = pyqtSignal()
     task_done = pyqtSignal()
-    update_progress = pyqtSignal(int)
+    update_progress = pyqtSignal(object)  # ConvertProgress
 
 
 class ConvertRunnable(QRunnable):
-    def __init__(self, task: ConvertTask, signals: ConvertSignals) -> None:
+    def __init__(self, task: ConvertTask, signals: ConvertSignals, throttle: ProgressThrottle | None = None) -> None:
         super().__init__()
         self.task = task
         self.signals = signals
+        self.throttle = throttle or ProgressThrottle()
         qconnect(self.signals.canceled, self.set_canceled)
 
     def set_canceled(self) -> None:
         self.task.set_canceled()
 
     def run(self) -> None:
-        self.signals.update_progress.emit(0)
-        for progress_value in self.task():
-            self.signals.update_progress.emit(progress_value)  # type: ignore
+        self.signals.update_progress.emit(self.task.progress())
+        for _ in self.task():
+            if self.throttle.ready():
+                self.signals.update_progress.emit(self.task.progress())  # type: ignore
+        # Always report the final state, so that the bar reaches the end.
+        self.signals.update_progress.emit(self.task.progress())  # type: ignore
         self.signals.task_done.emit()  # type: ignore
@@ -5,16 +5,19 @@ import functools
 from collections.abc import Sequence
 
 from anki.notes import NoteId
-from aqt import gui_hooks
 from aqt.browser import Browser
+from aqt.operations import QueryOp
 from aqt.qt import *
-from aqt.utils import tooltip
+from aqt.utils import askUser, tooltip
 
+from .bulk_convert.background import start_background_conversion
 from .bulk_convert.convert_task import ConvertTask
 from .config import MediaConverterConfig, get_global_config
 from .consts import ADDON_FULL_NAME
 from .dialogs.bulk_convert_dialog import AnkiBulkConvertDialog
 from .dialogs.bulk_convert_progress_bar import ProgressBar
+from .utils.idle_gate import IdleGate
+from .utils.lag_monitor import start_ui_lag_monitor
 
 ACTION_NAME = f"{ADDON_FULL_NAME}: Bulk-convert"
 
@@ -57,9 +60,42 @@ class BulkConverter:
 
     @reload_note
     def _bulk_convert(self, note_ids: Sequence[NoteId], selected_fields: list[str]) -> None:
-        progress_bar = ProgressBar(task=ConvertTask(self._browser, note_ids, selected_fields, self._config))
-        progress_bar.start_task()  # blocks
-        progress_bar.task.update_notes()
+        # Monitoring ends when the notes are updated, which happens in the background.
+        finish_monitoring = start_ui_lag_monitor("bulk conversion", self._config)
+        try:
+            gate = IdleGate() if self._config.bulk_convert_in_background else None
+            task = ConvertTask(self._browser, note_ids, selected_fields, self._config, idle_gate=gate)
+        except Exception:
+            finish_monitoring()
+            raise
+        if not self._config.bulk_reconvert:
+            return self._start(task, gate, finish_monitoring)
+
+        def on_failure(ex: Exception) -> None:
+            finish_monitoring()
+            raise ex
+
+        # Files converted before are looked up one by one, which takes a while in a large selection.
+        QueryOp(
+            parent=self._browser,
+            op=lambda col: task.plan_reconvert(),
+            success=lambda plan: self._start(task, gate, finish_monitoring),
+        ).failure(on_failure).without_collection().with_progress("Checking converted files...").run_in_background()
+
+    def _start(self, task: ConvertTask, gate: IdleGate | None, finish_monitoring: Callable[[], None]) -> None:
+        try:
+            if (plan := task.reconvert_plan) and not askUser(
+                f"{plan.summary()}\n\nContinue?", parent=self._browser, title=ACTION_NAME
+            ):
+                return finish_monitoring()
+            if gate:
+                return start_background_conversion(task, gate, self._config, on_done=finish_monitoring)
+            progress_bar = ProgressBar(task=task)
+            progress_bar.start_task()  # blocks
+            progress_bar.task.update_notes(on_done=finish_monitoring)
+        except Exception:
+            finish_monitoring()
+            raise
 
 
 def setup_menu(browser: Browser) -> None:
@@ -71,7 +107,3 @@ def setup_menu(browser: Browser) -> None:
 
     # Note: attach the object to the browser to prevent it from being deleted. Otherwise, the menu action doesn't work.
     browser._ajt__media_converter_bulk_converter = converter
-
-
-def init() -> None:
-    gui_hooks.browser_menus_did_init.append(setup_menu)
@@ -1,6 +1,7 @@
 # Copyright: Ajatt-Tools and contributors; https://github.com/Ajatt-Tools
 # License: GNU AGPL, version 3 or later; http://www.gnu.org/licenses/agpl.html
 import functools
+import typing
 from collections.abc import Iterable, Sequence
 
 from aqt import mw
@@ -21,9 +22,33 @@ def cfg_comma_sep_str_to_file_ext_set(cfg_str: str) -> set[str]:
 
 
 class MediaConverterConfig(AddonConfigManager):
+    _snapshot: "ConfigSnapshot | None" = None
+
     def __init__(self, default: bool = False) -> None:
         super().__init__(default)
 
+    def __setitem__(self, key: str, value) -> None:
+        self._snapshot = None
+        super().__setitem__(key, value)
+
+    def write_config(self) -> None:
+        self._snapshot = None
+        super().write_config()
+
+    def update_from_addon_manager(self, new_conf: dict) -> None:
+        self._snapshot = None
+        super().update_from_addon_manager(new_conf)
+
+    def snapshot(self) -> "ConfigSnapshot":
+        """
+        Return a read-only copy of the current settings, to be taken once per job.
+        The same copy is returned until the config is changed.
+        """
+        snapshot = self._snapshot
+        if snapshot is None:
+            snapshot = self._snapshot = ConfigSnapshot(self)
+        return snapshot
+
     def show_settings(self) -> Sequence[ShowOptions]:
         instances = []
         for name in self["show_settings"].split(","):
@@ -71,6 +96,23 @@ class MediaConverterConfig(AddonConfigManager):
         assert isinstance(value, bool), "value should be bool"
         self["bulk_reconvert"] = bool(value)
 
+    @property
+    def bulk_reconvert_min_gain(self) -> int:
+        """Percent."""
+        return clamp(min_val=0, val=self["bulk_reconvert_min_gain"], max_val=100)
+
+    @bulk_reconvert_min_gain.setter
+    def bulk_reconvert_min_gain(self, value: int) -> None:
+        self["bulk_reconvert_min_gain"] = clamp(min_val=0, val=int(value), max_val=100)
+
+    @property
+    def bulk_convert_in_background(self) -> bool:
+        return bool(self["bulk_convert_in_background"])
+
+    @bulk_convert_in_background.setter
+    def bulk_convert_in_background(self, value: bool) -> None:
+        self["bulk_convert_in_background"] = bool(value)
+
     @property
     def image_quality(self) -> int:
         return clamp(min_val=0, val=self["image_quality"], max_val=100)
@@ -177,6 +219,14 @@ class MediaConverterConfig(AddonConfigManager):
         assert isinstance(kbit_s, int), "kbit/s should be int"
         self["ffmpeg_audio_bitrate"] = int(kbit_s)
 
+    @property
+    def similar_images_max_distance(self) -> int:
+        return clamp(min_val=0, val=self["similar_images_max_distance"], max_val=64)
+
+    @property
+    def similar_audio_max_distance(self) -> int:
+        return clamp(min_val=0, val=self["similar_audio_max_distance"], max_val=128)
+
     @property
     def tooltip_duration_seconds(self) -> int:
         return int(self["tooltip_duration_seconds"])
@@ -193,6 +243,30 @@ class MediaConverterConfig(AddonConfigManager):
     def copy_paste(self) -> bool:
         return bool(self["copy_paste"])
 
+    @property
+    def async_paste(self) -> bool:
+        return bool(self["async_paste"])
+
+    @property
+    def fast_paste_preview(self) -> bool:
+        return bool(self["fast_paste_preview"])
+
+    @property
+    def multi_image_paste(self) -> bool:
+        return bool(self["multi_image_paste"])
+
+    @property
+    def reuse_converted_media(self) -> bool:
+        return bool(self["reuse_converted_media"])
+
+    @property
+    def defer_note_add_conversion(self) -> bool:
+        return bool(self["defer_note_add_conversion"])
+
+    @property
+    def monitor_ui_lag(self) -> bool:
+        return bool(self["monitor_ui_lag"])
+
     @property
     def excluded_image_containers(self) -> str:
         return self["excluded_image_containers"]
@@ -236,6 +310,103 @@ class MediaConverterConfig(AddonConfigManager):
         return bool(self["show_context_menu_entry"])
 
 
+class DetachedConfig(MediaConverterConfig):
+    """
+    A copy of the config for background jobs.
+    Changes made to the copy don't affect the add-on, and changes made to the add-on's config don't affect the copy.
+    """
+
+    def __init__(self, source: MediaConverterConfig, **overrides) -> None:
+        self._source = source
+        self._overrides = overrides
+        super().__init__()
+
+    def _set_underlying_dicts(self) -> None:
+        self._default_config = self._config = {**self._source.dict_copy(), **self._overrides}
+
+    def write_config(self) -> None:
+        raise RuntimeError("A detached config can't be written.")
+
+
+class ConfigSnapshot(DetachedConfig):
+    """
+    A frozen copy of the config for conversion jobs.
+    Worker threads see the same settings for the whole job, even if the settings dialog is saved meanwhile.
+    Values derived from the config, like the sets of excluded extensions, are computed only once.
+    """
+
+    _excluded_image_extensions: dict[bool, frozenset[str]]
+    _excluded_audio_extensions: dict[bool, frozenset[str]]
+    _frozen: dict[str, typing.Any]  # values of the properties below, which have no setters
+
+    def __init__(self, source: MediaConverterConfig) -> None:
+        super().__init__(source)
+        # Filled in order, because some of the values are derived from the ones before them.
+        self._frozen = {}
+        self._frozen["image_format"] = super().image_format
+        self._frozen["image_extension"] = super().image_extension
+        self._frozen["audio_extension"] = super().audio_extension
+        self._frozen["image_quality"] = super().image_quality
+        self._frozen["image_width"] = super().image_width
+        self._frozen["image_height"] = super().image_height
+        self._frozen["cwebp_args"] = tuple(super().cwebp_args)
+        self._frozen["ffmpeg_args"] = tuple(super().ffmpeg_args)
+        self._frozen["ffmpeg_audio_args"] = tuple(super().ffmpeg_audio_args)
+        self._excluded_image_extensions = {}
+        self._excluded_audio_extensions = {}
+        for include in (False, True):
+            self._excluded_image_extensions[include] = super().get_excluded_image_extensions(include)
+            self._excluded_audio_extensions[include] = super().get_excluded_audio_extensions(include)
+
+    def __setitem__(self, key: str, value) -> None:
+        raise RuntimeError("A config snapshot is read-only.")
+
+    def snapshot(self) -> "ConfigSnapshot":
+        return self
+
+    def get_excluded_image_extensions(self, include_converted: bool) -> frozenset[str]:
+        return self._excluded_image_extensions[include_converted]
+
+    def get_excluded_audio_extensions(self, include_converted: bool) -> frozenset[str]:
+        return self._excluded_audio_extensions[include_converted]
+
+    @property
+    def image_format(self) -> ImageFormat:
+        return self._frozen["image_format"]
+
+    @property
+    def image_extension(self) -> str:
+        return self._frozen["image_extension"]
+
+    @property
+    def audio_extension(self) -> str:
+        return self._frozen["audio_extension"]
+
+    @property
+    def image_quality(self) -> int:
+        return self._frozen["image_quality"]
+
+    @property
+    def image_width(self) -> int:
+        return self._frozen["image_width"]
+
+    @property
+    def image_height(self) -> int:
+        return self._frozen["image_height"]
+
+    @property
+    def cwebp_args(self) -> tuple[str | int, ...]:
+        return self._frozen["cwebp_args"]
+
+    @property
+    def ffmpeg_args(self) -> tuple[str | int, ...]:
+        return self._frozen["ffmpeg_args"]
+
+    @property
+    def ffmpeg_audio_args(self) -> tuple[str | int, ...]:
+        return self._frozen["ffmpeg_audio_args"]
+
+
 @functools.cache
 def get_global_config() -> MediaConverterConfig:
     assert mw, "anki must be running"
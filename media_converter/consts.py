@@ -12,6 +12,8 @@ ADDON_FULL_NAME = f"{ADDON_SERIES} {ADDON_NAME}"
 ADDON_NAME_SNAKE = ADDON_NAME.lower().replace(" ", "_")
 THIS_ADDON_MODULE = __name__.split(".")[0]
 SUPPORT_DIR = os.path.join(ADDON_PATH, "support")
+# Anki keeps this folder when the add-on is updated.
+USER_FILES_DIR = os.path.join(ADDON_PATH, "user_files")
 
 WINDOW_MIN_WIDTH = 400
 
@@ -6,6 +6,7 @@ from aqt.qt import *
 from PyQt6.QtWidgets import QWidget
 
 from ..ajt_common.restore_geom_dialog import AnkiSaveAndRestoreGeomDialog
+from ..bulk_convert.convert_result import ConvertProgress
 from ..bulk_convert.convert_task import ConvertTask
 from ..bulk_convert.runnable import ConvertRunnable, ConvertSignals
 from ..consts import ADDON_NAME_SNAKE
@@ -18,6 +19,10 @@ class ProgressBar(AnkiSaveAndRestoreGeomDialog):
     def __init__(self, task: ConvertTask, parent=None) -> None:
         super().__init__(parent)
         self.bar = QProgressBar()
+        self.summary_label = QLabel()
+        self.active_label = QLabel()
+        self.active_label.setTextFormat(Qt.TextFormat.PlainText)
+        self.active_label.setWordWrap(True)
         self.cancel_button = QPushButton("Cancel")
         self.setLayout(self.setup_layout())
         self.task = task
@@ -29,19 +34,26 @@ class ProgressBar(AnkiSaveAndRestoreGeomDialog):
         self.set_range(0, task.size)
         qconnect(self.cancel_button.clicked, self.set_canceled)
         qconnect(self.signals.task_done, self.accept)
-        qconnect(self.signals.update_progress, self.bar.setValue)
+        qconnect(self.signals.update_progress, self.set_progress)
 
     def start_task(self) -> int:
         runnable = ConvertRunnable(self.task, self.signals)
         self.pool.start(runnable)
         return self.exec()
 
+    def set_progress(self, progress: ConvertProgress) -> None:
+        self.bar.setValue(progress.done)
+        self.summary_label.setText(progress.summary())
+        self.active_label.setText("Converting: " + ", ".join(progress.active) if progress.active else "")
+
     def set_canceled(self) -> None:
         self.signals.canceled.emit()  # type: ignore
 
     def setup_layout(self) -> QLayout:
         layout = QVBoxLayout()
         layout.addWidget(self.bar)
+        layout.addWidget(self.summary_label)
+        layout.addWidget(self.active_label)
         layout.addLayout(self.setup_cancel_button_layout())
         return layout
 
@@ -1,13 +1,21 @@
 # Copyright: Ajatt-Tools and contributors; https://github.com/Ajatt-Tools
 # License: GNU AGPL, version 3 or later; http://www.gnu.org/licenses/agpl.html
-import io
+import os
+from collections.abc import Iterable, Sequence
 
 import aqt
 from aqt.qt import *
+from aqt.utils import tooltip
 
 from ..ajt_common.about_menu import tweak_window
-from ..bulk_convert.convert_result import ConvertResult
+from ..bulk_convert.convert_result import ConvertResult, format_duration, format_mib
 from ..consts import ADDON_FULL_NAME
+from ..file_converters.common import LocalFile
+from ..utils.conversion_records import ConversionRecord, export_records
+from ..widgets.lazy_table_model import LazyTableModel
+
+RESULT_COLUMNS = ("File", "Result", "Details")
+EXPORT_FILTERS = "CSV (*.csv);;JSON (*.json)"
 
 
 def fallback_parent(parent) -> QWidget | None:
@@ -21,35 +29,51 @@ def fallback_parent(parent) -> QWidget | None:
 
 
 def form_report_message(result: ConvertResult) -> str:
-    buffer = io.StringIO()
-    buffer.write(f"<p>Converted <code>{len(result.converted)}</code> files.</p>")
+    msg = f"Converted <code>{len(result.converted)}</code> files."
     if result.failed:
-        buffer.write(f"<p>Failed <code>{len(result.failed)}</code> files.</p>")
-        buffer.write("<ol>")
-        for file, reason in result.failed.items():
-            buffer.write(f"<li><code>{file}</code>: {reason}</li>")
-        buffer.write("</ol>")
-    return buffer.getvalue()
+        msg += f" Failed <code>{len(result.failed)}</code> files."
+    if result.bytes_in:
+        saved = result.bytes_in - result.bytes_out
+        msg += (
+            f"<br>{format_mib(result.bytes_in)} → {format_mib(result.bytes_out)}, "
+            f"saved <code>{format_mib(saved)}</code> ({saved / result.bytes_in:.0%})."
+        )
+    if result.elapsed:
+        files_per_second = (len(result.converted) + len(result.failed)) / result.elapsed
+        msg += f"<br>Took {format_duration(result.elapsed)}, {files_per_second:.1f} files/s."
+    return msg
 
 
-class AJTScrollLabel(QScrollArea):
-    def __init__(self, parent: QWidget | None = None) -> None:
-        super().__init__(parent)
-        self.setWidgetResizable(True)
-        content = QWidget(self)
-        self.setWidget(content)
-        layout = QVBoxLayout(content)
-        self._label = QLabel(content)
-        self._label.setAlignment(Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignTop)
-        self._label.setWordWrap(False)
-        self._label.setTextFormat(Qt.TextFormat.RichText)
-        layout.addWidget(self._label)
+def ask_export_records(parent: QWidget, records: list[ConversionRecord], default_name: str) -> None:
+    """Save per-file conversion records as CSV or JSON, depending on the chosen file name."""
+    path, chosen_filter = QFileDialog.getSaveFileName(parent, "Export conversion records", default_name, EXPORT_FILTERS)
+    if not path:
+        return
+    if not os.path.splitext(path)[1]:
+        path += ".json" if "json" in chosen_filter else ".csv"
+    try:
+        export_records(records, path)
+    except OSError as ex:
+        tooltip(f"Couldn't export records: {ex}", parent=parent)
+    else:
+        tooltip(f"{len(records)} records saved to {path}", parent=parent)
 
-    def set_text(self, text: str) -> None:
-        return self._label.setText(text)
+
+def result_rows(
+    failed: Sequence[tuple[LocalFile, Exception | None]], converted: Sequence[tuple[LocalFile, str]]
+) -> Iterable[tuple[str, str, str]]:
+    # Failures go first because they need the user's attention.
+    for file, reason in failed:
+        yield file.file_name, "failed", str(reason or "")
+    for file, new_filename in converted:
+        yield file.file_name, "converted", new_filename
 
 
 class BulkConvertResultDialog(QDialog):
+    _result: ConvertResult | None
+    _n_failed_shown: int
+    _n_converted_shown: int
+
     def __init__(self, parent: QWidget | None = None) -> None:
         super().__init__(parent=fallback_parent(parent))
         tweak_window(self)
@@ -58,16 +82,66 @@ class BulkConvertResultDialog(QDialog):
         self.setSizePolicy(self.make_size_policy())
         self.setMinimumSize(320, 320)
         self._button_box = QDialogButtonBox(QDialogButtonBox.StandardButton.Ok)
-        self._label = AJTScrollLabel()
+        self._export_button = self._button_box.addButton("Export...", QDialogButtonBox.ButtonRole.ActionRole)
+        self._export_button.setToolTip("Save size, dimensions, encoder and time of every file as CSV or JSON.")
+        self._records: list[ConversionRecord] = []
+        self._result = None
+        self._n_failed_shown = 0
+        self._n_converted_shown = 0
+        self._label = QLabel()
+        self._label.setTextFormat(Qt.TextFormat.RichText)
+        self._model = LazyTableModel(RESULT_COLUMNS, parent=self)
+        self._table = self.make_table()
         self.setLayout(self.make_root_layout())
         qconnect(self._button_box.accepted, self.accept)
+        qconnect(self._export_button.clicked, self.export)
 
     def set_result(self, result: ConvertResult) -> None:
-        self._label.set_text(form_report_message(result))
+        """
+        Show the results. If the conversion is still running,
+        call update_result() to add the files that finish while the dialog is open.
+        """
+        self._result = result
+        # Copied at once, because a running conversion keeps adding files from another thread.
+        failed, converted = list(result.failed.items()), list(result.converted.items())
+        self._n_failed_shown, self._n_converted_shown = len(failed), len(converted)
+        self._model.set_rows(result_rows(failed, converted))
+        self._update_summary()
+
+    def update_result(self) -> None:
+        """Append rows of the files that finished since the last update."""
+        assert self._result is not None, "set_result() should be called first"
+        failed = list(self._result.failed.items())[self._n_failed_shown :]
+        converted = list(self._result.converted.items())[self._n_converted_shown :]
+        self._n_failed_shown += len(failed)
+        self._n_converted_shown += len(converted)
+        self._model.append_rows(result_rows(failed, converted))
+        self._update_summary()
+
+    def _update_summary(self) -> None:
+        assert self._result is not None
+        self._label.setText(form_report_message(self._result))
+        self._records = self._result.records
+        self._export_button.setEnabled(bool(self._records))
+
+    def export(self) -> None:
+        ask_export_records(self, list(self._records), "media_converter_conversions.csv")
+
+    def make_table(self) -> QTableView:
+        table = QTableView()
+        table.setModel(self._model)
+        table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        table.setWordWrap(False)
+        table.horizontalHeader().setStretchLastSection(True)
+        table.horizontalHeader().setSortIndicator(-1, Qt.SortOrder.AscendingOrder)
+        table.setSortingEnabled(True)
+        table.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+        return table
 
     def make_root_layout(self) -> QLayout:
         root_layout = QVBoxLayout()
         root_layout.addWidget(self._label)
+        root_layout.addWidget(self._table)
         root_layout.addWidget(self._button_box)
         return root_layout
 
@@ -8,8 +8,9 @@ import aqt
 from aqt.qt import *
 from aqt.utils import tooltip
 
-from ..ajt_common.stats_table_dialog import StatsDialog
+from ..ajt_common.restore_geom_dialog import AnkiSaveAndRestoreGeomDialog
 from ..ajt_common.utils import open_file, ui_translate
+from ..widgets.lazy_table_model import LazyTableModel
 
 
 class DeduplicateTableColumns(typing.NamedTuple):
@@ -21,12 +22,16 @@ class DeduplicateTableColumns(typing.NamedTuple):
         return [ui_translate(field) for field in cls.__annotations__]
 
 
-def copy_cell_to_clipboard(item: QTableWidgetItem | None) -> None:
-    if item:
-        QApplication.clipboard().setText(item.text())
+def copy_cell_to_clipboard(text: str) -> None:
+    QApplication.clipboard().setText(text)
 
 
-class DeduplicateMediaConfirmDialog(StatsDialog):
+class DeduplicateMediaConfirmDialog(AnkiSaveAndRestoreGeomDialog):
+    """
+    Lists duplicates and asks the user to confirm.
+    The table is backed by a lazy model, so the dialog opens instantly even with tens of thousands of rows.
+    """
+
     name: str = "ajt__deduplicate_media_confirm_dialog"
     win_title: str = "Deduplicate media files"
     button_box_buttons: QDialogButtonBox.StandardButton = (
@@ -34,10 +39,43 @@ class DeduplicateMediaConfirmDialog(StatsDialog):
     )
 
     def __init__(self, column_names: Sequence[str], parent: aqt.AnkiQt | None = None) -> None:
-        super().__init__(column_names=column_names, parent=parent)
+        super().__init__(parent)
+        self.setWindowTitle(self.win_title)
+        self.setMinimumSize(480, 320)
         self._count_label = QLabel()
-        self._layout.insertWidget(0, self._count_label)
+        self._filter_edit = QLineEdit()
+        self._filter_edit.setPlaceholderText("Filter...")
+        self._filter_edit.setClearButtonEnabled(True)
+        self._model = LazyTableModel(column_names, parent=self)
+        self._table = QTableView()
+        self._button_box = QDialogButtonBox(self.button_box_buttons)
+        self._setup_table()
+        self.setLayout(self._make_layout())
         self._setup_context_menu()
+        qconnect(self._filter_edit.textChanged, self._model.set_filter)
+        qconnect(self._button_box.accepted, self.accept)
+        qconnect(self._button_box.rejected, self.reject)
+
+    def _setup_table(self) -> None:
+        self._table.setModel(self._model)
+        self._table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectItems)
+        self._table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self._table.setWordWrap(False)
+        header = self._table.horizontalHeader()
+        header.setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        # Keep the original order until the user clicks a header.
+        header.setSortIndicator(-1, Qt.SortOrder.AscendingOrder)
+        self._table.setSortingEnabled(True)
+        # Row heights are fixed, so the view doesn't have to measure every row.
+        self._table.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+
+    def _make_layout(self) -> QLayout:
+        layout = QVBoxLayout()
+        layout.addWidget(self._count_label)
+        layout.addWidget(self._filter_edit)
+        layout.addWidget(self._table)
+        layout.addWidget(self._button_box)
+        return layout
 
     def _setup_context_menu(self) -> None:
         """
@@ -47,50 +85,50 @@ class DeduplicateMediaConfirmDialog(StatsDialog):
         qconnect(self._table.customContextMenuRequested, self._show_context_menu)
 
     def _show_context_menu(self, pos: QPoint) -> None:
-        item = self._table.itemAt(pos)
-        if not item:
+        index = self._table.indexAt(pos)
+        if not index.isValid():
             return
+        text = self._model.cell_text(index.row(), index.column())
         menu = QMenu(self._table)
 
         copy_cell_action = menu.addAction("Copy to the clipboard")
-        copy_cell_action.setEnabled(item is not None)
-        qconnect(copy_cell_action.triggered, lambda: copy_cell_to_clipboard(item))
+        qconnect(copy_cell_action.triggered, lambda: copy_cell_to_clipboard(text))
 
         search_action = menu.addAction("Search in Browser")
-        search_action.setEnabled(item is not None)
-        qconnect(search_action.triggered, lambda: self._search_in_anki_browser(item))
+        qconnect(search_action.triggered, lambda: self._search_in_anki_browser(text))
 
         show_in_fm_action = menu.addAction("Show in file manager")
-        show_in_fm_action.setEnabled(item is not None)
-        qconnect(show_in_fm_action.triggered, lambda: self._show_in_file_manager(item))
+        qconnect(show_in_fm_action.triggered, lambda: self._show_in_file_manager(text))
 
         menu.exec(self._table.viewport().mapToGlobal(pos))
 
-    def _search_in_anki_browser(self, item: QTableWidgetItem | None) -> None:
+    def _search_in_anki_browser(self, text: str) -> None:
         """
         Paste selected text into the Browser's search bar and perform search.
         """
         if not aqt.mw:
             # Can't do anything without Anki. Abort.
             return
-        if not (item and item.text()):
+        if not text:
             tooltip("Empty selection.", parent=self)
+            return
         browser = aqt.dialogs.open("Browser", aqt.mw)  # browser requires mw (AnkiQt) to be passed as parent
         browser.activateWindow()
-        browser.search_for(item.text())
+        browser.search_for(text)
 
-    def _show_in_file_manager(self, item: QTableWidgetItem | None) -> None:
-        if not (item and item.text() and aqt.mw):
+    def _show_in_file_manager(self, text: str) -> None:
+        if not (text and aqt.mw):
             return
-        file_path = os.path.join(aqt.mw.col.media.dir(), item.text())
+        file_path = os.path.join(aqt.mw.col.media.dir(), text)
         if os.path.exists(file_path):
             open_file(file_path)
         else:
             tooltip("File does not exist.", parent=self)
 
     def row_count(self) -> int:
-        return self._table.rowCount()
+        return self._model.total_row_count()
 
-    def load_data(self, data: Sequence[Sequence[str]]) -> "StatsDialog":
+    def load_data(self, data: Sequence[Sequence[str]]) -> "DeduplicateMediaConfirmDialog":
         self._count_label.setText(f"Found {len(data)} copies.")
-        return super().load_data(data)
+        self._model.set_rows(data)
+        return self
@@ -2,15 +2,20 @@
 # License: GNU AGPL, version 3 or later; http://www.gnu.org/licenses/agpl.html
 
 from aqt import qconnect
+from aqt.qt import *
 
 from ..ajt_common.restore_geom_dialog import AnkiSaveAndRestoreGeomDialog
 from ..config import MediaConverterConfig
 from ..consts import ADDON_NAME_SNAKE
+from ..file_converters.speculative_encoder import EncodeSettings, SpeculativeEncoder
 from ..utils.show_options import ImageDimensions
+from ..utils.temp_file import TempFile
 from ..widgets.image_settings_widget import ImageSettings
 from ..widgets.scale_settings_widget import ScaleSettings
 from .settings_dialog_base import SettingsDialogBase
 
+PREVIEW_SIZE_PX = 240
+
 
 class PasteImageDialog(SettingsDialogBase):
     """Dialog shown on paste."""
@@ -19,22 +24,46 @@ class PasteImageDialog(SettingsDialogBase):
     _image_settings: ImageSettings
     _scale_settings: ScaleSettings
     _dimensions: ImageDimensions
+    _encoder: SpeculativeEncoder | None
+    _encoded_file: TempFile | None
 
-    def __init__(self, config: MediaConverterConfig, dimensions: ImageDimensions, parent=None) -> None:
+    def __init__(
+        self,
+        config: MediaConverterConfig,
+        dimensions: ImageDimensions,
+        parent=None,
+        source_path: str | None = None,
+    ) -> None:
         super().__init__(config, parent)
         self._dimensions = dimensions
         self._image_settings = ImageSettings(config=self.config)
         self._scale_settings = ScaleSettings(
             config=self.config, title=f"Original size: {self._dimensions.width} x {self._dimensions.height} px"
         )
+        self._encoded_file = None
+        # Encode in the background while the user picks settings, if the image is known.
+        self._encoder = SpeculativeEncoder(source_path, config=self.config, parent=self) if source_path else None
+        self._size_label = QLabel()
+        self._preview_label = QLabel()
         self._setup_ui()
         self.setup_bottom_button_box()
         self.set_initial_values()
         qconnect(self._scale_settings.factor_changed, self._set_factor)
+        if self._encoder:
+            qconnect(self._image_settings.sliders.value_changed, self._request_encode)
+            qconnect(self._image_settings.enable_checkbox.toggled, lambda _checked: self._request_encode())
+            qconnect(self._encoder.result_ready, self._show_result)
+            qconnect(self.finished, lambda _result: self._encoder.close())
+            self._request_encode()
 
     def _setup_ui(self) -> None:
         self.main_vbox.addWidget(self._image_settings)
         self.main_vbox.addWidget(self._scale_settings)
+        if self._encoder:
+            self._preview_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+            self._preview_label.setMinimumHeight(PREVIEW_SIZE_PX)
+            self.main_vbox.addWidget(self._size_label)
+            self.main_vbox.addWidget(self._preview_label)
         self.main_vbox.addStretch()
         self.main_vbox.addWidget(self.button_box)
 
@@ -46,7 +75,46 @@ class PasteImageDialog(SettingsDialogBase):
             width=int(self._dimensions.width * factor), height=int(self._dimensions.height * factor)
         )
 
+    def _current_settings(self) -> EncodeSettings:
+        return EncodeSettings.of(self.config, self._image_settings.as_dict())
+
+    def _request_encode(self) -> None:
+        self._size_label.setText("Encoding...")
+        self._encoder.request(self._current_settings())
+
+    def _show_result(self, settings: EncodeSettings) -> None:
+        if settings != self._current_settings() or (result := self._encoder.result(settings)) is None:
+            return
+        if result.error:
+            self._size_label.setText(f"Encoding failed: {result.error}")
+            self._preview_label.clear()
+            return
+        self._size_label.setText(f"Converted size: {os.path.getsize(result.file.path()) / 1024:.1f} KiB")
+        pixmap = QPixmap(result.file.path())
+        if pixmap.isNull():
+            # Qt can't decode some formats, e.g. AVIF without the imageformats plugin.
+            self._preview_label.setText("Preview is unavailable for this format.")
+        else:
+            self._preview_label.setPixmap(
+                pixmap.scaled(
+                    PREVIEW_SIZE_PX,
+                    PREVIEW_SIZE_PX,
+                    Qt.AspectRatioMode.KeepAspectRatio,
+                    Qt.TransformationMode.SmoothTransformation,
+                )
+            )
+
+    def take_encoded_file(self) -> TempFile | None:
+        """
+        After the dialog is accepted, return the file encoded with the accepted settings, if it's ready.
+        The caller becomes responsible for closing it.
+        """
+        file, self._encoded_file = self._encoded_file, None
+        return file
+
     def accept(self) -> None:
+        if self._encoder:
+            self._encoded_file = self._encoder.take_file(self._current_settings())
         self._image_settings.pass_settings_to_config()
         self.config.write_config()
         return super().accept()
@@ -57,5 +125,11 @@ class AnkiPasteImageDialog(PasteImageDialog, AnkiSaveAndRestoreGeomDialog):
     Adds methods that work only when Anki is running.
     """
 
-    def __init__(self, config: MediaConverterConfig, dimensions: ImageDimensions, parent=None) -> None:
-        super().__init__(config, dimensions, parent)
+    def __init__(
+        self,
+        config: MediaConverterConfig,
+        dimensions: ImageDimensions,
+        parent=None,
+        source_path: str | None = None,
+    ) -> None:
+        super().__init__(config, dimensions, parent, source_path)
@@ -0,0 +1,119 @@
+# Copyright: Ajatt-Tools and contributors; https://github.com/Ajatt-Tools
+# License: GNU AGPL, version 3 or later; http://www.gnu.org/licenses/agpl.html
+from collections.abc import Iterable
+
+from aqt import mw
+from aqt.qt import *
+from aqt.utils import showText, tooltip
+
+from ..ajt_common.about_menu import tweak_window
+from ..consts import ADDON_FULL_NAME
+from ..utils.conversion_records import get_conversion_log
+from ..utils.lag_monitor import format_stalls, get_lag_monitor
+from ..utils.timings import PROFILE_ENV_VAR, StageStats, TimingRecorder, get_timings
+from ..widgets.lazy_table_model import LazyTableModel
+from .bulk_convert_result_dialog import ask_export_records
+
+STATS_COLUMNS = ("Stage", "Encoder", "Count", "p50, ms", "p95, ms", "p99, ms", "Total, s")
+
+
+def stats_rows(stats: Iterable[StageStats]) -> Iterable[tuple[str, ...]]:
+    for row in stats:
+        yield (
+            row.stage,
+            row.label,
+            str(row.count),
+            f"{row.p50 * 1000:.1f}",
+            f"{row.p95 * 1000:.1f}",
+            f"{row.p99 * 1000:.1f}",
+            f"{row.total:.2f}",
+        )
+
+
+class TimingsDialog(QDialog):
+    """Shows how long each stage of recent conversions took."""
+
+    _recorder: TimingRecorder
+
+    def __init__(self, recorder: TimingRecorder, parent: QWidget | None = None) -> None:
+        super().__init__(parent)
+        tweak_window(self)
+        self.setWindowTitle(f"{ADDON_FULL_NAME} - Timings")
+        self.setMinimumSize(560, 320)
+        self._recorder = recorder
+        self._label = QLabel()
+        self._model = LazyTableModel(STATS_COLUMNS, parent=self)
+        self._table = self.make_table()
+        self._button_box = QDialogButtonBox(QDialogButtonBox.StandardButton.Close)
+        self._refresh_button = self._button_box.addButton("Refresh", QDialogButtonBox.ButtonRole.ActionRole)
+        self._clear_button = self._button_box.addButton("Clear", QDialogButtonBox.ButtonRole.ResetRole)
+        self._export_button = self._button_box.addButton("Export JSON...", QDialogButtonBox.ButtonRole.ActionRole)
+        self._stalls_button = self._button_box.addButton("Stalls...", QDialogButtonBox.ButtonRole.ActionRole)
+        self._records_button = self._button_box.addButton("Conversions...", QDialogButtonBox.ButtonRole.ActionRole)
+        self._records_button.setToolTip("Export records of recent paste and add-note conversions as CSV or JSON.")
+        self.setLayout(self.make_root_layout())
+        qconnect(self._button_box.rejected, self.reject)
+        qconnect(self._refresh_button.clicked, self.refresh)
+        qconnect(self._clear_button.clicked, self.clear)
+        qconnect(self._export_button.clicked, self.export)
+        qconnect(self._stalls_button.clicked, self.show_stalls)
+        qconnect(self._records_button.clicked, self.export_records)
+        self.refresh()
+
+    def make_table(self) -> QTableView:
+        table = QTableView()
+        table.setModel(self._model)
+        table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        table.setWordWrap(False)
+        table.horizontalHeader().setStretchLastSection(True)
+        table.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+        return table
+
+    def make_root_layout(self) -> QLayout:
+        root_layout = QVBoxLayout()
+        root_layout.addWidget(self._label)
+        root_layout.addWidget(self._table)
+        root_layout.addWidget(self._button_box)
+        return root_layout
+
+    def refresh(self) -> None:
+        stats = self._recorder.stats()
+        self._label.setText(
+            f"{sum(row.count for row in stats)} recent spans. "
+            f"Set {PROFILE_ENV_VAR} to a folder to profile bulk conversions with cProfile."
+        )
+        self._model.set_rows(stats_rows(stats))
+
+    def clear(self) -> None:
+        self._recorder.clear()
+        self.refresh()
+
+    def export(self) -> None:
+        path, _ = QFileDialog.getSaveFileName(self, "Export timings", "media_converter_timings.json", "JSON (*.json)")
+        if not path:
+            return
+        try:
+            self._recorder.export_json(path)
+        except OSError as ex:
+            tooltip(f"Couldn't export timings: {ex}", parent=self)
+        else:
+            tooltip(f"Timings saved to {path}", parent=self)
+
+    def export_records(self) -> None:
+        if not (records := get_conversion_log().records()):
+            tooltip("No paste or add-note conversions yet.", parent=self)
+            return
+        ask_export_records(self, records, "media_converter_recent_conversions.csv")
+
+    def show_stalls(self) -> None:
+        showText(
+            format_stalls(get_lag_monitor().stalls()),
+            parent=self,
+            title=f"{ADDON_FULL_NAME} - Interface stalls",
+        )
+
+
+def show_timings_dialog() -> None:
+    dialog = TimingsDialog(get_timings(), parent=mw)
+    dialog.setAttribute(Qt.WidgetAttribute.WA_DeleteOnClose)
+    dialog.show()
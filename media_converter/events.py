@@ -1,23 +1,27 @@
 # Copyright: Ajatt-Tools and contributors; https://github.com/Ajatt-Tools
 # License: GNU AGPL, version 3 or later; http://www.gnu.org/licenses/agpl.html
+import functools
 import os.path
 
 import anki
 import aqt.editor
-from anki import hooks
-from anki.hooks import wrap
-from aqt import gui_hooks, mw
+from aqt import mw
 from aqt.qt import *
 from aqt.utils import KeyboardModifiersPressed, tooltip
 
+from .bulk_convert.deferred_converter import DeferredConverter
 from .common import image_html
 from .config import MediaConverterConfig, get_global_config
+from .file_converters.async_paste_converter import AsyncPasteConverter
+from .file_converters.common import ConverterType
 from .file_converters.file_converter import FFmpegNotFoundError
 from .file_converters.find_media import FindMedia
 from .file_converters.image_converter import CanceledPaste, ffmpeg_not_found_dialog
+from .file_converters.multi_paste_converter import MultiPasteConverter
 from .file_converters.on_add_note_converter import OnAddNoteConverter
 from .file_converters.on_paste_converter import TEMP_IMAGE_FORMAT, OnPasteConverter
-from .utils.mime_helper import has_local_files
+from .utils.lag_monitor import monitor_ui_lag
+from .utils.mime_helper import ImageSource, has_local_files, image_sources
 from .utils.show_options import ShowOptions
 from .utils.temp_file import TempFile
 
@@ -29,12 +33,55 @@ def should_paste_raw() -> bool:
 class Events:
     _config: MediaConverterConfig
     _finder: FindMedia
+    _deferred: DeferredConverter
 
     def __init__(self, config: MediaConverterConfig) -> None:
         self._config = config
         self._finder = FindMedia(config)
+        self._deferred = DeferredConverter(config)
+
+    def _convert_mime_async(self, mime: QMimeData, editor: aqt.editor.Editor, action: ShowOptions) -> QMimeData:
+        conv = AsyncPasteConverter(editor, action, self._config)
+        with TempFile(suffix=f".{TEMP_IMAGE_FORMAT}") as tmp_file:
+            if to_convert := conv.mime_to_image_file(mime, tmp_file.path()):
+                try:
+                    placeholder = conv.convert_mime_async(to_convert)
+                except CanceledPaste as ex:
+                    conv.tooltip(ex)
+                    mime = QMimeData()
+                except OSError as ex:
+                    conv.tooltip(ex)
+                else:
+                    # Paste the original image. It's replaced when the conversion finishes.
+                    mime = QMimeData()
+                    mime.setHtml(image_html(placeholder))
+        return mime
+
+    def _convert_mime_multi(
+        self, mime: QMimeData, sources: list[ImageSource], editor: aqt.editor.Editor, action: ShowOptions
+    ) -> QMimeData:
+        conv = MultiPasteConverter(editor, action, self._config)
+        try:
+            result = conv.convert_sources(sources)
+        except FFmpegNotFoundError:
+            ffmpeg_not_found_dialog()
+        except CanceledPaste as ex:
+            conv.tooltip(ex)
+            mime = QMimeData()
+        except OSError as ex:
+            conv.tooltip(ex)
+        else:
+            if result.converted:
+                mime = QMimeData()
+                mime.setHtml(result.as_html())
+            conv.result_tooltip_multi(result)
+        return mime
 
     def _convert_mime(self, mime: QMimeData, editor: aqt.editor.Editor, action: ShowOptions) -> QMimeData:
+        if self._config.multi_image_paste and len(sources := image_sources(mime)) > 1:
+            return self._convert_mime_multi(mime, sources, editor, action)
+        if self._config.async_paste:
+            return self._convert_mime_async(mime, editor, action)
         conv = OnPasteConverter(editor, action, self._config)
         with TempFile(suffix=f".{TEMP_IMAGE_FORMAT}") as tmp_file:
             if to_convert := conv.mime_to_image_file(mime, tmp_file.path()):
@@ -69,13 +116,23 @@ class Events:
             return mime
 
         if self._config.drag_and_drop and drop_event:
-            return self._convert_mime(mime, editor_web_view.editor, action=ShowOptions.drag_and_drop)
+            with monitor_ui_lag("drag and drop", self._config):
+                return self._convert_mime(mime, editor_web_view.editor, action=ShowOptions.drag_and_drop)
 
-        if self._config.copy_paste and not drop_event and (mime.hasImage() or has_local_files(mime)):
-            return self._convert_mime(mime, editor_web_view.editor, action=ShowOptions.paste)
+        if self._config.copy_paste and not drop_event and self._has_images(mime):
+            with monitor_ui_lag("paste", self._config):
+                return self._convert_mime(mime, editor_web_view.editor, action=ShowOptions.paste)
 
         return mime
 
+    def _has_images(self, mime: QMimeData) -> bool:
+        return (
+            mime.hasImage()
+            or has_local_files(mime)
+            # A copied web page fragment may carry only HTML with several <img> tags.
+            or (self._config.multi_image_paste and len(image_sources(mime)) > 1)
+        )
+
     def _should_convert_images_in_new_note(self, note: anki.notes.Note) -> bool:
         """
         Convert media files when a new note is added by AnkiConnect.
@@ -84,13 +141,28 @@ class Events:
         assert mw
         return self._config.convert_on_note_add is True and mw.app.activeWindow() is None and note.id == 0
 
+    def _enqueue_new_note_media(self, note: anki.notes.Note) -> None:
+        html = note.joined_fields()
+        assert mw and mw.col
+        have = mw.col.media.have
+        self._deferred.enqueue(filename for filename in self._finder.find_convertible_images(html) if have(filename))
+        if self._config.enable_audio_conversion:
+            self._deferred.enqueue(
+                (filename for filename in self._finder.find_convertible_audio(html) if have(filename)),
+                kind=ConverterType.audio,
+            )
+
     def on_add_note(
         self, _self: anki.collection.Collection, note: anki.notes.Note, _deck_id: anki.decks.DeckId
     ) -> None:
-        if self._should_convert_images_in_new_note(note):
+        if self._should_convert_images_in_new_note(note) and self._config.defer_note_add_conversion:
+            # Let the note be added with the original files. They are converted later.
+            self._enqueue_new_note_media(note)
+        elif self._should_convert_images_in_new_note(note):
             converter = OnAddNoteConverter(note, action=ShowOptions.add_note, parent=mw, config=self._config)
             try:
-                converter.convert_note()
+                with monitor_ui_lag("note conversion", self._config):
+                    converter.convert_note()
             except FFmpegNotFoundError:
                 ffmpeg_not_found_dialog()
             except CanceledPaste as ex:
@@ -98,6 +170,12 @@ class Events:
             except (OSError, RuntimeError, FileNotFoundError):
                 pass
 
+    def on_profile_did_open(self) -> None:
+        self._deferred.schedule()
+
+    def on_profile_will_close(self) -> None:
+        self._deferred.stop()
+
     def on_setup_mask_editor(self, editor: aqt.editor.Editor, image_path: str, _old: Callable) -> None:
         """
         Wrap Image Occlusion and convert the pasted image before Occlusion is used.
@@ -118,12 +196,8 @@ class Events:
         return _old(editor, image_path)
 
 
-def init() -> None:
+@functools.cache
+def get_events() -> Events:
+    """Created when one of the hooks registered by startup.py fires for the first time."""
     mw._ajt__media_converter_events = events = Events(get_global_config())
-    gui_hooks.editor_will_process_mime.append(events.on_process_mime)
-    hooks.note_will_be_added.append(events.on_add_note)
-    aqt.editor.Editor.setup_mask_editor = wrap(
-        aqt.editor.Editor.setup_mask_editor,
-        events.on_setup_mask_editor,
-        pos="around",
-    )
+    return events
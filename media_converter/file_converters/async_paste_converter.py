@@ -0,0 +1,113 @@
+# Copyright: Ajatt-Tools and contributors; https://github.com/Ajatt-Tools
+# License: GNU AGPL, version 3 or later; http://www.gnu.org/licenses/agpl.html
+import os
+
+import aqt.editor
+from anki.collection import Collection, OpChanges, SearchNode
+from anki.notes import Note, NoteId
+from aqt.operations import CollectionOp, QueryOp
+from aqt.qt import *
+
+from ..config import MediaConverterConfig
+from ..media_deduplication.conversion_index import ConversionKey
+from ..media_deduplication.deduplication import deduplicate_media_in_note
+from ..utils.file_paths_factory import release_reserved
+from ..utils.show_options import ShowOptions
+from .file_converter import FFmpegNotFoundError
+from .image_converter import ImageConverter, ffmpeg_not_found_dialog
+from .on_paste_converter import TEMP_IMAGE_FORMAT, ConverterPayload, OnPasteConverter
+
+
+def note_references(note: Note, filename: str) -> bool:
+    return any(filename in field for field in note.fields)
+
+
+def swap_placeholder_op(col: Collection, placeholder: str, new_filename: str) -> OpChanges:
+    """
+    Point every note that references the placeholder to the converted file, then trash the placeholder.
+    """
+    pos = col.add_custom_undo_entry(f"Convert {placeholder}")
+    to_update: dict[NoteId, Note] = {}
+    for note_id in col.find_notes(query=col.build_search_string(SearchNode(literal_text=placeholder))):
+        to_update[note_id] = deduplicate_media_in_note(col.get_note(note_id), placeholder, new_filename)
+    col.update_notes(list(to_update.values()))
+    if col.media.have(placeholder):
+        col.media.trash_files([placeholder])
+    return col.merge_undo_entries(pos)
+
+
+class AsyncPasteConverter(OnPasteConverter):
+    """
+    Converter that doesn't block the editor.
+    The original image is added to the collection and pasted right away as a placeholder.
+    Conversion runs in the background, and then the placeholder's src is swapped for the converted file.
+    """
+
+    _started: bool
+
+    def __init__(self, editor: aqt.editor.Editor, action: ShowOptions, config: MediaConverterConfig) -> None:
+        super().__init__(editor, action, config)
+        self._started = False
+
+    def convert_mime_async(self, to_convert: ConverterPayload) -> str:
+        """
+        Start the conversion. Returns the name of the placeholder file to paste,
+        or the name of an existing file converted from the same image.
+        Each converter handles one paste, so a paste can't be converted twice.
+        """
+        if self._started:
+            raise RuntimeError("This paste is already being converted.")
+        self._started = True
+        self._maybe_show_settings(to_convert.dimensions)
+        key = ConversionKey.of(to_convert.tmp_path, self._config)
+        if reusable := self._find_reusable(to_convert.tmp_path, key):
+            return os.path.basename(reusable)
+        # The name is reserved, so that another paste made during the conversion doesn't take it.
+        destination_path = self._make_destination_path(to_convert.initial_filename)
+        with open(to_convert.tmp_path, "rb") as f:
+            placeholder = self._editor.mw.col.media.write_data(
+                f"{os.path.splitext(os.path.basename(destination_path))[0]}.{TEMP_IMAGE_FORMAT}", f.read()
+            )
+        conv = ImageConverter(os.path.join(self._dest_dir, placeholder), destination_path, config=self._config)
+        QueryOp(
+            parent=self._editor.mw,
+            op=lambda col: self._run_converter(conv, destination_path),
+            success=lambda _: self._swap_placeholder(placeholder, destination_path, key),
+        ).failure(lambda ex: self._on_failure(ex, destination_path)).without_collection().run_in_background()
+        return placeholder
+
+    def _swap_placeholder(self, placeholder: str, destination_path: str, key: ConversionKey) -> None:
+        release_reserved(destination_path)
+        self._remember(key, destination_path)
+        new_filename = os.path.basename(destination_path)
+        editor = self._editor
+
+        def run_op() -> None:
+            CollectionOp(
+                parent=editor.mw,
+                op=lambda col: swap_placeholder_op(col, placeholder, new_filename),
+            ).success(lambda out: self.result_tooltip(destination_path)).run_in_background()
+
+        def swap_after_note_saved() -> None:
+            if editor.addMode and editor.note and note_references(editor.note, placeholder):
+                # The note isn't in the collection yet.
+                deduplicate_media_in_note(editor.note, placeholder, new_filename)
+                editor.loadNoteKeepingFocus()
+            run_op()
+
+        if editor.web is None:
+            # The editor has been closed during the conversion.
+            run_op()
+        else:
+            # Save what the user has typed during the conversion before the note is modified.
+            editor.call_after_note_saved(swap_after_note_saved)
+
+    def _on_failure(self, ex: Exception, destination_path: str) -> None:
+        # The placeholder stays in the note, so the user keeps the original image.
+        release_reserved(destination_path)
+        if isinstance(ex, FFmpegNotFoundError):
+            ffmpeg_not_found_dialog(parent=self._editor.parentWindow)
+        elif isinstance(ex, (OSError, RuntimeError)):
+            self.tooltip(f"Conversion failed: {ex}")
+        else:
+            raise ex
@@ -2,8 +2,9 @@
 # License: GNU AGPL, version 3 or later; http://www.gnu.org/licenses/agpl.html
 
 from ..config import MediaConverterConfig
-from .common import ConverterType, create_process, run_process
-from .file_converter import FFmpegNotFoundError, FileConverter, find_ffmpeg_exe
+from ..utils.executables import find_ffmpeg_exe
+from .common import ConverterType
+from .file_converter import FFmpegNotFoundError, FileConverter
 
 
 class AudioConverter(FileConverter, mode=ConverterType.audio):
@@ -19,8 +20,10 @@ class AudioConverter(FileConverter, mode=ConverterType.audio):
     def convert(self) -> None:
         if not find_ffmpeg_exe():
             raise FFmpegNotFoundError("ffmpeg executable is not in PATH")
+        self._run_to_destination(self._make_args)
 
-        args = [
+    def _make_args(self, output_path: str) -> list[str]:
+        return [
             find_ffmpeg_exe(),
             "-hide_banner",
             "-nostdin",
@@ -44,9 +47,5 @@ class AudioConverter(FileConverter, mode=ConverterType.audio):
             "-b:a",
             f"{self._config.audio_bitrate_k}k",
             *self._config.ffmpeg_audio_args,
-            self._destination_path,
+            output_path,
         ]
-
-        print(f"executing args: {args}")
-        p = create_process(args)
-        run_process(p)
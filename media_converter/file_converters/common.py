@@ -9,6 +9,8 @@ from typing import Any
 
 from ..consts import IS_WIN
 
+# The highest nice value, used where SCHED_IDLE isn't available.
+LOWEST_PRIORITY_NICE = 19
 COMMON_AUDIO_FORMATS = frozenset(
     (".mp3", ".wav", ".ogg", ".flac", ".aac", ".m4a", ".aiff", ".amr", ".ape", ".mp2", ".oga", ".oma", ".opus")
 )
@@ -50,26 +52,62 @@ def stringify_args(args: list[Any]) -> list[str]:
     return [str(arg) for arg in args]
 
 
-def create_process(args: list[Any]) -> subprocess.Popen:
-    return subprocess.Popen(
+def lower_process_priority(pid: int) -> None:
+    """
+    Let the process run only when the CPU has nothing else to do.
+    On Linux, SCHED_IDLE also puts the process in the idle I/O class, as if it was started with ionice -c3.
+    Lowering the priority of a child process needs no privileges, so the only expected error is that it has exited.
+    """
+    try:
+        if hasattr(os, "SCHED_IDLE"):
+            os.sched_setscheduler(pid, os.SCHED_IDLE, os.sched_param(0))
+        else:
+            os.setpriority(os.PRIO_PROCESS, pid, LOWEST_PRIORITY_NICE)
+    except ProcessLookupError:
+        # Its result is read as usual.
+        pass
+
+
+def create_process(args: list[Any], low_priority: bool = False) -> subprocess.Popen:
+    p = subprocess.Popen(
         stringify_args(args),
         shell=False,
         bufsize=-1,
         stdout=subprocess.PIPE,
         stderr=subprocess.STDOUT,
         startupinfo=startup_info(),
+        # On Windows, the priority is set when the process is created.
+        creationflags=getattr(subprocess, "IDLE_PRIORITY_CLASS", 0) if low_priority else 0,
         universal_newlines=True,
         encoding="utf8",
     )
-
-
-def run_process(p: subprocess.Popen) -> None:
-    stdout, stderr = p.communicate()
+    if low_priority and not IS_WIN:
+        lower_process_priority(p.pid)
+    return p
+
+
+def run_process(p: subprocess.Popen) -> float | None:
+    """
+    Wait for the process to finish and return the CPU time it used, in seconds.
+    Returns None on platforms that can't report it (Windows).
+    """
+    cpu_seconds = None
+    if hasattr(os, "wait4") and p.stdout is not None:
+        # Reap the process here instead of in Popen, because only wait4 reports the resources it used.
+        # stderr is redirected to stdout, so reading one pipe can't deadlock.
+        with p.stdout:
+            stdout = p.stdout.read()
+        _, status, usage = os.wait4(p.pid, 0)
+        p.returncode = os.waitstatus_to_exitcode(status)
+        cpu_seconds = usage.ru_utime + usage.ru_stime
+    else:
+        stdout, stderr = p.communicate()
     if p.wait() != 0:
         print("Conversion failed.")
         print(f"exit code = {p.returncode}")
         print(stdout)
         raise RuntimeError(f"Conversion failed with code {p.returncode}.")
+    return cpu_seconds
 
 
 def get_file_extension(file_path: str) -> str:
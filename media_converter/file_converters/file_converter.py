@@ -2,24 +2,68 @@
 # License: GNU AGPL, version 3 or later; http://www.gnu.org/licenses/agpl.html
 
 import functools
+import hashlib
+import os
+import subprocess
+import time
+import typing
+import uuid
+from collections.abc import Callable
+from typing import Any
 
-from ..ajt_common.utils import find_executable as find_executable_ajt
 from ..config import MediaConverterConfig
-from .common import COMMON_AUDIO_FORMATS, ConverterType, get_file_extension
+from ..utils.timings import timed
+from .common import (
+    COMMON_AUDIO_FORMATS,
+    ConverterType,
+    create_process,
+    get_file_extension,
+    run_process,
+)
 
 
 class FFmpegNotFoundError(FileNotFoundError):
     pass
 
 
+class EncoderRun(typing.NamedTuple):
+    encoder: str  # e.g. "cwebp" or "ffmpeg"
+    args_fingerprint: str
+    wall_seconds: float
+    cpu_seconds: float | None
+
+
+def args_fingerprint(args: list[Any], source_path: str, output_path: str) -> str:
+    """
+    Identifies the encoder settings. File paths and the location of the executable are left out,
+    so that conversions of different files with the same settings get the same fingerprint.
+    """
+    parts = [os.path.basename(str(args[0])), *("{in}" if arg == source_path else str(arg) for arg in args[1:])]
+    parts = ["{out}" if part == output_path else part for part in parts]
+    return hashlib.sha1("\0".join(parts).encode("utf-8")).hexdigest()[:12]
+
+
 def is_audio_file(filename: str) -> bool:
     return get_file_extension(filename) in COMMON_AUDIO_FORMATS
 
 
+def temp_output_path(destination_path: str) -> str:
+    """
+    A hidden name next to the destination, so that the final rename stays on the same filesystem.
+    The extension is kept, because ffmpeg picks the output format by it.
+    """
+    dest_dir, name = os.path.split(destination_path)
+    return os.path.join(dest_dir, f".ajt__{uuid.uuid4().hex[:8]}_{name}")
+
+
 @functools.cache
-def find_ffmpeg_exe() -> str | None:
-    # https://www.gyan.dev/ffmpeg/builds/ffmpeg-git-essentials.7z
-    return find_executable_ajt("ffmpeg")
+def encoder_version(exe: str) -> str:
+    """The first line that the encoder prints about its version, or an empty string if it can't be run."""
+    try:
+        stdout, _ = create_process([exe, "-version"]).communicate(timeout=10)
+    except (OSError, subprocess.SubprocessError):
+        return ""
+    return next(iter(stdout.strip().splitlines()), "")
 
 
 class FileConverter:
@@ -29,6 +73,10 @@ class FileConverter:
 
     _subclasses_map: dict[ConverterType, type["FileConverter"]] = {}  # audio -> AudioConverter
     _mode: ConverterType  # used to mark subclasses
+    _source_path: str
+    _destination_path: str
+    _last_run: EncoderRun | None = None
+    _low_priority: bool = False
 
     def __init_subclass__(cls, **kwargs) -> None:
         # mode is one of ("audio", "image")
@@ -50,5 +98,43 @@ class FileConverter:
     def mode(self) -> ConverterType:
         return self._mode
 
+    @property
+    def source_path(self) -> str:
+        return self._source_path
+
+    @property
+    def last_run(self) -> EncoderRun | None:
+        """How the encoder was run the last time, or None if it hasn't finished yet."""
+        return self._last_run
+
+    def run_at_low_priority(self) -> None:
+        """Start the encoder with the lowest OS priority, so that it doesn't slow down Anki or other programs."""
+        self._low_priority = True
+
     def convert(self) -> None:
         raise NotImplementedError()
+
+    def _run_to_destination(self, make_args: Callable[[str], list[Any]]) -> None:
+        """
+        Run the encoder with a temporary output file and move it to the destination when the encoder succeeds.
+        The destination never contains a partially written file, and a failed conversion leaves it as it was.
+        """
+        tmp_path = temp_output_path(self._destination_path)
+        try:
+            args = make_args(tmp_path)
+            print(f"executing args: {args}")
+            encoder = os.path.splitext(os.path.basename(str(args[0])))[0]
+            start = time.perf_counter()
+            # Timed per encoder, e.g. "cwebp" or "ffmpeg".
+            with timed("encode", label=encoder):
+                cpu_seconds = run_process(create_process(args, low_priority=self._low_priority))
+            self._last_run = EncoderRun(
+                encoder=encoder,
+                args_fingerprint=args_fingerprint(args, self._source_path, tmp_path),
+                wall_seconds=time.perf_counter() - start,
+                cpu_seconds=cpu_seconds,
+            )
+            os.replace(tmp_path, self._destination_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
@@ -22,7 +22,8 @@ class FindMedia:
         :param include_converted: Allow reconversion. The target extension (webp, avif) will not be excluded.
         """
 
-        return get_file_extension(filename) in self._config.get_excluded_image_extensions(include_converted)
+        # The snapshot keeps the extension sets, so they aren't rebuilt for every file.
+        return get_file_extension(filename) in self._config.snapshot().get_excluded_image_extensions(include_converted)
 
     def is_excluded_audio_extension(self, filename: str, include_converted: bool = False) -> bool:
         """
@@ -32,7 +33,7 @@ class FindMedia:
         :param include_converted: Allow reconversion. The target extension (webp, avif) will not be excluded.
         """
 
-        return get_file_extension(filename) in self._config.get_excluded_audio_extensions(include_converted)
+        return get_file_extension(filename) in self._config.snapshot().get_excluded_audio_extensions(include_converted)
 
     def find_convertible_images(self, html: str, include_converted: bool = False) -> Iterable[str]:
         """
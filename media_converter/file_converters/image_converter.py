@@ -1,28 +1,30 @@
 # Copyright: Ajatt-Tools and contributors; https://github.com/Ajatt-Tools
 # License: GNU AGPL, version 3 or later; http://www.gnu.org/licenses/agpl.html
 
-import functools
+from collections.abc import Sequence
 
 from aqt.qt import *
 from aqt.utils import showWarning
 
-from ..ajt_common.utils import find_executable as find_executable_ajt
 from ..config import ImageFormat, MediaConverterConfig
-from ..consts import ADDON_FULL_NAME, IS_MAC, IS_WIN, SUPPORT_DIR
+from ..consts import ADDON_FULL_NAME
+from ..utils.executables import find_cwebp_exe, find_ffmpeg_exe
 from ..utils.mime_helper import iter_files
 from ..utils.show_options import ImageDimensions
-from .common import (
-    ConverterType,
-    create_process,
-    get_file_extension,
-    run_process,
-)
-from .file_converter import FFmpegNotFoundError, FileConverter, find_ffmpeg_exe
+from ..utils.timings import timed
+from .common import ConverterType, get_file_extension
+from .file_converter import FFmpegNotFoundError, FileConverter, encoder_version
 
 ANIMATED_OR_VIDEO_FORMATS = frozenset(
     [".apng", ".gif", ".mp4", ".avi", ".mov", ".mkv", ".wmv", ".flv", ".webm", ".m4v", ".mpg", ".mpeg"]
 )
 AVIF_WORST_CRF = 63
+# Options that make the encoder slower for a smaller file, and the number of values each option takes.
+# They are dropped when encoding a preview.
+CWEBP_SLOW_OPTIONS = {"-pass": 1, "-m": 1, "-af": 0}
+FFMPEG_SLOW_OPTIONS = {"-cpu-used": 1}
+CWEBP_FAST_ARGS = ["-m", "0"]
+FFMPEG_FAST_ARGS = ["-cpu-used", "8"]
 
 
 class CanceledPaste(Warning):
@@ -33,37 +35,6 @@ class MimeImageNotFound(Warning):
     pass
 
 
-@functools.cache
-def support_exe_suffix() -> str:
-    """
-    The mecab executable file in the "support" dir has a different suffix depending on the platform.
-    """
-    if IS_WIN:
-        return ".exe"
-    elif IS_MAC:
-        return ".mac"
-    else:
-        return ".lin"
-
-
-def get_bundled_executable(name: str) -> str:
-    """
-    Get path to executable in the bundled "support" folder.
-    Used to provide "cwebp' and 'ffmpeg' on computers where it is not installed system-wide or can't be found.
-    """
-    path_to_exe = os.path.join(SUPPORT_DIR, name) + support_exe_suffix()
-    assert os.path.isfile(path_to_exe), f"{path_to_exe} doesn't exist. Can't recover."
-    if not IS_WIN:
-        os.chmod(path_to_exe, 0o755)
-    return path_to_exe
-
-
-@functools.cache
-def find_cwebp_exe() -> str:
-    # https://developers.google.com/speed/webp/download
-    return find_executable_ajt("cwebp") or get_bundled_executable("cwebp")
-
-
 def fetch_filename(mime: QMimeData) -> str | None:
     for file in iter_files(mime):
         if base := os.path.basename(file):
@@ -101,12 +72,38 @@ def ffmpeg_not_found_dialog(parent: QWidget | None = None) -> None:
     )
 
 
+def without_options(args: Sequence[str | int], options: dict[str, int]) -> list[str | int]:
+    """
+    Remove command-line options along with their values.
+    """
+    result: list[str | int] = []
+    skip = 0
+    for arg in args:
+        if skip:
+            skip -= 1
+        elif arg in options:
+            skip = options[arg]
+        else:
+            result.append(arg)
+    return result
+
+
 def find_image_dimensions(file_path: str) -> ImageDimensions:
-    with open(file_path, "rb") as f:
+    with timed("probe_dimensions"), open(file_path, "rb") as f:
         image = QImage.fromData(f.read())  # type: ignore
     return ImageDimensions(image.width(), image.height())
 
 
+def image_encoder_version(config: MediaConverterConfig) -> str:
+    """Version of the encoder that makes images in the configured format. Empty if it isn't installed."""
+    try:
+        exe = find_cwebp_exe() if config.image_format == ImageFormat.webp else find_ffmpeg_exe()
+    except AssertionError:
+        # The bundled cwebp is missing.
+        return ""
+    return encoder_version(exe) if exe else ""
+
+
 class ImageConverter(FileConverter, mode=ConverterType.image):
     _source_path: str
     _dimensions: ImageDimensions
@@ -151,7 +148,7 @@ class ImageConverter(FileConverter, mode=ConverterType.image):
                 return f"scale={resize_args.width}:{resize_args.height}"
         return "scale=-1:-1"
 
-    def _make_to_webp_args(self, source_path: str, destination_path: str) -> list[str | int]:
+    def _make_to_webp_args(self, source_path: str, destination_path: str, fast: bool = False) -> list[str | int]:
         args = [
             find_cwebp_exe(),
             source_path,
@@ -159,13 +156,17 @@ class ImageConverter(FileConverter, mode=ConverterType.image):
             destination_path,
             "-q",
             self._config.image_quality,
-            *self._config.cwebp_args,
+            *(
+                [*without_options(self._config.cwebp_args, CWEBP_SLOW_OPTIONS), *CWEBP_FAST_ARGS]
+                if fast
+                else self._config.cwebp_args
+            ),
         ]
         if resize_args := self._get_resize_dimensions():
             args.extend(["-resize", resize_args.width, resize_args.height])
         return args
 
-    def _make_to_avif_args(self, source_path: str, destination_path: str) -> list[str | int]:
+    def _make_to_avif_args(self, source_path: str, destination_path: str, fast: bool = False) -> list[str | int]:
         if not find_ffmpeg_exe():
             raise FFmpegNotFoundError("ffmpeg executable is not in PATH")
         # Use ffmpeg for non-webp formats, dynamically using the format from config
@@ -186,7 +187,11 @@ class ImageConverter(FileConverter, mode=ConverterType.image):
             self._get_ffmpeg_scale_arg() + ":flags=sinc+accurate_rnd",
             "-crf",
             quality_percent_to_avif_crf(self._config.image_quality),
-            *self._config.ffmpeg_args,
+            *(
+                [*without_options(self._config.ffmpeg_args, FFMPEG_SLOW_OPTIONS), *FFMPEG_FAST_ARGS]
+                if fast
+                else self._config.ffmpeg_args
+            ),
         ]
         if not is_animation(source_path):
             args += [
@@ -199,11 +204,16 @@ class ImageConverter(FileConverter, mode=ConverterType.image):
         return args
 
     def convert(self) -> None:
+        self._run(fast=False)
+
+    def convert_preview(self) -> None:
+        """
+        Encode with the cheapest settings. Same quality and dimensions, but the file is larger.
+        """
+        self._run(fast=True)
+
+    def _run(self, fast: bool) -> None:
         if self._config.image_format == ImageFormat.webp:
-            args = self._make_to_webp_args(self._source_path, self._destination_path)
+            self._run_to_destination(lambda output_path: self._make_to_webp_args(self._source_path, output_path, fast))
         else:
-            args = self._make_to_avif_args(self._source_path, self._destination_path)
-
-        print(f"executing args: {args}")
-        p = create_process(args)
-        run_process(p)
+            self._run_to_destination(lambda output_path: self._make_to_avif_args(self._source_path, output_path, fast))
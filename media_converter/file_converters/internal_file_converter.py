@@ -9,11 +9,17 @@ from aqt import mw
 from aqt.qt import *
 
 from ..config import MediaConverterConfig
-from ..utils.file_paths_factory import FilePathFactory
+from ..utils.conversion_records import (
+    ConversionOrigin,
+    ConversionRecord,
+    ConversionStatus,
+)
+from ..utils.file_paths_factory import FilePathFactory, release_reserved
 from ..utils.show_options import ImageDimensions
 from .common import ConverterType, LocalFile
 from .file_converter import FileConverter
 from .image_converter import ImageConverter
+from .records import file_size, image_provenance, make_record, store_provenance
 
 
 class InternalFileConverter:
@@ -22,30 +28,53 @@ class InternalFileConverter:
     """
 
     _initial_file_path: str
+    _initial_size: int
     _destination_file_path: str
     _conversion_finished: bool
+    _reserved: bool
+    _reused: bool
     _converter: FileConverter
     _config: MediaConverterConfig
 
     def __init__(
-        self, editor: aqt.editor.Editor | None, file: LocalFile, note: Note, config: MediaConverterConfig
+        self,
+        editor: aqt.editor.Editor | None,
+        file: LocalFile,
+        note: Note,
+        config: MediaConverterConfig,
+        low_priority: bool = False,
     ) -> None:
         self._config = config
         self._conversion_finished = False
+        self._reused = False
         self._initial_file_path = os.path.join(self._dest_dir, file.file_name)
+        # Measured now, because the original file may be trashed once the notes stop referencing it.
+        self._initial_size = file_size(self._initial_file_path)
         self._fpf = FilePathFactory(note=note, editor=editor, config=config)
+        # The name is reserved, so that converters running at the same time pick other names.
         self._destination_file_path = self._fpf.make_unique_filepath(
             self._dest_dir,
             file.file_name,
             extension=self._fpf.get_target_extension(file),
         )
-        self._converter = FileConverter(self._initial_file_path, self._destination_file_path, config=config)
+        self._reserved = True
+        try:
+            self._converter = FileConverter(self._initial_file_path, self._destination_file_path, config=config)
+            if low_priority:
+                self._converter.run_at_low_priority()
+        except BaseException:
+            self.release_destination()
+            raise
 
     @property
     def _dest_dir(self) -> str:
         assert mw
         return mw.col.media.dir()
 
+    @property
+    def initial_file_path(self) -> str:
+        return self._initial_file_path
+
     @property
     def new_file_path(self) -> str:
         if not self._conversion_finished:
@@ -68,9 +97,49 @@ class InternalFileConverter:
         assert isinstance(self._converter, ImageConverter)
         return self._converter.initial_dimensions
 
+    def release_destination(self) -> None:
+        """Give up the reserved destination name. A file that has been written there stays."""
+        if self._reserved:
+            self._reserved = False
+            release_reserved(self._destination_file_path)
+
     def convert_internal(self) -> None:
-        self._converter.convert()
+        try:
+            # Hashed before converting, in case the source file changes while the encoder runs.
+            provenance = image_provenance(self._initial_file_path, self._config) if self.is_image() else None
+            self._converter.convert()
+        except BaseException:
+            self.release_destination()
+            raise
+        if provenance:
+            store_provenance(self._destination_file_path, provenance)
+        self._finish()
+
+    def use_existing(self, filename: str) -> None:
+        """Skip the conversion and use a file in the collection that was converted from the same source."""
+        self.release_destination()
+        self._destination_file_path = os.path.join(self._dest_dir, filename)
+        self._reused = True
+        self._finish()
+
+    def record(self, origin: ConversionOrigin, error: BaseException | None = None) -> ConversionRecord:
+        """Describe the conversion, or why it failed."""
+        if error is not None:
+            status, reason = ConversionStatus.failed, str(error) or type(error).__name__
+        elif self._reused:
+            status, reason = ConversionStatus.skipped, "converted from the same source before"
+        else:
+            status, reason = ConversionStatus.converted, ""
+        return make_record(
+            origin,
+            self._initial_file_path,
+            self._destination_file_path if self._conversion_finished else "",
+            converter=self._converter,
+            bytes_in=self._initial_size,
+            status=status,
+            reason=reason,
+        )
+
+    def _finish(self) -> None:
         self._conversion_finished = True
-        if self._config.delete_original_file_on_convert:
-            print("Removing original file.")
-            os.remove(self._initial_file_path)
+        self.release_destination()
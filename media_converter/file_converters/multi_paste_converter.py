@@ -0,0 +1,143 @@
+# Copyright: Ajatt-Tools and contributors; https://github.com/Ajatt-Tools
+# License: GNU AGPL, version 3 or later; http://www.gnu.org/licenses/agpl.html
+import concurrent.futures
+import hashlib
+import multiprocessing
+import typing
+from collections.abc import Sequence
+
+from aqt.qt import *
+
+from ..common import image_html
+from ..media_deduplication.conversion_index import ConversionKey
+from ..utils.file_paths_factory import release_reserved
+from ..utils.mime_helper import ImageSource, image_from_source
+from ..utils.show_options import ImageDimensions
+from ..utils.temp_file import TempFile
+from .file_converter import FFmpegNotFoundError
+from .image_converter import ImageConverter
+from .on_paste_converter import TEMP_IMAGE_FORMAT, OnPasteConverter
+
+MAX_WORKERS = max(1, multiprocessing.cpu_count() - 1)
+
+
+class DecodedImage(typing.NamedTuple):
+    source: ImageSource
+    tmp_file: TempFile
+    dimensions: ImageDimensions
+    digest: str
+
+
+class MultiPasteResult(typing.NamedTuple):
+    converted: list[str]  # destination paths, in source order
+    failed: list[str]
+
+    def as_html(self) -> str:
+        return "".join(image_html(os.path.basename(path)) for path in self.converted)
+
+
+def decode_image(source: ImageSource) -> DecodedImage | None:
+    """
+    Load the image and save it as a temporary PNG.
+    The digest is taken from the decoded image, so the same picture from different sources is recognized.
+    """
+    image = image_from_source(source)
+    if not image or image.isNull():
+        return None
+    tmp_file = TempFile(suffix=f".{TEMP_IMAGE_FORMAT}")
+    if not image.save(tmp_file.path(), TEMP_IMAGE_FORMAT):
+        tmp_file.close()
+        return None
+    with open(tmp_file.path(), "rb") as f:
+        digest = hashlib.sha1(f.read()).hexdigest()
+    return DecodedImage(source, tmp_file, ImageDimensions(image.width(), image.height()), digest)
+
+
+def unique_images(decoded: Sequence[DecodedImage | None]) -> list[DecodedImage]:
+    """Keep the first occurrence of each picture. Temp files of the repeated ones are closed."""
+    unique: dict[str, DecodedImage] = {}
+    for image in decoded:
+        if image is None:
+            continue
+        if image.digest in unique:
+            image.tmp_file.close()
+        else:
+            unique[image.digest] = image
+    return list(unique.values())
+
+
+class MultiPasteConverter(OnPasteConverter):
+    """
+    Converter used when a paste or a drop carries several images, e.g. a selection of files or a web page fragment.
+    Images are downloaded, decoded and converted in parallel.
+    """
+
+    def convert_sources(self, sources: Sequence[ImageSource]) -> MultiPasteResult:
+        sources = [
+            source
+            for source in sources
+            if not (source.filename and self._finder.is_excluded_image_extension(source.filename))
+        ]
+        with concurrent.futures.ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+            images = unique_images(list(executor.map(decode_image, sources)))
+            try:
+                if not images:
+                    return MultiPasteResult(converted=[], failed=[])
+                # One dialog for the whole paste.
+                self._maybe_show_settings(images[0].dimensions)
+                keys = [ConversionKey.of(image.tmp_file.path(), self._config) for image in images]
+                reusable = [self._find_reusable(image.tmp_file.path(), key) for image, key in zip(images, keys)]
+                to_convert = [image for image, path in zip(images, reusable) if path is None]
+                # Names are picked one by one and reserved, so parallel conversions can't get the same name.
+                destinations = self._reserve_destination_paths(to_convert)
+                futures = {
+                    image.digest: (destination, executor.submit(self._convert_one, image, destination))
+                    for image, destination in zip(to_convert, destinations)
+                }
+                result = MultiPasteResult(converted=[], failed=[])
+                ffmpeg_error: FFmpegNotFoundError | None = None
+                # Wait for every conversion before the temp files are closed.
+                for image, key, path in zip(images, keys, reusable):
+                    if path:
+                        result.converted.append(path)
+                        continue
+                    destination, future = futures[image.digest]
+                    try:
+                        future.result()
+                    except (OSError, RuntimeError) as ex:
+                        result.failed.append(f"{image.source.filename or image.source.location[:64]}: {ex}")
+                        if isinstance(ex, FFmpegNotFoundError):
+                            ffmpeg_error = ex
+                    else:
+                        self._remember(key, destination)
+                        result.converted.append(destination)
+                    finally:
+                        release_reserved(destination)
+                if ffmpeg_error and not result.converted:
+                    raise ffmpeg_error
+                return result
+            finally:
+                for image in images:
+                    image.tmp_file.close()
+
+    def _reserve_destination_paths(self, images: Sequence[DecodedImage]) -> list[str]:
+        destinations: list[str] = []
+        try:
+            for image in images:
+                destinations.append(self._make_destination_path(image.source.filename))
+        except OSError:
+            for destination in destinations:
+                release_reserved(destination)
+            raise
+        return destinations
+
+    def _convert_one(self, image: DecodedImage, destination_path: str) -> None:
+        self._run_converter(
+            ImageConverter(image.tmp_file.path(), destination_path, config=self._config), destination_path
+        )
+
+    def result_tooltip_multi(self, result: MultiPasteResult) -> None:
+        msg = f"<strong>{len(result.converted)}</strong> images added."
+        if result.failed:
+            msg += f"<br>Failed: {len(result.failed)}.<br>{'<br>'.join(result.failed[:3])}"
+        self.tooltip(msg)
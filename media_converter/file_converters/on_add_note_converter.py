@@ -1,18 +1,35 @@
 # Copyright: Ajatt-Tools and contributors; https://github.com/Ajatt-Tools
 # License: GNU AGPL, version 3 or later; http://www.gnu.org/licenses/agpl.html
+import concurrent.futures
+import functools
+
 from anki.notes import Note
 from aqt import mw
+from aqt.operations import QueryOp
 from aqt.qt import *
 
 from ..config import MediaConverterConfig
 from ..dialogs.paste_image_dialog import AnkiPasteImageDialog
+from ..media_deduplication.conversion_index import ConversionKey, get_conversion_index
+from ..media_deduplication.deduplication import deduplicate_media_in_note
+from ..media_deduplication.reference_index import trash_unreferenced
+from ..utils.conversion_records import ConversionOrigin, get_conversion_log
 from ..utils.show_options import ImageDimensions, ShowOptions
-from .common import LocalFile
+from .common import ConverterType, LocalFile
 from .find_media import FindMedia
-from .image_converter import CanceledPaste
+from .image_converter import CanceledPaste, find_image_dimensions
 from .internal_file_converter import InternalFileConverter
 
 
+def trash_originals_in_background(filenames: list[str]) -> None:
+    """Move the original files that no note references any more to the media trash, on a background thread."""
+    QueryOp(
+        parent=mw,
+        op=lambda col: trash_unreferenced(col, filenames),
+        success=lambda trashed: None,
+    ).run_in_background()
+
+
 class OnAddNoteConverter:
     """
     Converter used when a new note is added by AnkiConnect.
@@ -45,21 +62,70 @@ class OnAddNoteConverter:
             return AnkiPasteImageDialog(config=self._config, dimensions=dimensions, parent=self._parent).exec()
         return QDialog.DialogCode.Accepted
 
-    def _convert_and_replace_stored_image(self, filename: str) -> None:
-        conv = InternalFileConverter(file=LocalFile.image(filename), editor=None, note=self._note, config=self._config)
-        ans = self._maybe_show_settings(conv.initial_dimensions)
-        if ans == QDialog.DialogCode.Rejected:
-            raise CanceledPaste("Cancelled.")
-        conv.convert_internal()
-        self._update_note_fields(filename, conv.new_filename)
+    def _find_files(self) -> list[LocalFile]:
+        html = self._note.joined_fields()
+        files = [LocalFile.image(filename) for filename in self._finder.find_convertible_images(html)]
+        if self._config.enable_audio_conversion:
+            files.extend(LocalFile.audio(filename) for filename in self._finder.find_convertible_audio(html))
+        return [file for file in files if mw.col.media.have(file.file_name)]
+
+    def _make_converters(self, files: list[LocalFile]) -> list[InternalFileConverter]:
+        converters = []
+        try:
+            for file in files:
+                # Each converter reserves its name, so files like a.png and a.jpg don't get the same one.
+                converters.append(InternalFileConverter(file=file, editor=None, note=self._note, config=self._config))
+        except OSError:
+            for conv in converters:
+                conv.release_destination()
+            raise
+        return converters
+
+    def _convert(self, conv: InternalFileConverter) -> None:
+        if not (self._config.reuse_converted_media and conv.is_image()):
+            return conv.convert_internal()
+        index = get_conversion_index()
+        key = ConversionKey.of(conv.initial_file_path, self._config)
+        if reusable := index.lookup(mw.col.media.dir(), key):
+            conv.use_existing(reusable)
+        else:
+            conv.convert_internal()
+            index.store(mw.col.media.dir(), key, conv.new_filename)
 
     def convert_note(self) -> None:
-        for filename in self._finder.find_convertible_images(self._note.joined_fields()):
-            if mw.col.media.have(filename):
-                print(f"Converting file: {filename}")
-                self._convert_and_replace_stored_image(filename)
-        # TODO handle audio files
+        """
+        Convert images and audio files of the note at the same time, then update the note once.
+        If some files fail, the others are still applied, and the first error is raised.
+        """
+        if not (files := self._find_files()):
+            return
+        if image := next((file for file in files if file.type == ConverterType.image), None):
+            dimensions = find_image_dimensions(os.path.join(mw.col.media.dir(), image.file_name))
+            if self._maybe_show_settings(dimensions) == QDialog.DialogCode.Rejected:
+                raise CanceledPaste("Cancelled.")
+        # The workers share a frozen copy of the settings, including the ones chosen in the dialog.
+        self._config = self._config.snapshot()
+        converters = self._make_converters(files)
+        with concurrent.futures.ThreadPoolExecutor(max_workers=len(converters)) as executor:
+            futures = [executor.submit(self._convert, conv) for conv in converters]
+        replacements: dict[str, str] = {}
+        errors: list[Exception] = []
+        log = get_conversion_log()
+        for file, conv, future in zip(files, converters, futures):
+            if ex := future.exception():
+                errors.append(ex)
+                log.record(conv.record(ConversionOrigin.add_note, error=ex))
+            else:
+                print(f"Converted file: {file.file_name} -> {conv.new_filename}")
+                replacements[file.file_name] = conv.new_filename
+                log.record(conv.record(ConversionOrigin.add_note))
+        self._update_note_fields(replacements)
+        if self._config.delete_original_file_on_convert and replacements:
+            # Searching the collection for other references would block adding, so it's done after the note is added.
+            mw.taskman.run_on_main(functools.partial(trash_originals_in_background, list(replacements)))
+        if errors:
+            raise errors[0]
 
-    def _update_note_fields(self, old_filename: str, new_filename: str) -> None:
-        for field_name, field_value in self._note.items():
-            self._note[field_name] = field_value.replace(f'src="{old_filename}"', f'src="{new_filename}"')
+    def _update_note_fields(self, replacements: dict[str, str]) -> None:
+        for old_filename, new_filename in replacements.items():
+            deduplicate_media_in_note(self._note, old_filename, new_filename)
@@ -1,24 +1,37 @@
 # Copyright: Ajatt-Tools and contributors; https://github.com/Ajatt-Tools
 # License: GNU AGPL, version 3 or later; http://www.gnu.org/licenses/agpl.html
+import shutil
 import typing
 
 import aqt.editor
+from aqt.operations import QueryOp
 from aqt.qt import *
 from aqt.utils import tooltip
 
 from ..common import filesize_kib
 from ..config import MediaConverterConfig
 from ..dialogs.paste_image_dialog import AnkiPasteImageDialog
-from ..utils.file_paths_factory import FilePathFactory
+from ..media_deduplication.conversion_index import ConversionKey, get_conversion_index
+from ..utils.conversion_records import (
+    ConversionOrigin,
+    ConversionStatus,
+    get_conversion_log,
+)
+from ..utils.file_paths_factory import FilePathFactory, release_when_done
 from ..utils.mime_helper import image_candidates
 from ..utils.show_options import ImageDimensions, ShowOptions
+from ..utils.temp_file import TempFile
+from ..utils.timings import timed, timed_iter
+from .file_converter import temp_output_path
 from .find_media import FindMedia
 from .image_converter import (
     CanceledPaste,
     ImageConverter,
     MimeImageNotFound,
     fetch_filename,
+    find_image_dimensions,
 )
+from .records import image_provenance, make_record, store_provenance
 
 TEMP_IMAGE_FORMAT = "png"
 
@@ -30,8 +43,12 @@ class ConverterPayload(typing.NamedTuple):
 
 
 def save_image(mime: QMimeData, tmp_path: str) -> ConverterPayload:
-    for image in image_candidates(mime):
-        if image and image.save(tmp_path, TEMP_IMAGE_FORMAT) is True:
+    for image in timed_iter("mime_decode", image_candidates(mime)):
+        if not image:
+            continue
+        with timed("temp_write"):
+            saved = image.save(tmp_path, TEMP_IMAGE_FORMAT)
+        if saved is True:
             return ConverterPayload(
                 tmp_path=tmp_path,
                 initial_filename=fetch_filename(mime),
@@ -56,37 +73,163 @@ class OnPasteConverter:
         self._config = config
         self._finder = FindMedia(config)
 
-    def _maybe_show_settings(self, dimensions: ImageDimensions) -> None:
+    def _maybe_show_settings(self, dimensions: ImageDimensions, source_path: str | None = None) -> TempFile | None:
+        """
+        Show the settings dialog if the user wants it.
+        If the source image is given, return the file the dialog has already encoded with the chosen settings.
+        """
         if self._config.should_show_settings(action=self._action):
-            dlg = AnkiPasteImageDialog(config=self._config, dimensions=dimensions, parent=self._editor.parentWindow)
+            dlg = AnkiPasteImageDialog(
+                config=self._config,
+                dimensions=dimensions,
+                parent=self._editor.parentWindow,
+                source_path=source_path,
+            )
             if dlg.exec() == QDialog.DialogCode.Rejected:
                 raise CanceledPaste("Cancelled.")
+            return dlg.take_encoded_file()
+        return None
 
-    def convert_image(self, image_path: str) -> str:
-        fpf = FilePathFactory(note=self._editor.note, editor=self._editor, config=self._config)
-        destination_path = fpf.make_unique_filepath(
-            dest_dir=self._dest_dir,
-            original_filename=os.path.basename(image_path),
-            extension=self._config.image_extension,
+    def _find_reusable(self, source_path: str, key: ConversionKey) -> str | None:
+        """Return the path of a file that has been converted from the same source with the same settings."""
+        if self._config.reuse_converted_media and (filename := get_conversion_index().lookup(self._dest_dir, key)):
+            reusable = os.path.join(self._dest_dir, filename)
+            get_conversion_log().record(
+                make_record(
+                    ConversionOrigin.paste,
+                    source_path,
+                    reusable,
+                    status=ConversionStatus.skipped,
+                    reason="converted from the same source before",
+                )
+            )
+            return reusable
+        return None
+
+    def _run_converter(self, conv: ImageConverter, destination_path: str, preview: bool = False) -> None:
+        """Encode the image, remember how it was made and keep a record of what it cost."""
+        source_path = conv.source_path
+        try:
+            if preview:
+                conv.convert_preview()
+            else:
+                provenance = image_provenance(source_path, self._config)
+                conv.convert()
+                store_provenance(destination_path, provenance)
+        except Exception as ex:
+            get_conversion_log().record(
+                make_record(
+                    ConversionOrigin.paste, source_path, converter=conv, status=ConversionStatus.failed, reason=str(ex)
+                )
+            )
+            raise
+        get_conversion_log().record(
+            make_record(
+                ConversionOrigin.paste,
+                source_path,
+                destination_path,
+                converter=conv,
+                reason="fast preview" if preview else "",
+            )
         )
-        conv = ImageConverter(image_path, destination_path, config=self._config)
-        self._maybe_show_settings(conv.initial_dimensions)
-        conv.convert()
+
+    def _remember(self, key: ConversionKey, destination_path: str) -> None:
+        if self._config.reuse_converted_media:
+            get_conversion_index().store(self._dest_dir, key, os.path.basename(destination_path))
+
+    @staticmethod
+    def _use_encoded(encoded: TempFile, source_path: str, destination_path: str) -> None:
+        tmp_path = temp_output_path(destination_path)
+        with encoded:
+            try:
+                shutil.copyfile(encoded.path(), tmp_path)
+                os.replace(tmp_path, destination_path)
+            finally:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+        # The encoder ran while the settings dialog was open, so its cost isn't known here.
+        get_conversion_log().record(
+            make_record(ConversionOrigin.paste, source_path, destination_path, reason="encoded by the settings dialog")
+        )
+
+    def convert_image(self, image_path: str) -> str:
+        encoded = self._maybe_show_settings(find_image_dimensions(image_path), source_path=image_path)
+        key = ConversionKey.of(image_path, self._config)
+        if reusable := self._find_reusable(image_path, key):
+            if encoded:
+                encoded.close()
+            return reusable
+        with release_when_done(self._make_destination_path(os.path.basename(image_path))) as destination_path:
+            if encoded:
+                self._use_encoded(encoded, image_path, destination_path)
+            else:
+                self._run_converter(ImageConverter(image_path, destination_path, config=self._config), destination_path)
+        self._remember(key, destination_path)
         return destination_path
 
-    def convert_mime(self, to_convert: ConverterPayload) -> str:
-        self._maybe_show_settings(to_convert.dimensions)
+    def _make_destination_path(self, initial_filename: str | None) -> str:
         fpf = FilePathFactory(note=self._editor.note, editor=self._editor, config=self._config)
-        destination_path = fpf.make_unique_filepath(
+        return fpf.make_unique_filepath(
             dest_dir=self._dest_dir,
-            original_filename=to_convert.initial_filename,
+            original_filename=initial_filename,
             extension=self._config.image_extension,
         )
-        conv = ImageConverter(to_convert.tmp_path, destination_path, config=self._config)
-        conv.convert()
+
+    def convert_mime(self, to_convert: ConverterPayload) -> str:
+        encoded = self._maybe_show_settings(to_convert.dimensions, source_path=to_convert.tmp_path)
+        key = ConversionKey.of(to_convert.tmp_path, self._config)
+        if reusable := self._find_reusable(to_convert.tmp_path, key):
+            if encoded:
+                encoded.close()
+            return reusable
+        with release_when_done(self._make_destination_path(to_convert.initial_filename)) as destination_path:
+            if encoded:
+                # The dialog has encoded the image while the user was choosing settings.
+                self._use_encoded(encoded, to_convert.tmp_path, destination_path)
+            elif self._config.fast_paste_preview:
+                self._run_converter(
+                    ImageConverter(to_convert.tmp_path, destination_path, config=self._config),
+                    destination_path,
+                    preview=True,
+                )
+                # The file is remembered when the final version replaces the preview.
+                self._refine_in_background(to_convert.tmp_path, destination_path, key)
+                return destination_path
+            else:
+                self._run_converter(
+                    ImageConverter(to_convert.tmp_path, destination_path, config=self._config), destination_path
+                )
+        self._remember(key, destination_path)
         return destination_path
         # TODO handle audio
 
+    def _refine_in_background(self, source_path: str, destination_path: str, key: ConversionKey) -> None:
+        """
+        Re-encode the image with the full settings and replace the preview file in place.
+        Notes keep referencing the same file name, so they don't have to be updated.
+        """
+        # The caller deletes the source file when the paste is done.
+        source = TempFile(suffix=os.path.splitext(source_path)[1])
+        shutil.copyfile(source_path, source.path())
+        # The converter replaces the destination only when the new file is complete.
+        conv = ImageConverter(source.path(), destination_path, config=self._config)
+
+        def refine() -> None:
+            with source:
+                self._run_converter(conv, destination_path)
+
+        QueryOp(
+            parent=self._editor.mw,
+            op=lambda col: refine(),
+            success=lambda _: self._on_refined(key, destination_path),
+        ).failure(
+            lambda ex: self.tooltip(f"Couldn't finish encoding, keeping the preview: {ex}")
+        ).without_collection().run_in_background()
+
+    def _on_refined(self, key: ConversionKey, destination_path: str) -> None:
+        self._remember(key, destination_path)
+        self.result_tooltip(destination_path)
+
     def tooltip(self, msg: Exception | str) -> None:
         return tooltip(str(msg), period=self._config.tooltip_duration_milliseconds, parent=self._editor.parentWindow)
 
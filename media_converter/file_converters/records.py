@@ -0,0 +1,101 @@
+# Copyright: Ajatt-Tools and contributors; https://github.com/Ajatt-Tools
+# License: GNU AGPL, version 3 or later; http://www.gnu.org/licenses/agpl.html
+import os
+import sqlite3
+import time
+
+from aqt.qt import QImageReader
+
+from ..config import MediaConverterConfig
+from ..media_deduplication.conversion_index import (
+    Provenance,
+    file_sha256,
+    get_conversion_index,
+    image_settings_sha1,
+)
+from ..utils.conversion_records import (
+    ConversionOrigin,
+    ConversionRecord,
+    ConversionStatus,
+)
+from ..utils.show_options import ImageDimensions
+from .common import ConverterType
+from .file_converter import FileConverter, is_audio_file
+from .image_converter import ImageConverter, image_encoder_version
+
+
+def file_size(path: str) -> int:
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def read_dimensions(path: str) -> ImageDimensions:
+    """Read the size from the file header without decoding the image. Zero if the format isn't supported."""
+    size = QImageReader(path).size()
+    return ImageDimensions(max(0, size.width()), max(0, size.height()))
+
+
+def image_provenance(source_path: str, config: MediaConverterConfig) -> Provenance:
+    return Provenance(file_sha256(source_path), image_settings_sha1(config), image_encoder_version(config))
+
+
+def store_provenance(destination_path: str, provenance: Provenance) -> None:
+    """
+    Remember how a converted image was made, so that bulk reconversion can skip it while it's up to date.
+    A failure isn't fatal: the file is reconverted next time.
+    """
+    dims = read_dimensions(destination_path)
+    media_dir, filename = os.path.split(destination_path)
+    try:
+        get_conversion_index().store_provenance(media_dir, filename, provenance, pixels=dims.width * dims.height)
+    except (OSError, sqlite3.Error) as ex:
+        print(f"Couldn't store provenance of {filename}: {ex}")
+
+
+def make_record(
+    origin: ConversionOrigin,
+    source_path: str,
+    output_path: str = "",
+    *,
+    converter: FileConverter | None = None,
+    bytes_in: int | None = None,
+    status: ConversionStatus = ConversionStatus.converted,
+    reason: str = "",
+) -> ConversionRecord:
+    """
+    Describe a conversion after it has finished or failed.
+    Pass bytes_in if the source file may have been deleted by the conversion.
+    """
+    if converter is not None:
+        file_type = converter.mode
+    else:
+        file_type = ConverterType.audio if is_audio_file(source_path) else ConverterType.image
+    dims_in = dims_out = ImageDimensions(0, 0)
+    if isinstance(converter, ImageConverter):
+        dims_in = converter.initial_dimensions
+    has_output = bool(output_path) and status != ConversionStatus.failed and os.path.isfile(output_path)
+    if has_output and file_type == ConverterType.image:
+        dims_out = read_dimensions(output_path)
+    # A failed run doesn't replace the last run of the converter, so it can't be used.
+    run = converter.last_run if converter is not None and status != ConversionStatus.failed else None
+    return ConversionRecord(
+        origin=origin,
+        status=status,
+        reason=reason,
+        file_type=file_type.value,
+        source=os.path.basename(source_path),
+        output=os.path.basename(output_path) if has_output else "",
+        bytes_in=file_size(source_path) if bytes_in is None else bytes_in,
+        bytes_out=file_size(output_path) if has_output else 0,
+        width_in=dims_in.width,
+        height_in=dims_in.height,
+        width_out=dims_out.width,
+        height_out=dims_out.height,
+        encoder=run.encoder if run else "",
+        args_fingerprint=run.args_fingerprint if run else "",
+        wall_seconds=run.wall_seconds if run else 0.0,
+        cpu_seconds=run.cpu_seconds if run else None,
+        finished_at=time.time(),
+    )
@@ -0,0 +1,140 @@
+# Copyright: Ajatt-Tools and contributors; https://github.com/Ajatt-Tools
+# License: GNU AGPL, version 3 or later; http://www.gnu.org/licenses/agpl.html
+import typing
+
+from aqt.qt import *
+
+from ..ajt_common.utils import q_emit
+from ..config import DetachedConfig, MediaConverterConfig
+from ..media_deduplication.conversion_index import image_settings_sha1
+from ..utils.temp_file import TempFile
+from .image_converter import ImageConverter
+
+DEBOUNCE_MS = 400
+
+
+class EncodeSettings(typing.NamedTuple):
+    """Everything that affects the encoded file. Equal settings give the same file."""
+
+    enabled: bool
+    settings_hash: str  # every config key that affects the file, see IMAGE_SETTINGS_KEYS
+    overrides: tuple[tuple[str, typing.Any], ...]  # the values chosen in the dialog
+
+    @classmethod
+    def of(cls, config: MediaConverterConfig, overrides: dict[str, typing.Any]) -> "EncodeSettings":
+        detached = DetachedConfig(config, **overrides)
+        return cls(
+            enabled=detached.enable_image_conversion,
+            settings_hash=image_settings_sha1(detached),
+            overrides=tuple(sorted(overrides.items())),
+        )
+
+    def make_config(self, config: MediaConverterConfig) -> DetachedConfig:
+        return DetachedConfig(config, **dict(self.overrides))
+
+
+class EncodeResult(typing.NamedTuple):
+    file: TempFile | None
+    error: str | None
+
+
+class EncodeSignals(QObject):
+    finished = pyqtSignal(object, object)  # EncodeSettings, EncodeResult
+
+
+class EncodeRunnable(QRunnable):
+    def __init__(self, source_path: str, config: MediaConverterConfig, settings: EncodeSettings) -> None:
+        super().__init__()
+        self._source_path = source_path
+        self._config = config
+        self._settings = settings
+        self.signals = EncodeSignals()
+
+    def run(self) -> None:
+        output = TempFile(suffix=self._config.image_extension)
+        try:
+            # The converter reads the image to find its size, so it's made here rather than on the GUI thread.
+            ImageConverter(self._source_path, output.path(), config=self._config).convert()
+        except Exception as ex:
+            output.close()
+            result = EncodeResult(file=None, error=str(ex) or type(ex).__name__)
+        else:
+            result = EncodeResult(file=output, error=None)
+        q_emit(self.signals.finished, self._settings, result)
+
+
+class SpeculativeEncoder(QObject):
+    """
+    Encodes an image in the background while the user is still choosing settings.
+    Requests are debounced, and results are cached per settings,
+    so the file is usually ready by the time the user accepts.
+    """
+
+    result_ready = pyqtSignal(object)  # EncodeSettings
+
+    _source_path: str
+    _config: MediaConverterConfig
+    _results: dict[EncodeSettings, EncodeResult]
+    _in_flight: set[EncodeSettings]
+    _wanted: EncodeSettings | None
+    _closed: bool
+
+    def __init__(self, source_path: str, config: MediaConverterConfig, parent: QObject | None = None) -> None:
+        super().__init__(parent)
+        self._source_path = source_path
+        self._config = config
+        self._results = {}
+        self._in_flight = set()
+        self._wanted = None
+        self._closed = False
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(DEBOUNCE_MS)
+        qconnect(self._timer.timeout, self._start_wanted)
+
+    def request(self, settings: EncodeSettings) -> None:
+        self._wanted = settings
+        if settings in self._results:
+            self._timer.stop()
+            q_emit(self.result_ready, settings)
+        else:
+            self._timer.start()
+
+    def result(self, settings: EncodeSettings) -> EncodeResult | None:
+        return self._results.get(settings)
+
+    def take_file(self, settings: EncodeSettings) -> TempFile | None:
+        """
+        Return the encoded file for these settings if it's ready. The caller becomes responsible for closing it.
+        """
+        if (result := self._results.pop(settings, None)) is not None:
+            return result.file
+        return None
+
+    def close(self) -> None:
+        self._closed = True
+        self._timer.stop()
+        for result in self._results.values():
+            if result.file:
+                result.file.close()
+        self._results.clear()
+
+    def _start_wanted(self) -> None:
+        settings = self._wanted
+        if settings is None or settings in self._results or settings in self._in_flight:
+            return
+        runnable = EncodeRunnable(self._source_path, settings.make_config(self._config), settings)
+        qconnect(runnable.signals.finished, self._on_finished)
+        self._in_flight.add(settings)
+        QThreadPool.globalInstance().start(runnable)
+
+    def _on_finished(self, settings: EncodeSettings, result: EncodeResult) -> None:
+        self._in_flight.discard(settings)
+        if self._closed:
+            # Nobody is waiting for this file anymore.
+            if result.file:
+                result.file.close()
+            return
+        self._results[settings] = result
+        if settings == self._wanted:
+            q_emit(self.result_ready, settings)
@@ -0,0 +1,199 @@
+# Copyright: Ajatt-Tools and contributors; https://github.com/Ajatt-Tools
+# License: GNU AGPL, version 3 or later; http://www.gnu.org/licenses/agpl.html
+
+import array
+import cmath
+import functools
+import math
+import pathlib
+import subprocess
+import sys
+import typing
+from collections.abc import Sequence
+
+from ..file_converters.common import COMMON_AUDIO_FORMATS, startup_info
+from ..file_converters.file_converter import FFmpegNotFoundError
+from ..utils.executables import find_ffmpeg_exe
+
+SAMPLE_RATE = 8000
+FRAME_SIZE = 256  # 32 ms, a power of two for the FFT
+# Frames overlap by half, so that a copy that starts a few milliseconds later gives nearly the same slices.
+HOP_SIZE = FRAME_SIZE // 2
+# Only the beginning of each recording is decoded and compared, because the FFT is computed in pure Python
+# and takes tens of milliseconds per second of audio. Copies of the same clip start the same way anyway.
+MAX_DURATION_S = 10
+# Edges of the frequency bands in Hz, spaced logarithmically over the range where speech has most of its energy.
+BAND_EDGES_HZ = (250, 360, 500, 700, 980, 1370, 1900, 2650, 3100, 3700)
+# The clip (with silence trimmed) is divided into this many equal slices. Each slice gives one bit per pair of bands.
+TIME_SLICES = 16
+FINGERPRINT_BITS = TIME_SLICES * (len(BAND_EDGES_HZ) - 2)
+# Frames quieter than this fraction of the loudest frame are treated as silence when trimming.
+SILENCE_RATIO = 0.05
+# Band energies are compared in decibels, and bands quieter than this (relative to the loudest band) are equal.
+# Otherwise, the bits of quiet bands would be decided by encoder noise.
+DYNAMIC_RANGE_DB = 30
+# Durations of two copies of the same clip may differ by this fraction, e.g. due to encoder padding.
+DURATION_TOLERANCE = 0.1
+
+
+class AudioFingerprint(typing.NamedTuple):
+    """
+    Spectral fingerprint of the clip (with silence trimmed).
+    Each bit tells whether a frequency band is louder than the next band in one time slice of the clip,
+    so the bits follow the shape of the spectrum over time and don't depend on loudness or bitrate.
+    """
+
+    bits: int
+    duration_ms: int
+
+    def pack(self) -> int:
+        return (self.duration_ms << FINGERPRINT_BITS) | self.bits
+
+    @classmethod
+    def unpack(cls, packed: int) -> "AudioFingerprint":
+        return cls(packed & ((1 << FINGERPRINT_BITS) - 1), packed >> FINGERPRINT_BITS)
+
+
+def is_audio(path: pathlib.Path) -> bool:
+    return path.suffix.lower() in COMMON_AUDIO_FORMATS
+
+
+def decode_pcm(path: pathlib.Path) -> array.array:
+    """
+    Decode the audio track to mono signed 16-bit samples at a low sample rate.
+    """
+    if not (ffmpeg := find_ffmpeg_exe()):
+        raise FFmpegNotFoundError("ffmpeg executable is not in PATH")
+    args = [
+        ffmpeg,
+        "-hide_banner",
+        "-nostdin",
+        "-loglevel",
+        "quiet",
+        "-t",
+        str(MAX_DURATION_S),
+        "-i",
+        str(path),
+        "-vn",
+        "-sn",
+        "-ac",
+        "1",
+        "-ar",
+        str(SAMPLE_RATE),
+        "-f",
+        "s16le",
+        "-",
+    ]
+    p = subprocess.run(args, capture_output=True, startupinfo=startup_info(), check=False)
+    if p.returncode != 0:
+        raise RuntimeError(f"Decoding failed with code {p.returncode}.")
+    samples = array.array("h")
+    samples.frombytes(p.stdout[: len(p.stdout) - len(p.stdout) % samples.itemsize])
+    if sys.byteorder != "little":
+        samples.byteswap()
+    return samples
+
+
+@functools.cache
+def fft_tables(size: int) -> tuple[list[int], list[complex], list[float]]:
+    """Bit-reversal permutation, twiddle factors and the Hann window for an FFT of the given size."""
+    bits = size.bit_length() - 1
+    order = [int(f"{idx:0{bits}b}"[::-1], 2) for idx in range(size)]
+    twiddles = [cmath.exp(-2j * math.pi * k / size) for k in range(size // 2)]
+    window = [0.5 - 0.5 * math.cos(2 * math.pi * idx / size) for idx in range(size)]
+    return order, twiddles, window
+
+
+def power_spectrum(frame: Sequence[int]) -> list[float]:
+    """Power of the first half of the spectrum of a windowed frame, computed with an iterative radix-2 FFT."""
+    size = len(frame)
+    order, twiddles, window = fft_tables(size)
+    values = [complex(frame[idx] * window[idx]) for idx in order]
+    half = 1
+    while half < size:
+        stage_twiddles = twiddles[:: size // (2 * half)]
+        for start in range(0, size, 2 * half):
+            for k, twiddle in enumerate(stage_twiddles, start):
+                odd = values[k + half] * twiddle
+                even = values[k]
+                values[k] = even + odd
+                values[k + half] = even - odd
+        half *= 2
+    return [abs(value) ** 2 for value in values[: size // 2]]
+
+
+def band_bins() -> list[tuple[int, int]]:
+    """FFT bins [lo, hi) of each frequency band."""
+    hz_per_bin = SAMPLE_RATE / FRAME_SIZE
+    edges = [round(edge / hz_per_bin) for edge in BAND_EDGES_HZ]
+    return list(zip(edges, edges[1:]))
+
+
+def band_energies(samples: Sequence[int]) -> list[list[float]]:
+    """Energy of each frequency band in each frame."""
+    bands = band_bins()
+    result = []
+    for start in range(0, len(samples) - FRAME_SIZE + 1, HOP_SIZE):
+        spectrum = power_spectrum(samples[start : start + FRAME_SIZE])
+        result.append([sum(spectrum[lo:hi]) for lo, hi in bands])
+    return result
+
+
+def average_slices(frames: Sequence[Sequence[float]], n_slices: int) -> list[list[float]]:
+    """Average consecutive frames into n_slices equal-width slices."""
+    n = len(frames)
+    result = []
+    for idx in range(n_slices):
+        lo = idx * n // n_slices
+        hi = max(lo + 1, (idx + 1) * n // n_slices)
+        result.append([sum(band) / (hi - lo) for band in zip(*frames[lo:hi])])
+    return result
+
+
+def to_decibels(slices: Sequence[Sequence[float]]) -> list[list[float]]:
+    """Convert band energies to decibels below the loudest band, clipped to DYNAMIC_RANGE_DB."""
+    loudest = max(max(bands) for bands in slices)
+    floor = loudest * 10 ** (-DYNAMIC_RANGE_DB / 10)
+    return [[10 * math.log10(max(energy, floor) / loudest) for energy in bands] for bands in slices]
+
+
+def spectral_bits(slices: Sequence[Sequence[float]]) -> int:
+    """One bit per slice and pair of adjacent bands, set when the lower band is louder."""
+    result = 0
+    for bands in slices:
+        for lower, upper in zip(bands, bands[1:]):
+            result = (result << 1) | int(lower > upper)
+    return result
+
+
+def compute_audio_fingerprint(samples: Sequence[int]) -> AudioFingerprint | None:
+    frames = band_energies(samples)
+    loudness = [sum(frame) for frame in frames]
+    if not loudness or (loudest := max(loudness)) == 0:
+        return None
+    voiced = [idx for idx, energy in enumerate(loudness) if energy >= loudest * SILENCE_RATIO]
+    first, last = voiced[0], voiced[-1] + 1
+    if last - first < TIME_SLICES:
+        return None
+    slices = average_slices(frames[first:last], TIME_SLICES)
+    return AudioFingerprint(
+        bits=spectral_bits(to_decibels(slices)),
+        duration_ms=(last - first) * HOP_SIZE * 1000 // SAMPLE_RATE,
+    )
+
+
+def audio_file_fingerprint(path: pathlib.Path) -> int | None:
+    if fingerprint := compute_audio_fingerprint(decode_pcm(path)):
+        return fingerprint.pack()
+    return None
+
+
+def similar_durations(a: int, b: int) -> bool:
+    """Compare durations of two packed fingerprints."""
+    a_ms, b_ms = AudioFingerprint.unpack(a).duration_ms, AudioFingerprint.unpack(b).duration_ms
+    return abs(a_ms - b_ms) <= max(a_ms, b_ms) * DURATION_TOLERANCE
+
+
+def audio_distance(a: int, b: int) -> int:
+    """Hamming distance between the spectral bits of two packed fingerprints."""
+    return (AudioFingerprint.unpack(a).bits ^ AudioFingerprint.unpack(b).bits).bit_count()
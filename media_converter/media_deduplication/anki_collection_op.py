@@ -15,7 +15,13 @@ from ..dialogs.deduplicate_dialog import (
     DeduplicateMediaConfirmDialog,
     DeduplicateTableColumns,
 )
-from .deduplication import DuplicatesGroup, MediaDedup
+from ..file_converters.file_converter import FFmpegNotFoundError
+from ..file_converters.image_converter import ffmpeg_not_found_dialog
+from ..utils.lag_monitor import start_ui_lag_monitor
+from .deduplication import DuplicatesGroup, LinkDuplicatesResult, MediaDedup
+from .reference_index import get_reference_index
+
+MAX_REPORTED_ERRORS = 20
 
 
 def show_deduplication_confirm_dialog(files: Sequence[DuplicatesGroup]) -> DeduplicateMediaConfirmDialog:
@@ -32,41 +38,86 @@ def deduplication_result_msg(n_files: int) -> str:
     return f'Deduplicated {n_files} files. Don\'t forget to run "Tools" -> "Check Media".'
 
 
+def link_result_msg(result: LinkDuplicatesResult) -> str:
+    msg = f"Replaced {result.linked} files with links. Reclaimed {result.reclaimed_bytes / 1024 / 1024:.2f} MiB."
+    if result.errors:
+        msg += f"\n\nCouldn't link {len(result.errors)} files:\n" + "\n".join(result.errors[:MAX_REPORTED_ERRORS])
+    return msg
+
+
 class AnkiMediaDedup:
     _col: anki.collection.Collection
     _nproc: int
     _config: MediaConverterConfig
+    finish_monitoring: typing.Callable[[], None]
 
     def __init__(self, col: anki.collection.Collection, config: MediaConverterConfig) -> None:
         self._dedup = MediaDedup(col)
         self._config = config
+        self.finish_monitoring = lambda: None
+
+    def start_monitoring(self) -> None:
+        """Watch the GUI thread from the search until the files are deduplicated or the user cancels."""
+        self.finish_monitoring = start_ui_lag_monitor("deduplication", self._config)
+
+    def on_failure(self, ex: Exception) -> None:
+        self.finish_monitoring()
+        raise ex
 
     def collect_files(self) -> typing.Sequence[DuplicatesGroup]:
         return self._dedup.collect_files()
 
+    def collect_similar_images(self) -> typing.Sequence[DuplicatesGroup]:
+        return self._dedup.collect_similar_images(max_distance=self._config.similar_images_max_distance)
+
+    def collect_similar_audio(self) -> typing.Sequence[DuplicatesGroup]:
+        return self._dedup.collect_similar_audio(max_distance=self._config.similar_audio_max_distance)
+
     def _deduplicate_media_files(self, files: Sequence[DuplicatesGroup], row_count: int) -> None:
         CollectionOp(
             parent=mw,
             op=lambda col: self._dedup.deduplicate_notes_op(files, row_count),
         ).success(
-            lambda out: show_info(
-                deduplication_result_msg(row_count),
-                parent=mw,
-            ),
-        ).run_in_background()
+            lambda out: self._show_result(deduplication_result_msg(row_count)),
+        ).failure(self.on_failure).run_in_background()
+
+    def _show_result(self, msg: str) -> None:
+        self.finish_monitoring()
+        show_info(msg, parent=mw)
+
+    def _on_aborted(self) -> None:
+        self.finish_monitoring()
+        tooltip("Aborted.", period=self._config.tooltip_duration_milliseconds, parent=mw)
 
     def process_duplicates_search_results(self, files: Sequence[DuplicatesGroup]) -> None:
         if not files:
-            show_info("No duplicate media files found.", parent=mw)
+            self._show_result("No duplicate media files found.")
             return
         dialog = show_deduplication_confirm_dialog(files)
-
         on_all_dialogs_closed = functools.partial(self._deduplicate_media_files, files, row_count=dialog.row_count())
-        tooltip_period = self._config.tooltip_duration_milliseconds
 
         # close dialogs that would interfere with note updates.
         qconnect(dialog.accepted, lambda: aqt.dialogs.closeAll(on_all_dialogs_closed))
-        qconnect(dialog.rejected, lambda: tooltip("Aborted.", period=tooltip_period, parent=mw))
+        qconnect(dialog.rejected, self._on_aborted)
+        dialog.show()
+
+    def _link_media_files(self, files: Sequence[DuplicatesGroup]) -> None:
+        QueryOp(
+            parent=mw,
+            op=lambda col: self._dedup.link_duplicates(files),
+            success=lambda result: self._show_result(link_result_msg(result)),
+        ).failure(self.on_failure).without_collection().with_progress(
+            "Linking duplicate media files..."
+        ).run_in_background()
+
+    def process_link_search_results(self, files: Sequence[DuplicatesGroup]) -> None:
+        if not files:
+            self._show_result("No duplicate media files found.")
+            return
+        dialog = show_deduplication_confirm_dialog(files)
+        # Notes are not modified, so there's no need to close other dialogs.
+        qconnect(dialog.accepted, lambda: self._link_media_files(files))
+        qconnect(dialog.rejected, self._on_aborted)
         dialog.show()
 
 
@@ -74,8 +125,74 @@ def run_media_deduplication() -> None:
     col = mw.col
     assert col, "Collection should be open."
     dedup = AnkiMediaDedup(col=col, config=get_global_config())
+    dedup.start_monitoring()
     QueryOp(
         parent=mw,
         op=lambda collection: dedup.collect_files(),
         success=lambda result: dedup.process_duplicates_search_results(result),
-    ).without_collection().with_progress("Searching for duplicate media files...").run_in_background()
+    ).failure(dedup.on_failure).without_collection().with_progress(
+        "Searching for duplicate media files..."
+    ).run_in_background()
+
+
+def run_similar_images_deduplication() -> None:
+    col = mw.col
+    assert col, "Collection should be open."
+    dedup = AnkiMediaDedup(col=col, config=get_global_config())
+    dedup.start_monitoring()
+    QueryOp(
+        parent=mw,
+        op=lambda collection: dedup.collect_similar_images(),
+        success=lambda result: dedup.process_duplicates_search_results(result),
+    ).failure(dedup.on_failure).without_collection().with_progress(
+        "Searching for similar images..."
+    ).run_in_background()
+
+
+def on_similar_audio_search_failed(dedup: AnkiMediaDedup, ex: Exception) -> None:
+    if isinstance(ex, FFmpegNotFoundError):
+        dedup.finish_monitoring()
+        ffmpeg_not_found_dialog(parent=mw)
+    else:
+        dedup.on_failure(ex)
+
+
+def run_similar_audio_deduplication() -> None:
+    col = mw.col
+    assert col, "Collection should be open."
+    dedup = AnkiMediaDedup(col=col, config=get_global_config())
+    dedup.start_monitoring()
+    QueryOp(
+        parent=mw,
+        op=lambda collection: dedup.collect_similar_audio(),
+        success=lambda result: dedup.process_duplicates_search_results(result),
+    ).failure(functools.partial(on_similar_audio_search_failed, dedup)).without_collection().with_progress(
+        "Searching for similar audio files..."
+    ).run_in_background()
+
+
+def run_media_linking() -> None:
+    col = mw.col
+    assert col, "Collection should be open."
+    dedup = AnkiMediaDedup(col=col, config=get_global_config())
+    dedup.start_monitoring()
+    QueryOp(
+        parent=mw,
+        op=lambda collection: dedup.collect_files(),
+        success=lambda result: dedup.process_link_search_results(result),
+    ).failure(dedup.on_failure).without_collection().with_progress(
+        "Searching for duplicate media files..."
+    ).run_in_background()
+
+
+def run_reference_index_rebuild() -> None:
+    assert mw.col, "Collection should be open."
+    QueryOp(
+        parent=mw,
+        op=lambda collection: get_reference_index().rebuild(collection),
+        success=lambda n_notes: tooltip(
+            f"Indexed media references of {n_notes} notes.",
+            period=get_global_config().tooltip_duration_milliseconds,
+            parent=mw,
+        ),
+    ).with_progress("Indexing media references...").run_in_background()
@@ -0,0 +1,194 @@
+# Copyright: Ajatt-Tools and contributors; https://github.com/Ajatt-Tools
+# License: GNU AGPL, version 3 or later; http://www.gnu.org/licenses/agpl.html
+
+import functools
+import hashlib
+import json
+import os
+import pathlib
+import sqlite3
+import statistics
+import threading
+import typing
+from collections.abc import Iterable
+
+from ..config import MediaConverterConfig
+from ..consts import USER_FILES_DIR
+from .media_catalog import FileStat
+
+INDEX_FILENAME = "conversion_index.sqlite3"
+HASH_CHUNK_SIZE = 1024 * 1024
+# Config keys that affect the converted file.
+IMAGE_SETTINGS_KEYS = (
+    "image_format",
+    "image_quality",
+    "image_width",
+    "image_height",
+    "avoid_upscaling",
+    "cwebp_args",
+    "ffmpeg_args",
+)
+
+
+def file_sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(HASH_CHUNK_SIZE):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def image_settings_sha1(config: MediaConverterConfig) -> str:
+    settings = {key: config[key] for key in IMAGE_SETTINGS_KEYS}
+    return hashlib.sha1(json.dumps(settings, sort_keys=True).encode()).hexdigest()
+
+
+class ConversionKey(typing.NamedTuple):
+    source_hash: str
+    settings_hash: str
+
+    @classmethod
+    def of(cls, source_path: str, config: MediaConverterConfig) -> "ConversionKey":
+        return cls(file_sha256(source_path), image_settings_sha1(config))
+
+
+class Provenance(typing.NamedTuple):
+    """How a converted image was made."""
+
+    source_hash: str
+    settings_hash: str
+    encoder_version: str  # empty if unknown
+
+
+class ConversionIndex:
+    """
+    Remembers which media file was made from which source with which settings,
+    so that converting the same source again can reuse the existing file,
+    and so that bulk reconversion can skip files that are already up to date.
+    An entry is dropped when its file is deleted or modified.
+    """
+
+    _db_path: str
+    _lock: threading.Lock
+
+    def __init__(self, db_path: str | None = None) -> None:
+        if db_path is None:
+            os.makedirs(USER_FILES_DIR, exist_ok=True)
+            db_path = os.path.join(USER_FILES_DIR, INDEX_FILENAME)
+        self._db_path = db_path
+        self._lock = threading.Lock()
+        with self._connect() as con:
+            con.execute("""
+                CREATE TABLE IF NOT EXISTS conversions (
+                    media_dir TEXT NOT NULL,
+                    source_hash TEXT NOT NULL,
+                    settings_hash TEXT NOT NULL,
+                    filename TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    mtime_ns INTEGER NOT NULL,
+                    PRIMARY KEY (media_dir, source_hash, settings_hash)
+                )
+            """)
+            con.execute("""
+                CREATE TABLE IF NOT EXISTS provenance (
+                    media_dir TEXT NOT NULL,
+                    filename TEXT NOT NULL,
+                    source_hash TEXT NOT NULL,
+                    settings_hash TEXT NOT NULL,
+                    encoder_version TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    mtime_ns INTEGER NOT NULL,
+                    pixels INTEGER NOT NULL,
+                    PRIMARY KEY (media_dir, filename)
+                )
+            """)
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self._db_path, timeout=10)
+
+    def lookup(self, media_dir: str, key: ConversionKey) -> str | None:
+        """Return the name of a file in the media folder that was converted from the same source."""
+        with self._lock, self._connect() as con:
+            row = con.execute(
+                "SELECT filename, size, mtime_ns FROM conversions "
+                "WHERE media_dir = ? AND source_hash = ? AND settings_hash = ?",
+                (media_dir, *key),
+            ).fetchone()
+            if row is None:
+                return None
+            filename, size, mtime_ns = row
+            try:
+                if FileStat.of(pathlib.Path(media_dir, filename)) == FileStat(size, mtime_ns):
+                    return filename
+            except OSError:
+                pass
+            con.execute(
+                "DELETE FROM conversions WHERE media_dir = ? AND source_hash = ? AND settings_hash = ?",
+                (media_dir, *key),
+            )
+        return None
+
+    def store(self, media_dir: str, key: ConversionKey, filename: str) -> None:
+        stat = FileStat.of(pathlib.Path(media_dir, filename))
+        with self._lock, self._connect() as con:
+            con.execute(
+                "INSERT OR REPLACE INTO conversions "
+                "(media_dir, source_hash, settings_hash, filename, size, mtime_ns) VALUES (?, ?, ?, ?, ?, ?)",
+                (media_dir, *key, filename, stat.size, stat.mtime_ns),
+            )
+
+    def store_provenance(self, media_dir: str, filename: str, provenance: Provenance, pixels: int) -> None:
+        """Remember how a converted file was made. Pixels are width times height of the file, 0 if unknown."""
+        stat = FileStat.of(pathlib.Path(media_dir, filename))
+        with self._lock, self._connect() as con:
+            con.execute(
+                "INSERT OR REPLACE INTO provenance "
+                "(media_dir, filename, source_hash, settings_hash, encoder_version, size, mtime_ns, pixels) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (media_dir, filename, *provenance, stat.size, stat.mtime_ns, pixels),
+            )
+
+    def provenance(self, media_dir: str, filenames: Iterable[str]) -> dict[str, Provenance]:
+        """
+        Return how each file was made. Files that weren't made by the add-on are missing from the result.
+        So are files that have been modified or replaced since, and their entries are dropped.
+        """
+        result: dict[str, Provenance] = {}
+        stale: list[tuple[str, str]] = []
+        with self._lock, self._connect() as con:
+            for filename in filenames:
+                row = con.execute(
+                    "SELECT source_hash, settings_hash, encoder_version, size, mtime_ns FROM provenance "
+                    "WHERE media_dir = ? AND filename = ?",
+                    (media_dir, filename),
+                ).fetchone()
+                if row is None:
+                    continue
+                *provenance, size, mtime_ns = row
+                try:
+                    if FileStat.of(pathlib.Path(media_dir, filename)) == FileStat(size, mtime_ns):
+                        result[filename] = Provenance(*provenance)
+                        continue
+                except OSError:
+                    pass
+                stale.append((media_dir, filename))
+            con.executemany("DELETE FROM provenance WHERE media_dir = ? AND filename = ?", stale)
+        return result
+
+    def bytes_per_pixel(self, settings_hash: str, encoder_version: str) -> float | None:
+        """
+        The median size of a pixel in images converted with these settings, in any collection.
+        None if there are no such images yet.
+        """
+        with self._lock, self._connect() as con:
+            rows = con.execute(
+                "SELECT CAST(size AS REAL) / pixels FROM provenance "
+                "WHERE settings_hash = ? AND encoder_version = ? AND pixels > 0",
+                (settings_hash, encoder_version),
+            ).fetchall()
+        return statistics.median(row[0] for row in rows) if rows else None
+
+
+@functools.cache
+def get_conversion_index() -> ConversionIndex:
+    return ConversionIndex()
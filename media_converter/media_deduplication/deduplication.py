@@ -3,6 +3,7 @@
 
 import collections
 import concurrent.futures
+import filecmp
 import hashlib
 import math
 import multiprocessing
@@ -16,8 +17,27 @@ import anki.errors
 from anki.notes import Note, NoteId
 from aqt.qt import *
 
+from ..file_converters.file_converter import FFmpegNotFoundError
+from .acoustic import (
+    audio_distance,
+    audio_file_fingerprint,
+    is_audio,
+    similar_durations,
+)
+from .file_links import LinkKind, replace_with_link
+from .media_catalog import CatalogEntry, FileStat, MediaCatalog
+from .perceptual import (
+    group_similar,
+    hamming_distance,
+    image_file_dhash,
+    is_still_image,
+)
+from .reference_index import get_reference_index
+
 HASH_FUNC = hashlib.sha512
 CHUNK_SIZE: int = 8192
+PERCEPTUAL_HASH_KIND = "dhash"
+ACOUSTIC_FINGERPRINT_KIND = "audio_spectrum"
 
 
 class DeduplicationError(RuntimeError):
@@ -54,6 +74,23 @@ class DuplicatesGroup(typing.NamedTuple):
         # Assign the shortest name as the original.
         return cls(original=files[0], copies=files[1:])
 
+    @classmethod
+    def smallest_as_original(cls, files: collections.abc.Collection[pathlib.Path]) -> "DuplicatesGroup":
+        assert len(files) > 1, "a group of duplicates should contain at least two files"
+        files = sorted(files, key=file_size_and_name_len)
+        # Near-duplicates differ in content. Keep the file that takes the least space.
+        return cls(original=files[0], copies=files[1:])
+
+
+class LinkDuplicatesResult(typing.NamedTuple):
+    linked: int
+    reclaimed_bytes: int
+    errors: list[str]
+
+
+def file_size_and_name_len(file: pathlib.Path) -> tuple[int, int]:
+    return os.path.getsize(file), len(file.name)
+
 
 def do_replacements(field_content: str, old_name: str, new_name: str) -> str:
     if old_name not in field_content:
@@ -109,13 +146,39 @@ def split_list(input_list: typing.Sequence[T], n_chunks: int) -> typing.Iterable
         yield input_list[i : i + chunk_size]
 
 
+def is_media_file(entry: pathlib.Path) -> bool:
+    # files starting with "_" are special to Anki.
+    return entry.is_file() and not entry.name.startswith("_")
+
+
+def fingerprint_files(
+    files: typing.Sequence[pathlib.Path], compute: typing.Callable[[pathlib.Path], int | None]
+) -> list[CatalogEntry]:
+    """
+    Compute fingerprints of files. Files that can't be decoded are skipped.
+    A missing decoder isn't a problem of one file, so it stops the search.
+    """
+    entries: list[CatalogEntry] = []
+    for entry in files:
+        try:
+            stat = FileStat.of(entry)
+            fingerprint = compute(entry)
+        except FFmpegNotFoundError:
+            raise
+        except (OSError, RuntimeError) as ex:
+            print(f"error when computing fingerprint: {ex}")
+            continue
+        if fingerprint is not None:
+            entries.append(CatalogEntry(entry, stat, fingerprint))
+    return entries
+
+
 def hash_files(files: typing.Sequence[pathlib.Path]) -> dict[MediaDedupFileHash, list[pathlib.Path]]:
     """Hash files and group by hash value."""
     hash_to_names: dict[MediaDedupFileHash, list[pathlib.Path]] = collections.defaultdict(list)
 
     for entry in files:
-        if not entry.is_file() or entry.name.startswith("_"):
-            # files starting with "_" are special to Anki.
+        if not is_media_file(entry):
             continue
 
         try:
@@ -159,6 +222,99 @@ class MediaDedup:
                     result[hash_key].extend(names)
         return [DuplicatesGroup.from_list(files) for files in result.values() if len(files) > 1]
 
+    def collect_similar_images(
+        self, max_distance: int, catalog: MediaCatalog | None = None
+    ) -> typing.Sequence[DuplicatesGroup]:
+        """
+        Find groups of images that look the same, e.g. "foo.png", "foo.jpg" and a re-encoded "foo.webp".
+        """
+        fingerprints = self._fingerprint_media(
+            PERCEPTUAL_HASH_KIND, is_still_image, image_file_dhash, catalog or MediaCatalog()
+        )
+        return [
+            DuplicatesGroup.smallest_as_original(files)
+            for files in group_similar(
+                fingerprints, max_distance, sort_key=file_size_and_name_len, distance=hamming_distance
+            )
+        ]
+
+    def collect_similar_audio(
+        self, max_distance: int, catalog: MediaCatalog | None = None
+    ) -> typing.Sequence[DuplicatesGroup]:
+        """
+        Find groups of audio files that sound the same, e.g. one TTS clip saved under different names or bitrates.
+        """
+        fingerprints = self._fingerprint_media(
+            ACOUSTIC_FINGERPRINT_KIND, is_audio, audio_file_fingerprint, catalog or MediaCatalog()
+        )
+        return [
+            DuplicatesGroup.smallest_as_original(files)
+            for files in group_similar(
+                fingerprints,
+                max_distance,
+                sort_key=file_size_and_name_len,
+                distance=audio_distance,
+                compatible=similar_durations,
+            )
+        ]
+
+    def _fingerprint_media(
+        self,
+        kind: str,
+        is_wanted: typing.Callable[[pathlib.Path], bool],
+        compute: typing.Callable[[pathlib.Path], int | None],
+        catalog: MediaCatalog,
+    ) -> dict[pathlib.Path, int]:
+        """
+        Fingerprint media files of one kind.
+        Fingerprints are cached in the media catalog, so only new or modified files are decoded.
+        """
+        files = [
+            entry
+            for entry in pathlib.Path(self._col.media.dir()).iterdir()
+            if is_wanted(entry) and is_media_file(entry)
+        ]
+        fingerprints = catalog.lookup(kind, files)
+        if to_compute := [entry for entry in files if entry not in fingerprints]:
+            computed: list[CatalogEntry] = []
+            with concurrent.futures.ThreadPoolExecutor(max_workers=self._nproc) as executor:
+                futures = (
+                    executor.submit(fingerprint_files, group, compute)
+                    for group in split_list(to_compute, n_chunks=self._nproc)
+                )
+                for future in concurrent.futures.as_completed(futures):
+                    computed.extend(future.result())
+            catalog.store(kind, computed)
+            fingerprints.update((entry.path, entry.fingerprint) for entry in computed)
+        return fingerprints
+
+    def link_duplicates(self, files: typing.Sequence[DuplicatesGroup]) -> LinkDuplicatesResult:
+        """
+        Replace each copy with a reflink or a hardlink to the original.
+        Notes are not modified because every file name stays valid.
+        Only groups of identical files are accepted.
+        """
+        linked, reclaimed_bytes, errors = 0, 0, []
+        for group in files:
+            for dup in group.copies:
+                try:
+                    stat = dup.stat()
+                    # The files could have changed since they were hashed.
+                    if not filecmp.cmp(group.original, dup, shallow=False):
+                        errors.append(f"{dup.name}: content differs from {group.original.name}")
+                        continue
+                    kind = replace_with_link(group.original, dup)
+                except OSError as ex:
+                    errors.append(f"{dup.name}: {ex}")
+                    continue
+                if kind == LinkKind.already_linked:
+                    continue
+                linked += 1
+                # Data is freed only when the last name pointing to it goes away.
+                if stat.st_nlink == 1:
+                    reclaimed_bytes += stat.st_size
+        return LinkDuplicatesResult(linked, reclaimed_bytes, errors)
+
     def deduplicate_notes_op(
         self, files: typing.Sequence[DuplicatesGroup], row_count: int
     ) -> anki.collection.OpChanges:
@@ -169,10 +325,12 @@ class MediaDedup:
         self.deduplicate(files)
         return self._col.merge_undo_entries(pos)
 
-    def _deduplicate_group(self, group: DuplicatesGroup, to_update: dict[NoteId, Note]) -> dict[NoteId, Note]:
+    def _deduplicate_group(
+        self, group: DuplicatesGroup, to_update: dict[NoteId, Note], references: dict[str, list[NoteId]]
+    ) -> dict[NoteId, Note]:
         """Process a single group of duplicates."""
         for dup in group.copies:
-            for note_id in self._col.find_notes(query=self._col.build_search_string(dup.name)):
+            for note_id in references[dup.name]:
                 try:
                     to_update.setdefault(note_id, self._col.get_note(note_id))
                 except anki.errors.NotFoundError:
@@ -188,9 +346,10 @@ class MediaDedup:
         Run Tools → Check Media afterward to review and delete.
         """
         to_update: dict[NoteId, Note] = {}
+        references = get_reference_index().references(self._col, (dup.name for group in files for dup in group.copies))
 
         # Update all note references
         for group in files:
-            self._deduplicate_group(group, to_update)
+            self._deduplicate_group(group, to_update, references)
 
         return self._col.update_notes(list(to_update.values()))
@@ -0,0 +1,100 @@
+# Copyright: Ajatt-Tools and contributors; https://github.com/Ajatt-Tools
+# License: GNU AGPL, version 3 or later; http://www.gnu.org/licenses/agpl.html
+
+import enum
+import os
+import pathlib
+import shutil
+import sys
+import uuid
+
+# ioctl request that makes the destination share the source's extents (Btrfs, XFS, bcachefs).
+# https://man7.org/linux/man-pages/man2/ioctl_ficlone.2.html
+FICLONE = 0x40049409
+COPY_CHUNK_SIZE = 1024 * 1024
+
+
+class LinkKind(enum.Enum):
+    reflink = "reflink"
+    hardlink = "hardlink"
+    already_linked = "already linked"
+
+
+def make_reflink(src: pathlib.Path, dst: pathlib.Path) -> None:
+    """
+    Create dst as a copy-on-write clone of src.
+    Raises OSError if the platform or the filesystem doesn't support it.
+    """
+    if not sys.platform.startswith("linux"):
+        raise OSError("reflinks are only supported on Linux")
+    import fcntl
+
+    with open(src, "rb") as src_file, open(dst, "xb") as dst_file:
+        try:
+            fcntl.ioctl(dst_file.fileno(), FICLONE, src_file.fileno())
+        except OSError:
+            dst_file.close()
+            os.unlink(dst)
+            raise
+
+
+def replace_with_link(original: pathlib.Path, copy: pathlib.Path) -> LinkKind:
+    """
+    Replace copy with a reflink to original, or with a hardlink if reflinks are not supported.
+    The link is created under a temporary name first and then moved over the copy,
+    so the copy's name never points to a missing or partially written file.
+    """
+    if os.path.samefile(original, copy):
+        return LinkKind.already_linked
+    tmp_path = copy.with_name(f".{copy.name}.{uuid.uuid4().hex[:8]}.tmp")
+    try:
+        make_reflink(original, tmp_path)
+        kind = LinkKind.reflink
+    except OSError:
+        os.link(original, tmp_path)
+        kind = LinkKind.hardlink
+    try:
+        os.replace(tmp_path, copy)
+    except OSError:
+        os.unlink(tmp_path)
+        raise
+    return kind
+
+
+def copy_file_exclusive(src: pathlib.Path, dst: pathlib.Path) -> None:
+    """
+    Copy src to a new file dst in chunks. Raises FileExistsError if dst exists.
+    On Linux, the data is copied by the kernel (copy_file_range) without passing through user space.
+    """
+    with open(src, "rb") as src_file, open(dst, "xb") as dst_file:
+        try:
+            if hasattr(os, "copy_file_range"):
+                try:
+                    while os.copy_file_range(src_file.fileno(), dst_file.fileno(), COPY_CHUNK_SIZE):
+                        pass
+                except OSError:
+                    # Not supported by the filesystem. File offsets have advanced past the copied part.
+                    shutil.copyfileobj(src_file, dst_file, COPY_CHUNK_SIZE)
+            else:
+                shutil.copyfileobj(src_file, dst_file, COPY_CHUNK_SIZE)
+        except BaseException:
+            dst_file.close()
+            os.unlink(dst)
+            raise
+
+
+def link_or_copy(src: pathlib.Path, dst: pathlib.Path) -> None:
+    """
+    Create dst with the same content as src without reading the file into memory.
+    Tries a reflink, then a hardlink, then a chunked copy.
+    Raises FileExistsError if dst exists and FileNotFoundError if src doesn't.
+    """
+    for make_link in (make_reflink, os.link):
+        try:
+            make_link(src, dst)
+            return
+        except (FileExistsError, FileNotFoundError):
+            raise
+        except OSError:
+            continue
+    copy_file_exclusive(src, dst)
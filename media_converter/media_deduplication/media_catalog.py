@@ -0,0 +1,95 @@
+# Copyright: Ajatt-Tools and contributors; https://github.com/Ajatt-Tools
+# License: GNU AGPL, version 3 or later; http://www.gnu.org/licenses/agpl.html
+
+import os
+import pathlib
+import sqlite3
+import threading
+import typing
+from collections.abc import Iterable
+
+from ..consts import USER_FILES_DIR
+
+CATALOG_FILENAME = "media_catalog.sqlite3"
+
+
+class FileStat(typing.NamedTuple):
+    size: int
+    mtime_ns: int
+
+    @classmethod
+    def of(cls, path: pathlib.Path) -> "FileStat":
+        stat = path.stat()
+        return cls(stat.st_size, stat.st_mtime_ns)
+
+
+class CatalogEntry(typing.NamedTuple):
+    path: pathlib.Path
+    stat: FileStat
+    fingerprint: int
+
+
+class MediaCatalog:
+    """
+    Persistent storage of media fingerprints.
+    A stored fingerprint is valid as long as the file's size and modification time don't change.
+    """
+
+    _db_path: str
+    _lock: threading.Lock
+
+    def __init__(self, db_path: str | None = None) -> None:
+        if db_path is None:
+            os.makedirs(USER_FILES_DIR, exist_ok=True)
+            db_path = os.path.join(USER_FILES_DIR, CATALOG_FILENAME)
+        self._db_path = db_path
+        self._lock = threading.Lock()
+        with self._connect() as con:
+            con.execute("""
+                CREATE TABLE IF NOT EXISTS fingerprints (
+                    path TEXT NOT NULL,
+                    kind TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    mtime_ns INTEGER NOT NULL,
+                    fingerprint BLOB NOT NULL,
+                    PRIMARY KEY (path, kind)
+                )
+            """)
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self._db_path, timeout=10)
+
+    def lookup(self, kind: str, paths: Iterable[pathlib.Path]) -> dict[pathlib.Path, int]:
+        """
+        Return fingerprints of files that haven't changed since they were stored.
+        """
+        wanted = {str(path): path for path in paths}
+        found: dict[pathlib.Path, int] = {}
+        with self._lock, self._connect() as con:
+            rows = con.execute("SELECT path, size, mtime_ns, fingerprint FROM fingerprints WHERE kind = ?", (kind,))
+            for path_str, size, mtime_ns, fingerprint in rows:
+                if (path := wanted.get(path_str)) is None:
+                    continue
+                try:
+                    if FileStat.of(path) != FileStat(size, mtime_ns):
+                        continue
+                except OSError:
+                    continue
+                found[path] = int.from_bytes(fingerprint, "big")
+        return found
+
+    def store(self, kind: str, entries: Iterable[CatalogEntry]) -> None:
+        with self._lock, self._connect() as con:
+            con.executemany(
+                "INSERT OR REPLACE INTO fingerprints (path, kind, size, mtime_ns, fingerprint) VALUES (?, ?, ?, ?, ?)",
+                (
+                    (
+                        str(entry.path),
+                        kind,
+                        entry.stat.size,
+                        entry.stat.mtime_ns,
+                        entry.fingerprint.to_bytes((entry.fingerprint.bit_length() + 7) // 8 or 1, "big"),
+                    )
+                    for entry in entries
+                ),
+            )
@@ -0,0 +1,166 @@
+# Copyright: Ajatt-Tools and contributors; https://github.com/Ajatt-Tools
+# License: GNU AGPL, version 3 or later; http://www.gnu.org/licenses/agpl.html
+
+import pathlib
+import typing
+from collections.abc import Callable, Iterable, Sequence
+
+from aqt.qt import *
+
+# Still images only. Animations and videos are excluded.
+STILL_IMAGE_FORMATS = frozenset((".png", ".jpg", ".jpeg", ".webp", ".avif", ".bmp", ".tif", ".tiff"))
+DHASH_WIDTH = 9
+DHASH_HEIGHT = 8
+# Decode at a reduced size first. JPEG readers decode directly at the requested scale, which is much faster.
+DECODE_SIZE = 64
+
+T = typing.TypeVar("T")
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+def is_still_image(path: pathlib.Path) -> bool:
+    return path.suffix.lower() in STILL_IMAGE_FORMATS
+
+
+def read_downscaled_image(path: pathlib.Path) -> QImage | None:
+    """
+    Decode a small version of the image, with transparency blended onto white.
+    """
+    reader = QImageReader(str(path))
+    if (size := reader.size()).isValid() and (size.width() > DECODE_SIZE or size.height() > DECODE_SIZE):
+        reader.setScaledSize(QSize(DECODE_SIZE, DECODE_SIZE))
+    image = reader.read()
+    if image.isNull():
+        return None
+    # Converted images are saved without transparency (-blend_alpha 0xffffff).
+    canvas = QImage(image.size(), QImage.Format.Format_RGB32)
+    canvas.fill(Qt.GlobalColor.white)
+    painter = QPainter(canvas)
+    painter.drawImage(0, 0, image)
+    painter.end()
+    return canvas
+
+
+def compute_dhash(image: QImage) -> int:
+    """
+    Compute a 64-bit difference hash.
+    Each bit tells whether a pixel is brighter than its right neighbor in a 9x8 grayscale thumbnail.
+    """
+    small = image.scaled(
+        DHASH_WIDTH,
+        DHASH_HEIGHT,
+        Qt.AspectRatioMode.IgnoreAspectRatio,
+        Qt.TransformationMode.SmoothTransformation,
+    )
+    result = 0
+    for y in range(DHASH_HEIGHT):
+        row = [qGray(small.pixel(x, y)) for x in range(DHASH_WIDTH)]
+        for left, right in zip(row, row[1:]):
+            result = (result << 1) | int(left > right)
+    return result
+
+
+def image_file_dhash(path: pathlib.Path) -> int | None:
+    if image := read_downscaled_image(path):
+        return compute_dhash(image)
+    return None
+
+
+class BKTree(typing.Generic[T]):
+    """
+    Burkhard-Keller tree over integer hashes.
+    Finds all items within a given distance without comparing the query to every stored item.
+    The distance must satisfy the triangle inequality. By default, the Hamming distance is used.
+    """
+
+    class _Node(typing.NamedTuple):
+        key: int
+        items: list
+        children: dict
+
+    _root: _Node | None
+    _size: int
+
+    def __init__(self, distance: Callable[[int, int], int] = hamming_distance) -> None:
+        self._root = None
+        self._size = 0
+        self._distance = distance
+
+    def __len__(self) -> int:
+        return self._size
+
+    def add(self, key: int, item: T) -> None:
+        self._size += 1
+        if self._root is None:
+            self._root = self._Node(key, [item], {})
+            return
+        node = self._root
+        while True:
+            dist = self._distance(key, node.key)
+            if dist == 0:
+                node.items.append(item)
+                return
+            if (child := node.children.get(dist)) is None:
+                node.children[dist] = self._Node(key, [item], {})
+                return
+            node = child
+
+    def query(self, key: int, radius: int) -> Iterable[tuple[int, T]]:
+        """
+        Yield (distance, item) pairs for all items whose keys are within the radius.
+        """
+        if self._root is None:
+            return
+        stack = [self._root]
+        while stack:
+            node = stack.pop()
+            dist = self._distance(key, node.key)
+            if dist <= radius:
+                for item in node.items:
+                    yield dist, item
+            # By the triangle inequality, matches can only be found in children within [dist - r, dist + r].
+            for child_dist, child in node.children.items():
+                if dist - radius <= child_dist <= dist + radius:
+                    stack.append(child)
+
+
+def group_similar(
+    fingerprints: dict[pathlib.Path, int],
+    max_distance: int,
+    sort_key: Callable[[pathlib.Path], typing.Any],
+    distance: Callable[[int, int], int] = hamming_distance,
+    compatible: Callable[[int, int], bool] | None = None,
+) -> Sequence[list[pathlib.Path]]:
+    """
+    Group files whose fingerprints are within max_distance of each other.
+    Files are visited in the order given by sort_key, and each unassigned file starts a new group.
+    The first file of each group is the one that started it.
+
+    :param distance: A metric on fingerprints.
+    :param compatible: An extra check that a match has to pass to join the group.
+    """
+    tree: BKTree[pathlib.Path] = BKTree(distance)
+    for path, fingerprint in fingerprints.items():
+        tree.add(fingerprint, path)
+
+    assigned: set[pathlib.Path] = set()
+    groups: list[list[pathlib.Path]] = []
+    for seed in sorted(fingerprints, key=sort_key):
+        if seed in assigned:
+            continue
+        assigned.add(seed)
+        members = sorted(
+            (
+                path
+                for _dist, path in tree.query(fingerprints[seed], max_distance)
+                if path not in assigned and (compatible is None or compatible(fingerprints[seed], fingerprints[path]))
+            ),
+            key=sort_key,
+        )
+        if members:
+            assigned.update(members)
+            groups.append([seed, *members])
+    return groups
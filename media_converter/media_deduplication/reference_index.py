@@ -0,0 +1,252 @@
+# Copyright: Ajatt-Tools and contributors; https://github.com/Ajatt-Tools
+# License: GNU AGPL, version 3 or later; http://www.gnu.org/licenses/agpl.html
+
+import functools
+import html
+import os
+import re
+import sqlite3
+import threading
+import time
+import typing
+from collections.abc import Iterable, Iterator
+
+from anki.collection import Collection, SearchNode
+from anki.notes import Note, NoteId
+from anki.utils import ids2str
+
+from ..consts import USER_FILES_DIR
+
+INDEX_FILENAME = "reference_index.sqlite3"
+# Notes are read from the collection in pages, so that a large collection isn't loaded into memory at once.
+PAGE_SIZE = 5_000
+# The reference kinds that do_replacements() can rewrite.
+RE_MEDIA_REFERENCE = re.compile(
+    r"""\b(?:src|href)=(?:"(?P<dq>[^"<>]+)"|'(?P<sq>[^'<>]+)')"""
+    r"""|url\((?:&quot;|&\#39;|["'])?(?P<url>[^)"'&]+)(?:&quot;|&\#39;|["'])?\)"""
+    r"""|\[sound:(?P<sound>[^]]+)]""",
+    flags=re.IGNORECASE,
+)
+
+
+def referenced_files(flds: str) -> set[str]:
+    """Names of local media files referenced by a note's joined fields."""
+    names = set()
+    for match in RE_MEDIA_REFERENCE.finditer(flds):
+        name = next(group for group in match.groups() if group)
+        if "://" not in name and not name.startswith("data:"):
+            # Both spellings, so that the file is found by its real name and by the text that do_replacements() sees.
+            names.update((name, html.unescape(name)))
+    return names
+
+
+# Summarizes the notes and their modification times. Weighting by note id catches changes that cancel out in the sum.
+NOTES_SUMMARY = "count(), coalesce(sum(mod), 0), coalesce(sum(mod * ({id} % 1009)), 0)"
+
+
+class NotesSummary(typing.NamedTuple):
+    """If the summaries of the collection and of the index differ, some notes have changed without the index."""
+
+    n_notes: int
+    mod_sum: int
+    mod_checksum: int
+
+
+class ReferenceIndex:
+    """
+    Maps media filenames to the notes that reference them, for every collection the add-on has seen.
+    Changed notes are found by comparing modification times. Because those are stored in seconds,
+    notes modified in the second of the previous refresh or later are always re-read.
+    Notes passed to the note_will_flush hook are re-read as well, but not every Anki version runs it on save.
+    """
+
+    _db_path: str
+    _lock: threading.Lock
+    _dirty: set[NoteId]
+    _dirty_lock: threading.Lock
+    _refreshed_at: dict[str, int]  # media dir -> unix time of the last refresh, in seconds
+
+    def __init__(self, db_path: str | None = None) -> None:
+        if db_path is None:
+            os.makedirs(USER_FILES_DIR, exist_ok=True)
+            db_path = os.path.join(USER_FILES_DIR, INDEX_FILENAME)
+        self._db_path = db_path
+        self._lock = threading.Lock()
+        self._dirty = set()
+        self._dirty_lock = threading.Lock()
+        self._refreshed_at = {}
+        with self._connect() as con:
+            con.execute("""
+                CREATE TABLE IF NOT EXISTS refs (
+                    media_dir TEXT NOT NULL,
+                    filename TEXT NOT NULL,
+                    note_id INTEGER NOT NULL,
+                    PRIMARY KEY (media_dir, filename, note_id)
+                ) WITHOUT ROWID
+            """)
+            con.execute("CREATE INDEX IF NOT EXISTS refs_by_note ON refs (media_dir, note_id)")
+            con.execute("""
+                CREATE TABLE IF NOT EXISTS notes (
+                    media_dir TEXT NOT NULL,
+                    note_id INTEGER NOT NULL,
+                    mod INTEGER NOT NULL,
+                    PRIMARY KEY (media_dir, note_id)
+                ) WITHOUT ROWID
+            """)
+            con.execute("""
+                CREATE TABLE IF NOT EXISTS collections (
+                    media_dir TEXT PRIMARY KEY,
+                    schema INTEGER NOT NULL
+                )
+            """)
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self._db_path, timeout=10)
+
+    def mark_dirty(self, note_ids: Iterable[NoteId]) -> None:
+        """Re-read these notes on the next refresh. Notes that no longer exist are removed from the index."""
+        with self._dirty_lock:
+            self._dirty.update(note_ids)
+
+    def on_note_will_flush(self, note: Note) -> None:
+        # New notes don't have an id yet. They are found by comparing the notes.
+        if note.id:
+            self.mark_dirty([note.id])
+
+    def on_notes_will_be_deleted(self, col: Collection, note_ids: Iterable[NoteId]) -> None:
+        self.mark_dirty(note_ids)
+
+    @staticmethod
+    def _collection_summary(col: Collection) -> NotesSummary:
+        return NotesSummary(*col.db.first(f"SELECT {NOTES_SUMMARY.format(id='id')} FROM notes"))
+
+    @staticmethod
+    def _index_summary(con: sqlite3.Connection, media_dir: str) -> NotesSummary:
+        query = f"SELECT {NOTES_SUMMARY.format(id='note_id')} FROM notes WHERE media_dir = ?"
+        return NotesSummary(*con.execute(query, (media_dir,)).fetchone())
+
+    @staticmethod
+    def _pages(col: Collection, where: str = "1") -> Iterator[list[tuple[NoteId, int, str]]]:
+        last_id = 0
+        while rows := col.db.all(
+            f"SELECT id, mod, flds FROM notes WHERE ({where}) AND id > ? ORDER BY id LIMIT {PAGE_SIZE}", last_id
+        ):
+            yield rows
+            last_id = rows[-1][0]
+
+    @staticmethod
+    def _forget_notes(con: sqlite3.Connection, media_dir: str, note_ids: Iterable[NoteId]) -> None:
+        params = [(media_dir, nid) for nid in note_ids]
+        con.executemany("DELETE FROM refs WHERE media_dir = ? AND note_id = ?", params)
+        con.executemany("DELETE FROM notes WHERE media_dir = ? AND note_id = ?", params)
+
+    def _write_notes(self, con: sqlite3.Connection, media_dir: str, rows: list[tuple[NoteId, int, str]]) -> None:
+        self._forget_notes(con, media_dir, (nid for nid, _, _ in rows))
+        con.executemany(
+            "INSERT INTO notes (media_dir, note_id, mod) VALUES (?, ?, ?)",
+            ((media_dir, nid, mod) for nid, mod, _ in rows),
+        )
+        con.executemany(
+            "INSERT OR IGNORE INTO refs (media_dir, filename, note_id) VALUES (?, ?, ?)",
+            ((media_dir, filename, nid) for nid, _, flds in rows for filename in referenced_files(flds)),
+        )
+
+    def rebuild(self, col: Collection) -> int:
+        """Index every note of the collection from scratch. Returns the number of notes."""
+        media_dir = col.media.dir()
+        with self._dirty_lock:
+            self._dirty.clear()
+        n_notes = 0
+        with self._lock, self._connect() as con:
+            self._refreshed_at[media_dir] = int(time.time())
+            con.execute("DELETE FROM refs WHERE media_dir = ?", (media_dir,))
+            con.execute("DELETE FROM notes WHERE media_dir = ?", (media_dir,))
+            for rows in self._pages(col):
+                self._write_notes(con, media_dir, rows)
+                n_notes += len(rows)
+            con.execute(
+                "INSERT OR REPLACE INTO collections (media_dir, schema) VALUES (?, ?)",
+                (media_dir, col.db.scalar("SELECT scm FROM col")),
+            )
+        return n_notes
+
+    def _reread_notes(self, con: sqlite3.Connection, col: Collection, media_dir: str, note_ids: set[NoteId]) -> None:
+        existing = set(col.db.list(f"SELECT id FROM notes WHERE id IN {ids2str(note_ids)}"))
+        self._forget_notes(con, media_dir, note_ids - existing)
+        for rows in self._pages(col, f"id IN {ids2str(existing)}"):
+            self._write_notes(con, media_dir, rows)
+
+    @staticmethod
+    def _newest_mod(con: sqlite3.Connection, media_dir: str) -> int:
+        return con.execute("SELECT coalesce(max(mod), 0) FROM notes WHERE media_dir = ?", (media_dir,)).fetchone()[0]
+
+    @staticmethod
+    def _changed_notes(con: sqlite3.Connection, col: Collection, media_dir: str) -> set[NoteId]:
+        """Notes that were added, modified or deleted without the index noticing."""
+        current = dict(col.db.all("SELECT id, mod FROM notes"))
+        indexed = dict(con.execute("SELECT note_id, mod FROM notes WHERE media_dir = ?", (media_dir,)))
+        return {nid for nid, mod in current.items() if indexed.get(nid) != mod} | (indexed.keys() - current.keys())
+
+    def refresh(self, col: Collection) -> None:
+        """Catch up with the changes made to the collection since the last refresh."""
+        media_dir = col.media.dir()
+        with self._lock, self._connect() as con:
+            schema = con.execute("SELECT schema FROM collections WHERE media_dir = ?", (media_dir,)).fetchone()
+        if schema is None or schema[0] != col.db.scalar("SELECT scm FROM col"):
+            # Never indexed, or the collection was replaced, e.g. by a full sync.
+            self.rebuild(col)
+            return
+        with self._dirty_lock:
+            dirty, self._dirty = self._dirty, set()
+        now = int(time.time())
+        with self._lock, self._connect() as con:
+            # A note changed again in the same second keeps its modification time.
+            since = self._refreshed_at.get(media_dir) or self._newest_mod(con, media_dir)
+            dirty.update(col.db.list("SELECT id FROM notes WHERE mod >= ?", since))
+            if dirty:
+                self._reread_notes(con, col, media_dir, dirty)
+            self._refreshed_at[media_dir] = now
+            # Notes synced or restored by undo don't run the hooks.
+            if self._index_summary(con, media_dir) != self._collection_summary(col):
+                if changed := self._changed_notes(con, col, media_dir):
+                    self._reread_notes(con, col, media_dir, changed)
+
+    def references(self, col: Collection, filenames: Iterable[str]) -> dict[str, list[NoteId]]:
+        """Return the notes that reference each file. Files that no note references map to an empty list."""
+        self.refresh(col)
+        media_dir = col.media.dir()
+        with self._lock, self._connect() as con:
+            return {
+                filename: [
+                    NoteId(nid)
+                    for (nid,) in con.execute(
+                        "SELECT note_id FROM refs WHERE media_dir = ? AND filename = ?", (media_dir, filename)
+                    )
+                ]
+                for filename in filenames
+            }
+
+
+def is_mentioned(col: Collection, filename: str) -> bool:
+    """Search the notes for the name, which also finds references that the index doesn't parse, e.g. in srcset."""
+    return bool(col.find_notes(col.build_search_string(SearchNode(literal_text=filename))))
+
+
+def trash_unreferenced(col: Collection, filenames: Iterable[str]) -> list[str]:
+    """
+    Move files that no note references any more to Anki's media trash, where Check Media can restore them.
+    A file is kept if its name appears anywhere in a note. Returns the names of the moved files.
+    """
+    unreferenced = [
+        filename
+        for filename, note_ids in get_reference_index().references(col, filenames).items()
+        if not note_ids and not is_mentioned(col, filename)
+    ]
+    if unreferenced:
+        col.media.trash_files(unreferenced)
+    return unreferenced
+
+
+@functools.cache
+def get_reference_index() -> ReferenceIndex:
+    return ReferenceIndex()
@@ -1,11 +1,15 @@
 # Copyright: Ajatt-Tools and contributors; https://github.com/Ajatt-Tools
 # License: GNU AGPL, version 3 or later; http://www.gnu.org/licenses/agpl.html
 import io
+import os
+import pathlib
 import re
 import typing
+import unicodedata
 from collections.abc import Iterable
 from typing import cast
 
+from anki.collection import Collection
 from anki.notes import Note
 from aqt import mw
 from aqt.editor import Editor
@@ -19,8 +23,14 @@ from .ajt_common.utils import open_file
 from .config import MediaConverterConfig, get_global_config
 from .consts import ADDON_FULL_NAME, WINDOW_MIN_WIDTH
 from .media_deduplication.deduplication import do_replacements
+from .media_deduplication.file_links import link_or_copy
 
 RE_FILENAME_VALID = re.compile(r'^[^\[\]<>:\'"/|?*\\]+\.\w{1,5}$', flags=re.IGNORECASE)
+# The rules Anki applies to names of files added to the media folder (rslib/src/media/files.rs).
+RE_ANKI_DISALLOWED_CHARS = re.compile(r'[\[\]<>:"/?*^\\|\x00-\x1f\x7f]')
+RE_WINDOWS_DEVICE_NAME = re.compile(r"^(CON|PRN|AUX|NUL|COM[1-9]|LPT[1-9])(\.|$)", flags=re.IGNORECASE)
+ANKI_MAX_FILENAME_BYTES = 120
+ANKI_MAX_EXTENSION_BYTES = 10
 
 
 class FileNameEdit(MonoSpaceLineEdit):
@@ -177,14 +187,50 @@ class AnkiMediaRenameDialog(MediaRenameDialog):
         ).success(lambda out: on_success()).run_in_background()
 
 
-def duplicate_file_in_collection(old_filename: str, new_filename: str) -> str:
+def anki_media_filename(filename: str) -> str:
+    """
+    The name Anki would give the file when it is added to the media folder.
+    Names are lowercased, characters that aren't allowed are removed, names that Windows can't store are escaped,
+    and long names are shortened.
+    """
+    filename = RE_ANKI_DISALLOWED_CHARS.sub("", filename)
+    filename = unicodedata.normalize("NFC", filename).lower()
+    filename = RE_WINDOWS_DEVICE_NAME.sub(r"\1_\2", filename)
+    if filename.endswith((" ", ".")):
+        filename += "_"
+    if len(filename.encode("utf-8")) <= ANKI_MAX_FILENAME_BYTES:
+        return filename
+    stem, dot, ext = filename.rpartition(".")
+    if not dot:
+        stem, ext = filename, ""
+    ext = truncate_utf8(ext, ANKI_MAX_EXTENSION_BYTES)
+    # Room for the dot and a trailing underscore.
+    stem = truncate_utf8(stem, ANKI_MAX_FILENAME_BYTES - len(ext.encode("utf-8")) - 2)
+    return f"{stem}.{ext}"
+
+
+def truncate_utf8(text: str, max_bytes: int) -> str:
+    return text.encode("utf-8")[:max_bytes].decode("utf-8", errors="ignore")
+
+
+def duplicate_file_in_collection(old_filename: str, new_filename: str, col: Collection | None = None) -> str:
     """Returns new filename after Anki possibly alters it."""
-    if not (mw and mw.col):
+    if not (col := col or (mw and mw.col)):
         print("no collection available")
         return old_filename
     print(f"{old_filename} => {new_filename}")
-    with open(os.path.join(mw.col.media.dir(), old_filename), "rb") as f:
-        return mw.col.media.write_data(new_filename, f.read())
+    media_dir = pathlib.Path(col.media.dir())
+    # The file isn't added through Anki, so the name is cleaned up the same way Anki would do it.
+    new_filename = anki_media_filename(new_filename) or old_filename
+    try:
+        # Fast path: the file isn't read into memory, and usually no data is copied at all.
+        link_or_copy(media_dir / old_filename, media_dir / new_filename)
+        return new_filename
+    except FileExistsError:
+        pass
+    # The name is taken. Anki reuses it if the content is the same, otherwise it picks a new name.
+    with open(media_dir / old_filename, "rb") as f:
+        return col.media.write_data(new_filename, f.read())
 
 
 def format_report_message(to_rename: list[RenameTask]) -> str:
@@ -198,11 +244,11 @@ def format_report_message(to_rename: list[RenameTask]) -> str:
     return buffer.getvalue()
 
 
-def try_rename_files(to_rename: list[RenameTask]) -> Iterable[RenameTask]:
+def try_rename_files(to_rename: list[RenameTask], col: Collection | None = None) -> Iterable[RenameTask]:
     """Yields successful renames."""
     for old_filename, new_filename in to_rename:
         try:
-            new_filename = duplicate_file_in_collection(old_filename, new_filename)
+            new_filename = duplicate_file_in_collection(old_filename, new_filename, col)
         except FileNotFoundError:
             showCritical(f"{old_filename} doesn't exist.", title="Couldn't rename file.")
             continue
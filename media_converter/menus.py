@@ -4,23 +4,24 @@ import functools
 import os.path
 
 from anki.utils import join_fields
-from aqt import gui_hooks, mw
+from aqt import mw
 from aqt.editor import Editor, EditorWebView
 from aqt.qt import *
 from aqt.utils import tooltip
 
-from .ajt_common.about_menu import menu_root_entry
-from .ajt_common.addon_config import set_config_action
 from .ajt_common.media import find_all_media
 from .common import insert_image_html, key_to_str
 from .config import MediaConverterConfig, get_global_config
-from .consts import ADDON_FULL_NAME, ADDON_NAME, ADDON_PATH
+from .consts import ADDON_FULL_NAME, ADDON_PATH
 from .dialogs.main_settings_dialog import AnkiMainSettingsDialog
+from .file_converters.async_paste_converter import AsyncPasteConverter
 from .file_converters.file_converter import FFmpegNotFoundError
-from .file_converters.image_converter import ffmpeg_not_found_dialog
+from .file_converters.image_converter import CanceledPaste, ffmpeg_not_found_dialog
+from .file_converters.multi_paste_converter import MultiPasteConverter
 from .file_converters.on_paste_converter import TEMP_IMAGE_FORMAT, OnPasteConverter
-from .media_deduplication.anki_collection_op import run_media_deduplication
 from .media_rename import AnkiMediaRenameDialog
+from .utils.lag_monitor import monitor_ui_lag
+from .utils.mime_helper import ImageSource, image_sources
 from .utils.show_options import ShowOptions
 from .utils.temp_file import TempFile
 
@@ -34,25 +35,6 @@ def open_media_converter_settings(config: MediaConverterConfig, parent: QWidget,
     return QDialog.DialogCode.Rejected
 
 
-def setup_mainwindow_menu(config: MediaConverterConfig) -> None:
-    """
-    setup menu in anki
-    """
-    root_menu = menu_root_entry()
-
-    action = QAction(f"{ADDON_NAME} Options...", root_menu)
-    qconnect(action.triggered, lambda: open_media_converter_settings(config=config, parent=mw, modal=False))
-    root_menu.addAction(action)
-
-    action = QAction(f"Deduplicate media...", root_menu)
-    qconnect(action.triggered, run_media_deduplication)
-    root_menu.addAction(action)
-
-    # Register the modal settings dialog with Anki's add-on config button.
-    # The config update callback is registered by get_global_config().
-    set_config_action(lambda: open_media_converter_settings(config=config, parent=mw, modal=True))
-
-
 def get_clipboard_mime_data(editor: Editor) -> QMimeData | None:
     clip = editor.mw.app.clipboard()
     if not clip:
@@ -96,8 +78,43 @@ class EditorMenus:
         )
         buttons.append(b)
 
+    def _convert_and_insert_async(self, editor: Editor, source: ShowOptions, mime: QMimeData) -> None:
+        conv = AsyncPasteConverter(editor, source, config=self._cfg)
+        with TempFile(suffix=f".{TEMP_IMAGE_FORMAT}") as tmp_file:
+            if to_convert := conv.mime_to_image_file(mime, tmp_file.path()):
+                try:
+                    placeholder = conv.convert_mime_async(to_convert)
+                except (CanceledPaste, OSError) as ex:
+                    conv.tooltip(ex)
+                else:
+                    # Insert the original image. It's replaced when the conversion finishes.
+                    insert_image_html(editor, placeholder)
+            else:
+                conv.tooltip("Nothing to convert.")
+
+    def _convert_and_insert_multi(self, editor: Editor, source: ShowOptions, sources: list[ImageSource]) -> None:
+        conv = MultiPasteConverter(editor, source, config=self._cfg)
+        try:
+            result = conv.convert_sources(sources)
+        except FFmpegNotFoundError:
+            ffmpeg_not_found_dialog()
+        except (CanceledPaste, OSError) as ex:
+            conv.tooltip(ex)
+        else:
+            if result.converted:
+                editor.doPaste(html=result.as_html(), internal=True)
+            conv.result_tooltip_multi(result)
+
     def _convert_and_insert(self, editor: Editor, source: ShowOptions) -> None:
+        with monitor_ui_lag("paste", self._cfg):
+            self._convert_and_insert_clipboard(editor, source)
+
+    def _convert_and_insert_clipboard(self, editor: Editor, source: ShowOptions) -> None:
         mime: QMimeData | None = get_clipboard_mime_data(editor)
+        if mime and self._cfg.multi_image_paste and len(sources := image_sources(mime)) > 1:
+            return self._convert_and_insert_multi(editor, source, sources)
+        if mime and self._cfg.async_paste:
+            return self._convert_and_insert_async(editor, source, mime)
         conv = OnPasteConverter(editor, source, config=self._cfg)
         if not mime:
             conv.tooltip("Nothing to convert.")
@@ -110,7 +127,7 @@ class EditorMenus:
                     ffmpeg_not_found_dialog()
                 except FileNotFoundError:
                     conv.tooltip("File not found.")
-                except Exception as ex:
+                except (CanceledPaste, OSError, RuntimeError) as ex:
                     conv.tooltip(ex)
                 else:
                     # File has been converted.
@@ -163,17 +180,8 @@ class EditorMenus:
             )
 
 
-def setup_editor_menus(cfg: MediaConverterConfig) -> None:
-    mw._ajt__media_converter_editor_menus = menus = EditorMenus(cfg)
-
-    gui_hooks.editor_did_init_buttons.append(menus.add_rename_files_button)
-    gui_hooks.editor_did_init_buttons.append(menus.add_paste_and_convert_button)
-    gui_hooks.editor_did_init_shortcuts.append(menus.append_editor_shortcuts)
-    gui_hooks.editor_will_show_context_menu.append(menus.add_context_menu_entry)
-
-
-def init() -> None:
-    assert mw, "Anki should be open."
-    cfg = get_global_config()
-    setup_mainwindow_menu(cfg)
-    setup_editor_menus(cfg)
+@functools.cache
+def get_editor_menus() -> EditorMenus:
+    """Created when the first editor is opened. The hooks are registered by startup.py."""
+    mw._ajt__media_converter_editor_menus = menus = EditorMenus(get_global_config())
+    return menus
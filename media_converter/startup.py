@@ -0,0 +1,152 @@
+# Copyright: Ajatt-Tools and contributors; https://github.com/Ajatt-Tools
+# License: GNU AGPL, version 3 or later; http://www.gnu.org/licenses/agpl.html
+
+"""
+Registers the add-on's hooks and menu entries when Anki starts.
+The modules that do the work pull in requests, the dialogs and the deduplication code,
+so they are imported only when a hook fires or a menu entry is used for the first time.
+"""
+
+import importlib
+import sys
+import threading
+from collections.abc import Callable
+from typing import Any
+
+import aqt.editor
+from anki import hooks
+from anki.hooks import wrap
+from aqt import gui_hooks, mw
+from aqt.qt import *
+
+from .ajt_common.about_menu import menu_root_entry
+from .ajt_common.addon_config import set_config_action
+from .bulk_convert.conversion_queue import ConversionQueue
+from .config import get_global_config
+from .consts import ADDON_NAME
+from .utils.executables import find_cwebp_exe, find_ffmpeg_exe
+
+
+def lazy_function(module_name: str, name: str) -> Callable[..., Any]:
+    """Return a function that imports the module on the first call and calls module.name."""
+
+    def shim(*args, **kwargs) -> Any:
+        module = importlib.import_module(f".{module_name}", __package__)
+        return getattr(module, name)(*args, **kwargs)
+
+    return shim
+
+
+def lazy_method(module_name: str, getter: str, name: str) -> Callable[..., Any]:
+    """Return a function that imports the module on the first call and calls a method of the object made by getter."""
+
+    def shim(*args, **kwargs) -> Any:
+        module = importlib.import_module(f".{module_name}", __package__)
+        return getattr(getattr(module, getter)(), name)(*args, **kwargs)
+
+    return shim
+
+
+def is_loaded(module_name: str) -> bool:
+    return f"{__package__}.{module_name}" in sys.modules
+
+
+def warm_up_executables() -> None:
+    """
+    Look for cwebp and ffmpeg in a background thread.
+    The results are cached, so the first conversion doesn't wait for the search.
+    """
+
+    def find_all() -> None:
+        try:
+            find_cwebp_exe()
+        except AssertionError:
+            # Reported to the user when an image is converted.
+            pass
+        find_ffmpeg_exe()
+
+    threading.Thread(target=find_all, name="ajt__media_converter_warm_up", daemon=True).start()
+
+
+def open_settings(*, modal: bool) -> int:
+    return lazy_function("menus", "open_media_converter_settings")(config=get_global_config(), parent=mw, modal=modal)
+
+
+def setup_mainwindow_menu() -> None:
+    root_menu = menu_root_entry()
+    entries = (
+        (f"{ADDON_NAME} Options...", lambda: open_settings(modal=False)),
+        ("Deduplicate media...", lazy_function("media_deduplication.anki_collection_op", "run_media_deduplication")),
+        ("Link duplicate media...", lazy_function("media_deduplication.anki_collection_op", "run_media_linking")),
+        (
+            "Deduplicate similar images...",
+            lazy_function("media_deduplication.anki_collection_op", "run_similar_images_deduplication"),
+        ),
+        (
+            "Deduplicate similar audio...",
+            lazy_function("media_deduplication.anki_collection_op", "run_similar_audio_deduplication"),
+        ),
+        ("Conversion timings...", lazy_function("dialogs.timings_dialog", "show_timings_dialog")),
+        (
+            "Rebuild media reference index",
+            lazy_function("media_deduplication.anki_collection_op", "run_reference_index_rebuild"),
+        ),
+    )
+    for label, callback in entries:
+        action = QAction(label, root_menu)
+        # The shims forward every argument, so "checked" sent by the signal is dropped here.
+        qconnect(action.triggered, lambda _checked=False, callback=callback: callback())
+        root_menu.addAction(action)
+    # Register the modal settings dialog with Anki's add-on config button.
+    # The config update callback is registered by get_global_config().
+    set_config_action(lambda: open_settings(modal=True))
+
+
+def setup_editor_menus() -> None:
+    gui_hooks.editor_did_init_buttons.append(lazy_method("menus", "get_editor_menus", "add_rename_files_button"))
+    gui_hooks.editor_did_init_buttons.append(lazy_method("menus", "get_editor_menus", "add_paste_and_convert_button"))
+    gui_hooks.editor_did_init_shortcuts.append(lazy_method("menus", "get_editor_menus", "append_editor_shortcuts"))
+    gui_hooks.editor_will_show_context_menu.append(lazy_method("menus", "get_editor_menus", "add_context_menu_entry"))
+
+
+def on_profile_did_open() -> None:
+    # Load the converters now only if notes added before Anki was closed are waiting to be converted.
+    assert mw and mw.col
+    if is_loaded("events") or ConversionQueue().pending(mw.col.media.dir()):
+        lazy_method("events", "get_events", "on_profile_did_open")()
+
+
+def on_profile_will_close() -> None:
+    if is_loaded("events"):
+        lazy_method("events", "get_events", "on_profile_will_close")()
+
+
+def setup_events() -> None:
+    gui_hooks.editor_will_process_mime.append(lazy_method("events", "get_events", "on_process_mime"))
+    hooks.note_will_be_added.append(lazy_method("events", "get_events", "on_add_note"))
+    # Keep the index of media references up to date with notes saved in Anki.
+    hooks.note_will_flush.append(
+        lazy_method("media_deduplication.reference_index", "get_reference_index", "on_note_will_flush")
+    )
+    hooks.notes_will_be_deleted.append(
+        lazy_method("media_deduplication.reference_index", "get_reference_index", "on_notes_will_be_deleted")
+    )
+    # Convert files left in the queue when Anki was closed.
+    gui_hooks.profile_did_open.append(on_profile_did_open)
+    gui_hooks.profile_will_close.append(on_profile_will_close)
+    aqt.editor.Editor.setup_mask_editor = wrap(
+        aqt.editor.Editor.setup_mask_editor,
+        lazy_method("events", "get_events", "on_setup_mask_editor"),
+        pos="around",
+    )
+
+
+def init() -> None:
+    assert mw, "Anki should be open."
+    get_global_config()
+    gui_hooks.browser_menus_did_init.append(lazy_function("bulkconvert", "setup_menu"))
+    gui_hooks.browser_menus_did_init.append(lazy_function("batch_rename", "setup_menu"))
+    setup_mainwindow_menu()
+    setup_editor_menus()
+    setup_events()
+    warm_up_executables()
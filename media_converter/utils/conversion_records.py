@@ -0,0 +1,84 @@
+# Copyright: Ajatt-Tools and contributors; https://github.com/Ajatt-Tools
+# License: GNU AGPL, version 3 or later; http://www.gnu.org/licenses/agpl.html
+
+import csv
+import enum
+import functools
+import io
+import json
+import typing
+from collections.abc import Iterable
+
+from .ring_buffer import RingBuffer
+
+
+class ConversionOrigin(enum.Enum):
+    bulk = "bulk"
+    paste = "paste"
+    add_note = "add_note"
+
+
+class ConversionStatus(enum.Enum):
+    converted = "converted"
+    skipped = "skipped"
+    failed = "failed"
+
+
+class ConversionRecord(typing.NamedTuple):
+    """What one conversion cost and what it saved. Sizes are in bytes, dimensions are 0 when unknown."""
+
+    origin: ConversionOrigin
+    status: ConversionStatus
+    reason: str  # why the file was skipped or failed
+    file_type: str  # "image" or "audio"
+    source: str
+    output: str  # empty if nothing was written
+    bytes_in: int
+    bytes_out: int
+    width_in: int
+    height_in: int
+    width_out: int
+    height_out: int
+    encoder: str  # e.g. "cwebp", empty if the encoder didn't run
+    args_fingerprint: str  # same settings give the same fingerprint
+    wall_seconds: float
+    cpu_seconds: float | None  # None if the platform can't report it
+    finished_at: float  # unix time
+
+    def as_dict(self) -> dict[str, typing.Any]:
+        return {**self._asdict(), "origin": self.origin.value, "status": self.status.value}
+
+
+def records_to_json(records: Iterable[ConversionRecord]) -> str:
+    return json.dumps([record.as_dict() for record in records], indent=2, ensure_ascii=False)
+
+
+def records_to_csv(records: Iterable[ConversionRecord]) -> str:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=ConversionRecord._fields, lineterminator="\n")
+    writer.writeheader()
+    for record in records:
+        writer.writerow(record.as_dict())
+    return buffer.getvalue()
+
+
+def export_records(records: Iterable[ConversionRecord], path: str) -> None:
+    """Write CSV if the path ends with .csv, JSON otherwise."""
+    to_text = records_to_csv if path.lower().endswith(".csv") else records_to_json
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        f.write(to_text(records))
+
+
+class ConversionLog(RingBuffer[ConversionRecord]):
+    """Keeps records of the most recent paste and add-note conversions."""
+
+    def record(self, record: ConversionRecord) -> None:
+        self.append(record)
+
+    def records(self) -> list[ConversionRecord]:
+        return self.items()
+
+
+@functools.cache
+def get_conversion_log() -> ConversionLog:
+    return ConversionLog()
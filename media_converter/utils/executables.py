@@ -0,0 +1,50 @@
+# Copyright: Ajatt-Tools and contributors; https://github.com/Ajatt-Tools
+# License: GNU AGPL, version 3 or later; http://www.gnu.org/licenses/agpl.html
+
+"""
+Lookup of the encoder executables.
+Kept apart from the converters, so that startup can warm the lookups without importing them.
+"""
+
+import functools
+import os
+
+from ..ajt_common.utils import find_executable as find_executable_ajt
+from ..consts import IS_MAC, IS_WIN, SUPPORT_DIR
+
+
+@functools.cache
+def support_exe_suffix() -> str:
+    """
+    The mecab executable file in the "support" dir has a different suffix depending on the platform.
+    """
+    if IS_WIN:
+        return ".exe"
+    elif IS_MAC:
+        return ".mac"
+    else:
+        return ".lin"
+
+
+def get_bundled_executable(name: str) -> str:
+    """
+    Get path to executable in the bundled "support" folder.
+    Used to provide "cwebp' and 'ffmpeg' on computers where it is not installed system-wide or can't be found.
+    """
+    path_to_exe = os.path.join(SUPPORT_DIR, name) + support_exe_suffix()
+    assert os.path.isfile(path_to_exe), f"{path_to_exe} doesn't exist. Can't recover."
+    if not IS_WIN:
+        os.chmod(path_to_exe, 0o755)
+    return path_to_exe
+
+
+@functools.cache
+def find_cwebp_exe() -> str:
+    # https://developers.google.com/speed/webp/download
+    return find_executable_ajt("cwebp") or get_bundled_executable("cwebp")
+
+
+@functools.cache
+def find_ffmpeg_exe() -> str | None:
+    # https://www.gyan.dev/ffmpeg/builds/ffmpeg-git-essentials.7z
+    return find_executable_ajt("ffmpeg")
@@ -1,14 +1,15 @@
 # Copyright: Ajatt-Tools and contributors; https://github.com/Ajatt-Tools
 # License: GNU AGPL, version 3 or later; http://www.gnu.org/licenses/agpl.html
 
+import contextlib
 import functools
 import itertools
 import os
-import random
 import re
+import threading
 import time
 import unicodedata
-from collections.abc import Callable
+from collections.abc import Callable, Iterator
 from time import gmtime, strftime
 
 from anki.notes import Note
@@ -44,11 +45,61 @@ def compatible_filename(f: Callable[..., str]) -> Callable[..., str]:
     return wrapper
 
 
-def ensure_unique(file_path: str) -> str:
-    name, ext = os.path.splitext(file_path)
-    while os.path.isfile(file_path):
-        file_path = name + "_" + str(random.randint(0, 9999)).zfill(4) + ext
-    return file_path
+class NameReservations:
+    """
+    Claims file names for files that are about to be written.
+    Claimed names are kept in memory until the file is written or the write fails,
+    so parallel conversions never get the same name, and no empty files are left in the media folder.
+    Suffix counters are kept per name, so names taken earlier in the session aren't probed again.
+    """
+
+    _lock: threading.Lock
+    _next_suffix: dict[str, int]
+    _reserved: set[str]
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._next_suffix = {}
+        self._reserved = set()
+
+    def reserve(self, file_path: str) -> str:
+        """Claim file_path, or file_path with a numeric suffix if it's taken. Return the claimed path."""
+        name, ext = os.path.splitext(file_path)
+        with self._lock:
+            suffix = self._next_suffix.get(name, 0)
+            while True:
+                candidate = f"{name}_{suffix}{ext}" if suffix else file_path
+                if candidate in self._reserved or os.path.lexists(candidate):
+                    suffix += 1
+                    continue
+                self._reserved.add(candidate)
+                self._next_suffix[name] = suffix + 1
+                return candidate
+
+    def release(self, file_path: str) -> None:
+        with self._lock:
+            self._reserved.discard(file_path)
+
+
+_reservations = NameReservations()
+
+
+def reserve_unique(file_path: str) -> str:
+    return _reservations.reserve(file_path)
+
+
+def release_reserved(file_path: str) -> None:
+    """Give up a claimed name. Call it once the file has been written, or when writing it has failed."""
+    _reservations.release(file_path)
+
+
+@contextlib.contextmanager
+def release_when_done(file_path: str) -> Iterator[str]:
+    """Release the claimed name when the code that writes the file is done, whether it succeeds or not."""
+    try:
+        yield file_path
+    finally:
+        release_reserved(file_path)
 
 
 def note_sort_field_content(note: Note) -> str:
@@ -67,8 +118,12 @@ class FilePathFactory(FileNamePatterns):
         self._editor = editor
 
     def make_unique_filepath(self, dest_dir: str, original_filename: str | None, extension: str) -> str:
+        """
+        Pick a name that isn't taken and claim it.
+        The caller should release it with release_reserved() after writing the file or failing to.
+        """
         new_file_path = os.path.join(dest_dir, self._make_filename_no_ext(original_filename) + extension)
-        return ensure_unique(new_file_path)
+        return reserve_unique(new_file_path)
 
     @compatible_filename
     def _make_filename_no_ext(self, original_filename: str | None) -> str:
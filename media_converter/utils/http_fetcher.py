@@ -0,0 +1,206 @@
+# Copyright: Ajatt-Tools and contributors; https://github.com/Ajatt-Tools
+# License: GNU AGPL, version 3 or later; http://www.gnu.org/licenses/agpl.html
+
+import concurrent.futures
+import functools
+import hashlib
+import json
+import os
+import typing
+import uuid
+from collections.abc import Iterable, Iterator
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from ..consts import REQUEST_HEADERS, REQUEST_TIMEOUTS, USER_FILES_DIR
+
+HTTP_CACHE_DIRNAME = "http_cache"
+MAX_RESPONSE_BYTES = 32 * 1024 * 1024
+MAX_CACHE_BYTES = 128 * 1024 * 1024
+CHUNK_SIZE = 64 * 1024
+POOL_SIZE = 8
+
+
+class ResponseTooLarge(OSError):
+    pass
+
+
+class CachedResponse(typing.NamedTuple):
+    content: bytes
+    etag: str | None
+    last_modified: str | None
+
+
+class HttpCache:
+    """
+    Responses stored on disk, two files per URL: the body and its validators (ETag, Last-Modified).
+    When the cache grows past its limit, the least recently used entries are removed.
+    """
+
+    _cache_dir: str
+    _max_bytes: int
+
+    def __init__(self, cache_dir: str, max_bytes: int = MAX_CACHE_BYTES) -> None:
+        self._cache_dir = cache_dir
+        self._max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _entry_path(self, url: str) -> str:
+        return os.path.join(self._cache_dir, hashlib.sha256(url.encode()).hexdigest())
+
+    def get(self, url: str) -> CachedResponse | None:
+        path = self._entry_path(url)
+        try:
+            with open(f"{path}.json", encoding="utf-8") as f:
+                meta = json.load(f)
+            if meta["url"] != url:
+                return None
+            with open(f"{path}.body", "rb") as f:
+                content = f.read()
+            # The modification time is used to find the least recently used entries.
+            os.utime(f"{path}.body")
+        except (OSError, ValueError, KeyError):
+            return None
+        return CachedResponse(content, meta.get("etag"), meta.get("last_modified"))
+
+    def put(self, url: str, response: CachedResponse) -> None:
+        path = self._entry_path(url)
+        meta = {"url": url, "etag": response.etag, "last_modified": response.last_modified}
+        # Write under temporary names first, so that a concurrent reader never sees a partial entry.
+        tmp = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+        try:
+            with open(tmp, "wb") as f:
+                f.write(response.content)
+            os.replace(tmp, f"{path}.body")
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(meta, f)
+            os.replace(tmp, f"{path}.json")
+        except OSError:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            return
+        self._prune()
+
+    def _prune(self) -> None:
+        # Other threads may remove entries meanwhile, so each file is checked once and skipped if it's gone.
+        entries: list[tuple[int, int, str]] = []  # modification time, size, path
+        for entry in os.scandir(self._cache_dir):
+            if entry.name.endswith(".body"):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self._max_bytes:
+                break
+            total -= size
+            for to_remove in (path, f"{path.removesuffix('.body')}.json"):
+                try:
+                    os.remove(to_remove)
+                except FileNotFoundError:
+                    pass
+
+
+def is_cacheable(response: requests.Response) -> bool:
+    """A response is worth storing if it can be revalidated later."""
+    if "no-store" in response.headers.get("Cache-Control", ""):
+        return False
+    return "ETag" in response.headers or "Last-Modified" in response.headers
+
+
+def content_length(response: requests.Response) -> int | None:
+    """Declared size of the body, or None if the header is missing or malformed."""
+    try:
+        return int(response.headers["Content-Length"])
+    except (KeyError, ValueError):
+        return None
+
+
+class ImageFetcher:
+    """
+    Downloads remote images.
+    Connections are reused across requests, downloads are streamed and capped,
+    and responses are revalidated against the on-disk cache with ETag and Last-Modified.
+    """
+
+    _session: requests.Session
+    _cache: HttpCache | None
+    _max_bytes: int
+    _executor: concurrent.futures.ThreadPoolExecutor
+
+    def __init__(
+        self,
+        cache: HttpCache | None = None,
+        max_bytes: int = MAX_RESPONSE_BYTES,
+        pool_size: int = POOL_SIZE,
+    ) -> None:
+        self._cache = cache
+        self._max_bytes = max_bytes
+        self._session = requests.Session()
+        self._session.headers.update(REQUEST_HEADERS)
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=pool_size)
+
+    def fetch(self, url: str) -> bytes:
+        """
+        Return the response body.
+        Raises OSError on network errors, bad HTTP statuses and responses larger than the limit.
+        """
+        cached = self._cache.get(url) if self._cache else None
+        headers = {}
+        if cached and cached.etag:
+            headers["If-None-Match"] = cached.etag
+        if cached and cached.last_modified:
+            headers["If-Modified-Since"] = cached.last_modified
+        with self._session.get(url, timeout=REQUEST_TIMEOUTS, headers=headers, stream=True) as r:
+            if cached and r.status_code == requests.codes.not_modified:
+                return cached.content
+            r.raise_for_status()
+            content = self._read_limited(r)
+            if self._cache and is_cacheable(r):
+                self._cache.put(url, CachedResponse(content, r.headers.get("ETag"), r.headers.get("Last-Modified")))
+        return content
+
+    def _read_limited(self, r: requests.Response) -> bytes:
+        # The size is also checked while reading, so a missing or wrong header can't bypass the limit.
+        if (declared := content_length(r)) is not None and declared > self._max_bytes:
+            raise ResponseTooLarge(f"{r.url} is larger than {self._max_bytes} bytes.")
+        content = bytearray()
+        for chunk in r.iter_content(CHUNK_SIZE):
+            content += chunk
+            if len(content) > self._max_bytes:
+                raise ResponseTooLarge(f"{r.url} is larger than {self._max_bytes} bytes.")
+        return bytes(content)
+
+    def _fetch_or_none(self, url: str) -> bytes | None:
+        try:
+            return self.fetch(url)
+        except OSError:
+            return None
+
+    def iter_fetch(self, urls: Iterable[str]) -> Iterator[bytes | None]:
+        """
+        Download all URLs concurrently and yield the bodies in order, or None for failed downloads.
+        Downloads that haven't started are canceled if the caller stops early.
+        """
+        futures = [self._executor.submit(self._fetch_or_none, url) for url in urls]
+        try:
+            for future in futures:
+                yield future.result()
+        finally:
+            for future in futures:
+                future.cancel()
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._session.close()
+
+
+@functools.cache
+def get_image_fetcher() -> ImageFetcher:
+    return ImageFetcher(cache=HttpCache(os.path.join(USER_FILES_DIR, HTTP_CACHE_DIRNAME)))
@@ -0,0 +1,68 @@
+# Copyright: Ajatt-Tools and contributors; https://github.com/Ajatt-Tools
+# License: GNU AGPL, version 3 or later; http://www.gnu.org/licenses/agpl.html
+
+import threading
+import time
+from collections.abc import Callable
+
+from aqt.qt import *
+
+# Background work resumes after the user hasn't pressed a key or clicked for this long.
+IDLE_SECONDS = 10.0
+POLL_SECONDS = 0.5
+ACTIVITY_EVENTS = frozenset((
+    QEvent.Type.KeyPress,
+    QEvent.Type.MouseButtonPress,
+    QEvent.Type.Wheel,
+    QEvent.Type.TouchBegin,
+))
+
+
+class IdleGate:
+    """
+    Holds background work back while the user is busy, e.g. reviewing or typing.
+    Activity is reported with touch(). Worker threads call wait() before each piece of work.
+    """
+
+    _idle_seconds: float
+    _clock: Callable[[], float]
+    _last_activity: float
+    _lock: threading.Lock
+
+    def __init__(self, idle_seconds: float = IDLE_SECONDS, clock: Callable[[], float] = time.monotonic) -> None:
+        self._idle_seconds = idle_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        # Work starts right away and stops at the first key press or click.
+        self._last_activity = clock() - idle_seconds
+
+    def touch(self) -> None:
+        with self._lock:
+            self._last_activity = self._clock()
+
+    def seconds_until_idle(self) -> float:
+        with self._lock:
+            return max(0.0, self._idle_seconds - (self._clock() - self._last_activity))
+
+    def is_idle(self) -> bool:
+        return self.seconds_until_idle() == 0
+
+    def wait(self, should_stop: Callable[[], bool], sleep: Callable[[float], None] = time.sleep) -> None:
+        """Block until the user has been idle long enough, or should_stop returns True."""
+        while not should_stop() and (left := self.seconds_until_idle()) > 0:
+            sleep(min(left, POLL_SECONDS))
+
+
+class ActivityFilter(QObject):
+    """Reports key presses and clicks anywhere in the application to the gate. Events are passed on unchanged."""
+
+    _gate: IdleGate
+
+    def __init__(self, gate: IdleGate, parent: QObject | None = None) -> None:
+        super().__init__(parent)
+        self._gate = gate
+
+    def eventFilter(self, watched: QObject | None, event: QEvent | None) -> bool:
+        if event is not None and event.type() in ACTIVITY_EVENTS:
+            self._gate.touch()
+        return False
@@ -0,0 +1,190 @@
+# Copyright: Ajatt-Tools and contributors; https://github.com/Ajatt-Tools
+# License: GNU AGPL, version 3 or later; http://www.gnu.org/licenses/agpl.html
+
+import collections
+import contextlib
+import functools
+import sys
+import threading
+import time
+import traceback
+import typing
+from collections.abc import Callable, Iterable, Iterator, Sequence
+
+from aqt import mw
+from aqt.qt import *
+from aqt.utils import tooltip
+
+from ..config import MediaConverterConfig
+from .timings import Span, get_timings
+
+TICK_MS = 16
+STALL_THRESHOLD_MS = 100
+MAX_KEPT_STALLS = 50
+
+
+class Stall(typing.NamedTuple):
+    operation: str
+    started_at: float  # unix time
+    seconds: float
+    stack: str  # the GUI thread's stack while it was stalled, or an empty string if it wasn't sampled
+
+
+class LagMonitor(QObject):
+    """
+    Measures how late a high-frequency timer fires on the GUI thread while add-on operations are running.
+    When the event loop doesn't run for longer than the threshold, a watcher thread samples the stack
+    of the GUI thread, so that the code that blocked it can be found later.
+    Operations can be nested. Monitoring stops when the outermost one ends.
+    """
+
+    _timer: QTimer
+    _threshold: float
+    _operations: list[str]
+    _lock: threading.Lock
+    _last_tick: float
+    _stall_stack: str | None
+    _stop_watcher: threading.Event | None
+    _gui_thread_id: int
+    _stalls: collections.deque[Stall]
+    _session: list[Stall]
+
+    def __init__(self, threshold_ms: int = STALL_THRESHOLD_MS, parent: QObject | None = None) -> None:
+        super().__init__(parent)
+        self._threshold = threshold_ms / 1000
+        self._operations = []
+        self._lock = threading.Lock()
+        self._last_tick = time.perf_counter()
+        self._stall_stack = None
+        self._stop_watcher = None
+        # Created on the GUI thread.
+        self._gui_thread_id = threading.get_ident()
+        self._stalls = collections.deque(maxlen=MAX_KEPT_STALLS)
+        self._session = []
+        self._timer = QTimer(self)
+        self._timer.setTimerType(Qt.TimerType.PreciseTimer)
+        self._timer.setInterval(TICK_MS)
+        qconnect(self._timer.timeout, self._check_lag)
+
+    def is_active(self) -> bool:
+        return bool(self._operations)
+
+    def stalls(self) -> list[Stall]:
+        """Recent stalls, the newest last."""
+        return list(self._stalls)
+
+    def begin(self, operation: str) -> None:
+        self._operations.append(operation)
+        if len(self._operations) > 1:
+            return
+        self._session = []
+        with self._lock:
+            self._last_tick = time.perf_counter()
+            self._stall_stack = None
+        # A new event for each session, so that a watcher that hasn't noticed the previous stop doesn't keep running.
+        self._stop_watcher = stop = threading.Event()
+        threading.Thread(target=self._watch, args=(stop,), name="ajt__media_converter_lag_monitor", daemon=True).start()
+        self._timer.start()
+
+    def end(self, operation: str | None = None) -> list[Stall]:
+        """
+        Finish an operation, the most recent one by default. After the outermost one, return the stalls recorded
+        since it began. Operations that run in the background can end in any order.
+        """
+        # Synchronous operations block the event loop until they return, so check once more.
+        self._check_lag()
+        last = len(self._operations) - 1
+        del self._operations[last if operation is None else last - self._operations[::-1].index(operation)]
+        if self._operations:
+            return []
+        self._timer.stop()
+        if self._stop_watcher:
+            self._stop_watcher.set()
+        return self._session
+
+    @contextlib.contextmanager
+    def monitoring(self, operation: str) -> Iterator[list[Stall]]:
+        """Monitor the body. The yielded list is filled with the stalls when the body finishes."""
+        stalls: list[Stall] = []
+        self.begin(operation)
+        try:
+            yield stalls
+        finally:
+            stalls.extend(self.end(operation))
+
+    def _check_lag(self) -> None:
+        now = time.perf_counter()
+        with self._lock:
+            lag = now - self._last_tick - TICK_MS / 1000
+            stack = self._stall_stack
+            self._last_tick = now
+            self._stall_stack = None
+        if lag >= self._threshold and self._operations:
+            self._record(Stall(self._operations[-1], time.time() - lag, lag, stack or ""))
+
+    def _record(self, stall: Stall) -> None:
+        self._stalls.append(stall)
+        self._session.append(stall)
+        get_timings().record(Span("ui_stall", stall.operation, stall.started_at, stall.seconds))
+
+    def _watch(self, stop: threading.Event) -> None:
+        while not stop.wait(self._threshold / 2):
+            with self._lock:
+                if self._stall_stack is not None or time.perf_counter() - self._last_tick < self._threshold:
+                    continue
+                # Sample once per stall, while the GUI thread is still inside the code that blocks it.
+                frame = sys._current_frames().get(self._gui_thread_id)
+                self._stall_stack = "".join(traceback.format_stack(frame)) if frame else ""
+
+
+def stall_summary(operation: str, stalls: Sequence[Stall]) -> str:
+    longest = max(stall.seconds for stall in stalls)
+    return (
+        f"The interface was blocked {len(stalls)} times during {operation}, "
+        f"up to {longest * 1000:.0f} ms.<br>See AJT > Conversion timings for details."
+    )
+
+
+def format_stalls(stalls: Iterable[Stall]) -> str:
+    blocks = []
+    for stall in sorted(stalls, key=lambda stall: stall.seconds, reverse=True):
+        when = time.strftime("%H:%M:%S", time.localtime(stall.started_at))
+        blocks.append(f"{stall.operation}: {stall.seconds * 1000:.0f} ms at {when}\n{stall.stack or '(not sampled)'}")
+    return "\n\n".join(blocks) or "No stalls recorded."
+
+
+@functools.cache
+def get_lag_monitor() -> LagMonitor:
+    return LagMonitor()
+
+
+def start_ui_lag_monitor(operation: str, config: MediaConverterConfig) -> Callable[[], None]:
+    """
+    Start watching the GUI thread if enabled in the config.
+    Return a function that stops watching and reports stalls. Only its first call has an effect.
+    """
+    if not config.monitor_ui_lag:
+        return lambda: None
+    monitor = get_lag_monitor()
+    monitor.begin(operation)
+    finished = False
+
+    def finish() -> None:
+        nonlocal finished
+        if finished:
+            return
+        finished = True
+        if stalls := monitor.end(operation):
+            tooltip(stall_summary(operation, stalls), period=config.tooltip_duration_milliseconds, parent=mw)
+
+    return finish
+
+
+@contextlib.contextmanager
+def monitor_ui_lag(operation: str, config: MediaConverterConfig) -> Iterator[None]:
+    """Watch the GUI thread during an operation if enabled in the config, and report stalls afterwards."""
+    finish = start_ui_lag_monitor(operation, config)
+    try:
+        yield
+    finally:
+        finish()
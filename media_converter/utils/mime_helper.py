@@ -1,17 +1,20 @@
 # Copyright: Ajatt-Tools and contributors; https://github.com/Ajatt-Tools
 # License: GNU AGPL, version 3 or later; http://www.gnu.org/licenses/agpl.html
 
+import enum
+import os
 import re
+import typing
 from collections.abc import Iterable
 
-import requests
 from aqt.qt import *
-from requests.exceptions import InvalidSchema, Timeout
 
-from ..consts import IS_MAC, REQUEST_HEADERS, REQUEST_TIMEOUTS
+from ..consts import IS_MAC
+from .http_fetcher import get_image_fetcher
 
 REMOTE_IMAGE_URL_RE = re.compile(r'(?<= src=")(?P<url>http[^"]+)(?=")')
 BASE64_IMAGE_DATA_RE = re.compile(r'(?<=;base64,)(?P<data>[^"]+)(?=")')
+IMAGE_SRC_RE = re.compile(r'<img[^<>]*?\ssrc="(?P<src>(?:http|data:image/)[^"]+)"', flags=re.IGNORECASE)
 
 
 def urls_from_html(html: str) -> list[str]:
@@ -36,13 +39,17 @@ def iter_files(mime: QMimeData) -> Iterable[str]:
 
 def image_from_url(src_url: str) -> QImage | None:
     """Download a remote image URL and return it as a QImage when possible."""
-    image = QImage()
     try:
-        with requests.get(src_url, timeout=REQUEST_TIMEOUTS, headers=REQUEST_HEADERS) as r:
-            image.loadFromData(r.content)
-    except (Timeout, InvalidSchema, OSError):
+        content = get_image_fetcher().fetch(src_url)
+    except OSError:
+        # Network errors, bad statuses and oversized responses. Request exceptions are OSErrors too.
         return None
-    return image
+    return QImage.fromData(content)
+
+
+def remote_urls(mime: QMimeData) -> list[str]:
+    """Return remote URLs from the MIME data and from its HTML, without repeats."""
+    return list(dict.fromkeys((*iter_urls(mime), *urls_from_html(mime.html()))))
 
 
 def image_from_file(filepath: str) -> QImage | None:
@@ -56,6 +63,49 @@ def image_from_file(filepath: str) -> QImage | None:
         return None
 
 
+class ImageSourceKind(enum.Enum):
+    file = enum.auto()
+    url = enum.auto()
+    data = enum.auto()
+
+
+class ImageSource(typing.NamedTuple):
+    kind: ImageSourceKind
+    location: str
+
+    @property
+    def filename(self) -> str | None:
+        return os.path.basename(self.location) if self.kind == ImageSourceKind.file else None
+
+
+def image_sources(mime: QMimeData) -> list[ImageSource]:
+    """
+    Return every image the MIME data refers to, in order: local files, remote URLs, then images embedded in HTML.
+    A location that appears more than once is returned once.
+    """
+    sources: dict[str, ImageSource] = {}
+    for file in iter_files(mime):
+        sources.setdefault(file, ImageSource(ImageSourceKind.file, file))
+    for url in iter_urls(mime):
+        sources.setdefault(url, ImageSource(ImageSourceKind.url, url))
+    for match in IMAGE_SRC_RE.finditer(mime.html()):
+        src = match.group("src")
+        kind = ImageSourceKind.url if src.startswith("http") else ImageSourceKind.data
+        sources.setdefault(src, ImageSource(kind, src))
+    return list(sources.values())
+
+
+def image_from_source(source: ImageSource) -> QImage | None:
+    """Load the image from a file, a remote URL or a data URL."""
+    if source.kind == ImageSourceKind.file:
+        return image_from_file(source.location)
+    if source.kind == ImageSourceKind.url:
+        return image_from_url(source.location)
+    if match := BASE64_IMAGE_DATA_RE.search(f'{source.location}"'):
+        return QImage.fromData(QByteArray.fromBase64(match.group("data").encode("ascii")))
+    return None
+
+
 def has_local_files(mime: QMimeData) -> bool:
     """Return True if the clipboard contains at least one local file URL."""
     return any(url.isLocalFile() for url in mime.urls())
@@ -74,7 +124,6 @@ def image_candidates(mime: QMimeData) -> Iterable[QImage | None]:
         yield QImage.fromData(data)
     for file in iter_files(mime):
         yield image_from_file(file)
-    for url in iter_urls(mime):
-        yield image_from_url(url)
-    for url in urls_from_html(mime.html()):
-        yield image_from_url(url)
+    # Remote images are downloaded concurrently, but yielded in order.
+    for content in get_image_fetcher().iter_fetch(remote_urls(mime)):
+        yield QImage.fromData(content) if content else None
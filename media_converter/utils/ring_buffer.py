@@ -0,0 +1,35 @@
+# Copyright: Ajatt-Tools and contributors; https://github.com/Ajatt-Tools
+# License: GNU AGPL, version 3 or later; http://www.gnu.org/licenses/agpl.html
+
+import collections
+import threading
+import typing
+
+RING_BUFFER_SIZE = 4096
+T = typing.TypeVar("T")
+
+
+class RingBuffer(typing.Generic[T]):
+    """
+    Keeps the most recent items in memory. Old items are dropped when the buffer is full.
+    Items are added from worker threads, so access is guarded by a lock.
+    """
+
+    _items: collections.deque[T]
+    _lock: threading.Lock
+
+    def __init__(self, capacity: int = RING_BUFFER_SIZE) -> None:
+        self._items = collections.deque(maxlen=capacity)
+        self._lock = threading.Lock()
+
+    def append(self, item: T) -> None:
+        with self._lock:
+            self._items.append(item)
+
+    def items(self) -> list[T]:
+        with self._lock:
+            return list(self._items)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
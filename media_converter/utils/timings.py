@@ -0,0 +1,170 @@
+# Copyright: Ajatt-Tools and contributors; https://github.com/Ajatt-Tools
+# License: GNU AGPL, version 3 or later; http://www.gnu.org/licenses/agpl.html
+
+import collections
+import contextlib
+import functools
+import json
+import math
+import os
+import threading
+import time
+import typing
+from collections.abc import Callable, Iterable, Iterator, Sequence
+
+from .ring_buffer import RingBuffer
+
+# Set to a directory to profile bulk conversions with cProfile. One .prof file is written per run.
+PROFILE_ENV_VAR = "AJT_MEDIA_CONVERTER_PROFILE"
+T = typing.TypeVar("T")
+
+
+class Span(typing.NamedTuple):
+    stage: str  # e.g. "encode", "temp_write"
+    label: str  # e.g. the encoder, or an empty string
+    started_at: float  # unix time
+    seconds: float
+
+
+class StageStats(typing.NamedTuple):
+    stage: str
+    label: str
+    count: int
+    total: float
+    p50: float
+    p95: float
+    p99: float
+
+
+def percentile(sorted_values: Sequence[float], q: float) -> float:
+    """Nearest-rank percentile of values sorted in ascending order."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(q / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+class TimingRecorder(RingBuffer[Span]):
+    """Keeps the most recent spans. Spans are recorded from worker threads."""
+
+    def record(self, span: Span) -> None:
+        self.append(span)
+
+    @contextlib.contextmanager
+    def span(self, stage: str, label: str = "") -> Iterator[None]:
+        """Record how long the body takes, even if it raises."""
+        started_at = time.time()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(Span(stage, label, started_at, time.perf_counter() - start))
+
+    def spans(self) -> list[Span]:
+        return self.items()
+
+    def stats(self) -> list[StageStats]:
+        """Percentiles per stage and label, sorted by stage."""
+        groups: dict[tuple[str, str], list[float]] = collections.defaultdict(list)
+        for span in self.spans():
+            groups[span.stage, span.label].append(span.seconds)
+        result = []
+        for (stage, label), values in sorted(groups.items()):
+            values.sort()
+            result.append(
+                StageStats(
+                    stage=stage,
+                    label=label,
+                    count=len(values),
+                    total=sum(values),
+                    p50=percentile(values, 50),
+                    p95=percentile(values, 95),
+                    p99=percentile(values, 99),
+                )
+            )
+        return result
+
+    def to_json(self) -> str:
+        return json.dumps(
+            {
+                "stats": [stats._asdict() for stats in self.stats()],
+                "spans": [span._asdict() for span in self.spans()],
+            },
+            indent=2,
+        )
+
+    def export_json(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(self.to_json())
+
+
+@functools.cache
+def get_timings() -> TimingRecorder:
+    return TimingRecorder()
+
+
+def timed(stage: str, label: str = "") -> contextlib.AbstractContextManager[None]:
+    """Record a span in the add-on's recorder."""
+    return get_timings().span(stage, label)
+
+
+def timed_iter(stage: str, items: Iterable[T]) -> Iterator[T]:
+    """Yield items, recording how long it takes to produce each one. Useful for lazy decoders."""
+    it = iter(items)
+    while True:
+        with timed(stage):
+            try:
+                item = next(it)
+            except StopIteration:
+                return
+        yield item
+
+
+class RunProfiler:
+    """
+    Profiles every call made through it with cProfile, including calls made in worker threads,
+    and writes the combined stats to one file.
+    Since Python 3.12, only one profiler can be active at a time, so the calls are profiled one by one.
+    """
+
+    _out_dir: str
+    _profile: typing.Any  # cProfile.Profile, imported only when profiling is enabled.
+    _lock: threading.Lock
+    _has_calls: bool
+
+    def __init__(self, out_dir: str) -> None:
+        import cProfile
+
+        self._out_dir = out_dir
+        self._profile = cProfile.Profile()
+        self._lock = threading.Lock()
+        self._has_calls = False
+
+    @classmethod
+    def from_env(cls) -> "RunProfiler | None":
+        if out_dir := os.environ.get(PROFILE_ENV_VAR):
+            return cls(out_dir)
+        return None
+
+    def wrap(self, fn: Callable[..., T]) -> Callable[..., T]:
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs) -> T:
+            with self._lock:
+                self._has_calls = True
+                return self._profile.runcall(fn, *args, **kwargs)
+
+        return wrapper
+
+    def dump(self, name: str) -> str | None:
+        """Write the stats to <out_dir>/<name>_<time>.prof and return the path. Open it with pstats or snakeviz."""
+        import pstats
+
+        with self._lock:
+            if not self._has_calls:
+                return None
+            stats = pstats.Stats(self._profile)
+        os.makedirs(self._out_dir, exist_ok=True)
+        path = os.path.join(self._out_dir, f"{name}_{time.strftime('%Y%m%d_%H%M%S')}.prof")
+        stats.dump_stats(path)
+        print(f"Profile written to {path}")
+        return path
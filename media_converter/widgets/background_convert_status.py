@@ -0,0 +1,55 @@
+# Copyright: Ajatt-Tools and contributors; https://github.com/Ajatt-Tools
+# License: GNU AGPL, version 3 or later; http://www.gnu.org/licenses/agpl.html
+
+from aqt.qt import *
+
+from ..bulk_convert.convert_result import ConvertProgress
+
+
+class BackgroundConvertStatus(QWidget):
+    """A small indicator of a bulk conversion running in the background, shown in the status bar."""
+
+    _bar: QProgressBar
+    _label: QLabel
+    _cancel_button: QPushButton
+    _results_button: QPushButton
+
+    def __init__(self, parent: QWidget | None = None) -> None:
+        super().__init__(parent)
+        self._bar = QProgressBar()
+        self._bar.setMaximumWidth(120)
+        self._bar.setTextVisible(False)
+        self._label = QLabel()
+        self._cancel_button = QPushButton("Cancel")
+        self._results_button = QPushButton("Results")
+        self._results_button.setToolTip("List the files converted so far. The list grows as more files finish.")
+        self.setLayout(self._setup_layout())
+
+    def _setup_layout(self) -> QLayout:
+        layout = QHBoxLayout()
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.addWidget(self._bar)
+        layout.addWidget(self._label)
+        layout.addWidget(self._cancel_button)
+        layout.addWidget(self._results_button)
+        return layout
+
+    @property
+    def cancel_button(self) -> QPushButton:
+        return self._cancel_button
+
+    @property
+    def results_button(self) -> QPushButton:
+        return self._results_button
+
+    def set_progress(self, progress: ConvertProgress, paused: bool) -> None:
+        self._bar.setRange(0, progress.total)
+        self._bar.setValue(progress.done)
+        state = "paused while you're busy" if paused else "converting"
+        self._label.setText(f"Bulk-convert: {progress.done}/{progress.total}, {state}")
+        self.setToolTip(progress.summary())
+
+    def set_finished(self, message: str) -> None:
+        self._bar.hide()
+        self._label.setText(message)
+        self._cancel_button.hide()
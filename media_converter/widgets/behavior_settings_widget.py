@@ -15,12 +15,18 @@ from ..utils.show_options import ShowOptions
 VISIBLE_BOOL_CONFIG_KEYS = {
     "drag_and_drop": "Convert images on drag and drop",
     "copy_paste": "Convert images on copy-paste",
+    "async_paste": "Convert pasted images in the background",
+    "fast_paste_preview": "Insert a quick preview, then finish encoding in the background",
+    "multi_image_paste": "Convert every image when several are pasted at once",
+    "reuse_converted_media": "Reuse files when the same image is converted again",
     "convert_on_note_add": "Convert when AnkiConnect creates new notes",
+    "defer_note_add_conversion": "Convert media of new notes in the background",
     "preserve_original_filenames": "Preserve original filenames, if available",
     "avoid_upscaling": "Avoid upscaling",
     "show_editor_button": "Show a Converter button on the Editor Toolbar",
     "show_context_menu_entry": "Show a separate context menu item",
     "delete_original_file_on_convert": "Delete original file after conversion",
+    "monitor_ui_lag": "Report when the interface is blocked",
 }
 
 
@@ -80,6 +86,27 @@ class BehaviorSettings(WidgetHasName, ConfigPropMixIn):
             "Convert images when a new note is added by an external tool, such as AnkiConnect.\n"
             "Does not apply to the native Add dialog."
         )
+        self._checkboxes["defer_note_add_conversion"].setToolTip(
+            "Add notes from AnkiConnect right away with the original media.\n"
+            "Their files are converted in batches in the background, and the notes are updated afterward.\n"
+            "The settings dialog is not shown in this mode."
+        )
+        self._checkboxes["async_paste"].setToolTip(
+            "Insert the original image right away and replace it when the conversion finishes.\n"
+            "The editor stays responsive during slow conversions, e.g. to AVIF."
+        )
+        self._checkboxes["multi_image_paste"].setToolTip(
+            "Dragging several files or pasting a web page fragment with several pictures\n"
+            "converts all of them in parallel. Otherwise, only the first image is converted."
+        )
+        self._checkboxes["delete_original_file_on_convert"].setToolTip(
+            "Move the original file to Anki's media trash once no note references it.\n"
+            "Files still used by other notes are kept. Tools > Check Media can restore trashed files."
+        )
+        self._checkboxes["monitor_ui_lag"].setToolTip(
+            "Measure how long Anki's window stops responding during add-on operations.\n"
+            "Stalls are summarized when an operation finishes and listed in AJT > Conversion timings."
+        )
         self._excluded_image_containers_edit.setToolTip(
             "A comma-separated list of image file formats (extensions without the dot)\n"
             "that should be skipped when converting image files."
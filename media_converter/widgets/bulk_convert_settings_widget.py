@@ -18,12 +18,18 @@ class BulkConvertSettings(WidgetHasName, ConfigPropMixIn):
     name: str = "Bulk-convert settings"
     _field_selector: MultipleChoiceSelector
     _reconvert_checkbox: QCheckBox
+    _min_gain_spinbox: QSpinBox
+    _background_checkbox: QCheckBox
 
     def __init__(self, config: MediaConverterConfig, parent=None) -> None:
         super().__init__(parent)
         self._config = config
         self._field_selector = MultipleChoiceSelector()
         self._reconvert_checkbox = EnableReconvertCheckbox(self.config.image_format)
+        self._min_gain_spinbox = QSpinBox()
+        self._min_gain_spinbox.setRange(0, 100)
+        self._min_gain_spinbox.setSuffix(" %")
+        self._background_checkbox = QCheckBox("Convert in the background")
         self._layout = QFormLayout()
         self._setup_ui()
         self._add_tooltips()
@@ -35,7 +41,10 @@ class BulkConvertSettings(WidgetHasName, ConfigPropMixIn):
     def _setup_ui(self) -> None:
         self._layout.addRow(self._field_selector)
         self._layout.addRow(self._reconvert_checkbox)
+        self._layout.addRow("Minimum estimated gain", self._min_gain_spinbox)
+        self._layout.addRow(self._background_checkbox)
         self.setLayout(self._layout)
+        qconnect(self._reconvert_checkbox.toggled, self._min_gain_spinbox.setEnabled)
 
     def _add_tooltips(self) -> None:
         self._field_selector.setToolTip(
@@ -44,14 +53,31 @@ class BulkConvertSettings(WidgetHasName, ConfigPropMixIn):
         self._reconvert_checkbox.setToolTip(
             "If an image was converted to the target format before,\n"
             "convert it again.\n"
-            "For example, change quality or dimensions."
+            "For example, change quality or dimensions.\n"
+            "Images already converted with the current settings are skipped."
+        )
+        self._min_gain_spinbox.setToolTip(
+            "When reconverting, skip images that would shrink by less than this.\n"
+            "The estimate is based on earlier conversions with the current settings.\n"
+            "0 reconverts every image converted with other settings."
+        )
+        self._background_checkbox.setToolTip(
+            "Keep using Anki while the files are converted.\n"
+            "The encoders run at the lowest priority, and no new files are started\n"
+            "while you are reviewing or typing. Notes are updated in batches,\n"
+            "and the progress is shown at the bottom of the main window."
         )
 
     def set_initial_values(self, all_field_names: list[str]) -> None:
         self._field_selector.set_texts(all_field_names)
         self._field_selector.set_checked_texts(self.config["bulk_convert_fields"])
         self._reconvert_checkbox.setChecked(self.config.bulk_reconvert)
+        self._min_gain_spinbox.setValue(self.config.bulk_reconvert_min_gain)
+        self._min_gain_spinbox.setEnabled(self.config.bulk_reconvert)
+        self._background_checkbox.setChecked(self.config.bulk_convert_in_background)
 
     def pass_settings_to_config(self) -> None:
         self.config["bulk_convert_fields"] = self._field_selector.checked_texts()
         self.config.bulk_reconvert = self._reconvert_checkbox.isChecked()
+        self.config.bulk_reconvert_min_gain = self._min_gain_spinbox.value()
+        self.config.bulk_convert_in_background = self._background_checkbox.isChecked()
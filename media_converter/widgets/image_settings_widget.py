@@ -1,5 +1,7 @@
 # Copyright: Ajatt-Tools and contributors; https://github.com/Ajatt-Tools
 # License: GNU AGPL, version 3 or later; http://www.gnu.org/licenses/agpl.html
+import typing
+
 from aqt.qt import *
 
 from ..config import MediaConverterConfig
@@ -38,6 +40,18 @@ class ImageSettings(WidgetHasName, ConfigPropMixIn):
             "If running Arch, run `sudo pacman -S ffmpeg` to install it."
         )
 
+    @property
+    def sliders(self) -> ImageSliderBox:
+        return self._img_sliders
+
+    @property
+    def enable_checkbox(self) -> QCheckBox:
+        return self._enable_checkbox
+
+    def as_dict(self) -> dict[str, typing.Any]:
+        """The values that affect the converted image."""
+        return {"enable_image_conversion": self._enable_checkbox.isChecked(), **self._img_sliders.as_dict()}
+
     def set_dimensions(self, width: int, height: int) -> None:
         if self._img_sliders.image_width > 0:
             self._img_sliders.image_width = width
@@ -53,6 +67,5 @@ class ImageSettings(WidgetHasName, ConfigPropMixIn):
         self._presets_editor.set_items(self.config["saved_presets"])
 
     def pass_settings_to_config(self) -> None:
-        self.config["enable_image_conversion"] = self._enable_checkbox.isChecked()
-        self.config.update(self._img_sliders.as_dict())
+        self.config.update(self.as_dict())
         self.config["saved_presets"] = self._presets_editor.as_list()
@@ -5,6 +5,7 @@ from typing import NamedTuple, TypedDict
 
 from aqt.qt import *
 
+from ..ajt_common.utils import q_emit
 from .rich_slider import RichSlider
 
 
@@ -31,6 +32,8 @@ def sliders_to_grid(sliders: Iterable[RichSlider]) -> QLayout:
 
 
 class ImageSliderBox(QWidget):
+    value_changed = pyqtSignal()
+
     def __init__(self, max_width: int = 1000, max_height: int = 1000) -> None:
         super().__init__()
         self._sliders = Sliders(
@@ -38,6 +41,8 @@ class ImageSliderBox(QWidget):
             image_height=RichSlider("Height", "px", upper_limit=max_height),
             image_quality=RichSlider("Quality", "%", upper_limit=100),
         )
+        for slider in self._sliders:
+            qconnect(slider.slider.valueChanged, lambda _value: q_emit(self.value_changed))
         self._setup_ui()
         self.set_tooltips()
 
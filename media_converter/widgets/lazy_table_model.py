@@ -0,0 +1,186 @@
+# Copyright: Ajatt-Tools and contributors; https://github.com/Ajatt-Tools
+# License: GNU AGPL, version 3 or later; http://www.gnu.org/licenses/agpl.html
+
+import array
+import bisect
+from collections.abc import Iterable, Sequence
+
+from aqt.qt import *
+
+FETCH_BATCH_SIZE = 256
+
+
+class LazyTableModel(QAbstractTableModel):
+    """
+    Read-only table of strings for large result sets.
+    Rows are stored column by column, and the visible order is an array of row indices,
+    so sorting and filtering don't touch the stored rows.
+    The view receives rows in batches as it scrolls (canFetchMore/fetchMore).
+    """
+
+    _headers: list[str]
+    _columns: list[list[str]]
+    _haystack: list[str]
+    _visible: array.array
+    _fetched: int
+    _filter: str
+    _sort_column: int
+    _sort_order: Qt.SortOrder
+
+    def __init__(self, headers: Sequence[str], parent: QObject | None = None) -> None:
+        super().__init__(parent)
+        self._headers = list(headers)
+        self._columns = [[] for _ in self._headers]
+        self._haystack = []
+        self._visible = array.array("L")
+        self._fetched = 0
+        self._filter = ""
+        self._sort_column = -1
+        self._sort_order = Qt.SortOrder.AscendingOrder
+
+    def total_row_count(self) -> int:
+        """Number of stored rows, including the ones hidden by the filter."""
+        return len(self._haystack)
+
+    def visible_row_count(self) -> int:
+        """Number of rows that pass the filter, including the ones not fetched by the view yet."""
+        return len(self._visible)
+
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return 0 if parent.isValid() else self._fetched
+
+    def columnCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self._headers)
+
+    def canFetchMore(self, parent: QModelIndex = QModelIndex()) -> bool:
+        return not parent.isValid() and self._fetched < len(self._visible)
+
+    def fetchMore(self, parent: QModelIndex = QModelIndex()) -> None:
+        if parent.isValid():
+            return
+        n_more = min(FETCH_BATCH_SIZE, len(self._visible) - self._fetched)
+        if n_more <= 0:
+            return
+        self.beginInsertRows(QModelIndex(), self._fetched, self._fetched + n_more - 1)
+        self._fetched += n_more
+        self.endInsertRows()
+
+    def data(self, index: QModelIndex, role: int = Qt.ItemDataRole.DisplayRole) -> str | None:
+        if not index.isValid() or role not in (Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.ToolTipRole):
+            return None
+        return self._columns[index.column()][self._visible[index.row()]]
+
+    def headerData(
+        self, section: int, orientation: Qt.Orientation, role: int = Qt.ItemDataRole.DisplayRole
+    ) -> str | int | None:
+        if role != Qt.ItemDataRole.DisplayRole:
+            return None
+        if orientation == Qt.Orientation.Horizontal:
+            return self._headers[section]
+        return section + 1
+
+    def set_rows(self, rows: Iterable[Sequence[str]]) -> None:
+        """Replace all stored rows."""
+        self.beginResetModel()
+        self._columns = [[] for _ in self._headers]
+        self._haystack = []
+        self._store(rows)
+        self._rebuild_visible()
+        self.endResetModel()
+
+    def append_rows(self, rows: Iterable[Sequence[str]]) -> None:
+        """
+        Add rows without resetting the view, e.g. while results are still streaming in.
+        If the table is sorted, each row is inserted at its sorted position.
+        """
+        for row_idx in self._store(rows):
+            if self._filter not in self._haystack[row_idx]:
+                continue
+            pos = self._insert_position(row_idx)
+            # Rows past the fetched part are shown when the view scrolls to them.
+            if pos < self._fetched or len(self._visible) < FETCH_BATCH_SIZE:
+                self.beginInsertRows(QModelIndex(), pos, pos)
+                self._visible.insert(pos, row_idx)
+                self._fetched += 1
+                self.endInsertRows()
+            else:
+                self._visible.insert(pos, row_idx)
+
+    def set_filter(self, text: str) -> None:
+        """Show only rows where some cell contains the text (case-insensitive)."""
+        self.beginResetModel()
+        self._filter = text.casefold()
+        self._rebuild_visible()
+        self.endResetModel()
+
+    def sort(self, column: int, order: Qt.SortOrder = Qt.SortOrder.AscendingOrder) -> None:
+        hint = QAbstractItemModel.LayoutChangeHint.VerticalSortHint
+        self.layoutAboutToBeChanged.emit([], hint)
+        self._sort_column = column
+        self._sort_order = order
+        old_indexes = self.persistentIndexList()
+        # Stored rows that the view keeps track of, e.g. the selection.
+        tracked = [self._visible[index.row()] for index in old_indexes]
+        self._visible = self._sorted(self._visible)
+        self.changePersistentIndexList(old_indexes, self._moved_indexes(old_indexes, tracked))
+        self.layoutChanged.emit([], hint)
+
+    def cell_text(self, row: int, column: int) -> str:
+        return self._columns[column][self._visible[row]]
+
+    def _store(self, rows: Iterable[Sequence[str]]) -> range:
+        start = len(self._haystack)
+        for row in rows:
+            assert len(row) == len(self._headers), "each row should have a cell for every column"
+            for column, cell in zip(self._columns, row):
+                column.append(str(cell))
+            self._haystack.append("\t".join(map(str, row)).casefold())
+        return range(start, len(self._haystack))
+
+    def _rebuild_visible(self) -> None:
+        if self._filter:
+            visible = array.array("L", (idx for idx, text in enumerate(self._haystack) if self._filter in text))
+        else:
+            visible = array.array("L", range(len(self._haystack)))
+        self._visible = self._sorted(visible)
+        self._fetched = min(FETCH_BATCH_SIZE, len(self._visible))
+
+    def _sorted(self, visible: array.array) -> array.array:
+        if self._sort_column < 0:
+            return visible
+        return array.array(
+            "L",
+            sorted(
+                visible,
+                key=self._columns[self._sort_column].__getitem__,
+                reverse=self._sort_order == Qt.SortOrder.DescendingOrder,
+            ),
+        )
+
+    def _moved_indexes(self, old_indexes: Sequence[QModelIndex], tracked: Sequence[int]) -> list[QModelIndex]:
+        """New indexes of the tracked rows. Rows that moved past the fetched part become invalid."""
+        if not tracked:
+            return []
+        wanted = set(tracked)
+        new_rows = {row_idx: pos for pos, row_idx in enumerate(self._visible) if row_idx in wanted}
+        return [
+            self.index(new_rows[row_idx], index.column()) if new_rows[row_idx] < self._fetched else QModelIndex()
+            for index, row_idx in zip(old_indexes, tracked)
+        ]
+
+    def _insert_position(self, row_idx: int) -> int:
+        if self._sort_column < 0:
+            return len(self._visible)
+        column = self._columns[self._sort_column]
+        if self._sort_order == Qt.SortOrder.DescendingOrder:
+            # bisect only works with ascending order.
+            key = column[row_idx]
+            lo, hi = 0, len(self._visible)
+            while lo < hi:
+                mid = (lo + hi) // 2
+                if column[self._visible[mid]] >= key:
+                    lo = mid + 1
+                else:
+                    hi = mid
+            return lo
+        return bisect.bisect_right(self._visible, column[row_idx], key=column.__getitem__)
@@ -10,7 +10,9 @@ from media_converter.file_converters.common import ConverterType, LocalFile
 
 def fill_fake_results(result: ConvertResult) -> None:
     for idx in range(1, 10):
-        result.add_converted(LocalFile(f"image_{idx}.jpg", ConverterType.image), f"new_image_{idx}.webp")
+        result.add_converted(
+            LocalFile(f"image_{idx}.jpg", ConverterType.image), f"new_image_{idx}.webp", 300_000, 90_000
+        )
     for idx in range(1, 1000):
         result.add_failed(LocalFile(f"image_{idx}.jpg", ConverterType.image), RuntimeError("runtime error"))
 
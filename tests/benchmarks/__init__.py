@@ -0,0 +1,7 @@
+# Copyright: Ajatt-Tools and contributors; https://github.com/Ajatt-Tools
+# License: GNU AGPL, version 3 or later; http://www.gnu.org/licenses/agpl.html
+
+# https://github.com/beartype/beartype
+from beartype.claw import beartype_this_package
+
+beartype_this_package()
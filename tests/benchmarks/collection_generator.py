@@ -0,0 +1,232 @@
+# Copyright: Ajatt-Tools and contributors; https://github.com/Ajatt-Tools
+# License: GNU AGPL, version 3 or later; http://www.gnu.org/licenses/agpl.html
+
+"""
+Builds Anki collections of any size for scale tests of bulk conversion, deduplication and renaming.
+The same spec always produces the same notes and files.
+"""
+
+import enum
+import math
+import os
+import pathlib
+import random
+import shutil
+import typing
+from collections.abc import Iterable, Sequence
+
+from anki.collection import AddNoteRequest, Collection
+from anki.decks import DeckId
+from anki.models import NotetypeDict
+from anki.notes import NoteId
+from aqt.qt import QBuffer, QColor, QImage, QIODevice
+
+NOTETYPE_NAME = "AJT Scale Test"
+ADD_NOTES_BATCH_SIZE = 5_000
+DEFAULT_DECK_ID = DeckId(1)
+# Set to "production" to generate a collection of the size seen in large real-world decks.
+SCALE_ENV_VAR = "AJT_MEDIA_CONVERTER_SCALE"
+
+
+class RefKind(enum.Enum):
+    """The ways a note can reference a media file."""
+
+    img = enum.auto()
+    sound = enum.auto()
+    css_url = enum.auto()
+    href = enum.auto()
+
+    def format(self, filename: str) -> str:
+        match self:
+            case RefKind.img:
+                return f'<img src="{filename}">'
+            case RefKind.sound:
+                return f"[sound:{filename}]"
+            case RefKind.css_url:
+                return f'<div style="background-image: url(&quot;{filename}&quot;)"></div>'
+            case RefKind.href:
+                return f'<a href="{filename}">{filename}</a>'
+        raise ValueError(self)
+
+
+class SizeDistribution(typing.NamedTuple):
+    """File sizes are log-uniform between the bounds: many small files and a few large ones."""
+
+    min_bytes: int
+    max_bytes: int
+
+    def sample(self, rng: random.Random) -> int:
+        return int(math.exp(rng.uniform(math.log(self.min_bytes), math.log(self.max_bytes))))
+
+
+class CollectionSpec(typing.NamedTuple):
+    n_notes: int = 2_000
+    n_media: int = 800  # including duplicates
+    duplicate_ratio: float = 0.2  # share of media files that are byte-for-byte copies of other files
+    audio_ratio: float = 0.25  # share of media files that are audio, the rest are images
+    # One entry per field. Each field references media files in the listed ways.
+    field_layouts: tuple[tuple[RefKind, ...], ...] = (
+        (RefKind.img, RefKind.css_url),
+        (RefKind.sound,),
+        (RefKind.img, RefKind.href),
+    )
+    sizes: SizeDistribution = SizeDistribution(min_bytes=1024, max_bytes=64 * 1024)
+    seed: int = 20240611
+
+    @classmethod
+    def production(cls) -> "CollectionSpec":
+        return cls(n_notes=200_000, n_media=80_000)
+
+    @classmethod
+    def from_env(cls) -> "CollectionSpec":
+        return cls.production() if os.environ.get(SCALE_ENV_VAR) == "production" else cls()
+
+    @property
+    def n_duplicates(self) -> int:
+        return int(self.n_media * self.duplicate_ratio)
+
+    @property
+    def field_names(self) -> list[str]:
+        return [f"Field{idx}" for idx in range(1, len(self.field_layouts) + 1)]
+
+
+class GeneratedCollection(typing.NamedTuple):
+    directory: pathlib.Path
+    col: Collection
+    note_ids: list[NoteId]
+    media: list[str]  # every media file, originals first
+    duplicates: dict[str, str]  # copy -> original
+
+    @property
+    def media_dir(self) -> pathlib.Path:
+        return self.directory / "collection.media"
+
+    def close(self) -> None:
+        self.col.close(downgrade=False)
+
+
+def png_bytes(rng: random.Random) -> bytes:
+    """A small valid PNG, so that the converters can read its dimensions."""
+    image = QImage(rng.randrange(8, 64), rng.randrange(8, 64), QImage.Format.Format_RGB32)
+    image.fill(QColor(rng.randrange(256), rng.randrange(256), rng.randrange(256)))
+    buffer = QBuffer()
+    buffer.open(QIODevice.OpenModeFlag.WriteOnly)
+    assert image.save(buffer, "PNG")
+    return bytes(buffer.data())
+
+
+def make_file_content(rng: random.Random, is_image: bool, size: int) -> bytes:
+    """
+    Unique content of roughly the given size.
+    Images start with a real PNG. Decoders ignore the random bytes after it, which make every file different.
+    """
+    head = png_bytes(rng) if is_image else b"ID3"
+    return head + rng.randbytes(max(16, size - len(head)))
+
+
+def write_media(spec: CollectionSpec, rng: random.Random, media_dir: pathlib.Path) -> tuple[list[str], dict[str, str]]:
+    """
+    Write the media files directly to the media folder, which is what the add-on reads.
+    Anki's media database isn't updated, like after the files are copied in by hand.
+    """
+    n_originals = spec.n_media - spec.n_duplicates
+    originals = []
+    for idx in range(n_originals):
+        is_image = rng.random() >= spec.audio_ratio
+        name = f"media_{idx:06d}.{'png' if is_image else 'mp3'}"
+        (media_dir / name).write_bytes(make_file_content(rng, is_image, spec.sizes.sample(rng)))
+        originals.append(name)
+    duplicates = {}
+    for idx in range(spec.n_duplicates):
+        original = rng.choice(originals)
+        name = f"copy_{idx:06d}{os.path.splitext(original)[1]}"
+        (media_dir / name).write_bytes((media_dir / original).read_bytes())
+        duplicates[name] = original
+    return originals + list(duplicates), duplicates
+
+
+def add_notetype(col: Collection, spec: CollectionSpec) -> NotetypeDict:
+    models = col.models
+    notetype = models.new(NOTETYPE_NAME)
+    for name in spec.field_names:
+        models.add_field(notetype, models.new_field(name))
+    template = models.new_template("Card 1")
+    template["qfmt"] = "{{" + spec.field_names[0] + "}}"
+    template["afmt"] = "{{FrontSide}}"
+    models.add_template(notetype, template)
+    models.add_dict(notetype)
+    notetype = models.by_name(NOTETYPE_NAME)
+    assert notetype
+    return notetype
+
+
+def field_contents(spec: CollectionSpec, rng: random.Random, media: Sequence[str]) -> Iterable[list[str]]:
+    """
+    Yield the fields of each note. Media files are handed out in a shuffled round so that every file,
+    including each duplicate, is referenced at least once when there are enough notes.
+    """
+    images = [name for name in media if name.endswith(".png")]
+    audio = [name for name in media if name.endswith(".mp3")]
+    pools = {False: images, True: audio}
+    cursors = {False: 0, True: 0}
+    for pool in pools.values():
+        rng.shuffle(pool)
+
+    def next_file(want_audio: bool) -> str:
+        pool = pools[want_audio] or pools[not want_audio]
+        name = pool[cursors[want_audio] % len(pool)]
+        cursors[want_audio] += 1
+        return name
+
+    for note_idx in range(spec.n_notes):
+        fields = []
+        for layout in spec.field_layouts:
+            parts = [f"note {note_idx}"]
+            for kind in layout:
+                parts.append(kind.format(next_file(want_audio=kind == RefKind.sound)))
+            fields.append(" ".join(parts))
+        yield fields
+
+
+def generate_collection(directory: pathlib.Path, spec: CollectionSpec) -> GeneratedCollection:
+    """Create collection.anki2 and its media folder in the directory. The caller should close the collection."""
+    directory.mkdir(parents=True, exist_ok=True)
+    rng = random.Random(spec.seed)
+    col = Collection(str(directory / "collection.anki2"))
+    try:
+        media, duplicates = write_media(spec, rng, pathlib.Path(col.media.dir()))
+        notetype = add_notetype(col, spec)
+        requests = []
+        for fields in field_contents(spec, rng, media):
+            note = col.new_note(notetype)
+            note.fields = fields
+            requests.append(AddNoteRequest(note=note, deck_id=DEFAULT_DECK_ID))
+            if len(requests) == ADD_NOTES_BATCH_SIZE:
+                col.add_notes(requests)
+                requests.clear()
+        if requests:
+            col.add_notes(requests)
+    except BaseException:
+        col.close(downgrade=False)
+        raise
+    return GeneratedCollection(
+        directory=directory,
+        col=col,
+        note_ids=list(col.find_notes("")),
+        media=media,
+        duplicates=duplicates,
+    )
+
+
+def clone_collection(generated: GeneratedCollection, directory: pathlib.Path) -> GeneratedCollection:
+    """
+    Open a copy of a closed collection, so that a test can modify it without generating it again.
+    Media files are hard-linked. The add-on never writes to an existing media file, so the original stays intact.
+    """
+    directory.mkdir(parents=True, exist_ok=True)
+    for entry in generated.directory.iterdir():
+        if entry.is_dir():
+            shutil.copytree(entry, directory / entry.name, copy_function=os.link)
+        else:
+            shutil.copy2(entry, directory / entry.name)
+    return generated._replace(directory=directory, col=Collection(str(directory / "collection.anki2")))
@@ -0,0 +1,63 @@
+# Copyright: Ajatt-Tools and contributors; https://github.com/Ajatt-Tools
+# License: GNU AGPL, version 3 or later; http://www.gnu.org/licenses/agpl.html
+
+import os
+import pathlib
+import shutil
+from collections.abc import Iterator
+
+import pytest
+
+from tests.benchmarks.corpus import Corpus, make_corpus, write_stub_encoder
+from tests.benchmarks.report import (
+    BASELINE_ENV_VAR,
+    OUTPUT_ENV_VAR,
+    BenchmarkReport,
+    Thresholds,
+    load_baseline,
+)
+
+REPO_ROOT = pathlib.Path(__file__).parent.parent.parent
+
+
+@pytest.fixture(scope="session")
+def benchmark_report() -> Iterator[BenchmarkReport]:
+    report = BenchmarkReport(Thresholds.load(), load_baseline(os.environ.get(BASELINE_ENV_VAR)))
+    yield report
+    if report.results:
+        path = os.environ.get(OUTPUT_ENV_VAR) or str(REPO_ROOT / "bench_results.json")
+        report.write(path)
+        print(f"Benchmark results written to {path}")
+
+
+@pytest.fixture(scope="session")
+def corpus(tmp_path_factory) -> Corpus:
+    return make_corpus(tmp_path_factory.mktemp("benchmark") / "collection.media", ffmpeg=shutil.which("ffmpeg"))
+
+
+@pytest.fixture
+def stub_encoders(tmp_path, monkeypatch) -> None:
+    """Replace cwebp and ffmpeg with scripts that copy the file, leaving only the add-on's own overhead."""
+    from media_converter.file_converters import audio_converter, image_converter
+
+    cwebp = write_stub_encoder(tmp_path, "cwebp")
+    ffmpeg = write_stub_encoder(tmp_path, "ffmpeg")
+    monkeypatch.setattr(image_converter, "find_cwebp_exe", lambda: cwebp)
+    monkeypatch.setattr(image_converter, "find_ffmpeg_exe", lambda: ffmpeg)
+    monkeypatch.setattr(audio_converter, "find_ffmpeg_exe", lambda: ffmpeg)
+
+
+@pytest.fixture(autouse=True)
+def isolated_indexes(tmp_path, monkeypatch) -> Iterator[None]:
+    """Keep the reference and conversion indexes under tmp_path instead of the add-on's user files."""
+    from media_converter.media_deduplication import conversion_index, reference_index
+
+    getters = (reference_index.get_reference_index, conversion_index.get_conversion_index)
+    for module in (reference_index, conversion_index):
+        monkeypatch.setattr(module, "USER_FILES_DIR", str(tmp_path / "user_files"))
+    # The getters are imported by name in many modules, so their cached instances are replaced instead.
+    for getter in getters:
+        getter.cache_clear()
+    yield
+    for getter in getters:
+        getter.cache_clear()
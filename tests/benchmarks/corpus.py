@@ -0,0 +1,179 @@
+# Copyright: Ajatt-Tools and contributors; https://github.com/Ajatt-Tools
+# License: GNU AGPL, version 3 or later; http://www.gnu.org/licenses/agpl.html
+
+"""
+A deterministic media corpus for the benchmarks.
+The same seed always produces the same files, so results of different runs can be compared.
+"""
+
+import math
+import os
+import pathlib
+import random
+import shutil
+import stat
+import struct
+import subprocess
+import sys
+import typing
+import wave
+
+from aqt.qt import QColor, QFont, QImage, QPainter, QRect, Qt
+
+DEFAULT_SEED = 20240611
+SCREENSHOT_SIZES = ((640, 480), (1280, 720), (1920, 1080))
+PHOTO_SIZES = ((320, 240), (800, 600), (1600, 1200))
+GIF_SIZES = ((160, 120), (320, 240))
+AUDIO_SECONDS = (1, 3, 10)
+SAMPLE_RATE = 44100
+# Every n-th image is copied under another name, so that deduplication has something to find.
+DUPLICATE_EVERY = 3
+
+STUB_ENCODER = """\
+#!{python}
+# Copies the input to the output, like cwebp ("in -o out") or ffmpeg ("-i in ... out") would.
+import shutil, sys
+
+args = sys.argv[1:]
+if "-o" in args:
+    source, destination = args[0], args[args.index("-o") + 1]
+else:
+    source, destination = args[args.index("-i") + 1], args[-1]
+shutil.copyfile(source, destination)
+"""
+
+
+class Corpus(typing.NamedTuple):
+    media_dir: pathlib.Path
+    images: list[pathlib.Path]
+    animations: list[pathlib.Path]
+    audio: list[pathlib.Path]
+
+    def all_files(self) -> list[pathlib.Path]:
+        return sorted(path for path in self.media_dir.iterdir() if path.is_file())
+
+    def total_bytes(self) -> int:
+        return sum(path.stat().st_size for path in self.all_files())
+
+
+def draw_screenshot(rng: random.Random, width: int, height: int) -> QImage:
+    """Flat panels and text, which compress well, like a screenshot of an app or a web page."""
+    image = QImage(width, height, QImage.Format.Format_RGB32)
+    image.fill(QColor(rng.randrange(200, 256), rng.randrange(200, 256), rng.randrange(200, 256)))
+    painter = QPainter(image)
+    painter.setFont(QFont("Sans", 12))
+    for _ in range(40):
+        rect = QRect(rng.randrange(width), rng.randrange(height), rng.randrange(20, width // 2), rng.randrange(10, 120))
+        painter.fillRect(rect, QColor(rng.randrange(256), rng.randrange(256), rng.randrange(256)))
+    painter.setPen(QColor(Qt.GlobalColor.black))
+    for line in range(0, height, 24):
+        painter.drawText(8, line + 18, " ".join(f"word{rng.randrange(1000)}" for _ in range(width // 70)))
+    painter.end()
+    return image
+
+
+def draw_photo(rng: random.Random, width: int, height: int) -> QImage:
+    """Random pixels, which don't compress at all. The worst case for an encoder, like a noisy photo."""
+    data = rng.randbytes(width * height * 3)
+    # copy() detaches the image from the buffer, which is freed when this function returns.
+    return QImage(data, width, height, width * 3, QImage.Format.Format_RGB888).copy()
+
+
+def write_sine_wav(path: pathlib.Path, seconds: int, frequency: int) -> None:
+    """Used when ffmpeg isn't installed. The stub encoders don't look inside the file."""
+    frames = b"".join(
+        struct.pack("<h", int(12000 * math.sin(2 * math.pi * frequency * n / SAMPLE_RATE)))
+        for n in range(seconds * SAMPLE_RATE)
+    )
+    with wave.open(str(path), "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(SAMPLE_RATE)
+        f.writeframes(frames)
+
+
+def run_ffmpeg(ffmpeg: str, *args: str) -> None:
+    subprocess.run([ffmpeg, "-hide_banner", "-nostdin", "-y", "-loglevel", "error", *args], check=True)
+
+
+def make_images(rng: random.Random, media_dir: pathlib.Path) -> list[pathlib.Path]:
+    images = []
+    for width, height in SCREENSHOT_SIZES:
+        image = draw_screenshot(rng, width, height)
+        for fmt in ("png", "jpg"):
+            path = media_dir / f"screenshot_{width}x{height}.{fmt}"
+            assert image.save(str(path), quality=90), f"can't write {path}"
+            images.append(path)
+    for width, height in PHOTO_SIZES:
+        path = media_dir / f"photo_{width}x{height}.jpg"
+        assert draw_photo(rng, width, height).save(str(path), quality=90), f"can't write {path}"
+        images.append(path)
+    return images
+
+
+def make_animations(ffmpeg: str | None, media_dir: pathlib.Path) -> list[pathlib.Path]:
+    if not ffmpeg:
+        return []
+    animations = []
+    for width, height in GIF_SIZES:
+        path = media_dir / f"animation_{width}x{height}.gif"
+        run_ffmpeg(ffmpeg, "-f", "lavfi", "-i", f"testsrc2=size={width}x{height}:rate=10", "-t", "2", str(path))
+        animations.append(path)
+    return animations
+
+
+def make_audio(rng: random.Random, ffmpeg: str | None, media_dir: pathlib.Path) -> list[pathlib.Path]:
+    audio = []
+    for seconds in AUDIO_SECONDS:
+        frequency = rng.randrange(220, 880)
+        if ffmpeg:
+            path = media_dir / f"tone_{seconds}s.flac"
+            source = f"sine=frequency={frequency}:sample_rate={SAMPLE_RATE}:duration={seconds}"
+            run_ffmpeg(ffmpeg, "-f", "lavfi", "-i", source, str(path))
+        else:
+            path = media_dir / f"tone_{seconds}s.wav"
+            write_sine_wav(path, seconds, frequency)
+        audio.append(path)
+    return audio
+
+
+def make_corpus(media_dir: pathlib.Path, ffmpeg: str | None, seed: int = DEFAULT_SEED) -> Corpus:
+    """
+    Fill media_dir with screenshots, photos, animations and audio clips.
+    Animations are made only if ffmpeg is available. Without ffmpeg, audio clips are written as plain wav files.
+    """
+    rng = random.Random(seed)
+    media_dir.mkdir(parents=True, exist_ok=True)
+    images = make_images(rng, media_dir)
+    for idx, path in enumerate(images[::DUPLICATE_EVERY]):
+        shutil.copyfile(path, media_dir / f"copy_{idx}_{path.name}")
+    return Corpus(
+        media_dir=media_dir,
+        images=images,
+        animations=make_animations(ffmpeg, media_dir),
+        audio=make_audio(rng, ffmpeg, media_dir),
+    )
+
+
+def make_note_fields(corpus: Corpus, n_fields: int, seed: int = DEFAULT_SEED) -> list[str]:
+    """Field contents that reference the corpus files in the ways notes usually do."""
+    rng = random.Random(seed)
+    names = [path.name for path in corpus.all_files()]
+    fields = []
+    for _ in range(n_fields):
+        parts = [f"<div>sentence {rng.randrange(10_000)}</div>"]
+        for name in rng.sample(names, k=3):
+            if os.path.splitext(name)[1] in (".flac", ".wav"):
+                parts.append(f"[sound:{name}]")
+            else:
+                parts.append(f'<img src="{name}">')
+        fields.append("".join(parts))
+    return fields
+
+
+def write_stub_encoder(directory: pathlib.Path, name: str) -> str:
+    """An executable that stands in for cwebp or ffmpeg, so that the pipeline is measured without the encoder."""
+    path = directory / name
+    path.write_text(STUB_ENCODER.format(python=sys.executable), encoding="utf-8")
+    path.chmod(path.stat().st_mode | stat.S_IXUSR)
+    return str(path)
@@ -0,0 +1,150 @@
+# Copyright: Ajatt-Tools and contributors; https://github.com/Ajatt-Tools
+# License: GNU AGPL, version 3 or later; http://www.gnu.org/licenses/agpl.html
+
+import json
+import os
+import pathlib
+import platform
+import sys
+import time
+import tracemalloc
+import typing
+from collections.abc import Callable
+
+THRESHOLDS_PATH = pathlib.Path(__file__).with_name("thresholds.json")
+# Set to any value to run the benchmarks. They are skipped otherwise.
+ENABLE_ENV_VAR = "AJT_MEDIA_CONVERTER_BENCHMARK"
+# Where to write the results. Defaults to bench_results.json in the repository root.
+OUTPUT_ENV_VAR = "AJT_MEDIA_CONVERTER_BENCHMARK_OUT"
+# Results of an earlier run. Each benchmark must stay within its tolerance of the baseline.
+BASELINE_ENV_VAR = "AJT_MEDIA_CONVERTER_BENCHMARK_BASELINE"
+
+
+class BenchmarkResult(typing.NamedTuple):
+    name: str
+    unit: str  # e.g. "files/s", "MiB/s"
+    value: float  # higher is better
+    items: float  # files, MiB or fields processed in one round
+    seconds: float  # the fastest round
+
+
+class Thresholds(typing.NamedTuple):
+    tolerance: float  # allowed slowdown relative to the baseline, e.g. 0.25
+    minimums: dict[str, float]  # benchmark name -> the lowest acceptable value
+
+    @classmethod
+    def load(cls, path: pathlib.Path = THRESHOLDS_PATH) -> "Thresholds":
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(tolerance=float(data["tolerance"]), minimums={k: float(v) for k, v in data["minimums"].items()})
+
+
+def measure(name: str, unit: str, items: int | float, run: Callable[[], object], rounds: int = 3) -> BenchmarkResult:
+    """Run several rounds and keep the fastest, which is the least disturbed by other processes."""
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - start)
+    return BenchmarkResult(name=name, unit=unit, value=items / best, items=float(items), seconds=best)
+
+
+class Traced(typing.NamedTuple):
+    result: typing.Any
+    seconds: float
+    peak_bytes: int  # Python allocations only. Memory held by Anki's backend isn't counted.
+
+
+def traced(run: Callable[[], object]) -> Traced:
+    """Run once, measuring the time and the peak memory allocated by Python code."""
+    tracemalloc.start()
+    try:
+        start = time.perf_counter()
+        result = run()
+        seconds = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return Traced(result, seconds, peak)
+
+
+class ScaleBudget(typing.NamedTuple):
+    """Limits for an operation on a generated collection, per thousand items (notes or media files)."""
+
+    seconds_per_1k: float
+    peak_mib_per_1k: float
+
+    @classmethod
+    def load(cls, name: str, path: pathlib.Path = THRESHOLDS_PATH) -> "ScaleBudget":
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)["scale"][name]
+        return cls(float(data["seconds_per_1k"]), float(data["peak_mib_per_1k"]))
+
+    def violations(self, name: str, n_items: int, measured: Traced) -> list[str]:
+        # Small collections are held to the budget of a thousand items, so that fixed costs don't fail them.
+        thousands = max(n_items, 1000) / 1000
+        problems = []
+        if measured.seconds > (allowed := self.seconds_per_1k * thousands):
+            problems.append(f"{name}: took {measured.seconds:.2f} s, the budget is {allowed:.2f} s")
+        if (peak_mib := measured.peak_bytes / 1024 / 1024) > (allowed := self.peak_mib_per_1k * thousands):
+            problems.append(f"{name}: peak memory was {peak_mib:.1f} MiB, the budget is {allowed:.1f} MiB")
+        return problems
+
+
+def load_baseline(path: str | None) -> dict[str, float]:
+    if not path:
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return {result["name"]: result["value"] for result in json.load(f)["results"]}
+
+
+class BenchmarkReport:
+    """Collects the results of a run, checks them against the thresholds and writes them to a JSON file."""
+
+    _thresholds: Thresholds
+    _baseline: dict[str, float]
+    _results: list[BenchmarkResult]
+
+    def __init__(self, thresholds: Thresholds, baseline: dict[str, float]) -> None:
+        self._thresholds = thresholds
+        self._baseline = baseline
+        self._results = []
+
+    @property
+    def results(self) -> list[BenchmarkResult]:
+        return self._results
+
+    def regressions(self, result: BenchmarkResult) -> list[str]:
+        problems = []
+        if (minimum := self._thresholds.minimums.get(result.name)) is not None and result.value < minimum:
+            problems.append(f"{result.name}: {result.value:.1f} {result.unit} is below the minimum of {minimum}")
+        if (previous := self._baseline.get(result.name)) is not None:
+            allowed = previous * (1 - self._thresholds.tolerance)
+            if result.value < allowed:
+                problems.append(
+                    f"{result.name}: {result.value:.1f} {result.unit} is more than "
+                    f"{self._thresholds.tolerance:.0%} slower than the baseline of {previous:.1f}"
+                )
+        return problems
+
+    def add(self, result: BenchmarkResult) -> list[str]:
+        """Record the result and return the thresholds it doesn't meet."""
+        self._results.append(result)
+        print(f"{result.name}: {result.value:.1f} {result.unit} ({result.items:g} in {result.seconds:.3f} s)")
+        return self.regressions(result)
+
+    def to_json(self) -> str:
+        return json.dumps(
+            {
+                "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "python": sys.version.split()[0],
+                "platform": platform.platform(),
+                "cpu_count": os.cpu_count(),
+                "results": [result._asdict() for result in self._results],
+            },
+            indent=2,
+        )
+
+    def write(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(self.to_json())
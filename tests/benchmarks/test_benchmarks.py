@@ -0,0 +1,111 @@
+# Copyright: Ajatt-Tools and contributors; https://github.com/Ajatt-Tools
+# License: GNU AGPL, version 3 or later; http://www.gnu.org/licenses/agpl.html
+
+import functools
+import os
+import pathlib
+import types
+from collections.abc import Sequence
+
+import pytest
+
+from tests.benchmarks.corpus import DUPLICATE_EVERY, Corpus, make_note_fields
+from tests.benchmarks.report import (
+    ENABLE_ENV_VAR,
+    BenchmarkReport,
+    BenchmarkResult,
+    measure,
+)
+
+pytestmark = [
+    pytest.mark.skipif(not os.environ.get(ENABLE_ENV_VAR), reason=f"set {ENABLE_ENV_VAR}=1 to run benchmarks"),
+    pytest.mark.skipif(os.name == "nt", reason="the stub encoders are scripts with a shebang line"),
+]
+
+N_NOTE_FIELDS = 20_000
+MIB = 1024 * 1024
+
+
+def check(report: BenchmarkReport, result: BenchmarkResult) -> None:
+    problems = report.add(result)
+    assert not problems, "\n".join(problems)
+
+
+def convert_all(files: Sequence[pathlib.Path], out_dir: pathlib.Path, extension: str, config) -> None:
+    from media_converter.file_converters.file_converter import FileConverter
+
+    for path in files:
+        FileConverter(str(path), str(out_dir / f"{path.stem}{extension}"), config).convert()
+
+
+def test_image_converter_throughput(corpus: Corpus, stub_encoders, no_anki_config, tmp_path, benchmark_report) -> None:
+    run = functools.partial(convert_all, corpus.images, tmp_path, ".webp", no_anki_config)
+    check(benchmark_report, measure("image_convert_stub", "files/s", len(corpus.images), run))
+
+
+def test_animation_converter_throughput(
+    corpus: Corpus, stub_encoders, no_anki_config, tmp_path, benchmark_report
+) -> None:
+    if not corpus.animations:
+        pytest.skip("ffmpeg is needed to make animations")
+    no_anki_config.image_format = "avif"
+    run = functools.partial(convert_all, corpus.animations, tmp_path, ".avif", no_anki_config)
+    check(benchmark_report, measure("animation_convert_stub", "files/s", len(corpus.animations), run))
+
+
+def test_audio_converter_throughput(corpus: Corpus, stub_encoders, no_anki_config, tmp_path, benchmark_report) -> None:
+    run = functools.partial(convert_all, corpus.audio, tmp_path, ".ogg", no_anki_config)
+    check(benchmark_report, measure("audio_convert_stub", "files/s", len(corpus.audio), run))
+
+
+def test_cwebp_throughput(corpus: Corpus, no_anki_config, tmp_path, benchmark_report) -> None:
+    from media_converter.utils.executables import find_cwebp_exe
+
+    try:
+        find_cwebp_exe()
+    except AssertionError:
+        pytest.skip("cwebp is not installed")
+    run = functools.partial(convert_all, corpus.images, tmp_path, ".webp", no_anki_config)
+    check(benchmark_report, measure("image_convert_cwebp", "files/s", len(corpus.images), run, rounds=1))
+
+
+def test_collect_files_throughput(corpus: Corpus, benchmark_report) -> None:
+    from media_converter.media_deduplication.deduplication import MediaDedup
+
+    # collect_files() only needs to know where the media folder is.
+    col = types.SimpleNamespace(media=types.SimpleNamespace(dir=lambda: str(corpus.media_dir)))
+    dedup = MediaDedup(col)
+    groups = dedup.collect_files()
+    assert len(groups) == len(corpus.images[::DUPLICATE_EVERY])
+    result = measure("collect_files", "MiB/s", corpus.total_bytes() / MIB, dedup.collect_files)
+    check(benchmark_report, result)
+
+
+def test_find_media_scan_rate(corpus: Corpus, no_anki_config, benchmark_report) -> None:
+    from media_converter.file_converters.find_media import FindMedia
+
+    fields = make_note_fields(corpus, N_NOTE_FIELDS)
+    finder = FindMedia(no_anki_config)
+
+    def run() -> None:
+        for field in fields:
+            for _ in finder.find_convertible_images(field):
+                pass
+            for _ in finder.find_convertible_audio(field):
+                pass
+
+    check(benchmark_report, measure("find_media", "fields/s", len(fields), run))
+
+
+def test_do_replacements_rate(corpus: Corpus, benchmark_report) -> None:
+    from media_converter.media_deduplication.deduplication import do_replacements
+
+    fields = make_note_fields(corpus, N_NOTE_FIELDS)
+    old_name = corpus.images[0].name
+    assert any(old_name in field for field in fields)
+
+    def run() -> None:
+        for field in fields:
+            do_replacements(field, old_name, "renamed.webp")
+
+    check(benchmark_report, measure("do_replacements", "fields/s", len(fields), run))
@@ -0,0 +1,48 @@
+# Copyright: Ajatt-Tools and contributors; https://github.com/Ajatt-Tools
+# License: GNU AGPL, version 3 or later; http://www.gnu.org/licenses/agpl.html
+
+import json
+
+from tests.benchmarks.report import (
+    BenchmarkReport,
+    BenchmarkResult,
+    Thresholds,
+    load_baseline,
+    measure,
+)
+
+
+def test_measure() -> None:
+    calls = []
+    result = measure("noop", "calls/s", 10, lambda: calls.append(1), rounds=4)
+    assert len(calls) == 4
+    assert result.name == "noop" and result.items == 10
+    assert result.value == 10 / result.seconds
+
+
+def test_thresholds_file() -> None:
+    thresholds = Thresholds.load()
+    assert 0 < thresholds.tolerance < 1
+    assert "image_convert_stub" in thresholds.minimums
+
+
+def test_regressions(tmp_path) -> None:
+    baseline_path = tmp_path / "baseline.json"
+    baseline_path.write_text(json.dumps({"results": [{"name": "find_media", "value": 1000.0}]}))
+    report = BenchmarkReport(
+        Thresholds(tolerance=0.2, minimums={"collect_files": 50.0}), load_baseline(str(baseline_path))
+    )
+
+    assert report.add(BenchmarkResult("find_media", "fields/s", 850.0, 1.0, 1.0)) == []
+    assert "slower than the baseline" in report.add(BenchmarkResult("find_media", "fields/s", 700.0, 1.0, 1.0))[0]
+    assert "below the minimum" in report.add(BenchmarkResult("collect_files", "MiB/s", 10.0, 1.0, 1.0))[0]
+    assert report.add(BenchmarkResult("unknown", "MiB/s", 1.0, 1.0, 1.0)) == []
+
+    output = tmp_path / "results.json"
+    report.write(str(output))
+    assert [r["name"] for r in json.loads(output.read_text())["results"]] == [
+        "find_media",
+        "find_media",
+        "collect_files",
+        "unknown",
+    ]
@@ -0,0 +1,163 @@
+# Copyright: Ajatt-Tools and contributors; https://github.com/Ajatt-Tools
+# License: GNU AGPL, version 3 or later; http://www.gnu.org/licenses/agpl.html
+
+import os
+import types
+from collections.abc import Iterator
+from unittest.mock import Mock
+
+import pytest
+
+from tests.benchmarks.collection_generator import (
+    CollectionSpec,
+    GeneratedCollection,
+    clone_collection,
+    generate_collection,
+)
+from tests.benchmarks.report import ENABLE_ENV_VAR, ScaleBudget, Traced, traced
+
+requires_benchmarks = pytest.mark.skipif(
+    not os.environ.get(ENABLE_ENV_VAR), reason=f"set {ENABLE_ENV_VAR}=1 to run benchmarks"
+)
+# How many notes to check after an operation, instead of reading the whole collection again.
+N_SAMPLED = 200
+
+
+def check_budget(name: str, n_items: int, measured: Traced) -> None:
+    print(f"{name}: {n_items} items in {measured.seconds:.2f} s, peak {measured.peak_bytes / 1024 / 1024:.1f} MiB")
+    problems = ScaleBudget.load(name).violations(name, n_items, measured)
+    assert not problems, "\n".join(problems)
+
+
+@pytest.fixture(scope="session")
+def scale_template(tmp_path_factory) -> GeneratedCollection:
+    """Generated once per session and closed. Tests work on clones."""
+    generated = generate_collection(tmp_path_factory.mktemp("scale_template"), CollectionSpec.from_env())
+    generated.close()
+    return generated
+
+
+@pytest.fixture
+def scale_collection(scale_template, tmp_path) -> Iterator[GeneratedCollection]:
+    generated = clone_collection(scale_template, tmp_path / "clone")
+    yield generated
+    generated.close()
+
+
+@pytest.fixture
+def with_scale_collection(scale_collection, monkeypatch) -> GeneratedCollection:
+    """Point the add-on at the generated collection, as if it was open in Anki."""
+    import anki.lang
+
+    from media_converter.bulk_convert import convert_task
+    from media_converter.file_converters import internal_file_converter
+
+    fake_mw = types.SimpleNamespace(col=scale_collection.col)
+    monkeypatch.setattr(convert_task, "mw", fake_mw)
+    monkeypatch.setattr(internal_file_converter, "mw", fake_mw)
+    # Anki converts HTML to text with the backend of the open collection.
+    monkeypatch.setattr(anki.lang, "current_i18n", scale_collection.col._backend)
+    return scale_collection
+
+
+def test_generate_collection(tmp_path) -> None:
+    spec = CollectionSpec(n_notes=40, n_media=20, duplicate_ratio=0.25)
+    generated = generate_collection(tmp_path / "col", spec)
+    try:
+        assert len(generated.note_ids) == spec.n_notes
+        assert sorted(path.name for path in generated.media_dir.iterdir()) == sorted(generated.media)
+        assert len(generated.duplicates) == spec.n_duplicates == 5
+        for copy, original in generated.duplicates.items():
+            assert (generated.media_dir / copy).read_bytes() == (generated.media_dir / original).read_bytes()
+        all_fields = "".join("".join(generated.col.get_note(nid).fields) for nid in generated.note_ids)
+        assert all(name in all_fields for name in generated.media)
+        assert all(marker in all_fields for marker in ("<img src=", "[sound:", "url(&quot;", "<a href="))
+    finally:
+        generated.close()
+    # The same spec makes the same files.
+    again = generate_collection(tmp_path / "again", spec)
+    again.close()
+    assert again.media == generated.media
+    assert (again.media_dir / again.media[0]).read_bytes() == (generated.media_dir / generated.media[0]).read_bytes()
+
+
+@requires_benchmarks
+def test_collect_files_at_scale(scale_collection) -> None:
+    from media_converter.media_deduplication.deduplication import MediaDedup
+
+    measured = traced(MediaDedup(scale_collection.col).collect_files)
+    assert len(measured.result) == len(set(scale_collection.duplicates.values()))
+    check_budget("collect_files", len(scale_collection.media), measured)
+
+
+@requires_benchmarks
+def test_deduplicate_at_scale(scale_collection) -> None:
+    from media_converter.media_deduplication.deduplication import MediaDedup
+    from media_converter.media_deduplication.reference_index import get_reference_index
+
+    col = scale_collection.col
+    dedup = MediaDedup(col)
+    groups = dedup.collect_files()
+    # In Anki, the index is built once and then kept up to date, so building it isn't part of deduplication.
+    get_reference_index().rebuild(col)
+    measured = traced(lambda: dedup.deduplicate(groups))
+    # The group decides which file is kept, so it isn't necessarily the one the generator copied.
+    for dup in [dup for group in groups for dup in group.copies][:N_SAMPLED]:
+        assert not col.find_notes(col.build_search_string(dup.name))
+    check_budget("deduplicate", len(scale_collection.note_ids), measured)
+
+
+@requires_benchmarks
+def test_bulk_convert_at_scale(with_scale_collection, stub_encoders, no_anki_config) -> None:
+    from media_converter.bulk_convert.convert_task import ConvertTask
+
+    col = with_scale_collection.col
+
+    def run() -> ConvertTask:
+        task = ConvertTask(Mock(editor=None), with_scale_collection.note_ids, [], no_anki_config)
+        for _ in task():
+            pass
+        task.update_notes_op(col)
+        return task
+
+    measured = traced(run)
+    task: ConvertTask = measured.result
+    assert task.size > 0
+    assert not task._result.failed
+    assert len(task._result.converted) == task.size
+    for nid in with_scale_collection.note_ids[:N_SAMPLED]:
+        fields = "".join(col.get_note(nid).fields)
+        assert not any(file.file_name in fields for file in task._result.converted)
+    check_budget("bulk_convert", task.size, measured)
+
+
+@requires_benchmarks
+def test_batch_rename_at_scale(with_scale_collection, no_anki_config) -> None:
+    from media_converter.batch_rename import (
+        BatchRenameResult,
+        batch_rename_op,
+        collect_file_contexts,
+        plan_batch_rename,
+    )
+    from media_converter.media_rename import RenameTask
+
+    col = with_scale_collection.col
+    media_dir = with_scale_collection.media_dir
+
+    def run() -> tuple[list[RenameTask], BatchRenameResult]:
+        notes = (col.get_note(nid) for nid in with_scale_collection.note_ids)
+        files = collect_file_contexts(notes, no_anki_config)
+        to_rename = plan_batch_rename("renamed_{n}", files, is_taken=lambda name: (media_dir / name).exists())
+        result = BatchRenameResult(renamed=[], failed=[])
+        batch_rename_op(col, to_rename, result)
+        return to_rename, result
+
+    measured = traced(run)
+    to_rename, result = measured.result
+    assert to_rename
+    assert not result.failed
+    assert len(result.renamed) == len(to_rename)
+    old_name, new_name = result.renamed[0]
+    assert not col.find_notes(col.build_search_string(old_name))
+    assert col.find_notes(col.build_search_string(new_name))
+    check_budget("batch_rename", len(with_scale_collection.note_ids), measured)
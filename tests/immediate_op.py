@@ -0,0 +1,32 @@
+# Copyright: Ajatt-Tools and contributors; https://github.com/Ajatt-Tools
+# License: GNU AGPL, version 3 or later; http://www.gnu.org/licenses/agpl.html
+
+
+class ImmediateOp:
+    """Runs an operation at once, as if Anki has finished it in the background."""
+
+    col = None
+
+    def __init__(self, parent, op, success=None) -> None:
+        self._op = op
+        self._success = success
+        self._failure = None
+
+    def success(self, success) -> "ImmediateOp":
+        self._success = success
+        return self
+
+    def failure(self, failure) -> "ImmediateOp":
+        self._failure = failure
+        return self
+
+    def without_collection(self) -> "ImmediateOp":
+        return self
+
+    def run_in_background(self) -> None:
+        try:
+            result = self._op(self.col)
+        except Exception as ex:
+            self._failure(ex)
+        else:
+            self._success(result)
@@ -0,0 +1,80 @@
+# Copyright: Ajatt-Tools and contributors; https://github.com/Ajatt-Tools
+# License: GNU AGPL, version 3 or later; http://www.gnu.org/licenses/agpl.html
+
+import math
+import random
+
+from media_converter.media_deduplication.acoustic import (
+    FRAME_SIZE,
+    SAMPLE_RATE,
+    AudioFingerprint,
+    audio_distance,
+    compute_audio_fingerprint,
+    power_spectrum,
+    similar_durations,
+)
+
+
+def synthesize_clip(seed: int, gain: float = 1.0, padding_s: float = 0.0, noise: float = 0.0) -> list[int]:
+    """Synthesize a few seconds of voiced tones with pauses between them, like a short spoken sentence."""
+    rng = random.Random(seed)
+    noise_rng = random.Random(0)
+    samples = [0] * int(padding_s * SAMPLE_RATE)
+    for _ in range(10):
+        length = int(rng.uniform(0.1, 0.3) * SAMPLE_RATE)
+        pitch = rng.uniform(100, 800)
+        amplitude = rng.uniform(2000, 12000) * gain
+        for idx in range(length):
+            envelope = math.sin(math.pi * idx / length)
+            # A voice has harmonics above its pitch.
+            phase = 2 * math.pi * pitch * idx / SAMPLE_RATE
+            samples.append(int(amplitude * envelope * sum(math.sin(n * phase) / n for n in range(1, 6))))
+        samples.extend([0] * int(rng.uniform(0.02, 0.1) * SAMPLE_RATE))
+    return [int(sample + noise_rng.gauss(0, noise)) for sample in samples]
+
+
+def test_pack_unpack() -> None:
+    fingerprint = AudioFingerprint(bits=(1 << 127) | 5, duration_ms=2500)
+    assert AudioFingerprint.unpack(fingerprint.pack()) == fingerprint
+
+
+def test_copies_of_the_same_clip_match() -> None:
+    original = compute_audio_fingerprint(synthesize_clip(1))
+    quieter = compute_audio_fingerprint(synthesize_clip(1, gain=0.5, padding_s=0.5))
+    noisy = compute_audio_fingerprint(synthesize_clip(1, noise=100))
+    different = compute_audio_fingerprint(synthesize_clip(2))
+    assert original and quieter and noisy and different
+
+    assert audio_distance(original.pack(), quieter.pack()) <= 4
+    assert audio_distance(original.pack(), noisy.pack()) <= 8
+    assert audio_distance(original.pack(), different.pack()) > 32
+    # Leading silence is trimmed.
+    assert similar_durations(original.pack(), quieter.pack())
+
+
+def test_copy_starting_later_matches() -> None:
+    original = compute_audio_fingerprint(synthesize_clip(1))
+    # Less than one frame of extra silence, so the frames are cut at different points of the clip.
+    shifted = compute_audio_fingerprint(synthesize_clip(1, padding_s=0.01))
+    assert original and shifted
+    assert audio_distance(original.pack(), shifted.pack()) <= 4
+
+
+def test_power_spectrum_peaks_at_tone() -> None:
+    pitch_bin = 20
+    tone = [int(10000 * math.sin(2 * math.pi * pitch_bin * idx / FRAME_SIZE)) for idx in range(FRAME_SIZE)]
+    spectrum = power_spectrum(tone)
+    assert len(spectrum) == FRAME_SIZE // 2
+    assert spectrum.index(max(spectrum)) == pitch_bin
+
+
+def test_silence() -> None:
+    assert compute_audio_fingerprint([0] * SAMPLE_RATE) is None
+    assert compute_audio_fingerprint([]) is None
+    # Too short to be divided into slices.
+    assert compute_audio_fingerprint(synthesize_clip(1)[:FRAME_SIZE]) is None
+
+
+def test_similar_durations() -> None:
+    assert similar_durations(AudioFingerprint(0, 1000).pack(), AudioFingerprint(0, 1050).pack())
+    assert not similar_durations(AudioFingerprint(0, 1000).pack(), AudioFingerprint(0, 2000).pack())
@@ -0,0 +1,160 @@
+# Copyright: Ajatt-Tools and contributors; https://github.com/Ajatt-Tools
+# License: GNU AGPL, version 3 or later; http://www.gnu.org/licenses/agpl.html
+
+import pathlib
+import shutil
+from unittest.mock import MagicMock, Mock
+
+import pytest
+
+from media_converter.file_converters import async_paste_converter
+from media_converter.file_converters.async_paste_converter import (
+    AsyncPasteConverter,
+    swap_placeholder_op,
+)
+from media_converter.file_converters.on_paste_converter import ConverterPayload
+from media_converter.utils.file_paths_factory import NameReservations
+from media_converter.utils.show_options import ShowOptions
+from tests.immediate_op import ImmediateOp
+
+
+def test_swap_placeholder_op() -> None:
+    notes = {
+        1: {"Front": '<img src="paste_123.png">', "Back": "text"},
+        2: {"Front": '[sound:a.ogg] <img src="paste_123.png">'},
+    }
+    col = MagicMock()
+    col.find_notes.return_value = list(notes)
+    col.get_note.side_effect = notes.__getitem__
+    col.media.have.return_value = True
+
+    swap_placeholder_op(col, "paste_123.png", "paste_123.webp")
+
+    assert notes[1]["Front"] == '<img src="paste_123.webp">'
+    assert notes[2]["Front"] == '[sound:a.ogg] <img src="paste_123.webp">'
+    col.update_notes.assert_called_once_with(list(notes.values()))
+    col.media.trash_files.assert_called_once_with(["paste_123.png"])
+
+
+class CopyingConverter:
+    """Stands for ImageConverter. The converted file is a copy of the original."""
+
+    def __init__(self, source_path: str, destination_path: str, config) -> None:
+        self._source_path = source_path
+        self._destination_path = destination_path
+
+    def convert(self) -> None:
+        shutil.copy(self._source_path, self._destination_path)
+
+
+class BrokenConverter(CopyingConverter):
+    def convert(self) -> None:
+        raise RuntimeError("Conversion failed with code 1.")
+
+
+@pytest.fixture
+def media_dir(tmp_path: pathlib.Path) -> pathlib.Path:
+    (media_dir := tmp_path / "collection.media").mkdir()
+    return media_dir
+
+
+@pytest.fixture
+def paste(tmp_path: pathlib.Path) -> ConverterPayload:
+    (tmp_image := tmp_path / "pasted.png").write_bytes(b"png")
+    return ConverterPayload(tmp_path=str(tmp_image), dimensions=(4, 3), initial_filename=None)
+
+
+@pytest.fixture
+def editor(media_dir: pathlib.Path, monkeypatch) -> MagicMock:
+    notes = {1: {"Front": '<img src="paste_123.png">'}}
+
+    def write_data(filename: str, data: bytes) -> str:
+        (media_dir / filename).write_bytes(data)
+        return filename
+
+    editor = MagicMock(addMode=False, web=None)
+    col = editor.mw.col
+    col.media.dir.return_value = str(media_dir)
+    col.media.write_data.side_effect = write_data
+    col.find_notes.return_value = list(notes)
+    col.get_note.side_effect = notes.__getitem__
+    col.media.have.return_value = True
+    monkeypatch.setattr(ImmediateOp, "col", col)
+    monkeypatch.setattr(async_paste_converter, "QueryOp", ImmediateOp)
+    monkeypatch.setattr(async_paste_converter, "CollectionOp", ImmediateOp)
+    return editor
+
+
+@pytest.fixture
+def reservations(monkeypatch) -> NameReservations:
+    reservations = NameReservations()
+    monkeypatch.setattr(async_paste_converter, "release_reserved", reservations.release)
+    return reservations
+
+
+def make_converter(editor: MagicMock, reservations: NameReservations, config, monkeypatch) -> AsyncPasteConverter:
+    conv = AsyncPasteConverter(editor, ShowOptions.paste, config)
+    destination_path = str(pathlib.Path(editor.mw.col.media.dir()) / "paste_123.webp")
+    monkeypatch.setattr(conv, "_make_destination_path", lambda filename: reservations.reserve(destination_path))
+    monkeypatch.setattr(conv, "tooltip", Mock())
+    monkeypatch.setattr(conv, "result_tooltip", Mock())
+    # The converter is run like in the other paste paths, which keep the conversion records.
+    monkeypatch.setattr(
+        conv, "_run_converter", Mock(side_effect=lambda image_converter, path: image_converter.convert())
+    )
+    return conv
+
+
+def test_placeholder_is_swapped(editor, paste, media_dir, reservations, no_anki_config, monkeypatch) -> None:
+    monkeypatch.setattr(async_paste_converter, "ImageConverter", CopyingConverter)
+    conv = make_converter(editor, reservations, no_anki_config, monkeypatch)
+
+    # The conversion finishes at once, so the placeholder is swapped before it's returned.
+    assert conv.convert_mime_async(paste) == "paste_123.png"
+    assert (media_dir / "paste_123.webp").read_bytes() == b"png"
+    conv._run_converter.assert_called_once()
+    assert editor.mw.col.get_note(1)["Front"] == '<img src="paste_123.webp">'
+    editor.mw.col.media.trash_files.assert_called_once_with(["paste_123.png"])
+    conv.result_tooltip.assert_called_once_with(str(media_dir / "paste_123.webp"))
+    assert reservations._reserved == set()
+
+
+def test_failed_conversion_keeps_placeholder(
+    editor, paste, media_dir, reservations, no_anki_config, monkeypatch
+) -> None:
+    monkeypatch.setattr(async_paste_converter, "ImageConverter", BrokenConverter)
+    conv = make_converter(editor, reservations, no_anki_config, monkeypatch)
+
+    assert conv.convert_mime_async(paste) == "paste_123.png"
+    assert editor.mw.col.get_note(1)["Front"] == '<img src="paste_123.png">'
+    editor.mw.col.media.trash_files.assert_not_called()
+    conv.result_tooltip.assert_not_called()
+    conv.tooltip.assert_called_once_with("Conversion failed: Conversion failed with code 1.")
+    # The name isn't kept from the next paste.
+    assert reservations._reserved == set()
+
+
+class EditorNote(dict):
+    @property
+    def fields(self) -> list[str]:
+        return list(self.values())
+
+
+def test_placeholder_is_swapped_in_add_mode(
+    editor, paste, media_dir, reservations, no_anki_config, monkeypatch
+) -> None:
+    monkeypatch.setattr(async_paste_converter, "ImageConverter", CopyingConverter)
+    editor.web, editor.addMode = Mock(), True
+    editor.note = EditorNote(Front="")
+    pending_save = []
+    editor.call_after_note_saved.side_effect = pending_save.append
+    conv = make_converter(editor, reservations, no_anki_config, monkeypatch)
+
+    placeholder = conv.convert_mime_async(paste)
+    # The editor saves what the user has typed during the conversion before the note is changed.
+    editor.note["Front"] = f'typed during the conversion <img src="{placeholder}">'
+    editor.loadNoteKeepingFocus.assert_not_called()
+    [after_note_saved] = pending_save
+    after_note_saved()
+    assert editor.note["Front"] == 'typed during the conversion <img src="paste_123.webp">'
+    editor.loadNoteKeepingFocus.assert_called_once()
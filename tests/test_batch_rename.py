@@ -0,0 +1,59 @@
+# Copyright: Ajatt-Tools and contributors; https://github.com/Ajatt-Tools
+# License: GNU AGPL, version 3 or later; http://www.gnu.org/licenses/agpl.html
+
+import pytest
+
+from media_converter.batch_rename import (
+    BatchRenameDialog,
+    BatchRenameError,
+    FileContext,
+    plan_batch_rename,
+)
+from media_converter.media_rename import RenameTask
+
+FILES = [
+    FileContext("paste_123.png", note_id=1, sort_field="<b>猫</b>", custom_field="cat"),
+    FileContext("paste_456.ogg", note_id=1, sort_field="<b>猫</b>", custom_field="cat"),
+    FileContext("inu.jpg", note_id=2, sort_field="犬", custom_field="dog"),
+]
+
+
+def never_taken(filename: str) -> bool:
+    return False
+
+
+@pytest.mark.parametrize(
+    "pattern, expected",
+    [
+        ("{sort_field}_{n}", ["猫_1.png", "猫_2.ogg", "犬_3.jpg"]),
+        ("{custom_field}", ["cat.png", "cat.ogg", "dog.jpg"]),
+        ("{note_id}-{name}", ["1-paste_123.png", "1-paste_456.ogg", "2-inu.jpg"]),
+    ],
+)
+def test_plan_batch_rename(pattern: str, expected: list[str]) -> None:
+    tasks = plan_batch_rename(pattern, FILES, never_taken)
+    assert [task.new_filename for task in tasks] == expected
+    assert [task.old_filename for task in tasks] == [file.filename for file in FILES]
+
+
+def test_repeated_and_taken_names_get_suffix() -> None:
+    files = [FileContext(f"{idx}.png", note_id=idx, sort_field="same", custom_field="") for idx in range(3)]
+    tasks = plan_batch_rename("{sort_field}", files, is_taken=lambda filename: filename == "same.png")
+    assert [task.new_filename for task in tasks] == ["same_2.png", "same_3.png", "same_4.png"]
+
+
+def test_unchanged_names_are_skipped() -> None:
+    assert plan_batch_rename("{name}", FILES, never_taken) == []
+
+
+@pytest.mark.parametrize("pattern", ["", "{unknown}", "{0}", "{n"])
+def test_invalid_pattern(pattern: str) -> None:
+    with pytest.raises(BatchRenameError):
+        plan_batch_rename(pattern, FILES, never_taken)
+
+
+def test_dialog_preview() -> None:
+    dialog = BatchRenameDialog(FILES, never_taken, pattern="{custom_field}")
+    assert dialog.to_rename()[0] == RenameTask("paste_123.png", "cat.png")
+    dialog._pattern_edit.setText("{bad}")
+    assert dialog.to_rename() == []
@@ -3,23 +3,58 @@
 
 import os
 import tempfile
+import threading
 from unittest.mock import MagicMock, Mock, patch
 
 import pytest
 from anki.notes import Note, NoteId
 
-from media_converter.bulk_convert.convert_result import ConvertResult
+from media_converter.bulk_convert import convert_task
+from media_converter.bulk_convert.convert_result import (
+    ConvertProgress,
+    ConvertResult,
+    format_duration,
+)
 from media_converter.bulk_convert.convert_task import (
     ConvertTask,
     TaskCanceledByUserException,
     cancel_all_remaining_futures,
 )
-from media_converter.bulk_convert.runnable import ConvertRunnable
+from media_converter.bulk_convert.reconvert_plan import ReconvertPlan, ReconvertReason
+from media_converter.bulk_convert.runnable import ConvertRunnable, ProgressThrottle
 from media_converter.config import MediaConverterConfig
 from media_converter.file_converters.common import LocalFile
 from media_converter.file_converters.file_converter import FileConverter
 from media_converter.file_converters.find_media import FindMedia
+from media_converter.utils.conversion_records import (
+    ConversionOrigin,
+    ConversionRecord,
+    ConversionStatus,
+)
 from media_converter.utils.file_paths_factory import FilePathFactory
+from media_converter.utils.idle_gate import IdleGate
+
+
+def converted_record(output: str, bytes_in: int, bytes_out: int) -> ConversionRecord:
+    return ConversionRecord(
+        origin=ConversionOrigin.bulk,
+        status=ConversionStatus.converted,
+        reason="",
+        file_type="image",
+        source="source.png",
+        output=output,
+        bytes_in=bytes_in,
+        bytes_out=bytes_out,
+        width_in=0,
+        height_in=0,
+        width_out=0,
+        height_out=0,
+        encoder="cwebp",
+        args_fingerprint="0123456789ab",
+        wall_seconds=0.1,
+        cpu_seconds=0.1,
+        finished_at=0.0,
+    )
 
 
 def test_convert_result_has_results() -> None:
@@ -134,6 +169,25 @@ def test_convert_task_size(no_anki_config: MediaConverterConfig) -> None:
         assert task.size == 3
 
 
+def test_convert_task_plan_reconvert(no_anki_config: MediaConverterConfig, monkeypatch) -> None:
+    """The plan isn't made when the task is created, because that would block the GUI thread."""
+    no_anki_config["bulk_reconvert"] = True
+    to_convert = {LocalFile.image("new.png"): {}, LocalFile.image("done.webp"): {}}
+    plan = ReconvertPlan({"new.png": ReconvertReason.not_converted, "done.webp": ReconvertReason.up_to_date})
+    make_plan = Mock(return_value=plan)
+    monkeypatch.setattr(convert_task, "plan_reconvert", make_plan)
+    monkeypatch.setattr(convert_task, "mw", MagicMock())
+
+    with patch.object(ConvertTask, "_find_files_to_convert_and_notes", return_value=to_convert):
+        task = ConvertTask(Mock(), [NoteId(1)], [], no_anki_config)
+    make_plan.assert_not_called()
+    assert task.reconvert_plan is None
+    assert task.plan_reconvert() is plan
+    assert task.plan_reconvert() is plan
+    make_plan.assert_called_once()
+    assert task.size == 1
+
+
 def test_convert_task_already_converted_check(no_anki_config: MediaConverterConfig) -> None:
     """Test that calling the task twice raises RuntimeError."""
     mock_browser = Mock()
@@ -178,23 +232,81 @@ def test_convert_runnable_set_canceled() -> None:
 
 
 def test_convert_runnable_run() -> None:
-    """Test that ConvertRunnable run method works correctly."""
+    """Test that ConvertRunnable emits a progress snapshot for every file when updates aren't throttled."""
     mock_task = Mock()
     mock_task.return_value = [1, 2, 3]  # Simulate progress values
+    mock_task.progress.side_effect = ["start", "file 1", "file 2", "file 3", "end"]
     mock_signals = Mock()
 
-    runnable = ConvertRunnable(mock_task, mock_signals)
+    runnable = ConvertRunnable(mock_task, mock_signals, throttle=ProgressThrottle(interval=0))
 
     runnable.run()
 
-    # Check that progress was emitted correctly
-    mock_signals.update_progress.emit.assert_any_call(0)  # Initial call
-    mock_signals.update_progress.emit.assert_any_call(1)  # First progress
-    mock_signals.update_progress.emit.assert_any_call(2)  # Second progress
-    mock_signals.update_progress.emit.assert_any_call(3)  # Third progress
+    # The initial state, one update per file and the final state.
+    assert [c.args[0] for c in mock_signals.update_progress.emit.call_args_list] == [
+        "start",
+        "file 1",
+        "file 2",
+        "file 3",
+        "end",
+    ]
+    mock_signals.task_done.emit.assert_called_once()
+
+
+def test_convert_runnable_run_coalesces_updates() -> None:
+    """Test that fast conversions don't flood the event queue with progress updates."""
+    mock_task = Mock()
+    mock_task.return_value = range(1, 1001)
+    mock_signals = Mock()
+    # The clock doesn't move, so only the first file gets through the throttle.
+    throttle = ProgressThrottle(interval=0.1, clock=lambda: 5.0)
+
+    ConvertRunnable(mock_task, mock_signals, throttle=throttle).run()
+
+    # The initial state, the first file and the final state.
+    assert mock_signals.update_progress.emit.call_count == 3
     mock_signals.task_done.emit.assert_called_once()
 
 
+def test_progress_throttle() -> None:
+    now = [0.0]
+    throttle = ProgressThrottle(interval=0.1, clock=lambda: now[0])
+    assert throttle.ready()
+    now[0] = 0.05
+    assert not throttle.ready()
+    now[0] = 0.1
+    assert throttle.ready()
+    assert not throttle.ready()
+
+
+def test_convert_result_totals() -> None:
+    result = ConvertResult()
+    assert result.elapsed == 0
+    result.start()
+    result.add_converted(LocalFile.image("a.png"), "a.webp", bytes_in=4_000, bytes_out=1_000)
+    result.add_converted(LocalFile.image("b.png"), "b.webp", bytes_in=6_000, bytes_out=2_000)
+    result.add_failed(LocalFile.image("c.png"), RuntimeError("broken"))
+    result.finish()
+    assert (result.bytes_in, result.bytes_out) == (10_000, 3_000)
+    assert result.elapsed == result.elapsed > 0
+
+    progress = result.progress(total=8, active=("d.png",))
+    assert (progress.done, progress.total, progress.failed, progress.active) == (3, 8, 1, ("d.png",))
+    assert progress.compression_ratio == pytest.approx(0.3)
+
+
+def test_convert_progress_eta_and_summary() -> None:
+    progress = ConvertProgress(
+        done=10, total=30, failed=1, bytes_in=4 * 1024 * 1024, bytes_out=1024 * 1024, elapsed=5.0, active=()
+    )
+    assert progress.files_per_second == 2
+    assert progress.eta == 10
+    assert progress.summary() == "10/30 files · 2.0 files/s · 4.0 MiB → 1.0 MiB (25%) · 1 failed · ETA 0:10"
+    # The speed isn't known before the first file is done.
+    assert progress._replace(done=0).eta is None
+    assert format_duration(3725) == "1:02:05"
+
+
 def test_find_media_functionality(no_anki_config: MediaConverterConfig) -> None:
     """Test that FindMedia can find convertible images in HTML content."""
 
@@ -277,7 +389,9 @@ def test_convert_task_progress_reporting(no_anki_config: MediaConverterConfig) -
     }
 
     with patch.object(ConvertTask, "_find_files_to_convert_and_notes", return_value=mock_files):
-        with patch.object(ConvertTask, "_convert_stored_file", return_value="converted_file.webp"):
+        with patch.object(
+            ConvertTask, "_convert_stored_file", return_value=converted_record("converted_file.webp", 2_000, 500)
+        ):
             task = ConvertTask(Mock(), [], [], no_anki_config)
 
             # Check that size is correct
@@ -288,6 +402,25 @@ def test_convert_task_progress_reporting(no_anki_config: MediaConverterConfig) -
 
             # Should have reported progress for each file
             assert len(progress_values) == 2
+            progress = task.progress()
+            assert (progress.done, progress.total, progress.bytes_in, progress.bytes_out) == (2, 2, 4_000, 1_000)
+            assert progress.active == ()
+            # Every file has a record for export.
+            assert len(task._result.records) == 2
+
+
+def test_convert_task_records_failures(no_anki_config: MediaConverterConfig) -> None:
+    with patch.object(
+        ConvertTask, "_find_files_to_convert_and_notes", return_value={LocalFile.audio("sample01.mp3"): {}}
+    ):
+        with patch.object(ConvertTask, "_convert_stored_file", side_effect=RuntimeError("encoder crashed")):
+            task = ConvertTask(Mock(), [], [], no_anki_config)
+            list(task())
+
+    (record,) = task._result.records
+    assert (record.status, record.reason, record.source) == (ConversionStatus.failed, "encoder crashed", "sample01.mp3")
+    assert (record.file_type, record.output, record.encoder) == ("audio", "", "")
+    assert list(task._result.failed) == [LocalFile.audio("sample01.mp3")]
 
 
 def test_real_image_conversion(no_anki_config: MediaConverterConfig) -> None:
@@ -361,3 +494,39 @@ def test_convert_task_call_with_real_images(no_anki_config: MediaConverterConfig
 
             # Verify that the result has been recorded
             assert task._result.has_results() is True
+
+
+def test_convert_stored_file_waits_for_idle_user(no_anki_config: MediaConverterConfig) -> None:
+    gate = IdleGate(idle_seconds=60)
+    gate.touch()
+    with patch.object(ConvertTask, "_find_files_to_convert_and_notes", return_value={}):
+        task = ConvertTask(Mock(), [], [], no_anki_config, idle_gate=gate)
+    # Canceling releases the workers that wait for the user to become idle.
+    threading.Timer(0.1, task.set_canceled).start()
+    with pytest.raises(TaskCanceledByUserException):
+        task._convert_stored_file(LocalFile.image("test.jpg"))
+
+
+def test_update_notes_op_applies_files_once(no_anki_config: MediaConverterConfig) -> None:
+    first, second = LocalFile.image("a.png"), LocalFile.image("b.png")
+    notes = {
+        NoteId(1): {"Front": '<img src="a.png">', "Back": "edited while converting"},
+        NoteId(2): {"Front": '<img src="a.png"><img src="b.png">', "Back": ""},
+    }
+    col = MagicMock()
+    col.get_note.side_effect = lambda note_id: notes[note_id]
+    to_convert = {first: {NoteId(1): Mock(), NoteId(2): Mock()}, second: {NoteId(2): Mock()}}
+    with patch.object(ConvertTask, "_find_files_to_convert_and_notes", return_value=to_convert):
+        task = ConvertTask(Mock(), [], [], no_anki_config)
+    task.result.add_converted(first, "a.webp")
+    task.update_notes_op(col)
+    assert task.unapplied() == {}
+    # Only the files converted since the last update are applied.
+    task.result.add_converted(second, "b.webp")
+    assert task.unapplied() == {second: "b.webp"}
+    task.update_notes_op(col)
+    assert task.unapplied() == {}
+    assert notes[NoteId(1)] == {"Front": '<img src="a.webp">', "Back": "edited while converting"}
+    assert notes[NoteId(2)]["Front"] == '<img src="a.webp"><img src="b.webp">'
+    assert col.update_notes.call_count == 2
+    assert len(col.update_notes.call_args_list[1].args[0]) == 1
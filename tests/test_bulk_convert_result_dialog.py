@@ -0,0 +1,27 @@
+# Copyright: Ajatt-Tools and contributors; https://github.com/Ajatt-Tools
+# License: GNU AGPL, version 3 or later; http://www.gnu.org/licenses/agpl.html
+
+from media_converter.bulk_convert.convert_result import ConvertResult
+from media_converter.dialogs.bulk_convert_result_dialog import BulkConvertResultDialog
+from media_converter.file_converters.common import LocalFile
+
+
+def table_rows(dialog: BulkConvertResultDialog) -> list[tuple[str, str]]:
+    model = dialog._model
+    return [(model.cell_text(row, 0), model.cell_text(row, 1)) for row in range(model.visible_row_count())]
+
+
+def test_update_result_appends_finished_files() -> None:
+    result = ConvertResult()
+    result.add_converted(LocalFile.image("a.png"), "a.webp")
+    dialog = BulkConvertResultDialog()
+    dialog.set_result(result)
+    assert table_rows(dialog) == [("a.png", "converted")]
+
+    result.add_converted(LocalFile.image("b.png"), "b.webp")
+    result.add_failed(LocalFile.image("c.png"), RuntimeError("broken"))
+    dialog.update_result()
+    assert table_rows(dialog) == [("a.png", "converted"), ("c.png", "failed"), ("b.png", "converted")]
+    # Files are added once.
+    dialog.update_result()
+    assert len(table_rows(dialog)) == 3
@@ -1,12 +1,18 @@
 # Copyright: Ajatt-Tools and contributors; https://github.com/Ajatt-Tools
 # License: GNU AGPL, version 3 or later; http://www.gnu.org/licenses/agpl.html
 
+import os
 import re
+import sys
 
 import pytest
 
 from media_converter.common import RE_AUDIO_HTML_TAG, RE_IMAGE_HTML_TAG, image_html
-from media_converter.file_converters.common import get_file_extension
+from media_converter.file_converters.common import (
+    create_process,
+    get_file_extension,
+    lower_process_priority,
+)
 from media_converter.file_converters.find_media import FindMedia
 from media_converter.utils.config_types import SUPPORTED_IMAGE_FORMATS
 
@@ -96,3 +102,20 @@ def test_find_regex() -> None:
 def test_image_html(image_filename: str, expected_extension: str, expected_image_html: str) -> None:
     assert get_file_extension(image_filename) == expected_extension
     assert image_html(image_filename) == expected_image_html
+
+
+@pytest.mark.skipif(not hasattr(os, "SCHED_IDLE"), reason="SCHED_IDLE is Linux-only")
+def test_create_low_priority_process() -> None:
+    p = create_process([sys.executable, "-c", "import time; time.sleep(1)"], low_priority=True)
+    try:
+        assert os.sched_getscheduler(p.pid) == os.SCHED_IDLE
+    finally:
+        p.kill()
+        p.communicate()
+
+
+def test_lower_priority_of_finished_process() -> None:
+    p = create_process([sys.executable, "-c", "pass"])
+    p.communicate()
+    # The process has been reaped, so its pid is gone.
+    lower_process_priority(p.pid)
@@ -2,6 +2,7 @@
 # License: GNU AGPL, version 3 or later; http://www.gnu.org/licenses/agpl.html
 import pytest
 
+from media_converter.config import DetachedConfig
 from media_converter.utils.config_types import AudioContainer, ImageFormat
 
 
@@ -47,3 +48,44 @@ def test_video_containers_excluded_by_default(no_anki_config, include_converted:
     """Video files are not images and must never be passed to the image converter."""
     excluded = no_anki_config.get_excluded_image_extensions(include_converted=include_converted)
     assert {".mp4", ".mkv", ".mov", ".webm", ".avi"}.issubset(excluded)
+
+
+def test_detached_config(no_anki_config) -> None:
+    detached = DetachedConfig(no_anki_config, image_quality=5, image_width=77)
+    assert detached.image_quality == 5
+    assert detached.image_width == 77
+    assert detached.image_height == no_anki_config.image_height
+    detached["image_height"] = 1
+    no_anki_config["image_width"] = 2
+    assert no_anki_config.image_height != 1
+    assert detached.image_width == 77
+    with pytest.raises(RuntimeError):
+        detached.write_config()
+
+
+def test_config_snapshot(no_anki_config) -> None:
+    snapshot = no_anki_config.snapshot()
+    assert no_anki_config.snapshot() is snapshot
+    assert snapshot.snapshot() is snapshot
+    for include_converted in (False, True):
+        assert snapshot.get_excluded_image_extensions(include_converted) == (
+            no_anki_config.get_excluded_image_extensions(include_converted)
+        )
+    assert snapshot.cwebp_args == tuple(no_anki_config.cwebp_args)
+    with pytest.raises(RuntimeError):
+        snapshot["image_quality"] = 1
+    with pytest.raises(AttributeError):
+        snapshot.image_width = 1
+    with pytest.raises(RuntimeError):
+        snapshot.bulk_convert_in_background = True
+    assert snapshot.image_width == no_anki_config.image_width
+    with pytest.raises(RuntimeError):
+        snapshot.write_config()
+
+
+def test_config_snapshot_is_invalidated(no_anki_config) -> None:
+    snapshot = no_anki_config.snapshot()
+    no_anki_config["image_quality"] = 1
+    assert snapshot.image_quality != 1
+    assert no_anki_config.snapshot() is not snapshot
+    assert no_anki_config.snapshot().image_quality == 1
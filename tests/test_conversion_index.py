@@ -0,0 +1,101 @@
+# Copyright: Ajatt-Tools and contributors; https://github.com/Ajatt-Tools
+# License: GNU AGPL, version 3 or later; http://www.gnu.org/licenses/agpl.html
+
+import os
+import pathlib
+
+import pytest
+
+from media_converter.media_deduplication.conversion_index import (
+    ConversionIndex,
+    ConversionKey,
+    Provenance,
+)
+
+
+@pytest.fixture
+def media_dir(tmp_path: pathlib.Path) -> pathlib.Path:
+    media_dir = tmp_path / "collection.media"
+    media_dir.mkdir()
+    return media_dir
+
+
+@pytest.fixture
+def index(tmp_path: pathlib.Path) -> ConversionIndex:
+    return ConversionIndex(str(tmp_path / "index.sqlite3"))
+
+
+def make_key(source: pathlib.Path, config) -> ConversionKey:
+    return ConversionKey.of(str(source), config)
+
+
+def test_identical_sources_share_a_key(tmp_path: pathlib.Path, no_anki_config) -> None:
+    (tmp_path / "a.png").write_bytes(b"same")
+    (tmp_path / "b.png").write_bytes(b"same")
+    (tmp_path / "c.png").write_bytes(b"different")
+    key_a = make_key(tmp_path / "a.png", no_anki_config)
+    assert key_a == make_key(tmp_path / "b.png", no_anki_config)
+    assert key_a != make_key(tmp_path / "c.png", no_anki_config)
+    no_anki_config["image_quality"] = no_anki_config.image_quality + 1
+    assert key_a != make_key(tmp_path / "a.png", no_anki_config)
+
+
+def test_lookup(tmp_path: pathlib.Path, media_dir: pathlib.Path, index: ConversionIndex, no_anki_config) -> None:
+    (tmp_path / "source.png").write_bytes(b"source")
+    (media_dir / "converted.webp").write_bytes(b"converted")
+    key = make_key(tmp_path / "source.png", no_anki_config)
+    assert index.lookup(str(media_dir), key) is None
+    index.store(str(media_dir), key, "converted.webp")
+    assert index.lookup(str(media_dir), key) == "converted.webp"
+    # Another profile has its own media folder.
+    assert index.lookup(str(tmp_path), key) is None
+    # The index persists.
+    assert ConversionIndex(index._db_path).lookup(str(media_dir), key) == "converted.webp"
+
+
+def test_changed_or_deleted_file_is_forgotten(
+    tmp_path: pathlib.Path, media_dir: pathlib.Path, index: ConversionIndex, no_anki_config
+) -> None:
+    (tmp_path / "source.png").write_bytes(b"source")
+    converted = media_dir / "converted.webp"
+    converted.write_bytes(b"converted")
+    key = make_key(tmp_path / "source.png", no_anki_config)
+    index.store(str(media_dir), key, converted.name)
+
+    converted.write_bytes(b"edited by the user")
+    assert index.lookup(str(media_dir), key) is None
+    # The entry was dropped, so restoring the file doesn't bring it back.
+    converted.write_bytes(b"converted")
+    assert index.lookup(str(media_dir), key) is None
+
+    index.store(str(media_dir), key, converted.name)
+    os.remove(converted)
+    assert index.lookup(str(media_dir), key) is None
+
+
+def test_provenance(media_dir: pathlib.Path, index: ConversionIndex) -> None:
+    made = Provenance(source_hash="abc", settings_hash="def", encoder_version="1.3.2")
+    (media_dir / "a.webp").write_bytes(b"a" * 100)
+    (media_dir / "b.webp").write_bytes(b"b" * 100)
+    index.store_provenance(str(media_dir), "a.webp", made, pixels=50)
+    index.store_provenance(str(media_dir), "b.webp", made, pixels=0)
+    assert index.provenance(str(media_dir), ["a.webp", "b.webp", "unknown.webp"]) == {"a.webp": made, "b.webp": made}
+
+    # Files that are edited after converting aren't up to date.
+    (media_dir / "a.webp").write_bytes(b"edited")
+    assert index.provenance(str(media_dir), ["a.webp", "b.webp"]) == {"b.webp": made}
+    (media_dir / "a.webp").write_bytes(b"a" * 100)
+    assert index.provenance(str(media_dir), ["a.webp"]) == {}
+
+
+def test_bytes_per_pixel(media_dir: pathlib.Path, index: ConversionIndex) -> None:
+    made = Provenance(source_hash="", settings_hash="def", encoder_version="1.3.2")
+    assert index.bytes_per_pixel("def", "1.3.2") is None
+    for name, size in (("a.webp", 100), ("b.webp", 200), ("c.webp", 900)):
+        (media_dir / name).write_bytes(b"x" * size)
+        index.store_provenance(str(media_dir), name, made, pixels=100)
+    # Files of unknown dimensions are left out.
+    (media_dir / "d.webp").write_bytes(b"x")
+    index.store_provenance(str(media_dir), "d.webp", made, pixels=0)
+    assert index.bytes_per_pixel("def", "1.3.2") == 2.0
+    assert index.bytes_per_pixel("def", "1.4.0") is None
@@ -0,0 +1,36 @@
+# Copyright: Ajatt-Tools and contributors; https://github.com/Ajatt-Tools
+# License: GNU AGPL, version 3 or later; http://www.gnu.org/licenses/agpl.html
+
+import pathlib
+import sqlite3
+
+from media_converter.bulk_convert.conversion_queue import ConversionQueue
+
+
+def test_conversion_queue(tmp_path: pathlib.Path) -> None:
+    db_path = str(tmp_path / "queue.sqlite3")
+    queue = ConversionQueue(db_path)
+    queue.push("media_a", ["1.png", "2.png"])
+    queue.push("media_a", ["3.png", "1.png"])
+    queue.push("media_a", ["4.mp3"], kind="audio")
+    queue.push("media_b", ["1.png"])
+    assert list(queue.pending("media_a")) == ["1.png", "2.png", "3.png", "4.mp3"]
+    assert queue.pending("media_a")["4.mp3"] == "audio"
+    assert queue.pending("media_b") == {"1.png": "image"}
+
+    queue.remove("media_a", ["2.png", "missing.png"])
+    # The queue survives a restart.
+    assert list(ConversionQueue(db_path).pending("media_a")) == ["1.png", "3.png", "4.mp3"]
+    assert ConversionQueue(db_path).pending("media_c") == {}
+
+
+def test_conversion_queue_without_kinds(tmp_path: pathlib.Path) -> None:
+    db_path = str(tmp_path / "queue.sqlite3")
+    with sqlite3.connect(db_path) as con:
+        con.execute(
+            "CREATE TABLE queued (media_dir TEXT, filename TEXT, queued_at REAL, PRIMARY KEY (media_dir, filename))"
+        )
+        con.execute("INSERT INTO queued VALUES ('media', 'old.png', 0)")
+    queue = ConversionQueue(db_path)
+    queue.push("media", ["new.mp3"], kind="audio")
+    assert queue.pending("media") == {"old.png": "image", "new.mp3": "audio"}
@@ -0,0 +1,102 @@
+# Copyright: Ajatt-Tools and contributors; https://github.com/Ajatt-Tools
+# License: GNU AGPL, version 3 or later; http://www.gnu.org/licenses/agpl.html
+
+import csv
+import io
+import json
+import os
+import pathlib
+import sys
+
+import pytest
+
+from media_converter.file_converters.common import create_process, run_process
+from media_converter.file_converters.file_converter import args_fingerprint
+from media_converter.file_converters.records import make_record
+from media_converter.utils.conversion_records import (
+    ConversionLog,
+    ConversionOrigin,
+    ConversionStatus,
+    export_records,
+    records_to_csv,
+    records_to_json,
+)
+
+SAMPLE_PNG = os.path.join(os.path.dirname(__file__), "collection.media", "sample01.png")
+
+
+def test_make_record_of_reused_file() -> None:
+    record = make_record(
+        ConversionOrigin.paste,
+        "/tmp/pasted.png",
+        SAMPLE_PNG,
+        bytes_in=1234,
+        status=ConversionStatus.skipped,
+        reason="converted from the same source before",
+    )
+    assert (record.source, record.output, record.file_type) == ("pasted.png", "sample01.png", "image")
+    assert (record.bytes_in, record.bytes_out) == (1234, os.path.getsize(SAMPLE_PNG))
+    # The size is read from the header of the output file.
+    assert record.width_out > 0 and record.height_out > 0
+    # The encoder didn't run.
+    assert (record.encoder, record.wall_seconds, record.cpu_seconds) == ("", 0.0, None)
+
+
+def test_make_record_of_failed_file() -> None:
+    record = make_record(ConversionOrigin.bulk, SAMPLE_PNG, SAMPLE_PNG, status=ConversionStatus.failed, reason="oops")
+    assert record.output == ""
+    assert record.bytes_out == 0
+    assert record.bytes_in == os.path.getsize(SAMPLE_PNG)
+
+
+def test_export_csv_and_json(tmp_path: pathlib.Path) -> None:
+    records = [
+        make_record(ConversionOrigin.add_note, SAMPLE_PNG, SAMPLE_PNG),
+        make_record(ConversionOrigin.bulk, "missing.mp3", status=ConversionStatus.failed, reason='bad "file"'),
+    ]
+    rows = list(csv.DictReader(io.StringIO(records_to_csv(records))))
+    assert [row["origin"] for row in rows] == ["add_note", "bulk"]
+    assert rows[1]["status"] == "failed"
+    assert rows[1]["reason"] == 'bad "file"'
+    assert rows[1]["cpu_seconds"] == ""
+    assert rows[1]["file_type"] == "audio"
+
+    loaded = json.loads(records_to_json(records))
+    assert loaded[0]["status"] == "converted"
+    assert loaded[0]["cpu_seconds"] is None
+
+    export_records(records, str(tmp_path / "records.csv"))
+    export_records(records, str(tmp_path / "records.json"))
+    assert (tmp_path / "records.csv").read_text(encoding="utf-8").startswith("origin,status,reason,")
+    assert len(json.loads((tmp_path / "records.json").read_text(encoding="utf-8"))) == 2
+
+
+def test_conversion_log_keeps_recent_records() -> None:
+    log = ConversionLog(capacity=2)
+    for name in ("a.png", "b.png", "c.png"):
+        log.record(make_record(ConversionOrigin.paste, name, bytes_in=0))
+    assert [record.source for record in log.records()] == ["b.png", "c.png"]
+    log.clear()
+    assert log.records() == []
+
+
+def test_args_fingerprint_ignores_paths() -> None:
+    first = args_fingerprint(
+        ["/usr/bin/cwebp", "/a/x.png", "-o", "/a/.tmp_x.webp", "-q", 80], "/a/x.png", "/a/.tmp_x.webp"
+    )
+    second = args_fingerprint(
+        ["/opt/cwebp", "/b/y.png", "-o", "/b/.tmp_y.webp", "-q", 80], "/b/y.png", "/b/.tmp_y.webp"
+    )
+    other_quality = args_fingerprint(
+        ["cwebp", "/b/y.png", "-o", "/b/.tmp_y.webp", "-q", 60], "/b/y.png", "/b/.tmp_y.webp"
+    )
+    assert first == second
+    assert first != other_quality
+
+
+@pytest.mark.skipif(not hasattr(os, "wait4"), reason="CPU time of child processes isn't available")
+def test_run_process_reports_cpu_time() -> None:
+    cpu_seconds = run_process(create_process([sys.executable, "-c", "sum(range(3_000_000))"]))
+    assert cpu_seconds is not None and cpu_seconds > 0
+    with pytest.raises(RuntimeError, match="code 3"):
+        run_process(create_process([sys.executable, "-c", "raise SystemExit(3)"]))
@@ -11,3 +11,30 @@ def test_target_extension(no_anki_config) -> None:
 
     assert fpf.get_target_extension(LocalFile.image("test.jpg")) == ".webp"
     assert fpf.get_target_extension(LocalFile.audio("test.mp3")) == ".ogg"
+
+
+def test_without_options() -> None:
+    from media_converter.file_converters.image_converter import without_options
+
+    args = ["-short", "-mt", "-pass", "10", "-af", "-blend_alpha", "0xffffff", "-m", 6]
+    assert without_options(args, {"-pass": 1, "-m": 1, "-af": 0}) == ["-short", "-mt", "-blend_alpha", "0xffffff"]
+
+
+def test_preview_webp_args(no_anki_config, tmp_path, monkeypatch) -> None:
+    from aqt.qt import QImage, Qt
+
+    from media_converter.file_converters import image_converter
+
+    monkeypatch.setattr(image_converter, "find_cwebp_exe", lambda: "cwebp")
+    image = QImage(400, 300, QImage.Format.Format_RGB32)
+    image.fill(Qt.GlobalColor.white)
+    assert image.save(str(source := tmp_path / "source.png"))
+
+    conv = image_converter.ImageConverter(str(source), str(tmp_path / "out.webp"), config=no_anki_config)
+    full_args = conv._make_to_webp_args("in.png", "out.webp")
+    fast_args = conv._make_to_webp_args("in.png", "out.webp", fast=True)
+    assert "-pass" in full_args and "-pass" not in fast_args
+    assert fast_args[fast_args.index("-m") + 1] == "0"
+    # Quality and size are the same, so the preview looks like the final image.
+    assert fast_args[fast_args.index("-q") + 1] == full_args[full_args.index("-q") + 1]
+    assert fast_args[fast_args.index("-resize") :] == full_args[full_args.index("-resize") :]
@@ -1,9 +1,15 @@
 # Copyright: Ajatt-Tools and contributors; https://github.com/Ajatt-Tools
 # License: GNU AGPL, version 3 or later; http://www.gnu.org/licenses/agpl.html
 
+import pathlib
+
 import pytest
 
-from media_converter.media_deduplication.deduplication import do_replacements
+from media_converter.file_converters.file_converter import FFmpegNotFoundError
+from media_converter.media_deduplication.deduplication import (
+    do_replacements,
+    fingerprint_files,
+)
 
 
 @pytest.mark.parametrize(
@@ -45,3 +51,22 @@ from media_converter.media_deduplication.deduplication import do_replacements
 )
 def test_do_replacements(content: str, old_name: str, new_name: str, expected: str) -> None:
     assert do_replacements(content, old_name, new_name) == expected
+
+
+def test_fingerprint_files_skips_broken_files(tmp_path: pathlib.Path) -> None:
+    (path := tmp_path / "broken.ogg").write_bytes(b"not audio")
+
+    def fail_to_decode(_path: pathlib.Path) -> int:
+        raise RuntimeError("Decoding failed with code 1.")
+
+    assert fingerprint_files([path], fail_to_decode) == []
+
+
+def test_fingerprint_files_stops_without_ffmpeg(tmp_path: pathlib.Path) -> None:
+    (path := tmp_path / "clip.ogg").write_bytes(b"audio")
+
+    def no_ffmpeg(_path: pathlib.Path) -> int:
+        raise FFmpegNotFoundError("ffmpeg executable is not in PATH")
+
+    with pytest.raises(FFmpegNotFoundError):
+        fingerprint_files([path], no_ffmpeg)
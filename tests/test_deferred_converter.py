@@ -0,0 +1,93 @@
+# Copyright: Ajatt-Tools and contributors; https://github.com/Ajatt-Tools
+# License: GNU AGPL, version 3 or later; http://www.gnu.org/licenses/agpl.html
+
+import pathlib
+from unittest.mock import MagicMock, Mock
+
+import pytest
+from anki.notes import NoteId
+
+from media_converter.bulk_convert import deferred_converter
+from media_converter.bulk_convert.conversion_queue import ConversionQueue
+from media_converter.bulk_convert.deferred_converter import (
+    DeferredConverter,
+    DeferredResult,
+    QueuedFile,
+    apply_conversions_op,
+)
+from media_converter.config import MediaConverterConfig
+from media_converter.file_converters.common import LocalFile
+from tests.immediate_op import ImmediateOp
+
+MEDIA_DIR = "collection.media"
+
+
+@pytest.fixture
+def col() -> MagicMock:
+    notes = {
+        NoteId(1): {"Front": '<img src="a.png">', "Back": "[sound:b.wav]"},
+        NoteId(2): {"Front": '<img src="a.png">', "Back": ""},
+    }
+    col = MagicMock()
+    col.media.dir.return_value = MEDIA_DIR
+    col.media.have.side_effect = lambda filename: filename in ("a.png", "b.wav")
+    col.get_note.side_effect = notes.__getitem__
+    return col
+
+
+@pytest.fixture
+def references(monkeypatch) -> Mock:
+    index = Mock()
+    index.references.side_effect = lambda col, filenames: {
+        filename: {"a.png": [NoteId(1), NoteId(2)], "b.wav": [NoteId(1)]}.get(filename, []) for filename in filenames
+    }
+    monkeypatch.setattr(deferred_converter, "get_reference_index", lambda: index)
+    return index
+
+
+@pytest.fixture
+def converter(col, references, monkeypatch, tmp_path: pathlib.Path, no_anki_config) -> DeferredConverter:
+    monkeypatch.setattr(deferred_converter, "mw", Mock(col=col))
+    monkeypatch.setattr(deferred_converter, "tooltip", Mock())
+    monkeypatch.setattr(ImmediateOp, "col", col)
+    monkeypatch.setattr(deferred_converter, "QueryOp", ImmediateOp)
+    monkeypatch.setattr(deferred_converter, "CollectionOp", ImmediateOp)
+    queue = ConversionQueue(str(tmp_path / "queue.sqlite3"))
+    queue.push(MEDIA_DIR, ["a.png", "deleted.png"])
+    queue.push(MEDIA_DIR, ["b.wav"], kind="audio")
+    return DeferredConverter(no_anki_config, queue)
+
+
+def test_apply_conversions_op(col: MagicMock, references: Mock) -> None:
+    apply_conversions_op(col, {"a.png": "a.webp", "b.wav": "b.ogg"})
+    assert col.get_note(NoteId(1)) == {"Front": '<img src="a.webp">', "Back": "[sound:b.ogg]"}
+    assert col.get_note(NoteId(2)) == {"Front": '<img src="a.webp">', "Back": ""}
+    col.update_notes.assert_called_once()
+    assert len(col.update_notes.call_args.args[0]) == 2
+    col.media.trash_files.assert_not_called()
+
+
+def test_flush(converter: DeferredConverter, col: MagicMock, monkeypatch) -> None:
+    def convert(files: list[QueuedFile], config: MediaConverterConfig) -> DeferredResult:
+        # Audio is converted too, and files that are gone are dropped from the queue.
+        assert [queued.file for queued in files] == [LocalFile.image("a.png"), LocalFile.audio("b.wav")]
+        return DeferredResult(converted={"a.png": "a.webp"}, failed={"b.wav": "broken"})
+
+    monkeypatch.setattr(deferred_converter, "convert_queued_files", convert)
+    converter.flush()
+    assert col.get_note(NoteId(2))["Front"] == '<img src="a.webp">'
+    assert converter._queue.pending(MEDIA_DIR) == {}
+    assert not converter._running
+
+
+def test_flush_when_notes_cant_be_updated(converter: DeferredConverter, col: MagicMock, monkeypatch) -> None:
+    monkeypatch.setattr(
+        deferred_converter,
+        "convert_queued_files",
+        lambda files, config: DeferredResult(converted={"a.png": "a.webp", "b.wav": "b.ogg"}, failed={}),
+    )
+    col.update_notes.side_effect = RuntimeError("collection is closed")
+    converter.flush()
+    # The converted files exist, so the originals aren't converted again.
+    assert converter._queue.pending(MEDIA_DIR) == {}
+    assert not converter._running
@@ -0,0 +1,49 @@
+# Copyright: Ajatt-Tools and contributors; https://github.com/Ajatt-Tools
+# License: GNU AGPL, version 3 or later; http://www.gnu.org/licenses/agpl.html
+
+import os
+import pathlib
+
+import pytest
+
+from media_converter.media_deduplication.file_links import (
+    LinkKind,
+    copy_file_exclusive,
+    link_or_copy,
+    replace_with_link,
+)
+
+
+def test_replace_with_link(tmp_path: pathlib.Path) -> None:
+    (original := tmp_path / "foo.png").write_bytes(b"image data")
+    (copy := tmp_path / "foo_copy.png").write_bytes(b"image data")
+
+    kind = replace_with_link(original, copy)
+    assert kind in (LinkKind.reflink, LinkKind.hardlink)
+    assert copy.read_bytes() == b"image data"
+    if kind == LinkKind.hardlink:
+        assert os.path.samefile(original, copy)
+    # No temporary files are left behind.
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["foo.png", "foo_copy.png"]
+    # Linking again is a no-op for hardlinks.
+    if kind == LinkKind.hardlink:
+        assert replace_with_link(original, copy) == LinkKind.already_linked
+
+
+def test_link_or_copy(tmp_path: pathlib.Path) -> None:
+    (src := tmp_path / "video.mp4").write_bytes(b"x" * 3_000_000)
+    link_or_copy(src, dst := tmp_path / "renamed.mp4")
+    assert dst.read_bytes() == src.read_bytes()
+
+    with pytest.raises(FileExistsError):
+        link_or_copy(src, dst)
+    with pytest.raises(FileNotFoundError):
+        link_or_copy(tmp_path / "missing.mp4", tmp_path / "new.mp4")
+    assert not (tmp_path / "new.mp4").exists()
+
+
+def test_copy_file_exclusive(tmp_path: pathlib.Path) -> None:
+    (src := tmp_path / "audio.ogg").write_bytes(bytes(range(256)) * 10_000)
+    copy_file_exclusive(src, dst := tmp_path / "copy.ogg")
+    assert dst.read_bytes() == src.read_bytes()
+    assert not os.path.samefile(src, dst)
@@ -0,0 +1,74 @@
+# Copyright: Ajatt-Tools and contributors; https://github.com/Ajatt-Tools
+# License: GNU AGPL, version 3 or later; http://www.gnu.org/licenses/agpl.html
+
+import concurrent.futures
+import os
+import pathlib
+import sys
+
+import pytest
+
+from media_converter.file_converters.file_converter import temp_output_path
+from media_converter.file_converters.image_converter import ImageConverter
+from media_converter.utils.file_paths_factory import NameReservations
+
+
+def test_reserve_counts_up(tmp_path: pathlib.Path) -> None:
+    reservations = NameReservations()
+    (tmp_path / "foo_2.webp").write_bytes(b"taken by someone else")
+    names = [pathlib.Path(reservations.reserve(str(tmp_path / "foo.webp"))).name for _ in range(4)]
+    assert names == ["foo.webp", "foo_1.webp", "foo_3.webp", "foo_4.webp"]
+    # Names are claimed in memory. Nothing is written to the media folder until the file is ready.
+    assert [path.name for path in tmp_path.iterdir()] == ["foo_2.webp"]
+
+
+def test_parallel_reservations_are_distinct(tmp_path: pathlib.Path) -> None:
+    reservations = NameReservations()
+    target = str(tmp_path / "foo.webp")
+    with concurrent.futures.ThreadPoolExecutor(max_workers=8) as executor:
+        paths = list(executor.map(lambda _: reservations.reserve(target), range(64)))
+    assert len(set(paths)) == 64
+
+
+def test_released_names_can_be_claimed_again(tmp_path: pathlib.Path) -> None:
+    reservations = NameReservations()
+    first = reservations.reserve(str(tmp_path / "foo.webp"))
+    reservations.release(first)
+    # A file written under the name keeps it taken.
+    pathlib.Path(first).write_bytes(b"data")
+    second = reservations.reserve(first)
+    reservations.release(second)
+    assert reservations.reserve(second) == second
+    assert pathlib.Path(second).name == "foo_1.webp"
+
+
+def test_temp_output_path_keeps_directory_and_extension(tmp_path: pathlib.Path) -> None:
+    path = pathlib.Path(temp_output_path(str(tmp_path / "foo.ogg")))
+    assert path.parent == tmp_path
+    assert path.suffix == ".ogg"
+    assert path.name.startswith(".")
+
+
+def run_script(destination_path: str, script: str) -> None:
+    """Write the output with a Python one-liner instead of an encoder."""
+    conv = object.__new__(ImageConverter)
+    conv._source_path = os.path.join(os.path.dirname(destination_path), "source.png")
+    conv._destination_path = destination_path
+    conv._run_to_destination(lambda output_path: [sys.executable, "-c", script, output_path])
+
+
+def test_failed_conversion_leaves_destination_untouched(tmp_path: pathlib.Path) -> None:
+    destination = tmp_path / "foo.webp"
+    destination.write_bytes(b"old")
+    with pytest.raises(RuntimeError):
+        run_script(str(destination), "import sys; open(sys.argv[1], 'wb').write(b'partial'); sys.exit(1)")
+    assert destination.read_bytes() == b"old"
+    assert [path.name for path in tmp_path.iterdir()] == ["foo.webp"]
+
+
+def test_successful_conversion_replaces_destination(tmp_path: pathlib.Path) -> None:
+    destination = tmp_path / "foo.webp"
+    destination.touch()
+    run_script(str(destination), "import sys; open(sys.argv[1], 'wb').write(b'new')")
+    assert destination.read_bytes() == b"new"
+    assert [path.name for path in tmp_path.iterdir()] == ["foo.webp"]
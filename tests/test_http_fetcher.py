@@ -0,0 +1,136 @@
+# Copyright: Ajatt-Tools and contributors; https://github.com/Ajatt-Tools
+# License: GNU AGPL, version 3 or later; http://www.gnu.org/licenses/agpl.html
+
+import collections
+import http.server
+import os
+import pathlib
+import threading
+from collections.abc import Iterator
+
+import pytest
+
+from media_converter.utils.http_fetcher import (
+    CachedResponse,
+    HttpCache,
+    ImageFetcher,
+    ResponseTooLarge,
+)
+
+IMAGE_BODY = b"\x89PNG fake image body"
+ETAG = '"v1"'
+
+
+class StandInHandler(http.server.BaseHTTPRequestHandler):
+    """Serves a few fixed responses and counts requests per path."""
+
+    hits: collections.Counter = collections.Counter()
+    not_modified: collections.Counter = collections.Counter()
+
+    def do_GET(self) -> None:
+        self.hits[self.path] += 1
+        if self.path == "/image.png":
+            if self.headers.get("If-None-Match") == ETAG:
+                self.not_modified[self.path] += 1
+                self.send_response(304)
+                self.end_headers()
+                return
+            self._send(IMAGE_BODY, ETag=ETAG)
+        elif self.path == "/no-store.png":
+            self._send(IMAGE_BODY, ETag=ETAG, **{"Cache-Control": "no-store"})
+        elif self.path == "/large.png":
+            self._send(b"x" * 4096)
+        elif self.path == "/large-chunked.png":
+            # No Content-Length, so the size is only known while reading.
+            self.send_response(200)
+            self.end_headers()
+            for _ in range(4):
+                self.wfile.write(b"x" * 1024)
+            self.close_connection = True
+        elif self.path == "/bad-length.png":
+            self.send_response(200)
+            self.send_header("Content-Length", "many")
+            self.end_headers()
+            self.wfile.write(IMAGE_BODY)
+            self.close_connection = True
+        else:
+            self.send_error(404)
+
+    def _send(self, body: bytes, **headers: str) -> None:
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args) -> None:
+        pass
+
+
+@pytest.fixture
+def server() -> Iterator[str]:
+    StandInHandler.hits.clear()
+    StandInHandler.not_modified.clear()
+    httpd = http.server.ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture
+def fetcher(tmp_path: pathlib.Path) -> Iterator[ImageFetcher]:
+    fetcher = ImageFetcher(cache=HttpCache(str(tmp_path / "cache")), max_bytes=2048)
+    yield fetcher
+    fetcher.close()
+
+
+def test_revalidates_with_etag(server: str, fetcher: ImageFetcher) -> None:
+    assert fetcher.fetch(f"{server}/image.png") == IMAGE_BODY
+    assert fetcher.fetch(f"{server}/image.png") == IMAGE_BODY
+    assert StandInHandler.hits["/image.png"] == 2
+    assert StandInHandler.not_modified["/image.png"] == 1
+
+
+def test_no_store_is_not_cached(server: str, fetcher: ImageFetcher) -> None:
+    assert fetcher.fetch(f"{server}/no-store.png") == IMAGE_BODY
+    assert fetcher._cache.get(f"{server}/no-store.png") is None
+
+
+@pytest.mark.parametrize("path", ["/large.png", "/large-chunked.png"])
+def test_size_limit(server: str, fetcher: ImageFetcher, path: str) -> None:
+    with pytest.raises(ResponseTooLarge):
+        fetcher.fetch(f"{server}{path}")
+
+
+def test_malformed_content_length(server: str, fetcher: ImageFetcher) -> None:
+    assert fetcher.fetch(f"{server}/bad-length.png") == IMAGE_BODY
+
+
+def test_iter_fetch_keeps_order(server: str, fetcher: ImageFetcher) -> None:
+    urls = [f"{server}/missing.png", f"{server}/image.png", f"{server}/large.png"]
+    assert list(fetcher.iter_fetch(urls)) == [None, IMAGE_BODY, None]
+
+
+def test_cache_evicts_least_recently_used(tmp_path: pathlib.Path) -> None:
+    cache = HttpCache(str(tmp_path), max_bytes=25)
+    cache.put("a", CachedResponse(b"a" * 10, ETAG, None))
+    cache.put("b", CachedResponse(b"b" * 10, ETAG, None))
+    # Make "b" the least recently used entry.
+    body_b = f"{cache._entry_path('b')}.body"
+    os.utime(body_b, ns=(0, os.stat(body_b).st_mtime_ns - 10**9))
+    cache.put("c", CachedResponse(b"c" * 10, ETAG, None))
+    assert cache.get("b") is None
+    assert cache.get("a") == CachedResponse(b"a" * 10, ETAG, None)
+    assert cache.get("c") is not None
+
+
+def test_prune_skips_vanished_entries(tmp_path: pathlib.Path) -> None:
+    cache = HttpCache(str(tmp_path), max_bytes=15)
+    # Looks like an entry that another thread removed while the cache was scanned.
+    os.symlink(tmp_path / "removed", tmp_path / "vanished.body")
+    cache.put("a", CachedResponse(b"a" * 10, ETAG, None))
+    cache.put("b", CachedResponse(b"b" * 10, ETAG, None))
+    assert cache.get("b") is not None
@@ -0,0 +1,62 @@
+# Copyright: Ajatt-Tools and contributors; https://github.com/Ajatt-Tools
+# License: GNU AGPL, version 3 or later; http://www.gnu.org/licenses/agpl.html
+
+from aqt.qt import QEvent, QKeyEvent, QMouseEvent, QPointF, Qt
+
+from media_converter.utils.idle_gate import ActivityFilter, IdleGate
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 100.0
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.now += seconds
+
+
+def test_idle_gate() -> None:
+    clock = FakeClock()
+    gate = IdleGate(idle_seconds=10, clock=clock)
+    # A new gate doesn't hold the work back.
+    assert gate.is_idle()
+    gate.touch()
+    assert not gate.is_idle()
+    assert gate.seconds_until_idle() == 10
+    clock.now += 4
+    assert gate.seconds_until_idle() == 6
+    gate.wait(lambda: False, sleep=clock.sleep)
+    assert gate.is_idle()
+    assert clock.now == 110
+
+
+def test_idle_gate_wait_stops() -> None:
+    clock = FakeClock()
+    gate = IdleGate(idle_seconds=10, clock=clock)
+    gate.touch()
+    gate.wait(lambda: clock.now >= 101, sleep=clock.sleep)
+    assert clock.now == 101
+    assert not gate.is_idle()
+
+
+def test_activity_filter() -> None:
+    clock = FakeClock()
+    gate = IdleGate(idle_seconds=10, clock=clock)
+    activity_filter = ActivityFilter(gate)
+    key = QKeyEvent(QEvent.Type.KeyPress, Qt.Key.Key_Space, Qt.KeyboardModifier.NoModifier)
+    move = QMouseEvent(
+        QEvent.Type.MouseMove,
+        QPointF(0, 0),
+        QPointF(0, 0),
+        Qt.MouseButton.NoButton,
+        Qt.MouseButton.NoButton,
+        Qt.KeyboardModifier.NoModifier,
+    )
+    # Moving the mouse doesn't count as being busy.
+    assert activity_filter.eventFilter(None, move) is False
+    assert gate.is_idle()
+    # The event is passed on.
+    assert activity_filter.eventFilter(None, key) is False
+    assert not gate.is_idle()
@@ -0,0 +1,95 @@
+# Copyright: Ajatt-Tools and contributors; https://github.com/Ajatt-Tools
+# License: GNU AGPL, version 3 or later; http://www.gnu.org/licenses/agpl.html
+
+import time
+from unittest.mock import Mock
+
+from media_converter.utils import lag_monitor
+from media_converter.utils.lag_monitor import (
+    LagMonitor,
+    Stall,
+    format_stalls,
+    get_lag_monitor,
+    monitor_ui_lag,
+    stall_summary,
+    start_ui_lag_monitor,
+)
+from media_converter.utils.timings import get_timings
+
+
+def block_event_loop(seconds: float) -> None:
+    time.sleep(seconds)
+
+
+def test_blocking_call_is_recorded() -> None:
+    monitor = LagMonitor(threshold_ms=100)
+    with monitor.monitoring("paste") as stalls:
+        block_event_loop(0.3)
+    assert not monitor.is_active()
+    assert len(stalls) == 1
+    assert stalls[0].operation == "paste"
+    assert stalls[0].seconds >= 0.2
+    # The watcher thread sampled the GUI thread while it was blocked.
+    assert "block_event_loop" in stalls[0].stack
+    assert monitor.stalls() == stalls
+    assert any(span.stage == "ui_stall" and span.label == "paste" for span in get_timings().spans())
+
+
+def test_short_operation_is_not_recorded() -> None:
+    monitor = LagMonitor(threshold_ms=100)
+    with monitor.monitoring("paste") as stalls:
+        pass
+    assert stalls == []
+
+
+def test_nested_operations() -> None:
+    monitor = LagMonitor(threshold_ms=100)
+    monitor.begin("bulk conversion")
+    monitor.begin("paste")
+    block_event_loop(0.15)
+    assert monitor.end() == []
+    assert monitor.is_active()
+    stalls = monitor.end()
+    assert not monitor.is_active()
+    assert [stall.operation for stall in stalls] == ["paste"]
+
+
+def test_disabled_in_config(no_anki_config) -> None:
+    assert no_anki_config.monitor_ui_lag is False
+    with monitor_ui_lag("paste", no_anki_config):
+        block_event_loop(0.15)
+    assert not get_lag_monitor().is_active()
+    assert get_lag_monitor().stalls() == []
+
+
+def test_monitor_outlives_the_call(no_anki_config, monkeypatch) -> None:
+    # Background operations end in their callbacks, in any order.
+    no_anki_config["monitor_ui_lag"] = True
+    monkeypatch.setattr(lag_monitor, "tooltip", tooltip := Mock())
+    monitor = get_lag_monitor()
+    finish_conversion = start_ui_lag_monitor("bulk conversion", no_anki_config)
+    finish_deduplication = start_ui_lag_monitor("deduplication", no_anki_config)
+    finish_conversion()
+    assert monitor.is_active()
+    block_event_loop(0.15)
+    finish_deduplication()
+    assert not monitor.is_active()
+    assert monitor.stalls()[-1].operation == "deduplication"
+    tooltip.assert_called_once()
+    assert "during deduplication" in tooltip.call_args.args[0]
+    # Only the first call has an effect.
+    finish_deduplication()
+    tooltip.assert_called_once()
+
+
+def test_format_stalls() -> None:
+    stalls = [
+        Stall("paste", 0, 0.15, ""),
+        Stall("bulk conversion", 0, 0.5, "File 'convert_task.py', line 1\n"),
+    ]
+    text = format_stalls(stalls)
+    assert text.index("bulk conversion: 500 ms") < text.index("paste: 150 ms")
+    assert "convert_task.py" in text
+    assert "(not sampled)" in text
+    assert format_stalls([]) == "No stalls recorded."
+    assert stall_summary("paste", stalls).startswith("The interface was blocked 2 times during paste, up to 500 ms.")
@@ -0,0 +1,90 @@
+# Copyright: Ajatt-Tools and contributors; https://github.com/Ajatt-Tools
+# License: GNU AGPL, version 3 or later; http://www.gnu.org/licenses/agpl.html
+
+from aqt.qt import QPersistentModelIndex, Qt
+
+from media_converter.widgets.lazy_table_model import FETCH_BATCH_SIZE, LazyTableModel
+
+
+def make_model(n_rows: int) -> LazyTableModel:
+    model = LazyTableModel(["Duplicate", "Original"])
+    model.set_rows((f"copy_{idx:05d}.png", f"orig_{idx % 7}.png") for idx in range(n_rows))
+    return model
+
+
+def visible_column(model: LazyTableModel, column: int) -> list[str]:
+    return [model.cell_text(row, column) for row in range(model.visible_row_count())]
+
+
+def test_rows_are_fetched_in_batches() -> None:
+    model = make_model(50_000)
+    assert model.total_row_count() == 50_000
+    assert model.rowCount() == FETCH_BATCH_SIZE
+    assert model.canFetchMore()
+    model.fetchMore()
+    assert model.rowCount() == 2 * FETCH_BATCH_SIZE
+    assert model.data(model.index(0, 1)) == "orig_0.png"
+
+
+def test_sort_and_filter() -> None:
+    model = make_model(100)
+    model.sort(0, Qt.SortOrder.DescendingOrder)
+    assert visible_column(model, 0)[0] == "copy_00099.png"
+
+    model.set_filter("ORIG_3")
+    assert model.visible_row_count() == len(range(3, 100, 7))
+    assert set(visible_column(model, 1)) == {"orig_3.png"}
+    # Filtering keeps the sort order.
+    assert visible_column(model, 0) == sorted(visible_column(model, 0), reverse=True)
+
+    model.set_filter("")
+    assert model.visible_row_count() == 100
+
+
+def test_append_rows_keeps_sort_order() -> None:
+    model = make_model(10)
+    for order in (Qt.SortOrder.AscendingOrder, Qt.SortOrder.DescendingOrder):
+        model.sort(0, order)
+        model.append_rows([(f"copy_{idx:05d}.png", "new.png") for idx in (5, 50, 0)])
+        names = visible_column(model, 0)
+        assert names == sorted(names, reverse=order == Qt.SortOrder.DescendingOrder)
+    assert model.total_row_count() == 16
+    # All rows fit in one batch, so appended rows are shown right away.
+    assert model.rowCount() == 16
+
+
+def test_append_rows_respects_filter() -> None:
+    model = make_model(10)
+    model.set_filter("new")
+    model.append_rows([("a.png", "new.png"), ("b.png", "old.png")])
+    assert visible_column(model, 0) == ["a.png"]
+    assert model.total_row_count() == 12
+
+
+def test_sort_keeps_persistent_indexes() -> None:
+    model = make_model(10)
+    selected = QPersistentModelIndex(model.index(2, 0))
+    assert selected.data() == "copy_00002.png"
+    model.sort(0, Qt.SortOrder.DescendingOrder)
+    assert selected.row() == 7
+    assert selected.data() == "copy_00002.png"
+
+
+def test_append_rows_past_fetched_part() -> None:
+    model = make_model(FETCH_BATCH_SIZE)
+    model.append_rows([("extra.png", "new.png")])
+    # The view fetches the row when it is scrolled to the end.
+    assert model.rowCount() == FETCH_BATCH_SIZE
+    assert model.canFetchMore()
+    model.fetchMore()
+    assert model.cell_text(model.rowCount() - 1, 0) == "extra.png"
+
+
+def test_append_rows_is_announced_before_the_change() -> None:
+    model = make_model(3)
+    model.sort(0, Qt.SortOrder.AscendingOrder)
+    seen = []
+    model.rowsAboutToBeInserted.connect(lambda parent, first, last: seen.append(visible_column(model, 0)))
+    model.append_rows([("copy_00000a.png", "new.png")])
+    assert seen == [["copy_00000.png", "copy_00001.png", "copy_00002.png"]]
+    assert visible_column(model, 0)[1] == "copy_00000a.png"
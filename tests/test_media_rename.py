@@ -7,6 +7,7 @@ from media_converter.media_rename import (
     FileNameEdit,
     MediaRenameDialog,
     RenameTask,
+    anki_media_filename,
     format_report_message,
 )
 
@@ -148,3 +149,24 @@ class TestFormatReportMessage:
         result = format_report_message([])
         assert "<code>0</code> files" in result
         assert "<ol>" not in result
+
+
+@pytest.mark.parametrize(
+    "filename, expected",
+    [
+        ("a:b?.png", "ab.png"),
+        ("^weird|name*.jpg", "weirdname.jpg"),
+        ("tab\there.png", "tabhere.png"),
+        ("Hello.PNG", "hello.png"),
+        ("cafe\u0301.webp", "caf\u00e9.webp"),
+        ("con.png", "con_.png"),
+        ("Lpt1", "lpt1_"),
+        ("com10.png", "com10.png"),
+        ("dots...", "dots..._"),
+        ("a" * 130 + ".webp", "a" * 114 + ".webp"),
+        ("\u3042" * 50 + ".png", "\u3042" * 38 + ".png"),
+    ],
+)
+def test_anki_media_filename(filename: str, expected: str) -> None:
+    # The expected names are the ones Anki's backend gives when the file is added with write_data().
+    assert anki_media_filename(filename) == expected
@@ -1,6 +1,7 @@
 # Copyright: Ajatt-Tools and contributors; https://github.com/Ajatt-Tools
 # License: GNU AGPL, version 3 or later; http://www.gnu.org/licenses/agpl.html
 
+import base64
 import pathlib
 from unittest.mock import Mock
 
@@ -9,12 +10,17 @@ from aqt.qt import QImage, QMimeData, Qt, QUrl
 from requests.exceptions import InvalidSchema, Timeout
 
 from media_converter.utils import mime_helper
+from media_converter.utils.http_fetcher import ImageFetcher
 from media_converter.utils.mime_helper import (
+    ImageSource,
+    ImageSourceKind,
     data_from_html,
     has_local_files,
     image_candidates,
     image_from_file,
+    image_from_source,
     image_from_url,
+    image_sources,
     iter_files,
     iter_urls,
     urls_from_html,
@@ -173,5 +179,36 @@ class TestImageFromUrl:
         ids=["timeout", "invalid_schema", "os_error"],
     )
     def test_request_errors_yield_none(self, monkeypatch: pytest.MonkeyPatch, exception: Exception) -> None:
-        monkeypatch.setattr(mime_helper.requests, "get", Mock(side_effect=exception))
+        fetcher = ImageFetcher(cache=None)
+        monkeypatch.setattr(fetcher._session, "get", Mock(side_effect=exception))
+        monkeypatch.setattr(mime_helper, "get_image_fetcher", lambda: fetcher)
         assert image_from_url("https://example.com/a.png") is None
+
+
+class TestImageSources:
+    """Tests for image_sources() and image_from_source()."""
+
+    def test_order_and_duplicates(self, tmp_path: pathlib.Path) -> None:
+        png_path = tmp_path / "a.png"
+        mime = QMimeData()
+        mime.setUrls([QUrl.fromLocalFile(str(png_path)), QUrl("https://example.com/b.png")])
+        mime.setHtml(
+            '<img src="https://example.com/b.png"><img alt="c" src="data:image/png;base64,AAAA">'
+            '<img src="https://example.com/d.png">'
+        )
+        assert image_sources(mime) == [
+            ImageSource(ImageSourceKind.file, str(png_path)),
+            ImageSource(ImageSourceKind.url, "https://example.com/b.png"),
+            ImageSource(ImageSourceKind.data, "data:image/png;base64,AAAA"),
+            ImageSource(ImageSourceKind.url, "https://example.com/d.png"),
+        ]
+        assert [source.filename for source in image_sources(mime)] == ["a.png", None, None, None]
+
+    def test_image_from_data_source(self, tmp_path: pathlib.Path) -> None:
+        png_path = tmp_path / "a.png"
+        write_valid_png(png_path)
+        data = base64.b64encode(png_path.read_bytes()).decode("ascii")
+        image = image_from_source(ImageSource(ImageSourceKind.data, f"data:image/png;base64,{data}"))
+        assert image is not None and image.width() == 2
+        image = image_from_source(ImageSource(ImageSourceKind.file, str(png_path)))
+        assert image is not None and image.height() == 2
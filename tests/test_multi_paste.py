@@ -0,0 +1,67 @@
+# Copyright: Ajatt-Tools and contributors; https://github.com/Ajatt-Tools
+# License: GNU AGPL, version 3 or later; http://www.gnu.org/licenses/agpl.html
+
+import pathlib
+import shutil
+from unittest.mock import MagicMock
+
+from aqt.qt import QImage, Qt
+
+from media_converter.file_converters.image_converter import ImageConverter
+from media_converter.file_converters.multi_paste_converter import (
+    MultiPasteConverter,
+    decode_image,
+    unique_images,
+)
+from media_converter.utils.mime_helper import ImageSource, ImageSourceKind
+from media_converter.utils.show_options import ShowOptions
+
+
+def write_png(path: pathlib.Path, color: Qt.GlobalColor, fmt: str = "PNG") -> ImageSource:
+    image = QImage(4, 3, QImage.Format.Format_RGB32)
+    image.fill(color)
+    assert image.save(str(path), fmt)
+    return ImageSource(ImageSourceKind.file, str(path))
+
+
+def test_decode_and_deduplicate(tmp_path: pathlib.Path) -> None:
+    red = write_png(tmp_path / "red.png", Qt.GlobalColor.red)
+    # Same picture in a different file format.
+    red_bmp = write_png(tmp_path / "red.bmp", Qt.GlobalColor.red, "BMP")
+    blue = write_png(tmp_path / "blue.png", Qt.GlobalColor.blue)
+    missing = ImageSource(ImageSourceKind.file, str(tmp_path / "missing.png"))
+
+    decoded = [decode_image(source) for source in (red, missing, red_bmp, blue)]
+    assert decoded[1] is None
+    assert decoded[0].dimensions == (4, 3)
+
+    images = unique_images(decoded)
+    assert [image.source for image in images] == [red, blue]
+    assert not pathlib.Path(decoded[2].tmp_file._tmp_filepath).exists()
+    for image in images:
+        image.tmp_file.close()
+
+
+def test_convert_sources(tmp_path: pathlib.Path, no_anki_config, monkeypatch) -> None:
+    red = write_png(tmp_path / "red.png", Qt.GlobalColor.red)
+    blue = write_png(tmp_path / "blue.png", Qt.GlobalColor.blue)
+    media_dir = tmp_path / "collection.media"
+    media_dir.mkdir()
+    editor = MagicMock()
+    editor.mw.col.media.dir.return_value = str(media_dir)
+    conv = MultiPasteConverter(editor, ShowOptions.paste, no_anki_config)
+    monkeypatch.setattr(conv, "_make_destination_path", lambda filename: str(media_dir / f"{filename}.webp"))
+    converted = []
+
+    def run_converter(image_converter: ImageConverter, destination_path: str) -> None:
+        # Every image goes through the converter that keeps the conversion records and provenance.
+        shutil.copy(image_converter.source_path, destination_path)
+        converted.append(pathlib.Path(destination_path).name)
+
+    monkeypatch.setattr(conv, "_run_converter", run_converter)
+
+    result = conv.convert_sources([red, blue])
+    assert result.failed == []
+    assert result.converted == [str(media_dir / "red.png.webp"), str(media_dir / "blue.png.webp")]
+    assert all(pathlib.Path(path).is_file() for path in result.converted)
+    assert sorted(converted) == ["blue.png.webp", "red.png.webp"]
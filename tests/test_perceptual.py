@@ -0,0 +1,84 @@
+# Copyright: Ajatt-Tools and contributors; https://github.com/Ajatt-Tools
+# License: GNU AGPL, version 3 or later; http://www.gnu.org/licenses/agpl.html
+
+import pathlib
+import random
+
+import pytest
+from aqt.qt import QColor, QImage, QPainter, Qt
+
+from media_converter.media_deduplication.perceptual import (
+    BKTree,
+    group_similar,
+    hamming_distance,
+    image_file_dhash,
+)
+
+
+def draw_picture(path: pathlib.Path, width: int, height: int, flipped: bool = False) -> None:
+    """Draw a simple picture with a gradient and a few shapes and save it."""
+    image = QImage(width, height, QImage.Format.Format_RGB32)
+    image.fill(Qt.GlobalColor.white)
+    painter = QPainter(image)
+    for x in range(width):
+        shade = x * 255 // width
+        painter.setPen(QColor(shade, shade, shade))
+        painter.drawLine(x, 0, x, height // 2)
+    painter.fillRect(width // 8, height // 2, width // 4, height // 3, Qt.GlobalColor.black)
+    painter.fillRect(width // 2, height * 2 // 3, width // 3, height // 4, Qt.GlobalColor.darkBlue)
+    painter.end()
+    if flipped:
+        image = image.mirrored(True, False)
+    assert image.save(str(path))
+
+
+class TestBKTree:
+    def test_matches_brute_force(self) -> None:
+        rng = random.Random(0)
+        keys = [rng.getrandbits(64) for _ in range(500)]
+        # Add near copies of some keys.
+        keys += [key ^ (1 << rng.randrange(64)) for key in keys[:50]]
+        tree: BKTree[int] = BKTree()
+        for idx, key in enumerate(keys):
+            tree.add(key, idx)
+        assert len(tree) == len(keys)
+
+        for query in keys[:60]:
+            expected = {idx for idx, key in enumerate(keys) if hamming_distance(query, key) <= 3}
+            assert {idx for _dist, idx in tree.query(query, radius=3)} == expected
+
+    def test_empty_tree(self) -> None:
+        assert list(BKTree().query(0, radius=64)) == []
+
+
+class TestImageFingerprints:
+    def test_resized_and_reencoded_copies_match(self, tmp_path: pathlib.Path) -> None:
+        draw_picture(original := tmp_path / "foo.png", 400, 300)
+        draw_picture(resized := tmp_path / "foo_small.jpg", 200, 150)
+        draw_picture(different := tmp_path / "bar.png", 400, 300, flipped=True)
+
+        original_hash = image_file_dhash(original)
+        assert original_hash is not None
+        assert hamming_distance(original_hash, image_file_dhash(resized)) <= 4
+        assert hamming_distance(original_hash, image_file_dhash(different)) > 10
+
+    def test_not_an_image(self, tmp_path: pathlib.Path) -> None:
+        (path := tmp_path / "fake.png").write_bytes(b"not an image")
+        assert image_file_dhash(path) is None
+
+
+@pytest.mark.parametrize("max_distance, expected_size", [(0, 2), (2, 3), (3, 4)])
+def test_group_similar(max_distance: int, expected_size: int) -> None:
+    fingerprints = {
+        pathlib.Path("a.png"): 0b0000,
+        pathlib.Path("b.jpg"): 0b0000,
+        pathlib.Path("c.webp"): 0b0011,
+        pathlib.Path("d.png"): 0b0111,
+        pathlib.Path("unrelated.png"): 0xFFFF_0000,
+    }
+    groups = group_similar(fingerprints, max_distance, sort_key=lambda path: path.name)
+    assert len(groups) == 1
+    assert len(groups[0]) == expected_size
+    # The file that starts a group comes first.
+    assert groups[0][0] == pathlib.Path("a.png")
+    assert pathlib.Path("unrelated.png") not in groups[0]
@@ -0,0 +1,109 @@
+# Copyright: Ajatt-Tools and contributors; https://github.com/Ajatt-Tools
+# License: GNU AGPL, version 3 or later; http://www.gnu.org/licenses/agpl.html
+
+import pathlib
+
+import pytest
+
+from media_converter.bulk_convert import reconvert_plan
+from media_converter.bulk_convert.reconvert_plan import (
+    ReconvertReason,
+    expected_pixels,
+    plan_reconvert,
+)
+from media_converter.media_deduplication.conversion_index import (
+    ConversionIndex,
+    Provenance,
+    image_settings_sha1,
+)
+from media_converter.utils.show_options import ImageDimensions
+
+ENCODER_VERSION = "1.3.2"
+
+
+@pytest.fixture
+def media_dir(tmp_path: pathlib.Path) -> pathlib.Path:
+    media_dir = tmp_path / "collection.media"
+    media_dir.mkdir()
+    return media_dir
+
+
+@pytest.fixture
+def index(tmp_path: pathlib.Path) -> ConversionIndex:
+    return ConversionIndex(str(tmp_path / "index.sqlite3"))
+
+
+@pytest.fixture(autouse=True)
+def fixed_encoder_version(monkeypatch) -> None:
+    monkeypatch.setattr(reconvert_plan, "image_encoder_version", lambda config: ENCODER_VERSION)
+
+
+def add_file(
+    media_dir: pathlib.Path, index: ConversionIndex, name: str, provenance: Provenance | None, size: int = 1000
+) -> None:
+    (media_dir / name).write_bytes(b"x" * size)
+    if provenance:
+        index.store_provenance(str(media_dir), name, provenance, pixels=100)
+
+
+def test_plan_reconvert(media_dir: pathlib.Path, index: ConversionIndex, no_anki_config) -> None:
+    no_anki_config.bulk_reconvert = True
+    current = Provenance("source", image_settings_sha1(no_anki_config), ENCODER_VERSION)
+    add_file(media_dir, index, "fresh.webp", current)
+    add_file(media_dir, index, "old_settings.webp", current._replace(settings_hash="old"))
+    add_file(media_dir, index, "old_encoder.webp", current._replace(encoder_version="1.0.0"))
+    add_file(media_dir, index, "foreign.webp", None)
+    add_file(media_dir, index, "photo.png", None)
+
+    plan = plan_reconvert(sorted(p.name for p in media_dir.iterdir()), str(media_dir), no_anki_config, index)
+    assert plan.reasons == {
+        "foreign.webp": ReconvertReason.unknown_origin,
+        "fresh.webp": ReconvertReason.up_to_date,
+        "old_encoder.webp": ReconvertReason.different_encoder,
+        "old_settings.webp": ReconvertReason.different_settings,
+        "photo.png": ReconvertReason.not_converted,
+    }
+    assert plan.to_skip() == {"fresh.webp": ReconvertReason.up_to_date}
+    assert plan.summary().splitlines()[0] == "4 of 5 images will be converted."
+    assert "1 already converted with the current settings." in plan.summary()
+
+
+def test_plan_reconvert_min_gain(media_dir: pathlib.Path, index: ConversionIndex, no_anki_config, monkeypatch) -> None:
+    no_anki_config.bulk_reconvert = True
+    no_anki_config.bulk_reconvert_min_gain = 30
+    no_anki_config["image_width"] = 0
+    no_anki_config["image_height"] = 0
+    current = Provenance("source", image_settings_sha1(no_anki_config), ENCODER_VERSION)
+    # Earlier conversions with the current settings took 2 bytes per pixel.
+    add_file(media_dir, index, "calibration.webp", current, size=200)
+    add_file(media_dir, index, "bloated.webp", current._replace(settings_hash="old"), size=1000)
+    add_file(media_dir, index, "tight.webp", current._replace(settings_hash="old"), size=240)
+    monkeypatch.setattr(reconvert_plan, "read_dimensions", lambda path: ImageDimensions(10, 10))
+
+    plan = plan_reconvert(["bloated.webp", "tight.webp"], str(media_dir), no_anki_config, index)
+    # 1000 bytes would become about 200, but 240 bytes would only shrink by a sixth.
+    assert plan.reasons == {
+        "bloated.webp": ReconvertReason.different_settings,
+        "tight.webp": ReconvertReason.small_gain,
+    }
+
+
+@pytest.mark.parametrize(
+    "dims, width, height, avoid_upscaling, expected",
+    [
+        (ImageDimensions(1000, 500), 0, 0, True, 500_000),
+        (ImageDimensions(1000, 500), 200, 0, True, 200 * 100),
+        (ImageDimensions(1000, 500), 0, 100, True, 200 * 100),
+        (ImageDimensions(1000, 500), 300, 300, True, 90_000),
+        (ImageDimensions(100, 50), 200, 0, True, 5_000),
+        (ImageDimensions(100, 50), 200, 0, False, 200 * 100),
+        (ImageDimensions(0, 0), 200, 0, True, 0),
+    ],
+)
+def test_expected_pixels(
+    dims: ImageDimensions, width: int, height: int, avoid_upscaling: bool, expected: int, no_anki_config
+) -> None:
+    no_anki_config["image_width"] = width
+    no_anki_config["image_height"] = height
+    no_anki_config["avoid_upscaling"] = avoid_upscaling
+    assert expected_pixels(dims, no_anki_config) == expected
@@ -0,0 +1,121 @@
+# Copyright: Ajatt-Tools and contributors; https://github.com/Ajatt-Tools
+# License: GNU AGPL, version 3 or later; http://www.gnu.org/licenses/agpl.html
+
+import pathlib
+import time
+from collections.abc import Iterator
+
+import pytest
+from anki import hooks
+from anki.collection import Collection
+from anki.notes import Note
+
+from media_converter.media_deduplication import reference_index
+from media_converter.media_deduplication.reference_index import (
+    ReferenceIndex,
+    referenced_files,
+    trash_unreferenced,
+)
+
+
+@pytest.fixture
+def col(tmp_path: pathlib.Path) -> Iterator[Collection]:
+    col = Collection(str(tmp_path / "collection.anki2"))
+    yield col
+    col.close()
+
+
+@pytest.fixture
+def index(tmp_path: pathlib.Path) -> Iterator[ReferenceIndex]:
+    index = ReferenceIndex(str(tmp_path / "reference_index.sqlite3"))
+    # The add-on registers the same hooks when Anki starts.
+    hooks.note_will_flush.append(index.on_note_will_flush)
+    hooks.notes_will_be_deleted.append(index.on_notes_will_be_deleted)
+    yield index
+    hooks.note_will_flush.remove(index.on_note_will_flush)
+    hooks.notes_will_be_deleted.remove(index.on_notes_will_be_deleted)
+
+
+def add_note(col: Collection, front: str, back: str = "") -> Note:
+    note = col.new_note(col.models.by_name("Basic"))
+    note["Front"], note["Back"] = front, back
+    col.add_note(note, col.decks.id("Default"))
+    return note
+
+
+def test_referenced_files() -> None:
+    flds = (
+        "<img src=\"a.webp\"><img src='b b.png'>[sound:c.mp3]"
+        '<a href="d.pdf">d.pdf</a><div style="background: url(&quot;e.jpg&quot;)"></div>'
+        '<img src="https://example.com/f.png"><img src="data:image/png;base64,AAAA">'
+        '<img src="g&amp;h.png">'
+    )
+    assert referenced_files(flds) == {"a.webp", "b b.png", "c.mp3", "d.pdf", "e.jpg", "g&amp;h.png", "g&h.png"}
+
+
+def test_references_follow_changes(col: Collection, index: ReferenceIndex) -> None:
+    first = add_note(col, '<img src="shared.png">', "[sound:first.mp3]")
+    second = add_note(col, '<img src="shared.png">')
+    assert index.references(col, ["shared.png", "first.mp3", "missing.png"]) == {
+        "shared.png": sorted([first.id, second.id]),
+        "first.mp3": [first.id],
+        "missing.png": [],
+    }
+
+    first["Front"] = '<img src="shared.webp">'
+    col.update_note(first)
+    third = add_note(col, "[sound:first.mp3]")
+    col.remove_notes([second.id])
+    assert index.references(col, ["shared.png", "shared.webp", "first.mp3"]) == {
+        "shared.png": [],
+        "shared.webp": [first.id],
+        "first.mp3": sorted([first.id, third.id]),
+    }
+
+
+def test_references_after_changes_without_hooks(col: Collection, index: ReferenceIndex) -> None:
+    note = add_note(col, '<img src="old.png">')
+    # Changes are told apart by modification time, which is stored in seconds.
+    col.db.execute("UPDATE notes SET mod = mod - 10 WHERE id = ?", note.id)
+    assert index.references(col, ["old.png"]) == {"old.png": [note.id]}
+    note["Front"] = '<img src="new.webp">'
+    col.update_note(note)
+    assert index.references(col, ["old.png", "new.webp"]) == {"old.png": [], "new.webp": [note.id]}
+    # Undo restores the note in the backend, so Python hooks don't run.
+    col.undo()
+    assert index.references(col, ["old.png", "new.webp"]) == {"old.png": [note.id], "new.webp": []}
+    # Notes removed with SQL don't run the hooks either.
+    col.db.execute("DELETE FROM notes WHERE id = ?", note.id)
+    assert index.references(col, ["old.png"]) == {"old.png": []}
+
+
+def test_references_after_change_in_the_same_second(col: Collection, tmp_path: pathlib.Path) -> None:
+    # No hooks, and the modification time doesn't change.
+    index = ReferenceIndex(str(tmp_path / "unhooked.sqlite3"))
+    note = add_note(col, '<img src="old.png">')
+    same_second = int(time.time()) + 100
+    col.db.execute("UPDATE notes SET mod = ? WHERE id = ?", same_second, note.id)
+    assert index.references(col, ["old.png"]) == {"old.png": [note.id]}
+    col.db.execute("UPDATE notes SET flds = ? WHERE id = ?", '<img src="new.webp">\x1f', note.id)
+    assert index.references(col, ["old.png", "new.webp"]) == {"old.png": [], "new.webp": [note.id]}
+
+
+def test_rebuild(col: Collection, index: ReferenceIndex) -> None:
+    for n in range(3):
+        add_note(col, f'<img src="{n}.png">')
+    assert index.rebuild(col) == 3
+    assert [len(ids) for ids in index.references(col, ["0.png", "1.png", "2.png"]).values()] == [1, 1, 1]
+
+
+def test_trash_unreferenced(col: Collection, index: ReferenceIndex, monkeypatch) -> None:
+    monkeypatch.setattr(reference_index, "get_reference_index", lambda: index)
+    media_dir = pathlib.Path(col.media.dir())
+    names = ["used.png", "in_srcset.png", "mentioned (1).png", "unused.png"]
+    for name in names:
+        (media_dir / name).write_bytes(b"x")
+    add_note(col, '<img src="used.png">')
+    # The index doesn't parse these, but the files are still in use.
+    add_note(col, '<img srcset="in_srcset.png 2x">', "See mentioned (1).png")
+    assert trash_unreferenced(col, names) == ["unused.png"]
+    assert all((media_dir / name).exists() for name in names[:-1])
+    assert not (media_dir / "unused.png").exists()
@@ -0,0 +1,23 @@
+# Copyright: Ajatt-Tools and contributors; https://github.com/Ajatt-Tools
+# License: GNU AGPL, version 3 or later; http://www.gnu.org/licenses/agpl.html
+
+from media_converter.config import MediaConverterConfig
+from media_converter.file_converters.speculative_encoder import EncodeSettings
+
+DIALOG_VALUES = {"enable_image_conversion": True, "image_width": 0, "image_height": 200, "image_quality": 50}
+
+
+def test_encode_settings_cover_the_whole_config(no_anki_config: MediaConverterConfig) -> None:
+    settings = EncodeSettings.of(no_anki_config, DIALOG_VALUES)
+    assert settings == EncodeSettings.of(no_anki_config, dict(DIALOG_VALUES))
+    assert settings != EncodeSettings.of(no_anki_config, {**DIALOG_VALUES, "enable_image_conversion": False})
+    assert settings != EncodeSettings.of(no_anki_config, {**DIALOG_VALUES, "image_quality": 51})
+    # Settings that aren't in the dialog change the file too.
+    no_anki_config["cwebp_args"] = [*no_anki_config["cwebp_args"], "-sharp_yuv"]
+    assert settings != EncodeSettings.of(no_anki_config, DIALOG_VALUES)
+
+
+def test_encode_settings_make_config(no_anki_config: MediaConverterConfig) -> None:
+    config = EncodeSettings.of(no_anki_config, DIALOG_VALUES).make_config(no_anki_config)
+    assert (config.image_width, config.image_height, config.image_quality) == (0, 200, 50)
+    assert config["cwebp_args"] == no_anki_config["cwebp_args"]
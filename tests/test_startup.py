@@ -0,0 +1,92 @@
+# Copyright: Ajatt-Tools and contributors; https://github.com/Ajatt-Tools
+# License: GNU AGPL, version 3 or later; http://www.gnu.org/licenses/agpl.html
+
+import os
+import pathlib
+import subprocess
+import sys
+import typing
+
+import pytest
+
+REPO_ROOT = pathlib.Path(__file__).parent.parent
+# The add-on's own share of Anki's startup time.
+STARTUP_IMPORT_BUDGET_MS = 250
+# Modules imported by Anki before it loads add-ons.
+PRELOADED = "import anki.collection, anki.hooks, aqt, aqt.editor, aqt.operations, aqt.qt, aqt.utils"
+# Modules that must not be imported until a hook fires for the first time.
+DEFERRED_MODULES = (
+    "requests",
+    "media_converter.events",
+    "media_converter.menus",
+    "media_converter.bulkconvert",
+    "media_converter.utils.mime_helper",
+    "media_converter.dialogs.main_settings_dialog",
+    "media_converter.media_deduplication.deduplication",
+)
+
+
+class ImportTime(typing.NamedTuple):
+    name: str
+    cumulative_us: int
+    depth: int
+
+
+def parse_importtime(stderr: str) -> list[ImportTime]:
+    """Parse the output of python -X importtime."""
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.removeprefix("import time:").split("|")
+        # The name is indented by two spaces per nesting level, after the separating space.
+        stripped = name.lstrip()
+        entries.append(ImportTime(stripped, int(cumulative), (len(name) - len(stripped) - 1) // 2))
+    return entries
+
+
+@pytest.fixture(scope="module")
+def startup_import() -> tuple[list[ImportTime], set[str]]:
+    # Only the modules imported by the add-on are printed. Anki itself imports requests, for example.
+    code = (
+        f"{PRELOADED}; import sys; before = set(sys.modules); import media_converter.startup; "
+        "print(*(name for name in sys.modules if name not in before), sep='\\n')"
+    )
+    env = {**os.environ, "QT_QPA_PLATFORM": "offscreen"}
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=REPO_ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return parse_importtime(proc.stderr), set(proc.stdout.split())
+
+
+def test_heavy_modules_are_deferred(startup_import) -> None:
+    _, loaded = startup_import
+    assert loaded.isdisjoint(DEFERRED_MODULES)
+
+
+def test_startup_import_budget(startup_import) -> None:
+    entries, _ = startup_import
+    total_us = sum(
+        entry.cumulative_us for entry in entries if entry.depth == 0 and entry.name.startswith("media_converter")
+    )
+    assert total_us > 0
+    assert total_us / 1000 < STARTUP_IMPORT_BUDGET_MS
+
+
+def test_parse_importtime() -> None:
+    stderr = (
+        "import time: self [us] | cumulative | imported package\n"
+        "import time:       120 |        120 |     media_converter.consts\n"
+        "import time:       300 |        420 |   media_converter.config\n"
+        "import time:        80 |        500 | media_converter\n"
+    )
+    assert parse_importtime(stderr) == [
+        ImportTime("media_converter.consts", 120, 2),
+        ImportTime("media_converter.config", 420, 1),
+        ImportTime("media_converter", 500, 0),
+    ]
@@ -0,0 +1,83 @@
+# Copyright: Ajatt-Tools and contributors; https://github.com/Ajatt-Tools
+# License: GNU AGPL, version 3 or later; http://www.gnu.org/licenses/agpl.html
+
+import concurrent.futures
+import json
+import pathlib
+import pstats
+
+import pytest
+
+from media_converter.utils.timings import (
+    PROFILE_ENV_VAR,
+    RunProfiler,
+    Span,
+    TimingRecorder,
+    percentile,
+)
+
+
+def test_percentile() -> None:
+    values = [float(n) for n in range(1, 101)]
+    assert percentile(values, 50) == 50
+    assert percentile(values, 95) == 95
+    assert percentile(values, 99) == 99
+    assert percentile([7.0], 99) == 7
+    assert percentile([], 50) == 0
+
+
+def test_stats_per_stage_and_label() -> None:
+    recorder = TimingRecorder()
+    for seconds in (0.1, 0.2, 0.3, 0.4):
+        recorder.record(Span("encode", "cwebp", 0, seconds))
+    recorder.record(Span("encode", "ffmpeg", 0, 2.0))
+    with recorder.span("temp_write"):
+        pass
+    stats = {(row.stage, row.label): row for row in recorder.stats()}
+    assert set(stats) == {("encode", "cwebp"), ("encode", "ffmpeg"), ("temp_write", "")}
+    cwebp = stats["encode", "cwebp"]
+    assert (cwebp.count, cwebp.p50, cwebp.p99) == (4, 0.2, 0.4)
+    assert cwebp.total == pytest.approx(1.0)
+
+
+def test_ring_buffer_drops_oldest() -> None:
+    recorder = TimingRecorder(capacity=3)
+    for n in range(5):
+        recorder.record(Span("encode", "", n, 1.0))
+    assert [span.started_at for span in recorder.spans()] == [2, 3, 4]
+
+
+def test_span_is_recorded_on_error() -> None:
+    recorder = TimingRecorder()
+    with pytest.raises(RuntimeError):
+        with recorder.span("encode", "cwebp"):
+            raise RuntimeError()
+    assert len(recorder.spans()) == 1
+
+
+def test_export_json(tmp_path: pathlib.Path) -> None:
+    recorder = TimingRecorder()
+    recorder.record(Span("update_notes", "", 0, 0.5))
+    recorder.export_json(str(tmp_path / "timings.json"))
+    exported = json.loads((tmp_path / "timings.json").read_text(encoding="utf-8"))
+    assert exported["spans"] == [{"stage": "update_notes", "label": "", "started_at": 0, "seconds": 0.5}]
+    assert exported["stats"][0]["p95"] == 0.5
+
+
+def test_run_profiler(tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.delenv(PROFILE_ENV_VAR, raising=False)
+    assert RunProfiler.from_env() is None
+    monkeypatch.setenv(PROFILE_ENV_VAR, str(tmp_path))
+    profiler = RunProfiler.from_env()
+    assert profiler.dump("bulk_convert") is None
+
+    def double(n: int) -> int:
+        return n * 2
+
+    # Calls from several threads at once don't clash, even where only one profiler may be active.
+    with concurrent.futures.ThreadPoolExecutor(max_workers=3) as executor:
+        assert list(executor.map(profiler.wrap(double), range(6))) == [0, 2, 4, 6, 8, 10]
+    path = profiler.dump("bulk_convert")
+    assert path and pathlib.Path(path).parent == tmp_path
+    stats = pstats.Stats(path).stats
+    assert [calls[0] for (_, _, func), calls in stats.items() if func == "double"] == [6]